@@ -0,0 +1,52 @@
+"""Run the timing benchmarks on synthetic universes.
+
+Usage (from the `src` folder):
+
+    python -m crypto_momentum_portfolios.benchmark_suite --output bench.json
+    python -m crypto_momentum_portfolios.benchmark_suite --baseline baseline.json --threshold 0.2
+    python -m crypto_momentum_portfolios.benchmark_suite --profile full --filter run_strategy
+"""
+import argparse
+import sys
+
+from crypto_momentum_portfolios.benchmark_suite.suite import (
+    build_cases,
+    compare_with_baseline,
+    load_report,
+    run_suite,
+    save_report,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=["quick", "full"], default="quick")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--filter", default=None, help="Only run the matching cases")
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    parser.add_argument("--baseline", default=None, help="The baseline JSON report")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="The relative slowdown flagged as a regression",
+    )
+    args = parser.parse_args()
+
+    report = run_suite(build_cases(args.profile), args.repeat, args.filter)
+    if args.output is not None:
+        save_report(report, args.output)
+    if args.baseline is None:
+        return 0
+
+    comparison = compare_with_baseline(report, load_report(args.baseline), args.threshold)
+    print(comparison.to_string(float_format=lambda x: f"{x:.4f}"))
+    regressions = comparison[comparison["regression"]]
+    if not regressions.empty:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,685 @@
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+from crypto_momentum_portfolios.utility.constants import SLIPPAGE_EFFECT
+from crypto_momentum_portfolios.utility.synthetic import (
+    generate_synthetic_panel,
+    generate_synthetic_universe,
+)
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    Benchmark,
+    CovarianceEstimator,
+    Fields,
+    RebalanceFrequency,
+    Side,
+)
+
+ALLOCATION_K = (3, 5, 10, 20, 50)
+HEADLESS_MODULES = [
+    "crypto_momentum_portfolios.portfolio_management.backtester",
+    "crypto_momentum_portfolios.portfolio_management.combiner",
+    "crypto_momentum_portfolios.portfolio_management.information_coefficient",
+    "crypto_momentum_portfolios.portfolio_management.sweep_charts",
+    "crypto_momentum_portfolios.utility.data_loader",
+]
+PLOTTING_MODULES = ["quant_invest_lab", "plotly", "matplotlib"]
+RUN_STRATEGY_SIZES = {
+    "quick": [(20, 3), (100, 3)],
+    "full": [(20, 3), (20, 10), (100, 3), (100, 10), (500, 3), (500, 10)],
+}
+
+
+@dataclass
+class BenchmarkCase:
+    """A timed case of the suite.
+
+    Attributes:
+    ----
+        name (str): The unique name of the case, used to match the baseline.
+        setup (Callable[[], Callable[[], Any]]): Prepare the inputs (not timed) and return the function to time.
+    """
+
+    name: str
+    setup: Callable[[], Callable[[], Any]]
+
+
+@lru_cache(maxsize=None)
+def synthetic_universe(n_assets: int, n_years: int) -> pd.DataFrame:
+    return generate_synthetic_universe(n_assets, n_years * 365 + 30, seed=n_assets)
+
+
+@lru_cache(maxsize=None)
+def synthetic_panel(n_assets: int, n_years: int) -> pd.DataFrame:
+    return generate_synthetic_panel(n_assets, n_years * 365, seed=n_assets)
+
+
+def indicators_cases() -> List[BenchmarkCase]:
+    from crypto_momentum_portfolios.portfolio_management.indicators import Indicators
+
+    functions = [
+        "returns",
+        "momentum",
+        "ema_momentum",
+        "ts_momentum",
+        "volatility_neutralized_momentum",
+        "volatility",
+        "instantaneous_volatility",
+        "long_ema",
+        "short_ema",
+        "short_ma",
+        "long_ma",
+    ]
+
+    def case(name: str) -> BenchmarkCase:
+        def setup():
+            prices = synthetic_panel(100, 5)[Fields.PRICE]
+            return lambda: getattr(Indicators, name)(prices, lookback=30)
+
+        return BenchmarkCase(f"indicators.{name}[n=100,years=5]", setup)
+
+    cases = [case(name) for name in functions]
+
+    def sweep_setup():
+        prices = synthetic_panel(100, 5)[Fields.PRICE]
+        return lambda: Indicators.lookback_sweep(prices, np.arange(10, 100, 10))
+
+    cases.append(BenchmarkCase("indicators.lookback_sweep[n=100,years=5,L=9]", sweep_setup))
+
+    def kernel_case(name: str) -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.portfolio_management import kernels
+
+            values = kernels.as_panel(synthetic_panel(100, 5)[Fields.PRICE], np.float32)
+            out, workspace = np.empty_like(values), kernels.KernelWorkspace()
+            kernel = getattr(kernels, name)
+            return lambda: kernel(values, 30, out=out, workspace=workspace)
+
+        return BenchmarkCase(f"indicators.kernels.{name}[n=100,years=5,float32]", setup)
+
+    cases.extend(kernel_case(name) for name in ["rolling_mean", "rolling_std", "ewm_mean"])
+
+    def incremental_case(field: Fields) -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.portfolio_management.incremental import (
+                IncrementalIndicators,
+            )
+
+            prices = synthetic_panel(100, 5)[Fields.PRICE]
+            state = IncrementalIndicators.initialize(prices.iloc[:-2], field, lookback=30)
+            # A first update reserves the capacity of the next appends
+            state = IncrementalIndicators.update(state, prices.iloc[:-1])
+            return lambda: IncrementalIndicators.update(state, prices)
+
+        return BenchmarkCase(f"indicators.incremental.{field}[n=100,years=5,1 bar]", setup)
+
+    cases.extend(
+        incremental_case(field)
+        for field in [Fields.MOMENTUM, Fields.EMA_MOMENTUM, Fields.VOLATILITY]
+    )
+    return cases
+
+
+def data_loader_cases() -> List[BenchmarkCase]:
+    indicator_fields = [
+        Fields.MOMENTUM,
+        Fields.EMA_MOMENTUM,
+        Fields.TS_MOMENTUM,
+        Fields.VOLATILITY_NEUTRALIZED_MOMENTUM,
+        Fields.RETURNS,
+        Fields.VOLATILITY,
+    ]
+    lookbacks = dict(
+        momentum_lookback=30,
+        ts_momentum_lookback=30,
+        ema_momentum_lookback=30,
+        volatility_lookback=30,
+    )
+
+    def case(attach: bool) -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.utility.cache import SharedResourceCache
+            from crypto_momentum_portfolios.utility.constants import CRYPTOS
+            from crypto_momentum_portfolios.utility.data_loader import (
+                CryptoDataLoaderQIL,
+            )
+
+            panel = synthetic_panel(100, 5)
+            panel_path = (
+                os.path.join(tempfile.mkdtemp(), "universe.arrow") if attach else None
+            )
+
+            def get_crypto():
+                # A fresh cache per call so the indicators are really computed (or the file attached)
+                cache = SharedResourceCache()
+                cache.get_or_compute(
+                    "qil_panel", (tuple(sorted(CRYPTOS)), "1day"), lambda: panel
+                )
+                return CryptoDataLoaderQIL(cache).get_crypto(
+                    "all",
+                    fields=[Fields.PRICE, Fields.MARKET_CAP, *indicator_fields, Fields.VOLUME],
+                    panel_path=panel_path,
+                    **lookbacks,
+                )
+
+            if attach:
+                # The first call exports the panel, the timed ones attach it
+                get_crypto()
+            return get_crypto
+
+        return BenchmarkCase(
+            f"data_loader.get_crypto{'.attach' if attach else ''}[n=100,years=5]", setup
+        )
+
+    def csv_case() -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.utility.cache import SharedResourceCache
+            from crypto_momentum_portfolios.utility.constants import DATA_PATH
+            from crypto_momentum_portfolios.utility.data_loader import CryptoDataLoader
+
+            # A synthetic file in the layout of the TOBAM one: a date column and a price column per crypto
+            csv_path = os.path.join(tempfile.mkdtemp(), "daily_crypto_data.csv")
+            synthetic_panel(100, 5)[Fields.PRICE].rename_axis("date").to_csv(csv_path)
+            wrangle = CryptoDataLoader._CryptoDataLoader__wrangle_data
+
+            def get_crypto():
+                # A fresh cache per call so the file is really parsed and the indicators computed
+                cache = SharedResourceCache()
+                cache.get_or_compute(
+                    "csv_panel", (DATA_PATH,), lambda: wrangle(pd.read_csv(csv_path))
+                )
+                return CryptoDataLoader(cache).get_crypto(
+                    "all", fields=[Fields.PRICE, *indicator_fields], **lookbacks
+                )
+
+            return get_crypto
+
+        return BenchmarkCase("data_loader.csv.get_crypto[n=100,years=5]", setup)
+
+    return [case(False), case(True), csv_case()]
+
+
+def allocation_cases() -> List[BenchmarkCase]:
+    def case(method: AllocationMethod, k: int) -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.portfolio_management.allocation import (
+                ALLOCATION_FIELDS,
+                ALLOCATION_TO_FUNCTION,
+            )
+
+            universe = synthetic_universe(max(ALLOCATION_K), 3)
+            assets = universe[Fields.RETURNS].columns[:k].to_list()
+            window = universe[ALLOCATION_FIELDS[method]][assets].iloc[-31:]
+            return lambda: ALLOCATION_TO_FUNCTION[method](assets, window, False)
+
+        return BenchmarkCase(f"allocation.{method}[k={k}]", setup)
+
+    return [case(method, k) for method in AllocationMethod for k in ALLOCATION_K]
+
+
+def covariance_cases() -> List[BenchmarkCase]:
+    def case(estimator: CovarianceEstimator) -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.portfolio_management.covariance import (
+                BatchedCovariance,
+            )
+
+            panel = synthetic_universe(100, 10)[Fields.RETURNS].to_numpy(dtype=float)
+            rebalance_positions = np.arange(30, panel.shape[0], 7)
+            window_starts = rebalance_positions - 30
+            rng = np.random.default_rng(0)
+            selection = np.argsort(
+                rng.random((rebalance_positions.size, panel.shape[1])), axis=1
+            )[:, :20]
+            return lambda: BatchedCovariance.estimate(
+                selection, panel, rebalance_positions, window_starts, estimator
+            )
+
+        return BenchmarkCase(f"covariance.{estimator}[n=100,years=10,k=20,weekly]", setup)
+
+    return [case(estimator) for estimator in CovarianceEstimator]
+
+
+def benchmark_builders_cases() -> List[BenchmarkCase]:
+    def case(name: str) -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.portfolio_management.benchmarks import (
+                BenchmarkDataFrameBuilderABC,
+            )
+
+            universe = synthetic_universe(100, 3)
+            if name == "capitalization_weighted":
+                return lambda: BenchmarkDataFrameBuilderABC._build_capitalization_weighted_benchmark(
+                    universe, rebalance_frequency=RebalanceFrequency.MONTH_START
+                )
+            return lambda: BenchmarkDataFrameBuilderABC._build_equally_weighted_benchmark(
+                universe, rebalance_frequency=RebalanceFrequency.MONTH_START
+            )
+
+        return BenchmarkCase(f"benchmarks.{name}[n=100,years=3]", setup)
+
+    return [case("capitalization_weighted"), case("equally_weighted")]
+
+
+def calendar_cases() -> List[BenchmarkCase]:
+    def case(frequency: RebalanceFrequency) -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.utility.rebalance_calendar import (
+                RebalanceCalendar,
+            )
+
+            # Hourly bars, the calendar dates fall on the bars of midnight
+            index = pd.date_range("2015-01-01", periods=10 * 365 * 24, freq="h")
+            return lambda: RebalanceCalendar.from_frequency(index, frequency).mask
+
+        return BenchmarkCase(f"calendar.{frequency.name.lower()}[hourly,years=10]", setup)
+
+    return [case(RebalanceFrequency.DAILY), case(RebalanceFrequency.MONTH_START)]
+
+
+def triggers_cases() -> List[BenchmarkCase]:
+    def case(name: str) -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.portfolio_management.backtester import (
+                PortfolioBacktester,
+            )
+            from crypto_momentum_portfolios.portfolio_management.triggers import (
+                RebalanceTriggers,
+            )
+
+            universe = synthetic_universe(100, 3)
+            benchmarks = pd.DataFrame(
+                0.0, index=universe.index, columns=Benchmark.list_values()
+            )
+            backtester = PortfolioBacktester(universe, benchmarks)
+            triggers = (
+                RebalanceTriggers(membership_change=True)
+                if name == "membership_change"
+                else RebalanceTriggers(drift_threshold=0.1)
+            )
+            return lambda: backtester.run_strategy(
+                ranking_method=Fields.MOMENTUM,
+                select_top_k_assets=10,
+                allocation_method=AllocationMethod.MINIMUM_VARIANCE,
+                rebalance_frequency=triggers,
+                print_stats=False,
+                plot_curve=False,
+            )
+
+        return BenchmarkCase(f"triggers.{name}[n=100,years=3,k=10]", setup)
+
+    return [case("membership_change"), case("drift")]
+
+
+def run_strategy_cases(profile: str) -> List[BenchmarkCase]:
+    def case(n_assets: int, n_years: int) -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.portfolio_management.backtester import (
+                PortfolioBacktester,
+            )
+
+            universe = synthetic_universe(n_assets, n_years)
+            benchmarks = pd.DataFrame(
+                {
+                    benchmark: universe[Fields.RETURNS]["BTC-USDT"]
+                    for benchmark in Benchmark.list_values()
+                }
+            )
+            backtester = PortfolioBacktester(universe, benchmarks)
+            return lambda: backtester.run_strategy(
+                ranking_method=Fields.MOMENTUM,
+                select_top_k_assets=5,
+                allocation_method=AllocationMethod.EQUAL_WEIGHTED,
+                rebalance_frequency=RebalanceFrequency.MONTH_START,
+                side=Side.LONG,
+                print_stats=False,
+                plot_curve=False,
+            )
+
+        return BenchmarkCase(f"run_strategy[n={n_assets},years={n_years}]", setup)
+
+    return [case(n, years) for n, years in RUN_STRATEGY_SIZES[profile]]
+
+
+def performance_cases() -> List[BenchmarkCase]:
+    def setup():
+        import contextlib
+        import io
+        from crypto_momentum_portfolios.portfolio_management.performance import (
+            print_performance_statistics,
+        )
+
+        universe = synthetic_universe(20, 3)
+        strategy = universe[Fields.RETURNS].mean(axis=1)
+        benchmark = universe[Fields.RETURNS]["BTC-USDT"]
+
+        def statistics():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return print_performance_statistics(
+                    strategy, benchmark, True, n_samples=100, sample_size=180
+                )
+
+        return statistics
+
+    return [BenchmarkCase("performance.print_performance_statistics[bootstrap=100]", setup)]
+
+
+def overlay_cases() -> List[BenchmarkCase]:
+    def setup():
+        from crypto_momentum_portfolios.portfolio_management.overlay import (
+            VolatilityTargeting,
+        )
+
+        strategy = synthetic_universe(20, 10)[Fields.RETURNS].mean(axis=1)
+        targets = np.linspace(0.1, 1.0, 50)
+        return lambda: VolatilityTargeting.sweep(strategy, targets)
+
+    return [BenchmarkCase("overlay.volatility_targeting_sweep[targets=50]", setup)]
+
+
+def simulation_cases() -> List[BenchmarkCase]:
+    def case(method: str) -> BenchmarkCase:
+        def setup():
+            from crypto_momentum_portfolios.portfolio_management.simulation import (
+                MonteCarloSimulator,
+            )
+            from crypto_momentum_portfolios.utility.types import StrategySpec
+
+            simulator = MonteCarloSimulator(synthetic_panel(20, 3))
+            spec = StrategySpec(rebalance_frequency=RebalanceFrequency.FRIDAY)
+            return lambda: simulator.run(
+                spec,
+                n_paths=200,
+                method=method,
+                seed=0,
+                benchmark_rebalance_frequency=RebalanceFrequency.MONTH_START,
+            )
+
+        return BenchmarkCase(f"simulation.{method}[n=20,years=3,paths=200]", setup)
+
+    return [case(method) for method in ["gbm", "block_bootstrap", "regime_switching"]]
+
+
+def multiple_testing_cases() -> List[BenchmarkCase]:
+    def setup():
+        from crypto_momentum_portfolios.portfolio_management.multiple_testing import (
+            MultipleTesting,
+        )
+
+        rng = np.random.default_rng(0)
+        dates = pd.date_range("2018-01-01", periods=3 * 365, freq="D")
+        returns = pd.DataFrame(0.02 * rng.standard_normal((dates.size, 2000)), index=dates)
+        benchmark = pd.Series(0.02 * rng.standard_normal(dates.size), index=dates)
+        return lambda: MultipleTesting.evaluate(returns, benchmark, n_draws=1000, seed=0)
+
+    return [BenchmarkCase("multiple_testing.evaluate[strategies=2000,years=3,draws=1000]", setup)]
+
+
+def costs_cases() -> List[BenchmarkCase]:
+    """Reprice the costs of a stored backtest at 21 levels against running it again at another cost."""
+
+    def setup_backtest():
+        from crypto_momentum_portfolios.portfolio_management.backtester import (
+            PortfolioBacktester,
+        )
+
+        universe = synthetic_universe(100, 3)
+        benchmarks = pd.DataFrame(
+            {
+                benchmark: universe[Fields.RETURNS]["BTC-USDT"]
+                for benchmark in Benchmark.list_values()
+            }
+        )
+        backtester = PortfolioBacktester(universe, benchmarks)
+        return lambda **costs: backtester.run_strategy(
+            ranking_method=Fields.MOMENTUM,
+            select_top_k_assets=10,
+            allocation_method=AllocationMethod.RISK_PARITY,
+            rebalance_frequency=RebalanceFrequency.WEEKLY,
+            print_stats=False,
+            plot_curve=False,
+            **costs,
+        )
+
+    def rerun_setup():
+        run = setup_backtest()
+        return lambda: run(transaction_cost=0.002)
+
+    def reprice_setup():
+        ledger = setup_backtest()().ledger
+        levels = np.linspace(0.0, 0.005, 21)
+        return lambda: ledger.reprice_costs(levels, SLIPPAGE_EFFECT)
+
+    return [
+        BenchmarkCase("costs.rerun_backtest[n=100,years=3,k=10,risk_parity]", rerun_setup),
+        BenchmarkCase("costs.reprice_costs[n=100,years=3,k=10,levels=21]", reprice_setup),
+    ]
+
+
+def sweep_charts_cases() -> List[BenchmarkCase]:
+    """Build the charts of the article from a sweep table of 4 formulas x 4 allocations x 5 k x 3 benchmarks x 7 frequencies, instead of re-running the 1680 backtests."""
+
+    def sweep_table() -> pd.DataFrame:
+        rng = np.random.default_rng(0)
+        table = pd.MultiIndex.from_product(
+            [
+                [
+                    Fields.MOMENTUM,
+                    Fields.EMA_MOMENTUM,
+                    Fields.TS_MOMENTUM,
+                    Fields.VOLATILITY_NEUTRALIZED_MOMENTUM,
+                ],
+                [
+                    AllocationMethod.CAPITALIZATION_WEIGHTED,
+                    AllocationMethod.EQUAL_WEIGHTED,
+                    AllocationMethod.MEAN_VARIANCE,
+                    AllocationMethod.RISK_PARITY,
+                ],
+                [3, 5, 8, 10, 15],
+                Benchmark.list_values(),
+                RebalanceFrequency.list_values()[:7],
+            ],
+            names=[
+                "ranking_method",
+                "allocation_method",
+                "select_top_k_assets",
+                "benchmark",
+                "rebalance_frequency",
+            ],
+        ).to_frame(index=False)
+        for metric in ["Information ratio", "Sharpe ratio", "Tracking error"]:
+            table[metric] = rng.standard_normal(len(table))
+        return table
+
+    def datasets_setup():
+        from crypto_momentum_portfolios.portfolio_management.sweep_charts import (
+            SweepCharts,
+        )
+
+        table = sweep_table()
+        return lambda: SweepCharts.datasets(table)
+
+    def render_setup():
+        from crypto_momentum_portfolios.portfolio_management.sweep_charts import (
+            SweepCharts,
+        )
+
+        importlib.import_module("matplotlib.backends.backend_agg")
+        table = sweep_table()
+        output_dir = tempfile.mkdtemp()
+        return lambda: SweepCharts.render(table, output_dir, dpi=100)
+
+    return [
+        BenchmarkCase("sweep_charts.datasets[runs=1680,charts=18]", datasets_setup),
+        BenchmarkCase("sweep_charts.render[runs=1680,charts=18]", render_setup),
+    ]
+
+
+def import_cases() -> List[BenchmarkCase]:
+    """Time the import of the package in a fresh interpreter, i.e. the start up cost paid by each process pool worker, against the import of the plotting stack it used to load."""
+
+    def subprocess_import(modules: List[str], forbidden: List[str]) -> Callable[[], None]:
+        code = "; ".join(
+            [f"import {module}" for module in modules]
+            + [
+                "import sys",
+                f"loaded = [m for m in {forbidden!r} if m in sys.modules]",
+                "assert not loaded, f'{loaded} imported by the headless core'",
+            ]
+        )
+
+        def run() -> None:
+            subprocess.run([sys.executable, "-c", code], check=True)
+
+        return run
+
+    def headless_setup():
+        return subprocess_import(HEADLESS_MODULES, PLOTTING_MODULES)
+
+    def plotting_setup():
+        if importlib.util.find_spec("quant_invest_lab") is None:
+            raise ImportError("No module named 'quant_invest_lab'")
+        return subprocess_import(["quant_invest_lab.reports"], [])
+
+    return [
+        BenchmarkCase("import.headless_core[subprocess]", headless_setup),
+        BenchmarkCase("import.quant_invest_lab.reports[subprocess]", plotting_setup),
+    ]
+
+
+def build_cases(profile: str = "quick") -> List[BenchmarkCase]:
+    """Build the cases of the suite.
+
+    Args:
+    ----
+        profile (str, optional): "quick" for small universes, "full" for up to 500 assets over 10 years. Defaults to "quick".
+
+    Returns:
+    ----
+        List[BenchmarkCase]: The cases.
+    """
+    return [
+        *import_cases(),
+        *indicators_cases(),
+        *data_loader_cases(),
+        *allocation_cases(),
+        *covariance_cases(),
+        *benchmark_builders_cases(),
+        *calendar_cases(),
+        *triggers_cases(),
+        *run_strategy_cases(profile),
+        *performance_cases(),
+        *overlay_cases(),
+        *simulation_cases(),
+        *multiple_testing_cases(),
+        *costs_cases(),
+        *sweep_charts_cases(),
+    ]
+
+
+def run_suite(
+    cases: List[BenchmarkCase],
+    repeat: int = 3,
+    name_filter: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Time the cases, a case that cannot be set up (e.g. missing optional dependency) is reported as skipped.
+
+    Args:
+    ----
+        cases (List[BenchmarkCase]): The cases to run.
+        repeat (int, optional): The number of timed calls per case. Defaults to 3.
+        name_filter (Optional[str], optional): Only run the cases containing this string. Defaults to None.
+
+    Returns:
+    ----
+        Dict[str, Any]: The JSON serializable report with the metadata and the timings in seconds.
+    """
+    results: Dict[str, Any] = {}
+    for case in cases:
+        if name_filter is not None and name_filter not in case.name:
+            continue
+        timings = []
+        try:
+            function = case.setup()
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function()
+                timings.append(time.perf_counter() - start)
+        except ImportError as error:
+            # The optional dependencies are imported lazily, at setup or on the first call
+            results[case.name] = {"skipped": str(error)}
+            print(f"{case.name:<70} skipped ({error})")
+            continue
+        results[case.name] = {
+            "min": min(timings),
+            "median": float(np.median(timings)),
+            "repeat": repeat,
+        }
+        print(f"{case.name:<70} {min(timings) * 1e3:>12.3f} ms")
+    return {
+        "metadata": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "results": results,
+    }
+
+
+def compare_with_baseline(
+    report: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2
+) -> pd.DataFrame:
+    """Compare a report with a stored baseline on the best timing of each case.
+
+    Args:
+    ----
+        report (Dict[str, Any]): The current report.
+        baseline (Dict[str, Any]): The baseline report.
+        threshold (float, optional): The relative slowdown above which a case is flagged as a regression. Defaults to 0.2 (20%).
+
+    Returns:
+    ----
+        pd.DataFrame: The baseline and current timings, their ratio and the regression flag of the cases timed in both reports.
+    """
+    rows = []
+    for name, current in report["results"].items():
+        reference = baseline["results"].get(name, {})
+        if "min" not in current or "min" not in reference:
+            continue
+        ratio = current["min"] / reference["min"]
+        rows.append(
+            {
+                "case": name,
+                "baseline": reference["min"],
+                "current": current["min"],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+            }
+        )
+    return pd.DataFrame(
+        rows, columns=["case", "baseline", "current", "ratio", "regression"]
+    ).set_index("case")
+
+
+def save_report(report: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path) as file:
+        return json.load(file)
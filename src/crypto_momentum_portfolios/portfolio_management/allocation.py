@@ -1,13 +1,329 @@
-from copy import copy
 from enum import StrEnum
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Union
 import numpy as np
 import numpy.typing as npt
 import pandas as pd
 
+from scipy.cluster.hierarchy import linkage
 from scipy.optimize import minimize
 
-from crypto_momentum_portfolios.utility.types import AllocationMethod, Fields
+from crypto_momentum_portfolios.portfolio_management.covariance import (
+    AllocationDiagnostics,
+    BatchedCovariance,
+    MomentsCache,
+)
+from crypto_momentum_portfolios.utility.profiling import (
+    capture_optimizations,
+    record_optimization,
+)
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    CovarianceEstimator,
+    Fields,
+)
+
+
+def sample_covariance(returns: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Compute the sample covariance of a `(date, asset)` returns window, shared by the closed form allocators.
+
+    Args:
+    ----
+        returns (npt.NDArray[np.float64]): The returns window.
+
+    Returns:
+    ----
+        npt.NDArray[np.float64]: The `(asset, asset)` covariance, NaN when the window has less than 2 dates.
+    """
+    if returns.shape[0] < 2:
+        return np.full((returns.shape[1], returns.shape[1]), np.nan)
+    centered = returns - returns.mean(axis=0)
+    return (centered.T @ centered) / (returns.shape[0] - 1)
+
+
+def _normalize_or_equal(weights: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Normalize the weights to a sum of 1, fall back on equal weights when the covariance was degenerate (e.g. the first rebalance holds a single date)."""
+    total = weights.sum()
+    if not np.isfinite(total) or total <= 0:
+        return np.full(weights.size, 1 / weights.size)
+    return weights / total
+
+
+def inverse_variance_weights(
+    covariance: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    """Weight each asset by the inverse of its variance.
+
+    Args:
+    ----
+        covariance (npt.NDArray[np.float64]): The `(asset, asset)` covariance.
+
+    Returns:
+    ----
+        npt.NDArray[np.float64]: The weights.
+    """
+    with np.errstate(divide="ignore"):
+        return _normalize_or_equal(1 / np.diag(covariance))
+
+
+def minimum_variance_weights(
+    covariance: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    """Closed form global minimum variance portfolio `inv(S) 1 / (1' inv(S) 1)`, the short positions are clipped to 0 (long only) and the weights renormalized.
+
+    Args:
+    ----
+        covariance (npt.NDArray[np.float64]): The `(asset, asset)` covariance.
+
+    Returns:
+    ----
+        npt.NDArray[np.float64]: The weights.
+    """
+    if not np.isfinite(covariance).all():
+        return np.full(covariance.shape[0], 1 / covariance.shape[0])
+    ones = np.ones(covariance.shape[0])
+    try:
+        weights = np.linalg.solve(covariance, ones)
+    except np.linalg.LinAlgError:
+        # Singular covariance e.g. a window shorter than the number of assets
+        weights = np.linalg.lstsq(covariance, ones, rcond=None)[0]
+    return _normalize_or_equal(np.clip(weights / weights.sum(), 0, None))
+
+
+def hierarchical_risk_parity_weights(
+    covariance: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    """Hierarchical Risk Parity (Lopez de Prado): the assets are ordered by a single linkage clustering of the correlation distance `sqrt((1 - rho) / 2)`, then the weights are split by recursive bisection of the ordered assets in inverse proportion of the inverse variance portfolio variance of each half.
+
+    Args:
+    ----
+        covariance (npt.NDArray[np.float64]): The `(asset, asset)` covariance.
+
+    Returns:
+    ----
+        npt.NDArray[np.float64]: The weights.
+    """
+    n_assets = covariance.shape[0]
+    variances = np.diag(covariance)
+    if n_assets == 1 or not np.isfinite(covariance).all() or (variances <= 0).any():
+        return np.full(n_assets, 1 / n_assets)
+    volatilities = np.sqrt(variances)
+    correlation = covariance / np.outer(volatilities, volatilities)
+    distance = np.sqrt(np.clip((1 - correlation) / 2, 0, None))
+    condensed = distance[np.triu(np.ones((n_assets, n_assets), dtype=bool), k=1)]
+    children = linkage(condensed, method="single")[:, :2].astype(int).tolist()
+
+    # Quasi diagonal order: the leaves of the dendrogram from left to right
+    order = []
+    stack = [2 * n_assets - 2]
+    while stack:
+        node = stack.pop()
+        if node < n_assets:
+            order.append(node)
+        else:
+            left, right = children[node - n_assets]
+            stack.extend((right, left))
+
+    # The variance of the inverse variance portfolio of the contiguous cluster [a, b) of the ordered assets is
+    # (u' C u)[a:b, a:b] / sum(u[a:b])^2 with u = 1 / variances, the block sums are read from a 2D prefix sum
+    ordered = np.array(order)
+    inverse = 1 / variances[ordered]
+    prefix = np.zeros((n_assets + 1, n_assets + 1))
+    prefix[1:, 1:] = (
+        (np.outer(inverse, inverse) * covariance[np.ix_(ordered, ordered)])
+        .cumsum(axis=0)
+        .cumsum(axis=1)
+    )
+    inverse_prefix = np.concatenate(([0.0], inverse.cumsum()))
+
+    def clusters_variance(starts, ends):
+        block = prefix[ends, ends] - prefix[starts, ends] - prefix[ends, starts]
+        return (block + prefix[starts, starts]) / (
+            inverse_prefix[ends] - inverse_prefix[starts]
+        ) ** 2
+
+    # The clusters of a level partition the ordered assets, every level is bisected at once: the halves
+    # [a, m) and [m, b) receive alpha and 1 - alpha, a single asset cluster keeps its weight (empty left half)
+    ordered_weights = np.ones(n_assets)
+    starts, ends = np.array([0]), np.array([n_assets])
+    while (ends - starts > 1).any():
+        middles = starts + (ends - starts) // 2
+        splittable = ends - starts > 1
+        alpha = np.zeros(starts.size)
+        left_variance = clusters_variance(starts[splittable], middles[splittable])
+        right_variance = clusters_variance(middles[splittable], ends[splittable])
+        alpha[splittable] = 1 - left_variance / (left_variance + right_variance)
+        starts = np.column_stack((starts, middles)).ravel()
+        ends = np.column_stack((middles, ends)).ravel()
+        factors = np.column_stack((alpha, 1 - alpha)).ravel()
+        ordered_weights *= np.repeat(factors, ends - starts)
+        not_empty = ends > starts
+        starts, ends = starts[not_empty], ends[not_empty]
+
+    weights = np.empty(n_assets)
+    weights[ordered] = ordered_weights
+    weights = _normalize_or_equal(weights)
+    return weights
+
+
+def _window_covariance(
+    returns: pd.DataFrame, covariance_estimator: CovarianceEstimator
+) -> npt.NDArray[np.float64]:
+    """The covariance of the returns window of the selected assets for the per date allocators, `CovarianceEstimator.SAMPLE` is the pandas pairwise covariance (`DataFrame.cov`). The market factor of `CovarianceEstimator.FACTOR_MODEL` is then the equally weighted return of the window assets."""
+    n_dates, n_assets = returns.shape
+    covariances, _ = BatchedCovariance.estimate(
+        np.arange(n_assets)[None],
+        returns.to_numpy(dtype=np.float64),
+        np.array([n_dates - 1]),
+        np.array([0]),
+        covariance_estimator,
+    )
+    return covariances[0]
+
+
+def allocate_complete_assets(
+    kernel: Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], npt.NDArray[np.float64]],
+    covariance: npt.NDArray[np.float64],
+    window: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    """Run a covariance allocator on the assets whose covariances are all finite, the others (e.g. an asset listed during the window with a shrunk estimator) get a 0 weight. When no asset is complete (e.g. a window of a single date) the kernel gets the whole covariance and falls back on equal weights.
+
+    Args:
+    ----
+        kernel (Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], npt.NDArray[np.float64]]): The allocator of a covariance and its `(date, asset)` returns window.
+        covariance (npt.NDArray[np.float64]): The `(asset, asset)` covariance.
+        window (npt.NDArray[np.float64]): The returns window.
+
+    Returns:
+    ----
+        npt.NDArray[np.float64]: The weights.
+    """
+    complete = np.ones(covariance.shape[0], dtype=bool)
+    finite = np.isfinite(covariance)
+    while complete.any() and not finite[np.ix_(complete, complete)].all():
+        # Drop the asset with the most non finite covariances with the remaining ones
+        n_missing = np.where(complete, (~finite[:, complete]).sum(axis=1), -1)
+        complete[np.argmax(n_missing)] = False
+    if complete.all() or not complete.any():
+        return kernel(covariance, window)
+    weights = np.zeros(covariance.shape[0])
+    weights[complete] = kernel(
+        covariance[np.ix_(complete, complete)], window[:, complete]
+    )
+    return weights
+
+
+def _window_mean(window: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """The mean return of each asset over its available dates, as `DataFrame.mean`."""
+    counts = (~np.isnan(window)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(np.isnan(window), 0.0, window).sum(axis=0) / counts
+
+
+def _long_only_slsqp(
+    objective: Callable[[npt.NDArray[np.float64], List[Any]], float],
+    args: List[Any],
+    covariance: npt.NDArray[np.float64],
+    allocator: AllocationMethod,
+) -> npt.NDArray[np.float64]:
+    """Minimize an objective over the long only, fully invested weights with SLSQP starting from equal weights, the weights below 0.1% are set to 0. When the optimizer does not converge (or returns non finite weights) its output is not trusted and the inverse variance weights are returned instead."""
+    n_assets = covariance.shape[0]
+    w0 = np.array([1 / n_assets for _ in range(n_assets)])
+
+    cons = (
+        {
+            "type": "eq",
+            "fun": lambda weights: np.sum(weights) - 1,
+        },  # return 0 if sum of the weights is 1
+        {"type": "ineq", "fun": lambda x: x},  # Long only
+    )
+
+    bounds = tuple([(0.0, 1.0) for _ in range(n_assets)])
+    result = minimize(
+        objective,
+        x0=w0,
+        args=args,
+        method="SLSQP",
+        constraints=cons,
+        bounds=bounds,
+        options={"disp": False},
+        tol=1e-10,
+    )
+    record_optimization(allocator, result)
+    if not result.success or not np.isfinite(result.x).all():
+        return inverse_variance_weights(covariance)
+    return np.where(result.x >= 0.001, result.x, 0)
+
+
+def risk_parity_weights(covariance: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Equal risk contribution weights solved with SLSQP.
+
+    Args:
+    ----
+        covariance (npt.NDArray[np.float64]): The `(asset, asset)` covariance.
+
+    Returns:
+    ----
+        npt.NDArray[np.float64]: The weights.
+    """
+
+    def risk_budget_objective(weights: npt.NDArray[np.float32], arg: List[Any]):
+        v = arg[0] # Variance
+        risk_budget = arg[1]
+        # Risk of the portfolio
+        sigma_p = np.sqrt(weights @ v @ weights.T)
+        # Marginal contribution of each asset to the risk of the portfolio
+        marginal_risk_contribution = v * weights.T
+        # Contribution of each asset to the risk of the portfolio
+        assets_risk_contribution = (
+            marginal_risk_contribution @ weights.T
+        ) / sigma_p  
+
+        # We calculate the desired contribution of each asset to the risk of the weights distribution
+        assets_risk_target = sigma_p * risk_budget
+
+        # Error between the desired contribution and the calculated contribution of each asset
+        residual = assets_risk_contribution - assets_risk_target
+        return residual @ residual.T
+
+    budget = np.full(covariance.shape[0], 1 / covariance.shape[0])
+    return _long_only_slsqp(
+        risk_budget_objective,
+        [covariance, budget],
+        covariance,
+        AllocationMethod.RISK_PARITY,
+    )
+
+
+def mean_variance_weights(
+    covariance: npt.NDArray[np.float64], expected_returns: npt.NDArray[np.float64]
+) -> npt.NDArray[np.float64]:
+    """Maximum Sharpe ratio weights solved with SLSQP.
+
+    Args:
+    ----
+        covariance (npt.NDArray[np.float64]): The `(asset, asset)` covariance.
+        expected_returns (npt.NDArray[np.float64]): The expected returns.
+
+    Returns:
+    ----
+        npt.NDArray[np.float64]: The weights.
+    """
+
+    def mean_variance_objective(weights: npt.NDArray[np.float32], arg: List[Any]):
+        cov_matrix = arg[0]
+        expected_return_vector = arg[1]
+        # rf = float(arg[2])
+        # Risk of the portfolio
+        sigma_p = np.sqrt(weights @ cov_matrix @ weights.T)
+        expected_return = expected_return_vector @ weights.T
+        return -expected_return / sigma_p
+
+    return _long_only_slsqp(
+        mean_variance_objective,
+        [covariance, expected_returns],
+        covariance,
+        AllocationMethod.MEAN_VARIANCE,
+    )
 
 
 class Allocation:
@@ -62,6 +378,8 @@ class Allocation:
         selected_assets: List[str],
         selected_assets_mom: pd.DataFrame,
         reversed_allocation: bool = False,
+        *arg,
+        **kwargs
     ) -> Dict[str, float]:
         mom = selected_assets_mom[selected_assets].iloc[-1].to_numpy()
         if reversed_allocation:
@@ -74,6 +392,22 @@ class Allocation:
     ) -> Dict[str, float]:
         return {asset: 1 / len(selected_assets) for asset in selected_assets}
 
+    @staticmethod
+    def __covariance_allocation(
+        kernel: Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], npt.NDArray[np.float64]],
+        selected_assets: List[str],
+        selected_assets_returns: pd.DataFrame,
+        covariance_estimator: CovarianceEstimator = CovarianceEstimator.SAMPLE,
+        **kwargs
+    ) -> Dict[str, float]:
+        returns = selected_assets_returns[selected_assets]
+        weights = allocate_complete_assets(
+            kernel,
+            _window_covariance(returns, covariance_estimator),
+            returns.to_numpy(dtype=np.float64),
+        )
+        return dict(zip(selected_assets, weights))
+
     @staticmethod
     def risk_parity_allocation(
         selected_assets: List[str],
@@ -81,55 +415,13 @@ class Allocation:
         *arg,
         **kwargs
     ) -> Dict[str, float]:
-        def risk_budget_objective(weights: npt.NDArray[np.float32], arg: List[Any]):
-            v = arg[0] # Variance
-            risk_budget = arg[1]
-            # Risk of the portfolio
-            sigma_p = np.sqrt(weights @ v @ weights.T)
-            # Marginal contribution of each asset to the risk of the portfolio
-            marginal_risk_contribution = v * weights.T
-            # Contribution of each asset to the risk of the portfolio
-            assets_risk_contribution = (
-                marginal_risk_contribution @ weights.T
-            ) / sigma_p  
-
-            # We calculate the desired contribution of each asset to the risk of the weights distribution
-            assets_risk_target = sigma_p * risk_budget
-
-            # Error between the desired contribution and the calculated contribution of each asset
-            residual = assets_risk_contribution - assets_risk_target
-            return residual @ residual.T
-
-        w0 = np.array([1 / len(selected_assets) for _ in selected_assets])
-        budget = copy(w0)
-
-        cons = (
-            {
-                "type": "eq",
-                "fun": lambda weights: np.sum(weights) - 1,
-            },  # return 0 if sum of the weights is 1
-            {"type": "ineq", "fun": lambda x: x},  # Long only
+        return Allocation.__covariance_allocation(
+            lambda covariance, window: risk_parity_weights(covariance),
+            selected_assets,
+            selected_assets_returns,
+            **kwargs,
         )
 
-        bounds = tuple([(0.0, 1.0) for _ in selected_assets])
-        weights = minimize(
-            risk_budget_objective,
-            x0=w0,
-            args=[selected_assets_returns.cov().to_numpy(), budget],
-            method="SLSQP",
-            constraints=cons,
-            bounds=bounds,
-            options={"disp": False},
-            tol=1e-10,
-        ).x
-        return {
-            security: unit_weight
-            for security, unit_weight in zip(
-                selected_assets,
-                map(lambda w: w if w >= 0.001 else 0, weights),
-            )
-        }
-
     @staticmethod
     def mean_variance_allocation(
         selected_assets: List[str],
@@ -137,47 +429,56 @@ class Allocation:
         *arg,
         **kwargs
     ) -> Dict[str, float]:
-        def mean_variance_objective(weights: npt.NDArray[np.float32], arg: List[Any]):
-            cov_matrix = arg[0]
-            expected_return_vector = arg[1]
-            # rf = float(arg[2])
-            # Risk of the portfolio
-            sigma_p = np.sqrt(weights @ cov_matrix @ weights.T)
-            expected_return = expected_return_vector @ weights.T
-            return -expected_return / sigma_p
-
-        w0 = np.array([1 / len(selected_assets) for _ in selected_assets])
-        budget = copy(w0)
-
-        cons = (
-            {
-                "type": "eq",
-                "fun": lambda weights: np.sum(weights) - 1,
-            },  # return 0 if sum of the weights is 1
-            {"type": "ineq", "fun": lambda x: x},  # Long only
+        return Allocation.__covariance_allocation(
+            lambda covariance, window: mean_variance_weights(
+                covariance, _window_mean(window)
+            ),
+            selected_assets,
+            selected_assets_returns,
+            **kwargs,
         )
 
-        bounds = tuple([(0.0, 1.0) for _ in selected_assets])
-        weights = minimize(
-            mean_variance_objective,
-            x0=w0,
-            args=[
-                selected_assets_returns.cov().to_numpy(),
-                selected_assets_returns.mean().to_numpy(),
-            ],
-            method="SLSQP",
-            constraints=cons,
-            bounds=bounds,
-            options={"disp": False},
-            tol=1e-10,
-        ).x
-        return {
-            security: unit_weight
-            for security, unit_weight in zip(
-                selected_assets,
-                map(lambda w: w if w >= 0.001 else 0, weights),
-            )
-        }
+    @staticmethod
+    def inverse_variance_allocation(
+        selected_assets: List[str],
+        selected_assets_returns: pd.DataFrame,
+        *arg,
+        **kwargs
+    ) -> Dict[str, float]:
+        return Allocation.__covariance_allocation(
+            lambda covariance, window: inverse_variance_weights(covariance),
+            selected_assets,
+            selected_assets_returns,
+            **kwargs,
+        )
+
+    @staticmethod
+    def minimum_variance_allocation(
+        selected_assets: List[str],
+        selected_assets_returns: pd.DataFrame,
+        *arg,
+        **kwargs
+    ) -> Dict[str, float]:
+        return Allocation.__covariance_allocation(
+            lambda covariance, window: minimum_variance_weights(covariance),
+            selected_assets,
+            selected_assets_returns,
+            **kwargs,
+        )
+
+    @staticmethod
+    def hierarchical_risk_parity_allocation(
+        selected_assets: List[str],
+        selected_assets_returns: pd.DataFrame,
+        *arg,
+        **kwargs
+    ) -> Dict[str, float]:
+        return Allocation.__covariance_allocation(
+            lambda covariance, window: hierarchical_risk_parity_weights(covariance),
+            selected_assets,
+            selected_assets_returns,
+            **kwargs,
+        )
 
 
 ALLOCATION_TO_FUNCTION: Dict[
@@ -190,6 +491,9 @@ ALLOCATION_TO_FUNCTION: Dict[
     AllocationMethod.MOMENTUM_WEIGHTED: Allocation.momentum_weighted_allocation,
     AllocationMethod.RISK_PARITY: Allocation.risk_parity_allocation,
     AllocationMethod.MEAN_VARIANCE: Allocation.mean_variance_allocation,
+    AllocationMethod.INVERSE_VARIANCE: Allocation.inverse_variance_allocation,
+    AllocationMethod.MINIMUM_VARIANCE: Allocation.minimum_variance_allocation,
+    AllocationMethod.HIERARCHICAL_RISK_PARITY: Allocation.hierarchical_risk_parity_allocation,
 }
 
 ALLOCATION_FIELDS: Dict[AllocationMethod, Fields] = {
@@ -200,4 +504,247 @@ ALLOCATION_FIELDS: Dict[AllocationMethod, Fields] = {
     AllocationMethod.MOMENTUM_WEIGHTED: Fields.MOMENTUM,
     AllocationMethod.RISK_PARITY: Fields.RETURNS,
     AllocationMethod.MEAN_VARIANCE: Fields.RETURNS,
+    AllocationMethod.INVERSE_VARIANCE: Fields.RETURNS,
+    AllocationMethod.MINIMUM_VARIANCE: Fields.RETURNS,
+    AllocationMethod.HIERARCHICAL_RISK_PARITY: Fields.RETURNS,
 }
+
+
+class BatchedAllocation:
+    """
+    BatchedAllocation computes the weights of all the rebalances of a backtest at once from NumPy arrays, instead of one `Allocation` call (with its pandas slicing) per rebalance date.
+
+    Every allocator takes:
+    ----
+        selection (npt.NDArray[np.intp]): The `(n_rebalances, k)` positions of the selected assets in the panel columns.
+        panel (npt.NDArray[np.float64]): The `(date, asset)` values of the allocation field (see `ALLOCATION_FIELDS`).
+        rebalance_positions (npt.NDArray[np.intp]): The `(n_rebalances,)` positions of the rebalance dates in the panel rows.
+        window_starts (npt.NDArray[np.intp]): The `(n_rebalances,)` first row of the estimation window of each rebalance, the window ends at the rebalance date (included).
+        reversed_allocation (Union[bool, npt.NDArray[np.bool_]]): Allocate with the inverse of the field, for all or per rebalance.
+
+    and returns the `(n_rebalances, k)` weights, aligned with `selection`. The covariance based allocators also take the keyword arguments:
+    ----
+        covariance_estimator (CovarianceEstimator): The estimator of the covariances of the windows, see `BatchedCovariance`. Defaults to CovarianceEstimator.SAMPLE.
+        ewma_decay (float): The daily decay of the EWMA estimator. Defaults to 0.94.
+        diagnostics (Optional[AllocationDiagnostics]): Filled in place with the condition number, the shrinkage and the optimizer convergence of each rebalance. Defaults to None.
+        moments (Optional[MomentsCache]): The covariances already estimated on the panel, shared with the other allocators and rebalances. Defaults to None i.e. all the covariances are estimated.
+    """
+
+    @staticmethod
+    def field_weighted_allocation(
+        selection: npt.NDArray[np.intp],
+        panel: npt.NDArray[np.float64],
+        rebalance_positions: npt.NDArray[np.intp],
+        window_starts: npt.NDArray[np.intp],
+        reversed_allocation: Union[bool, npt.NDArray[np.bool_]] = False,
+        **kwargs,
+    ) -> npt.NDArray[np.float64]:
+        """Weight the assets by their field value at the rebalance date (capitalization, volume, volatility or momentum weighted)."""
+        values = panel[rebalance_positions[:, None], selection]
+        with np.errstate(divide="ignore"):
+            values = np.where(
+                np.reshape(reversed_allocation, (-1, 1)), 1 / values, values
+            )
+        return values / values.sum(axis=1, keepdims=True)
+
+    @staticmethod
+    def equal_weighted_allocation(
+        selection: npt.NDArray[np.intp], *arg, **kwargs
+    ) -> npt.NDArray[np.float64]:
+        return np.full(selection.shape, 1 / selection.shape[1])
+
+    @staticmethod
+    def __covariance_allocation(
+        kernel: Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], npt.NDArray[np.float64]],
+        selection: npt.NDArray[np.intp],
+        panel: npt.NDArray[np.float64],
+        rebalance_positions: npt.NDArray[np.intp],
+        window_starts: npt.NDArray[np.intp],
+        covariance_estimator: CovarianceEstimator = CovarianceEstimator.SAMPLE,
+        ewma_decay: float = 0.94,
+        diagnostics: Optional[AllocationDiagnostics] = None,
+        moments: Optional[MomentsCache] = None,
+        **kwargs,
+    ) -> npt.NDArray[np.float64]:
+        """Estimate the covariances of all the rebalances at once (only the ones missing from the moments cache), then loop over the rebalances on NumPy arrays only to run the kernel on the complete assets of each covariance and returns window."""
+        estimate = BatchedCovariance.estimate if moments is None else moments.estimate
+        covariances, shrinkage = estimate(
+            selection,
+            panel,
+            rebalance_positions,
+            window_starts,
+            covariance_estimator,
+            ewma_decay,
+        )
+        weights = np.empty(selection.shape)
+        for i, (assets, start, end) in enumerate(
+            zip(selection, window_starts, rebalance_positions + 1)
+        ):
+            with capture_optimizations() as results:
+                weights[i] = allocate_complete_assets(
+                    kernel, covariances[i], panel[start:end, assets]
+                )
+            if diagnostics is not None and results:
+                diagnostics.converged[i] = all(result.success for result in results)
+                diagnostics.iterations[i] = sum(
+                    int(getattr(result, "nit", 0)) for result in results
+                )
+        if diagnostics is not None:
+            diagnostics.condition_number[:] = BatchedCovariance.condition_numbers(
+                covariances
+            )
+            diagnostics.shrinkage[:] = shrinkage
+        return weights
+
+    @staticmethod
+    def risk_parity_allocation(
+        selection, panel, rebalance_positions, window_starts, *arg, **kwargs
+    ) -> npt.NDArray[np.float64]:
+        return BatchedAllocation.__covariance_allocation(
+            lambda covariance, window: risk_parity_weights(covariance),
+            selection,
+            panel,
+            rebalance_positions,
+            window_starts,
+            **kwargs,
+        )
+
+    @staticmethod
+    def mean_variance_allocation(
+        selection, panel, rebalance_positions, window_starts, *arg, **kwargs
+    ) -> npt.NDArray[np.float64]:
+        return BatchedAllocation.__covariance_allocation(
+            lambda covariance, window: mean_variance_weights(
+                covariance, _window_mean(window)
+            ),
+            selection,
+            panel,
+            rebalance_positions,
+            window_starts,
+            **kwargs,
+        )
+
+    @staticmethod
+    def inverse_variance_allocation(
+        selection, panel, rebalance_positions, window_starts, *arg, **kwargs
+    ) -> npt.NDArray[np.float64]:
+        return BatchedAllocation.__covariance_allocation(
+            lambda covariance, window: inverse_variance_weights(covariance),
+            selection,
+            panel,
+            rebalance_positions,
+            window_starts,
+            **kwargs,
+        )
+
+    @staticmethod
+    def minimum_variance_allocation(
+        selection, panel, rebalance_positions, window_starts, *arg, **kwargs
+    ) -> npt.NDArray[np.float64]:
+        return BatchedAllocation.__covariance_allocation(
+            lambda covariance, window: minimum_variance_weights(covariance),
+            selection,
+            panel,
+            rebalance_positions,
+            window_starts,
+            **kwargs,
+        )
+
+    @staticmethod
+    def hierarchical_risk_parity_allocation(
+        selection, panel, rebalance_positions, window_starts, *arg, **kwargs
+    ) -> npt.NDArray[np.float64]:
+        return BatchedAllocation.__covariance_allocation(
+            lambda covariance, window: hierarchical_risk_parity_weights(covariance),
+            selection,
+            panel,
+            rebalance_positions,
+            window_starts,
+            **kwargs,
+        )
+
+
+BATCHED_ALLOCATION_TO_FUNCTION: Dict[
+    AllocationMethod, Callable[..., npt.NDArray[np.float64]]
+] = {
+    AllocationMethod.VOLATILITY_WEIGHTED: BatchedAllocation.field_weighted_allocation,
+    AllocationMethod.CAPITALIZATION_WEIGHTED: BatchedAllocation.field_weighted_allocation,
+    AllocationMethod.VOLUME_WEIGHTED: BatchedAllocation.field_weighted_allocation,
+    AllocationMethod.EQUAL_WEIGHTED: BatchedAllocation.equal_weighted_allocation,
+    AllocationMethod.MOMENTUM_WEIGHTED: BatchedAllocation.field_weighted_allocation,
+    AllocationMethod.RISK_PARITY: BatchedAllocation.risk_parity_allocation,
+    AllocationMethod.MEAN_VARIANCE: BatchedAllocation.mean_variance_allocation,
+    AllocationMethod.INVERSE_VARIANCE: BatchedAllocation.inverse_variance_allocation,
+    AllocationMethod.MINIMUM_VARIANCE: BatchedAllocation.minimum_variance_allocation,
+    AllocationMethod.HIERARCHICAL_RISK_PARITY: BatchedAllocation.hierarchical_risk_parity_allocation,
+}
+
+
+def allocate_valid_selection(
+    allocation_method: AllocationMethod,
+    selection: npt.NDArray[np.intp],
+    valid: npt.NDArray[np.bool_],
+    panel: npt.NDArray[np.float64],
+    rebalance_positions: npt.NDArray[np.intp],
+    window_starts: npt.NDArray[np.intp],
+    reversed_allocation: Union[bool, npt.NDArray[np.bool_]] = False,
+    diagnostics: Optional[AllocationDiagnostics] = None,
+    **kwargs,
+) -> npt.NDArray[np.float64]:
+    """Allocate the selections of `select_top_k_for_rows` with the batched allocator of the method, only on their valid slots. The rebalances are allocated in one batch per number of valid assets, the padding slots get a 0 weight (a rebalance without valid asset holds nothing).
+
+    Args:
+    ----
+        allocation_method (AllocationMethod): The allocation method.
+        selection (npt.NDArray[np.intp]): The `(n_rebalances, k)` positions of the selected assets in the panel columns.
+        valid (npt.NDArray[np.bool_]): The `(n_rebalances, k)` valid slots of the selection, first in each row.
+        panel (npt.NDArray[np.float64]): The `(date, asset)` values of the allocation field.
+        rebalance_positions (npt.NDArray[np.intp]): The positions of the rebalance dates in the panel rows.
+        window_starts (npt.NDArray[np.intp]): The first row of the estimation window of each rebalance.
+        reversed_allocation (Union[bool, npt.NDArray[np.bool_]], optional): Allocate with the inverse of the field, for all or per rebalance. Defaults to False.
+        diagnostics (Optional[AllocationDiagnostics], optional): Filled in place for the allocated rebalances. Defaults to None.
+
+    Returns:
+    ----
+        npt.NDArray[np.float64]: The `(n_rebalances, k)` weights, aligned with `selection`.
+    """
+    allocator = BATCHED_ALLOCATION_TO_FUNCTION[allocation_method]
+    n_valid = valid.sum(axis=1)
+    if n_valid.min(initial=selection.shape[1]) == selection.shape[1]:
+        return allocator(
+            selection,
+            panel,
+            rebalance_positions,
+            window_starts,
+            reversed_allocation,
+            diagnostics=diagnostics,
+            **kwargs,
+        )
+    weights = np.zeros(selection.shape)
+    reversed_allocation = np.broadcast_to(reversed_allocation, n_valid.shape)
+    for n_assets in np.unique(n_valid[n_valid > 0]):
+        rows = np.flatnonzero(n_valid == n_assets)
+        group_diagnostics = AllocationDiagnostics.empty(rows.size)
+        weights[rows, :n_assets] = allocator(
+            selection[rows, :n_assets],
+            panel,
+            rebalance_positions[rows],
+            window_starts[rows],
+            reversed_allocation[rows],
+            diagnostics=group_diagnostics,
+            **kwargs,
+        )
+        if diagnostics is not None:
+            for name in vars(diagnostics):
+                getattr(diagnostics, name)[rows] = getattr(group_diagnostics, name)
+    return weights
+
+
+# The allocators estimating a covariance, they accept a `covariance_estimator` and report `AllocationDiagnostics`
+COVARIANCE_ALLOCATION_METHODS: List[AllocationMethod] = [
+    AllocationMethod.RISK_PARITY,
+    AllocationMethod.MEAN_VARIANCE,
+    AllocationMethod.INVERSE_VARIANCE,
+    AllocationMethod.MINIMUM_VARIANCE,
+    AllocationMethod.HIERARCHICAL_RISK_PARITY,
+]
@@ -1,31 +1,65 @@
-from typing import Optional, Self, Unpack
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union, Unpack
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
-from quant_invest_lab.reports import (
-    plot_from_trade_df_and_ptf_optimization,
-)
 from crypto_momentum_portfolios.portfolio_management.allocation import (
     AllocationMethod,
-    ALLOCATION_TO_FUNCTION,
     ALLOCATION_FIELDS,
+    COVARIANCE_ALLOCATION_METHODS,
+    allocate_valid_selection,
 )
 from crypto_momentum_portfolios.portfolio_management.benchmarks import (
     BenchmarkDataFrameBuilder,
 )
+from crypto_momentum_portfolios.portfolio_management.costs import CostLedger
+from crypto_momentum_portfolios.portfolio_management.covariance import (
+    AllocationDiagnostics,
+    MomentsCache,
+)
+from crypto_momentum_portfolios.portfolio_management.engine import run_holdings_pass
+from crypto_momentum_portfolios.portfolio_management.indicators import LookbackPanel
 from crypto_momentum_portfolios.portfolio_management.performance import (
     print_performance_statistics,
+    print_stored_statistics,
 )
+from crypto_momentum_portfolios.portfolio_management.reports import plot_strategy
 from crypto_momentum_portfolios.portfolio_management.selection import (
-    rank_by_field_for_rows,
+    select_top_k_for_rows,
+)
+from crypto_momentum_portfolios.portfolio_management.triggers import (
+    RebalanceTriggers,
+    first_drift_breach,
+)
+from crypto_momentum_portfolios.portfolio_management.weights import WeightsHistory
+from crypto_momentum_portfolios.utility.cache import (
+    SHARED_CACHE,
+    SharedResourceCache,
+    dataframe_fingerprint,
 )
 from crypto_momentum_portfolios.utility.constants import (
     SLIPPAGE_EFFECT,
     TRANSACTION_COST,
 )
+from crypto_momentum_portfolios.utility.membership import MembershipMask
+from crypto_momentum_portfolios.utility.profiling import (
+    DISABLED_PROFILER,
+    StageProfiler,
+)
+from crypto_momentum_portfolios.utility.rebalance_calendar import (
+    RebalanceCalendar,
+    RebalanceSchedule,
+    schedule_key,
+)
+from crypto_momentum_portfolios.utility.result_store import (
+    ResultStore,
+    code_version,
+    config_hash,
+)
 from crypto_momentum_portfolios.utility.types import (
     AllocationMode,
     Benchmark,
+    CovarianceEstimator,
     Fields,
     RankingMethod,
     RebalanceFrequency,
@@ -33,29 +67,73 @@ from crypto_momentum_portfolios.utility.types import (
     Side,
     RankingMode,
 )
-from crypto_momentum_portfolios.utility.utils import get_rebalance_dates, weights_drift
+from crypto_momentum_portfolios.utility.utils import (
+    EstimationWindow,
+    estimation_window_starts,
+)
 
 
-class PortfolioBacktester:
-    _instance: Optional[Self] = None
+@dataclass
+class StrategyResult:
+    """The output of `PortfolioBacktester.run_strategy`. It unpacks as the `(returns, weights, stats)` tuple returned before, with the dense daily weights DataFrame.
 
+    Attributes:
+    ----
+        returns (pd.Series): The returns of the strategy, net of the costs.
+        weights_history (WeightsHistory): The compact weights history of the portfolio (use `to_dataframe` for the dense daily weights).
+        stats (Union[pd.DataFrame, List]): The statistics of the strategy, an empty list when they were not computed.
+        ledger (Optional[CostLedger]): The cost ledger of the run (gross returns, traded notional per asset of each rebalance), to charge other costs with `reprice_costs` without running the backtest again, None for a stored run saved without it.
+        profile (Optional[Dict[str, Any]]): The profiler `summary()` when a profiler is given.
+    """
+
+    returns: pd.Series
+    weights_history: WeightsHistory
+    stats: Union[pd.DataFrame, List]
+    ledger: Optional[CostLedger] = None
+    profile: Optional[Dict[str, Any]] = None
+
+    @cached_property
+    def weights(self) -> pd.DataFrame:
+        """The dense daily weights of the portfolio (dates x assets), rebuilt once from the weights history."""
+        return self.weights_history.to_dataframe()
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter((self.returns, self.weights, self.stats))
+
+
+class PortfolioBacktester:
     def __init__(
-        self, universe: pd.DataFrame, benchmarks: Optional[pd.DataFrame] = None
+        self,
+        universe: pd.DataFrame,
+        benchmarks: Optional[pd.DataFrame] = None,
+        cache: SharedResourceCache = SHARED_CACHE,
+        membership: Optional[MembershipMask] = None,
     ) -> None:
-        """Constructor method.
+        """Constructor method. Each instance holds its own universe so several backtesters (e.g. one per lookback) can live in the same process and run in a thread pool, the benchmarks are shared through the cache.
 
         Args:
             universe (pd.DataFrame): The universe of assets to backtest the strategy on with the fields.
             benchmarks (Optional[pd.DataFrame], optional): An optional dataFrame containing the 3 benchmarks ['equal_weighted_benchmark','capi_weighted_benchmark','bitcoin_benchmark']. Defaults to None.
+            cache (SharedResourceCache, optional): The cache used to share the benchmarks between the instances built on the same universe. Defaults to SHARED_CACHE.
+            membership (Optional[MembershipMask], optional): The eligibility of the assets, aligned on the dates of the universe, used by the selection and the benchmarks. Defaults to None i.e. all the assets with a ranking value are eligible.
         """
         self.__universe = universe
+        if membership is not None:
+            membership = membership.reindex(universe.index)
+        self.__membership = membership
+        # The covariances of the returns windows, shared by the covariance based allocators of all the runs
+        self.__moments = MomentsCache()
         if benchmarks is not None and set(Benchmark.list_values()).issubset(
             benchmarks.columns
         ):
             self.__benchmarks = benchmarks
         else:
-            self.__benchmarks = (
-                BenchmarkDataFrameBuilder(self.__universe)
+            self.__benchmarks = cache.get_or_compute(
+                "benchmarks",
+                dataframe_fingerprint(self.__universe)
+                if membership is None
+                else (dataframe_fingerprint(self.__universe), membership.fingerprint()),
+                lambda: BenchmarkDataFrameBuilder(self.__universe, membership)
                 .build_equally_weighted_benchmark(
                     rebalance_frequency=RebalanceFrequency.MONTHLY,
                     side=Side.LONG,
@@ -68,7 +146,7 @@ class PortfolioBacktester:
                     verbose=False,
                 )
                 .build_bitcoin_benchmark()
-                .collect_benchmark_returns()
+                .collect_benchmark_returns(),
             )
 
     def run_strategy(
@@ -80,16 +158,22 @@ class PortfolioBacktester:
         # Allocation section
         allocation_method: AllocationMethod = AllocationMethod.EQUAL_WEIGHTED,
         allocation_mode: AllocationMode = AllocationMode.CLASSIC,
+        covariance_estimator: CovarianceEstimator = CovarianceEstimator.SAMPLE,
+        estimation_window: Optional[EstimationWindow] = None,
         # Others
-        rebalance_frequency: RebalanceFrequency = RebalanceFrequency.MONTHLY,
+        rebalance_frequency: Union[
+            RebalanceSchedule, RebalanceTriggers
+        ] = RebalanceFrequency.MONTHLY,
         side: Side = Side.LONG,
         benchmark: Benchmark = Benchmark.EQUAL_WEIGHTED,
         verbose: bool = False,
         print_stats: bool = True,
         plot_curve: bool = True,
         perform_t_stats: bool = True,
+        result_store: Optional[ResultStore] = None,
+        profiler: Optional[StageProfiler] = None,
         **kwargs: RunStrategyKwargs,
-    ):
+    ) -> StrategyResult:
         """Run the strategy on the universe of assets.
 
         Args:
@@ -99,130 +183,426 @@ class PortfolioBacktester:
             select_top_k_assets (int, optional): The number of assets to select in the portfolio based on the ranking selection. Defaults to 5.
             allocation_method (AllocationMethod, optional): The allocation method used to allocate the weights on the selected securities. Defaults to AllocationMethod.EQUAL_WEIGHTED.
             allocation_mode (AllocationMode, optional): The allocation way classic or inverse, eg : If you allocate by volatility you better want to allocate a lower weight to the most volatile then you will use AllocationMode.INVERSE. Defaults to AllocationMode.CLASSIC.
-            rebalance_frequency (RebalanceFrequency, optional): The rebalance period for the portfolio. Defaults to RebalanceFrequency.MONTHLY.
+            covariance_estimator (CovarianceEstimator, optional): The covariance estimator of the covariance based allocations (see `COVARIANCE_ALLOCATION_METHODS`), their condition numbers, shrinkage and optimizer convergence are attached to the weights history (`WeightsHistory.diagnostics`). Defaults to CovarianceEstimator.SAMPLE.
+            estimation_window (Optional[EstimationWindow], optional): The returns window of the allocation at each rebalance, a number of rows (e.g. 90) or a time span (e.g. "90D"), independent from the rebalance frequency. Defaults to None i.e. the dates since the previous rebalance.
+            rebalance_frequency (Union[RebalanceSchedule, RebalanceTriggers], optional): The rebalance period for the portfolio, a `RebalanceCalendar` of custom dates (explicit dates, every n dates, signal) or the `RebalanceTriggers` of an event driven rebalancing (top-k membership change, weights drift, predicate). Defaults to RebalanceFrequency.MONTHLY.
             side (Side, optional): The long or short side. Defaults to Side.LONG.
             benchmark (Benchmark, optional): The benchmark to be used for the performance statistics. Defaults to Benchmark.EQUAL_WEIGHTED.
             verbose (bool, optional): Print the rebalance dates. Defaults to False.
             print_stats (bool, optional): Print the performances and metrics of the strategy. Defaults to True.
             plot_curve (bool, optional): Plot the performance curves. Defaults to True.
+            result_store (Optional[ResultStore], optional): A store checked before running the backtest, the run is saved in it when missing (with its statistics when `print_stats`), the stored statistics of a run are printed without being computed again. Defaults to None.
+            profiler (Optional[StageProfiler], optional): Time the rank, slice, allocate, drift, stats and plot stages and record the optimizers convergence. Defaults to None.
 
         Returns:
         -----
-            tuple[Series[float], DataFrame]: A tuple containing a pandas series of the returns of a dataframe of the weights of the portfolio.
+            StrategyResult: The returns, the weights (the compact history and the dense DataFrame) and the statistics of the strategy, it unpacks as `returns, weights, stats`, with its cost ledger and the profiler `summary()` when a profiler is given.
         """
         assert (
             select_top_k_assets <= self.__universe["returns"].shape[1]
         ), f"select_top_k_assets must be less than or equal to {self.__universe['returns'].shape[1]}"
 
-        returns_histo, weights_histo = [], []
-        REBALANCE_DATES = get_rebalance_dates(
-            start_date=self.__universe.index[0],
-            end_date=self.__universe.index[-1],
-            frequency=rebalance_frequency,
-        )
+        costs = {
+            "transaction_cost": kwargs.get("transaction_cost", TRANSACTION_COST),
+            "slippage_effect": kwargs.get("slippage_effect", SLIPPAGE_EFFECT),
+        }
+        asset_returns = self.__universe["returns"].to_numpy(dtype=float)
+        stage_profiler = profiler if profiler is not None else DISABLED_PROFILER
+        drift_threshold = None
+        if isinstance(rebalance_frequency, RebalanceTriggers):
+            # The triggers not depending on the portfolio are evaluated once over the whole history
+            drift_threshold = rebalance_frequency.drift_threshold
+            rebalance_frequency = rebalance_frequency.to_calendar(
+                self.__universe,
+                ranking_method,
+                ranking_mode,
+                select_top_k_assets,
+                self.__membership,
+            )
 
-        for index, row in tqdm(
-            self.__universe.iterrows(),
-            desc="Backtesting the strategy...",
-            total=self.__universe.shape[0],
-            leave=False,
-        ):
-            if index in REBALANCE_DATES and REBALANCE_DATES.index(index) == 0:
-                if verbose:
-                    print(f"Rebalancing the portfolio on {index}...")
-                # Rank the securities in the portfolio and select the top k performing ones
-                securities = rank_by_field_for_rows(
-                    row=row, field=ranking_method, ascending=bool(ranking_mode)
-                )[:select_top_k_assets]
-                # Run allocation method on the securities
-                weights = ALLOCATION_TO_FUNCTION[allocation_method](
-                    securities,
-                    self.__universe[ALLOCATION_FIELDS[allocation_method]][
-                        securities
-                    ].loc[
-                        :index
-                    ],  # type: ignore
-                    bool(allocation_mode),
-                )
-            elif index in REBALANCE_DATES and REBALANCE_DATES.index(index) > 0:
-                if verbose:
-                    print(f"Rebalancing the portfolio on {index}...")
-                # Rank the securities in the portfolio and select the top k performing ones
-                securities = rank_by_field_for_rows(
-                    row=row, field=ranking_method, ascending=bool(ranking_mode)
-                )[:select_top_k_assets]
-                # Run allocation method on the securities
-                weights = ALLOCATION_TO_FUNCTION[allocation_method](
-                    securities,
-                    # self.__universe["returns"][securities].loc...
-                    self.__universe[ALLOCATION_FIELDS[allocation_method]][
-                        securities
-                    ].loc[
-                        REBALANCE_DATES[REBALANCE_DATES.index(index) - 1] : index
-                    ],  # type: ignore
+        def statistics(returns: pd.Series) -> pd.DataFrame:
+            with stage_profiler.stage("stats"):
+                return print_performance_statistics(
+                    returns,
+                    self.__benchmarks[benchmark],
+                    perform_t_stats=perform_t_stats,
+                    n_samples=kwargs.get("n_bootstrap_samples", 100),
+                    sample_size=kwargs.get("sample_size", returns.shape[0] // 6),
+                    alpha_risk=kwargs.get("alpha_risk", 0.05),
                 )
 
-            weights_histo.append(weights)  # add weights dict to the weights_histo list
-
-            # returns is a numpy array of the returns of the securities in the portfolio
-            returns = row["returns"][securities].to_numpy()
-            # convert the weights dict to a numpy array
-            weights_np = np.array(list(weights.values()))
-
-            if index in REBALANCE_DATES:
-                # transaction x the number of assets in the portfolio x 2 : because we buy and sell the whole portfolio
-                returns_histo.append(
-                    (
-                        (returns @ weights_np)
-                        - (
-                            kwargs.get("transaction_cost", TRANSACTION_COST)
-                            * select_top_k_assets
-                            * 2
-                        )
-                        - kwargs.get("slippage_effect", SLIPPAGE_EFFECT)
-                    )
-                    * side
+        def backtest() -> Dict:
+            returns, weights_history, ledger = self.__backtest(
+                ranking_method,
+                ranking_mode,
+                select_top_k_assets,
+                allocation_method,
+                allocation_mode,
+                covariance_estimator,
+                estimation_window,
+                rebalance_frequency,
+                drift_threshold,
+                side,
+                verbose,
+                asset_returns,
+                stage_profiler,
+                **costs,
+            )
+            # The statistics are part of the run so a stored run is written once with them
+            return {
+                "returns": returns,
+                "weights": weights_history,
+                "stats": statistics(returns) if print_stats else None,
+                "ledger": ledger,
+            }
+
+        if result_store is None:
+            with stage_profiler.activate():
+                outputs = backtest()
+        else:
+            config = {
+                "ranking_method": ranking_method,
+                "ranking_mode": int(ranking_mode),
+                "select_top_k_assets": select_top_k_assets,
+                "allocation_method": allocation_method,
+                "allocation_mode": int(allocation_mode),
+                "rebalance_frequency": schedule_key(rebalance_frequency),
+                "side": int(side),
+                "benchmark": benchmark,
+                "perform_t_stats": perform_t_stats,
+                "n_bootstrap_samples": kwargs.get("n_bootstrap_samples", 100),
+                "sample_size": kwargs.get("sample_size"),
+                "alpha_risk": kwargs.get("alpha_risk", 0.05),
+            }
+            if self.__membership is not None:
+                config["membership_fingerprint"] = self.__membership.fingerprint()
+            if covariance_estimator != CovarianceEstimator.SAMPLE:
+                config["covariance_estimator"] = covariance_estimator
+            if drift_threshold is not None:
+                config["drift_threshold"] = drift_threshold
+            if estimation_window is not None:
+                config["estimation_window"] = (
+                    int(estimation_window)
+                    if isinstance(estimation_window, (int, np.integer))
+                    else str(pd.Timedelta(estimation_window))
+                )
+            universe_fingerprint = dataframe_fingerprint(self.__universe)
+            run_key = config_hash(
+                {
+                    **config,
+                    "benchmark_fingerprint": dataframe_fingerprint(
+                        self.__benchmarks[[benchmark]]
+                    ),
+                },
+                universe_fingerprint,
+                costs,
+            )
+            manifest = {
+                "config": config,
+                "costs": costs,
+                "universe_fingerprint": universe_fingerprint,
+                "code_version": code_version(),
+            }
+            with stage_profiler.activate():
+                outputs = result_store.get_or_run(
+                    run_key, backtest, manifest, asset_returns
                 )
 
+        returns, weights_history = outputs["returns"], outputs["weights"]
+        stats_ptf_df = [] if outputs["stats"] is None else outputs["stats"]
+        if print_stats and "manifest" in outputs:
+            # A run loaded from the store: its statistics are printed, or computed and attached once when missing
+            if outputs["stats"] is not None and not outputs["stats"].empty:
+                print_stored_statistics(outputs["stats"])
             else:
-                returns_histo.append((returns @ weights_np) * side)
+                stats_ptf_df = statistics(returns)
+                if outputs["stats"] is None:
+                    result_store.save_stats(run_key, stats_ptf_df)
+        if plot_curve:
+            with stage_profiler.stage("plot"):
+                plot_strategy(returns, self.__benchmarks[benchmark], weights_history)
+
+        return StrategyResult(
+            returns,
+            weights_history,
+            stats_ptf_df,
+            ledger=outputs["ledger"],
+            profile=None if profiler is None else profiler.summary(),
+        )
+
+    def __backtest(
+        self,
+        ranking_method: RankingMethod,
+        ranking_mode: RankingMode,
+        select_top_k_assets: int,
+        allocation_method: AllocationMethod,
+        allocation_mode: AllocationMode,
+        covariance_estimator: CovarianceEstimator,
+        estimation_window: Optional[EstimationWindow],
+        rebalance_frequency: RebalanceSchedule,
+        drift_threshold: Optional[float],
+        side: Side,
+        verbose: bool,
+        asset_returns: np.ndarray,
+        profiler: StageProfiler = DISABLED_PROFILER,
+        transaction_cost: float = TRANSACTION_COST,
+        slippage_effect: float = SLIPPAGE_EFFECT,
+    ) -> Tuple[pd.Series, WeightsHistory, CostLedger]:
+        """Walk through the universe, rebalance the portfolio and drift the weights.
+
+        Returns:
+        -----
+            Tuple[pd.Series, WeightsHistory, CostLedger]: The returns of the strategy, its weights history and its cost ledger.
+        """
+        assets = self.__universe["returns"].columns
+        weights_history = WeightsHistory(self.__universe.index, assets, asset_returns)
+        calendar = RebalanceCalendar.resolve(rebalance_frequency, self.__universe.index)
+        ranking_field = self.__universe[ranking_method]
+        allocation_field = self.__universe[ALLOCATION_FIELDS[allocation_method]]
+        ranking_values = ranking_field.to_numpy(dtype=float)
+        allocation_panel = allocation_field.to_numpy(dtype=float)
+        # The positions of the ranked assets in the allocation field columns
+        allocation_columns = allocation_field.columns.get_indexer(ranking_field.columns)
+
+        def targets(
+            positions: np.ndarray, previous_positions: np.ndarray
+        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, AllocationDiagnostics]:
+            return self.__rebalance_targets(
+                ranking_values,
+                ranking_field.columns,
+                allocation_panel,
+                allocation_columns,
+                positions,
+                previous_positions,
+                select_top_k_assets,
+                ranking_mode,
+                allocation_method,
+                allocation_mode,
+                covariance_estimator,
+                estimation_window,
+                profiler,
+            )
 
-            weights = weights_drift(securities, weights_np, returns)
+        if drift_threshold is None:
+            # The selection only depends on the ranking field at the rebalance dates and the allocation on the field
+            # up to these dates, so the weights of all the rebalances are computed at once before walking the dates
+            selection, valid, rebalance_weights, diagnostics = targets(
+                calendar.positions, calendar.previous_positions
+            )
+        else:
+            (
+                calendar,
+                selection,
+                valid,
+                rebalance_weights,
+                diagnostics,
+            ) = self.__drift_rebalances(
+                calendar,
+                drift_threshold,
+                np.nan_to_num(asset_returns[:, assets.get_indexer(ranking_field.columns)]),
+                targets,
+                profiler,
+            )
+        profiler.count("rebalances", len(calendar))
+        # Only the valid slots of the selections are held, the padding slots hold nothing
+        held_assets = assets.get_indexer(ranking_field.columns)[selection]
+        holdings = np.where(valid, rebalance_weights, 0.0)
+        for rebalance, position in enumerate(calendar.positions):
+            if verbose:
+                print(f"Rebalancing the portfolio on {self.__universe.index[position]}...")
+            # Only the targets are recorded, the drifted weights are rebuilt on demand
+            weights_history.add_rebalance(
+                position,
+                held_assets[rebalance][valid[rebalance]],
+                rebalance_weights[rebalance][valid[rebalance]],
+            )
+        with profiler.stage("drift"):
+            gross_returns = (
+                run_holdings_pass(asset_returns, calendar.positions, held_assets, holdings).gross_returns
+                * side
+            )
+        # transaction x the number of assets held x 2 : because we buy and sell the whole portfolio, an empty book trades nothing
+        n_held = valid.sum(axis=1)
+        returns_histo = gross_returns.copy()
+        returns_histo[calendar.positions] -= side * (transaction_cost * n_held * 2)
+        returns_histo[calendar.positions] -= side * np.where(
+            n_held > 0, slippage_effect, 0.0
+        )
+        if allocation_method in COVARIANCE_ALLOCATION_METHODS:
+            weights_history.set_diagnostics(
+                diagnostics.to_dataframe(weights_history.rebalance_dates)
+            )
+            profiler.count("unconverged_allocations", int((~diagnostics.converged).sum()))
         # The returns are the returns of the portfolio
         returns = pd.Series(returns_histo, index=self.__universe.index, dtype=float)
-        # The weights are the weights of the portfolio
-        weights_df = pd.DataFrame(
-            weights_histo, index=self.__universe.index, dtype=float
-        ).fillna(0)
-        stats_ptf_df = []
-        if print_stats:
-            stats_ptf_df = print_performance_statistics(
-                returns,
-                self.__benchmarks[benchmark],
-                perform_t_stats=perform_t_stats,
-                n_samples=kwargs.get("n_bootstrap_samples", 100),
-                sample_size=kwargs.get("sample_size", returns.shape[0] // 6),
-                alpha_risk=kwargs.get("alpha_risk", 0.05),
+        with profiler.stage("ledger"):
+            ledger = CostLedger.from_backtest(
+                pd.Series(gross_returns, index=self.__universe.index, dtype=float),
+                weights_history,
+                asset_returns,
+                side,
             )
-        if plot_curve:
-            alloc = pd.DataFrame(weights_df.mean())
-            alloc.columns = [0]
-            alloc = alloc.T
+        return returns, weights_history, ledger
+
+    def __rebalance_targets(
+        self,
+        ranking_values: np.ndarray,
+        ranking_columns: pd.Index,
+        allocation_panel: np.ndarray,
+        allocation_columns: np.ndarray,
+        rebalance_positions: np.ndarray,
+        previous_positions: np.ndarray,
+        select_top_k_assets: int,
+        ranking_mode: RankingMode,
+        allocation_method: AllocationMethod,
+        allocation_mode: AllocationMode,
+        covariance_estimator: CovarianceEstimator,
+        estimation_window: Optional[EstimationWindow],
+        profiler: StageProfiler,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, AllocationDiagnostics]:
+        """Select and allocate the portfolio at a batch of rebalance dates, the fields are given as arrays extracted once per backtest.
 
-            plot_from_trade_df_and_ptf_optimization(
-                portfolio_returns=returns,
-                benchmark_returns=self.__benchmarks[benchmark],
-                asset_allocation_dataframe=alloc,
+        Returns:
+        -----
+            Tuple[np.ndarray, np.ndarray, np.ndarray, AllocationDiagnostics]: The `(n_rebalances, k)` positions of the selected assets in the ranking field columns, their valid slots (the assets without ranking value or not eligible are never held), their weights (0 on the invalid slots) and the allocations diagnostics.
+        """
+        with profiler.stage("rank"):
+            selection, valid = select_top_k_for_rows(
+                ranking_values[rebalance_positions],
+                select_top_k_assets,
+                ascending=bool(ranking_mode),
+                eligible=None
+                if self.__membership is None
+                else self.__membership.rows(rebalance_positions, ranking_columns),
+            )
+        with profiler.stage("slice"):
+            allocation_selection = allocation_columns[selection]
+            # By default the window of the first rebalance starts with the universe, the next ones at the previous rebalance date
+            window_starts = estimation_window_starts(
+                self.__universe.index,
+                rebalance_positions,
+                previous_positions,
+                estimation_window,
             )
+        diagnostics = AllocationDiagnostics.empty(rebalance_positions.size)
+        with profiler.stage("allocate"):
+            rebalance_weights = allocate_valid_selection(
+                allocation_method,
+                allocation_selection,
+                valid,
+                allocation_panel,
+                rebalance_positions,
+                window_starts,
+                bool(allocation_mode),
+                covariance_estimator=covariance_estimator,
+                moments=self.__moments,
+                diagnostics=diagnostics,
+            )
+        return selection, valid, rebalance_weights, diagnostics
 
-        return returns, weights_df, stats_ptf_df
+    @staticmethod
+    def __drift_rebalances(
+        events: RebalanceCalendar,
+        drift_threshold: float,
+        returns: np.ndarray,
+        targets: Callable[
+            [np.ndarray, np.ndarray],
+            Tuple[np.ndarray, np.ndarray, np.ndarray, AllocationDiagnostics],
+        ],
+        profiler: StageProfiler,
+    ) -> Tuple[
+        RebalanceCalendar, np.ndarray, np.ndarray, np.ndarray, AllocationDiagnostics
+    ]:
+        """Rebalance at the events and whenever the drift of the weights exceeds the threshold. The targets of a rebalance give the drift of the next dates, so the rebalances are allocated one at a time, the dates up to the next event are scanned at once for a breach.
 
-    def __new__(cls, *args, **kwargs) -> Self:
-        """Singleton pattern implementation.
+        Args:
+        -----
+            events (RebalanceCalendar): The rebalances not depending on the portfolio (calendar, membership changes, predicate).
+            drift_threshold (float): The total absolute deviation from the targets firing a rebalance.
+            returns (np.ndarray): The `(date, asset)` returns of the ranking field assets, the missing returns set to 0.
+            targets (Callable): Select and allocate at rebalance positions given the previous rebalance positions.
+            profiler (StageProfiler): The profiler timing the scans.
 
         Returns:
-            Self: The unique instance of the class.
+        -----
+            Tuple[RebalanceCalendar, np.ndarray, np.ndarray, np.ndarray, AllocationDiagnostics]: The rebalance calendar, the selections, their valid slots, the weights and the diagnostics of its rebalances.
         """
-        if cls._instance is None:
-            cls._instance = super(PortfolioBacktester, cls).__new__(cls)
-        return cls._instance
+        event_positions = events.positions
+        positions, selections, valids, weights, diagnostics = [], [], [], [], []
+        position, previous_position = 0, 0
+        while position < events.index.size:
+            selection, valid, rebalance_weights, rebalance_diagnostics = targets(
+                np.array([position]), np.array([previous_position])
+            )
+            positions.append(position)
+            selections.append(selection)
+            valids.append(valid)
+            weights.append(rebalance_weights)
+            diagnostics.append(rebalance_diagnostics)
+
+            next_event = event_positions[event_positions > position][:1]
+            end = int(next_event[0]) if next_event.size else events.index.size
+            with profiler.stage("triggers"):
+                breach = first_drift_breach(
+                    returns[position:end, selection[0][valid[0]]],
+                    rebalance_weights[0][valid[0]],
+                    drift_threshold,
+                )
+            previous_position = position
+            position = end if breach is None else position + breach
+        profiler.count("drift_rebalances", len(positions) - int(events.mask[positions].sum()))
+        mask = np.zeros(events.index.size, dtype=bool)
+        mask[positions] = True
+        return (
+            RebalanceCalendar(events.index, mask),
+            np.concatenate(selections),
+            np.concatenate(valids),
+            np.concatenate(weights),
+            AllocationDiagnostics.concatenate(diagnostics),
+        )
+
+    def run_lookback_sweep(
+        self,
+        panel: LookbackPanel,
+        **kwargs,
+    ) -> Dict[int, tuple]:
+        """Run the same strategy for every lookback of an indicator panel. The ranking field of the universe is overwritten in place on a single working copy instead of building a new universe per lookback.
+
+        Args:
+        -----
+            panel (LookbackPanel): The panel computed with `Indicators.lookback_sweep`, its field is used as ranking method.
+            **kwargs: The arguments passed to `run_strategy` (ranking_method excepted).
+
+        Returns:
+        -----
+            Dict[int, StrategyResult]: The `run_strategy` outputs indexed by lookback.
+        """
+        working_universe = self.__universe.copy()
+        if panel.field not in working_universe.columns.get_level_values(0):
+            working_universe = pd.concat(
+                [
+                    working_universe,
+                    pd.DataFrame(
+                        np.nan,
+                        index=working_universe.index,
+                        columns=pd.MultiIndex.from_product(
+                            [[panel.field], working_universe["returns"].columns]
+                        ),
+                    ),
+                ],
+                axis=1,
+            )
+        field_positions = working_universe.columns.get_locs([panel.field])
+        field_assets = working_universe.columns[field_positions].get_level_values(1)
+        sweep_backtester = PortfolioBacktester(
+            working_universe, self.__benchmarks, membership=self.__membership
+        )
+        results = {}
+        for lookback in panel.lookbacks:
+            working_universe.iloc[:, field_positions] = panel.aligned_values(
+                lookback, working_universe.index, field_assets
+            )
+            results[int(lookback)] = sweep_backtester.run_strategy(
+                ranking_method=panel.field, **kwargs
+            )
+        return results
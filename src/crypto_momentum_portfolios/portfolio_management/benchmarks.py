@@ -2,16 +2,22 @@ import pandas as pd
 from typing import Self
 from abc import ABC, abstractmethod
 import numpy as np
-from typing import Optional, Self, Tuple
+from typing import List, Optional, Self, Tuple
 
 from tqdm import tqdm
 from crypto_momentum_portfolios.portfolio_management.allocation import Allocation
+from crypto_momentum_portfolios.portfolio_management.weights import WeightsHistory
+from crypto_momentum_portfolios.utility.membership import MembershipMask
+from crypto_momentum_portfolios.utility.rebalance_calendar import (
+    RebalanceCalendar,
+    RebalanceSchedule,
+)
 from crypto_momentum_portfolios.utility.constants import (
     SLIPPAGE_EFFECT,
     TRANSACTION_COST,
 )
 from crypto_momentum_portfolios.utility.types import Fields, Side, RebalanceFrequency
-from crypto_momentum_portfolios.utility.utils import get_rebalance_dates, weights_drift
+from crypto_momentum_portfolios.utility.utils import weights_drift
 
 
 class BenchmarkDataFrameBuilderABC(ABC):
@@ -37,97 +43,105 @@ class BenchmarkDataFrameBuilderABC(ABC):
     def _build_capitalization_weighted_benchmark(
         universe: pd.DataFrame,
         capitalization_field: Fields = Fields.MARKET_CAP,
-        rebalance_frequency: RebalanceFrequency = RebalanceFrequency.MONTH_START,
+        rebalance_frequency: RebalanceSchedule = RebalanceFrequency.MONTH_START,
         side: Side = Side.LONG,
         verbose: bool = False,
-    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        membership: Optional[MembershipMask] = None,
+    ) -> Tuple[pd.DataFrame, WeightsHistory]:
         """Build a capitalization weighted benchmark
 
         Args:
         ----
             universe (pd.DataFrame): The universe of securities i.e MultiIndex DataFrame with the price and returns of each security as the first level of columns, the cryptos names as second level and the date as the index
             capitalization_field (Fields, optional): The field to use as capitalization in the universe DataFrame. Defaults to Fields.MARKET_CAP.
-            rebalance_frequency (RebalanceFrequency, optional): The portfolio/benchmark rebalance frequency. Defaults to RebalanceFrequency.MONTH_START.
+            rebalance_frequency (RebalanceSchedule, optional): The portfolio/benchmark rebalance frequency or calendar. Defaults to RebalanceFrequency.MONTH_START.
             side (Side, optional): Whether building a LONG or SHORT portfolio/benchmark. Defaults to Side.LONG.
             verbose (bool, optional): Print the rebalance dates (could be used for sanity check). Defaults to False.
+            membership (Optional[MembershipMask], optional): The eligibility of the assets, only the eligible ones are held from each rebalance. Defaults to None i.e. all the assets.
 
         Returns:
         ----
-            Tuple[pd.DataFrame, pd.DataFrame]: The returns DataFrame and weights DataFrame of the capi weighted benchmark.
+            Tuple[pd.DataFrame, WeightsHistory]: The returns DataFrame and the compact weights history of the capi weighted benchmark.
         """
-        returns_histo, weights_histo = [], []
-        REBALANCE_DATES = get_rebalance_dates(
-            universe.index[0], universe.index[-1], rebalance_frequency
-        )
+        returns_histo = []
+        REBALANCE = RebalanceCalendar.resolve(rebalance_frequency, universe.index).mask
 
         SECURITIES = universe["price"].columns.to_list()
+        weights_history = WeightsHistory(
+            universe.index,
+            pd.Index(SECURITIES),
+            universe["returns"][SECURITIES].to_numpy(dtype=float),
+        )
 
-        for index, row in tqdm(
-            universe.iterrows(),
-            desc="Building the Benchmark...",
-            total=len(universe),
-            leave=False,
+        previous_rebalance = 0
+        for position, (index, row) in enumerate(
+            tqdm(
+                universe.iterrows(),
+                desc="Building the Benchmark...",
+                total=len(universe),
+                leave=False,
+            )
         ):
-            if index in REBALANCE_DATES and REBALANCE_DATES.index(index) == 0:
+            if REBALANCE[position]:
                 if verbose:
                     print(f"Rebalancing the portfolio on {index}")
-                weights = Allocation.capitalization_weighted_allocation(
-                    SECURITIES,
-                    universe[capitalization_field][SECURITIES].loc[:index],
+                held, held_securities = BenchmarkDataFrameBuilderABC.__held_securities(
+                    SECURITIES, position, membership
                 )
-            elif index in REBALANCE_DATES and REBALANCE_DATES.index(index) > 0:
-                if verbose:
-                    print(f"Rebalancing the portfolio on {index}")
+                # The capitalizations since the previous rebalance, since the start for the first one
                 weights = Allocation.capitalization_weighted_allocation(
-                    SECURITIES,
-                    universe[capitalization_field][SECURITIES].loc[
-                        REBALANCE_DATES[REBALANCE_DATES.index(index) - 1] : index
+                    held_securities,
+                    universe[capitalization_field][held_securities].iloc[
+                        previous_rebalance : position + 1
                     ],
                 )
+                previous_rebalance = position
 
-            weights_histo.append(weights)
-            returns = row["returns"][SECURITIES].to_numpy()
+            returns = row["returns"][held_securities].to_numpy()
 
             weights_np = np.array(list(weights.values()))
-            if index in REBALANCE_DATES or index == universe.index[0]:
+            if REBALANCE[position]:
+                weights_history.add_rebalance(position, held, weights_np)
                 returns_histo.append(
                     (
                         (returns @ weights_np)
-                        - TRANSACTION_COST * len(SECURITIES)
+                        - TRANSACTION_COST * len(held_securities)
                         - SLIPPAGE_EFFECT
                     )
                     * side
                 )
             else:
                 returns_histo.append((returns @ weights_np) * side)
-            weights = weights_drift(SECURITIES, weights_np, returns)
+            weights = weights_drift(held_securities, weights_np, returns)
 
         return pd.DataFrame(
             returns_histo,
             columns=["capi_weighted_benchmark"],
             index=universe.index,
             dtype=float,
-        ), pd.DataFrame(weights_histo, index=universe.index, dtype=float).fillna(0)
+        ), weights_history
 
     @staticmethod
     def _build_equally_weighted_benchmark(
         universe: pd.DataFrame,
-        rebalance_frequency: RebalanceFrequency = RebalanceFrequency.MONTH_START,
+        rebalance_frequency: RebalanceSchedule = RebalanceFrequency.MONTH_START,
         side: Side = Side.LONG,
         verbose: bool = False,
-    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        membership: Optional[MembershipMask] = None,
+    ) -> Tuple[pd.DataFrame, WeightsHistory]:
         """Build an equally weighted benchmark
 
             Args:
             ----
                 universe (pd.DataFrame): The universe of securities i.e MultiIndex DataFrame with the price and returns of each security as the first level of columns, the cryptos names as second level and the date as the index
-                rebalance_frequency (RebalanceFrequency, optional): The portfolio/benchmark rebalance frequency. Defaults to RebalanceFrequency.MONTH_START.
+                rebalance_frequency (RebalanceSchedule, optional): The portfolio/benchmark rebalance frequency or calendar. Defaults to RebalanceFrequency.MONTH_START.
                 side (Side, optional): Whether building a LONG or SHORT portfolio/benchmark. Defaults to Side.LONG.
                 verbose (bool, optional): Print the rebalance dates (could be used for sanity check). Defaults to False.
+                membership (Optional[MembershipMask], optional): The eligibility of the assets, only the eligible ones are held from each rebalance. Defaults to None i.e. all the assets.
 
             Returns:
             ----
-                Tuple[pd.DataFrame, pd.DataFrame]: The returns DataFrame and weights DataFrame of the equally weighted benchmark.
+                Tuple[pd.DataFrame, WeightsHistory]: The returns DataFrame and the compact weights history of the equally weighted benchmark.
 
         ```python
         returns_df, weights_bench = build_capitalization_weighted_benchmark(universe,
@@ -137,49 +151,69 @@ class BenchmarkDataFrameBuilderABC(ABC):
                                                                     verbose=False)
         ```
         """
-        returns_histo, weights_histo = [], []
-        REBALANCE_DATES = get_rebalance_dates(
-            universe.index[0], universe.index[-1], rebalance_frequency
-        )
+        returns_histo = []
+        REBALANCE = RebalanceCalendar.resolve(rebalance_frequency, universe.index).mask
 
         SECURITIES = universe["price"].columns.to_list()
+        weights_history = WeightsHistory(
+            universe.index,
+            pd.Index(SECURITIES),
+            universe["returns"][SECURITIES].to_numpy(dtype=float),
+        )
 
-        for index, row in tqdm(
-            universe.iterrows(),
-            desc="Building the Benchmark...",
-            total=len(universe),
-            leave=False,
+        for position, (index, row) in enumerate(
+            tqdm(
+                universe.iterrows(),
+                desc="Building the Benchmark...",
+                total=len(universe),
+                leave=False,
+            )
         ):
-            if index in REBALANCE_DATES or index == universe.index[0]:
+            if REBALANCE[position]:
                 if verbose:
                     print(f"Rebalancing the portfolio on {index}")
+                held, held_securities = BenchmarkDataFrameBuilderABC.__held_securities(
+                    SECURITIES, position, membership
+                )
                 weights = Allocation.equal_weighted_allocation(
-                    SECURITIES,
+                    held_securities,
                 )
 
-            weights_histo.append(weights)
-            returns = row["returns"][SECURITIES].to_numpy()
+            returns = row["returns"][held_securities].to_numpy()
 
             weights_np = np.array(list(weights.values()))
-            if index in REBALANCE_DATES or index == universe.index[0]:
+            if REBALANCE[position]:
+                weights_history.add_rebalance(position, held, weights_np)
                 returns_histo.append(
                     (
                         (returns @ weights_np)
-                        - TRANSACTION_COST * len(SECURITIES)
+                        - TRANSACTION_COST * len(held_securities)
                         - SLIPPAGE_EFFECT
                     )
                     * side
                 )
             else:
                 returns_histo.append((returns @ weights_np) * side)
-            weights = weights_drift(SECURITIES, weights_np, returns)
+            weights = weights_drift(held_securities, weights_np, returns)
 
         return pd.DataFrame(
             returns_histo,
             columns=["equal_weighted_benchmark"],
             index=universe.index,
             dtype=float,
-        ), pd.DataFrame(weights_histo, index=universe.index, dtype=float).fillna(0)
+        ), weights_history
+
+    @staticmethod
+    def __held_securities(
+        securities: List[str], position: int, membership: Optional[MembershipMask]
+    ) -> Tuple[np.ndarray, List[str]]:
+        """Get the positions and names of the securities held from a rebalance: all of them without membership mask, else the eligible ones."""
+        if membership is None:
+            return np.arange(len(securities)), securities
+        held = np.flatnonzero(
+            membership.rows(np.array([position]), pd.Index(securities))[0]
+        )
+        return held, [securities[i] for i in held]
 
     def _add_benchmark(self, dataframe: pd.DataFrame) -> None:
         if self._benchmarks is None:
@@ -189,18 +223,26 @@ class BenchmarkDataFrameBuilderABC(ABC):
 
 
 class BenchmarkDataFrameBuilder(BenchmarkDataFrameBuilderABC):
-    def __init__(self, universe: pd.DataFrame) -> None:
+    def __init__(
+        self, universe: pd.DataFrame, membership: Optional[MembershipMask] = None
+    ) -> None:
         self.__universe = universe
+        self.__membership = membership
 
     def build_capitalization_weighted_benchmark(
         self,
         capitalization_field: Fields = Fields.MARKET_CAP,
-        rebalance_frequency: RebalanceFrequency = RebalanceFrequency.MONTH_START,
+        rebalance_frequency: RebalanceSchedule = RebalanceFrequency.MONTH_START,
         side: Side = Side.LONG,
         verbose: bool = True,
     ) -> Self:
         returns_df, _ = self._build_capitalization_weighted_benchmark(
-            self.__universe, capitalization_field, rebalance_frequency, side, verbose
+            self.__universe,
+            capitalization_field,
+            rebalance_frequency,
+            side,
+            verbose,
+            self.__membership,
         )
         self._add_benchmark(returns_df)
         return self
@@ -215,12 +257,12 @@ class BenchmarkDataFrameBuilder(BenchmarkDataFrameBuilderABC):
 
     def build_equally_weighted_benchmark(
         self,
-        rebalance_frequency: RebalanceFrequency = RebalanceFrequency.MONTH_START,
+        rebalance_frequency: RebalanceSchedule = RebalanceFrequency.MONTH_START,
         side: Side = Side.LONG,
         verbose: bool = True,
     ) -> Self:
         returns_df, _ = self._build_equally_weighted_benchmark(
-            self.__universe, rebalance_frequency, side, verbose
+            self.__universe, rebalance_frequency, side, verbose, self.__membership
         )
         self._add_benchmark(returns_df)
 
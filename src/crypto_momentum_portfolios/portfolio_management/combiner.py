@@ -0,0 +1,268 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from tqdm import tqdm
+
+from crypto_momentum_portfolios.portfolio_management.allocation import (
+    ALLOCATION_FIELDS,
+    allocate_valid_selection,
+)
+from crypto_momentum_portfolios.portfolio_management.covariance import MomentsCache
+from crypto_momentum_portfolios.portfolio_management.selection import (
+    select_top_k_for_rows,
+)
+from crypto_momentum_portfolios.utility.constants import (
+    SLIPPAGE_EFFECT,
+    TRANSACTION_COST,
+)
+from crypto_momentum_portfolios.utility.rebalance_calendar import RebalanceCalendar
+from crypto_momentum_portfolios.utility.types import (
+    CostModel,
+    RankingMode,
+    StrategySpec,
+)
+from crypto_momentum_portfolios.utility.utils import estimation_window_starts
+
+
+@dataclass(frozen=True)
+class Sleeve:
+    """A strategy sleeve of a combined portfolio.
+
+    Attributes:
+    ----
+        name (str): The sleeve name used in the attribution.
+        spec (StrategySpec): The selection and allocation parameters of the sleeve.
+        capital_weight (float): The share of the book allocated to the sleeve at the start, the sleeve capital then drifts with its returns and each rebalance invests its current capital.
+    """
+
+    name: str
+    spec: StrategySpec
+    capital_weight: float
+
+
+@dataclass
+class CombinedPortfolioResult:
+    """The output of `PortfolioCombiner.run_combination`.
+
+    Attributes:
+    ----
+        returns (pd.Series): The net returns of the combined book.
+        gross_returns (pd.Series): The returns of the combined book before costs.
+        costs (pd.Series): The costs charged on the netted book with `cost_model`.
+        weights (pd.DataFrame): The weights of the combined book (dates x assets).
+        sleeves_contribution (pd.DataFrame): The gross return contribution of each sleeve (dates x sleeves).
+        sleeves_turnover (pd.DataFrame): The standalone turnover of each sleeve at each rebalance (dates x sleeves).
+        netted_turnover (pd.Series): The turnover of the combined book once the sleeves trades are netted.
+        cost_model (CostModel): The cost model used to charge `costs`.
+    """
+
+    returns: pd.Series
+    gross_returns: pd.Series
+    costs: pd.Series
+    weights: pd.DataFrame
+    sleeves_contribution: pd.DataFrame
+    sleeves_turnover: pd.DataFrame
+    netted_turnover: pd.Series
+    cost_model: CostModel
+
+    def attribution(self) -> pd.DataFrame:
+        """Summarize the contribution of each sleeve. The costs of the book are shared between the sleeves pro rata of their standalone turnover.
+
+        Returns:
+        ----
+            pd.DataFrame: The gross contribution, the allocated costs, the net contribution and the turnover of each sleeve.
+        """
+        total_turnover = self.sleeves_turnover.sum(axis=1)
+        cost_share = self.sleeves_turnover.div(
+            total_turnover.where(total_turnover > 0), axis=0
+        ).fillna(0)
+        allocated_costs = cost_share.mul(self.costs, axis=0).sum()
+        gross_contribution = self.sleeves_contribution.sum()
+        return pd.DataFrame(
+            {
+                "gross_contribution": gross_contribution,
+                "allocated_costs": allocated_costs,
+                "net_contribution": gross_contribution - allocated_costs,
+                "standalone_turnover": self.sleeves_turnover.sum(),
+            }
+        )
+
+    @property
+    def crossed_turnover(self) -> float:
+        """The turnover saved by netting the sleeves trades inside the book.
+
+        Returns:
+        ----
+            float: The sum of the sleeves standalone turnover minus the netted turnover.
+        """
+        return float(self.sleeves_turnover.to_numpy().sum() - self.netted_turnover.sum())
+
+
+class PortfolioCombiner:
+    def __init__(self, universe: pd.DataFrame) -> None:
+        """Constructor method.
+
+        Args:
+            universe (pd.DataFrame): The universe of assets with the fields used by the sleeves (MultiIndex columns field x asset).
+        """
+        self.__universe = universe
+
+    def run_combination(
+        self,
+        sleeves: List[Sleeve],
+        transaction_cost: float = TRANSACTION_COST,
+        slippage_effect: float = SLIPPAGE_EFFECT,
+        cost_model: CostModel = CostModel.TURNOVER,
+        verbose: bool = False,
+    ) -> CombinedPortfolioResult:
+        """Run several sleeves side by side in a single pass over the universe. The allocations of all the rebalances of a sleeve are computed at once by the batched allocators, the pass over the dates only scales them by the current capital of the sleeve, so the book stays invested whatever the rebalance dates of the sleeves. At each date where at least one sleeve rebalances, the sleeves targets are netted into one book and the costs are charged on the netted book, so the trades crossing between sleeves are not paid twice.
+
+        The default `TURNOVER` cost model charges the netted turnover and differs from `PortfolioBacktester.run_strategy`, which charges `transaction_cost * k * 2 + slippage_effect` at each rebalance whatever the traded notional. Use `CostModel.PER_REBALANCE` to charge the book as the backtester does, `k` being the number of assets held by the netted book (an empty book is not charged).
+
+        Args:
+        -----
+            sleeves (List[Sleeve]): The sleeves to combine, the capital weights should sum to 1.
+            transaction_cost (float, optional): The transaction cost, per unit of traded notional or per asset traded depending on `cost_model`. Defaults to TRANSACTION_COST.
+            slippage_effect (float, optional): The slippage, per unit of traded notional or per rebalance depending on `cost_model`. Defaults to SLIPPAGE_EFFECT.
+            cost_model (CostModel, optional): The cost model (see `CostLedger.rebalance_costs`). Defaults to CostModel.TURNOVER.
+            verbose (bool, optional): Print the rebalance dates. Defaults to False.
+
+        Returns:
+        -----
+            CombinedPortfolioResult: The book returns, weights, costs and the per sleeve attribution.
+        """
+        assert len(sleeves) > 0, "At least one sleeve must be provided"
+        assert len({sleeve.name for sleeve in sleeves}) == len(
+            sleeves
+        ), "The sleeves names must be unique"
+        dates = self.__universe.index
+        securities = self.__universe["returns"].columns
+        for sleeve in sleeves:
+            assert (
+                sleeve.spec.select_top_k_assets <= securities.size
+            ), f"select_top_k_assets must be less than or equal to {securities.size}"
+
+        # Shared data path: every field is extracted once whatever the number of sleeves
+        returns_np = np.nan_to_num(
+            self.__universe["returns"][securities].to_numpy(dtype=np.float64)
+        )
+        fields = {
+            field: self.__universe[field][securities].to_numpy(dtype=np.float64)
+            for sleeve in sleeves
+            for field in (
+                sleeve.spec.ranking_method,
+                ALLOCATION_FIELDS[sleeve.spec.allocation_method],
+            )
+        }
+        rebalance_masks = [
+            RebalanceCalendar.resolve(sleeve.spec.rebalance_frequency, dates).mask
+            for sleeve in sleeves
+        ]
+        # The covariances are shared by the sleeves allocating on the same windows
+        moments = MomentsCache()
+        sleeves_targets = [
+            self.__sleeve_targets(sleeve, fields, np.flatnonzero(mask), moments)
+            for sleeve, mask in zip(sleeves, rebalance_masks)
+        ]
+
+        n_dates, n_assets, n_sleeves = dates.size, securities.size, len(sleeves)
+        holdings = np.zeros((n_sleeves, n_assets))  # Share of the book held by each sleeve
+        # Share of the book value owned by each sleeve, its cash included
+        capital = np.array([sleeve.capital_weight for sleeve in sleeves], dtype=np.float64)
+        n_rebalances = [0] * n_sleeves
+        gross_returns = np.zeros(n_dates)
+        costs = np.zeros(n_dates)
+        netted_turnover = np.zeros(n_dates)
+        book_weights = np.zeros((n_dates, n_assets))
+        contribution = np.zeros((n_dates, n_sleeves))
+        sleeves_turnover = np.zeros((n_dates, n_sleeves))
+
+        for t in tqdm(
+            range(n_dates),
+            desc="Backtesting the combination...",
+            total=n_dates,
+            leave=False,
+        ):
+            drifted_book = holdings.sum(axis=0)
+            rebalanced = False
+            for s, sleeve in enumerate(sleeves):
+                if not rebalance_masks[s][t]:
+                    continue
+                if verbose:
+                    print(f"Rebalancing the sleeve {sleeve.name} on {dates[t]}...")
+                target = sleeves_targets[s][n_rebalances[s]] * capital[s] * sleeve.spec.side
+                sleeves_turnover[t, s] = np.abs(target - holdings[s]).sum()
+                holdings[s] = target
+                n_rebalances[s] += 1
+                rebalanced = True
+            if rebalanced:
+                netted_turnover[t] = np.abs(holdings.sum(axis=0) - drifted_book).sum()
+                if cost_model == CostModel.PER_REBALANCE:
+                    n_held = np.count_nonzero(holdings.sum(axis=0))
+                    # An empty book (e.g. no asset with a ranking value yet) is not charged
+                    if n_held > 0:
+                        costs[t] = transaction_cost * n_held * 2 + slippage_effect
+                else:
+                    costs[t] = (transaction_cost + slippage_effect) * netted_turnover[t]
+
+            book_weights[t] = holdings.sum(axis=0)
+            contribution[t] = holdings @ returns_np[t]
+            gross_returns[t] = contribution[t].sum()
+            # Drift: the sleeves holdings and capital are expressed as a share of the new book value
+            holdings = holdings * (1 + returns_np[t]) / (1 + gross_returns[t])
+            capital = (capital + contribution[t]) / (1 + gross_returns[t])
+
+        sleeves_names = [sleeve.name for sleeve in sleeves]
+        return CombinedPortfolioResult(
+            returns=pd.Series(gross_returns - costs, index=dates, dtype=float),
+            gross_returns=pd.Series(gross_returns, index=dates, dtype=float),
+            costs=pd.Series(costs, index=dates, dtype=float),
+            weights=pd.DataFrame(book_weights, index=dates, columns=securities),
+            sleeves_contribution=pd.DataFrame(
+                contribution, index=dates, columns=sleeves_names
+            ),
+            sleeves_turnover=pd.DataFrame(
+                sleeves_turnover, index=dates, columns=sleeves_names
+            ),
+            netted_turnover=pd.Series(netted_turnover, index=dates, dtype=float),
+            cost_model=cost_model,
+        )
+
+    def __sleeve_targets(
+        self,
+        sleeve: Sleeve,
+        fields: Dict[str, npt.NDArray[np.float64]],
+        rebalance_positions: npt.NDArray[np.intp],
+        moments: MomentsCache,
+    ) -> npt.NDArray[np.float64]:
+        """Select and allocate all the rebalances of a sleeve at once, the result is the `(n_rebalances, asset)` weights of a unit of capital, positive whatever the side of the sleeve."""
+        spec = sleeve.spec
+        # The assets without ranking value are never selected, as in `PortfolioBacktester`
+        selection, valid = select_top_k_for_rows(
+            fields[spec.ranking_method][rebalance_positions],
+            spec.select_top_k_assets,
+            ascending=spec.ranking_mode == RankingMode.ASCENDING,
+        )
+        # The window of the first rebalance starts with the universe, the next ones at the previous rebalance date
+        window_starts = estimation_window_starts(
+            self.__universe.index,
+            rebalance_positions,
+            np.concatenate([[0], rebalance_positions[:-1]]).astype(np.intp),
+            spec.estimation_window,
+        )
+        weights = allocate_valid_selection(
+            spec.allocation_method,
+            selection,
+            valid,
+            fields[ALLOCATION_FIELDS[spec.allocation_method]],
+            rebalance_positions,
+            window_starts,
+            bool(spec.allocation_mode),
+            covariance_estimator=spec.covariance_estimator,
+            moments=moments,
+        )
+        targets = np.zeros((rebalance_positions.size, fields[spec.ranking_method].shape[1]))
+        np.put_along_axis(targets, selection, np.where(valid, weights, 0.0), axis=1)
+        return targets
@@ -0,0 +1,289 @@
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from crypto_momentum_portfolios.portfolio_management.performance import (
+    batched_article_metrics,
+)
+from crypto_momentum_portfolios.portfolio_management.weights import WeightsHistory
+from crypto_momentum_portfolios.utility.constants import (
+    PERIODS_PER_YEAR,
+    SLIPPAGE_EFFECT,
+    TRANSACTION_COST,
+)
+from crypto_momentum_portfolios.utility.types import CostModel
+
+# A cost parameter: a single value, or a vector of cost levels repriced at once
+CostLevels = Union[float, npt.ArrayLike]
+
+
+@dataclass
+class CostLedger:
+    """The cost free record of a backtest: its gross returns and the trades of its rebalances, enough to charge any cost model after the backtest without re-running the selection and the allocation (see `reprice_costs`).
+
+    Attributes:
+    ----
+        gross_returns (pd.Series): The returns of the strategy before costs, the side applied.
+        traded_notional (pd.DataFrame): The absolute traded notional of each asset at each rebalance (rebalance dates x assets), as a share of the portfolio: `|target - drifted weights|`, the first rebalance buys the whole portfolio.
+        n_assets (npt.NDArray[np.int64]): The number of assets held after each rebalance.
+        side (int): The side of the strategy, 1 for long and -1 for short.
+    """
+
+    gross_returns: pd.Series
+    traded_notional: pd.DataFrame
+    n_assets: npt.NDArray[np.int64]
+    side: int
+
+    @classmethod
+    def from_backtest(
+        cls,
+        gross_returns: pd.Series,
+        weights: WeightsHistory,
+        asset_returns: npt.NDArray[np.float64],
+        side: int,
+    ) -> "CostLedger":
+        """Build the ledger of a backtest from its gross returns and its weights history. The weights held before a rebalance are the previous targets drifted up to its date, as `weights_drift` does.
+
+        Args:
+        ----
+            gross_returns (pd.Series): The returns of the strategy before costs, the side applied.
+            weights (WeightsHistory): The weights history of the strategy.
+            asset_returns (npt.NDArray[np.float64]): The `(date, asset)` returns of the universe assets.
+            side (int): The side of the strategy.
+
+        Returns:
+        ----
+            CostLedger: The ledger.
+        """
+        arrays = weights.to_arrays()
+        positions, offsets = arrays["positions"], arrays["offsets"]
+        ends = np.append(positions[1:], weights.dates.size)
+        traded_notional = np.zeros((positions.size, weights.assets.size))
+        held = np.zeros(weights.assets.size)
+        for rebalance, (start, end) in enumerate(zip(positions, ends)):
+            indices = arrays["asset_indices"][offsets[rebalance] : offsets[rebalance + 1]]
+            target = arrays["weights"][offsets[rebalance] : offsets[rebalance + 1]].astype(
+                np.float64
+            )
+            held[indices] -= target
+            traded_notional[rebalance] = np.abs(held)
+            drifted = target * np.prod(
+                1 + np.nan_to_num(asset_returns[start:end, indices]), axis=0
+            )
+            held = np.zeros(weights.assets.size)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                held[indices] = drifted / drifted.sum()
+        return cls(
+            gross_returns=gross_returns,
+            traded_notional=pd.DataFrame(
+                traded_notional, index=weights.rebalance_dates, columns=weights.assets
+            ),
+            n_assets=np.diff(offsets),
+            side=int(side),
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        dates: pd.Index,
+        assets: pd.Index,
+        arrays: Mapping[str, npt.NDArray],
+    ) -> "CostLedger":
+        """Rebuild a ledger from its arrays (e.g. loaded from a result store).
+
+        Args:
+        ----
+            dates (pd.Index): The dates of the backtest.
+            assets (pd.Index): The assets of the universe.
+            arrays (Mapping[str, npt.NDArray]): The arrays of `to_arrays`.
+
+        Returns:
+        ----
+            CostLedger: The ledger.
+        """
+        return cls(
+            gross_returns=pd.Series(arrays["gross_returns"], index=dates, dtype=float),
+            traded_notional=pd.DataFrame(
+                arrays["traded_notional"],
+                index=dates[arrays["positions"]],
+                columns=assets,
+            ),
+            n_assets=np.asarray(arrays["n_assets"], dtype=np.int64),
+            side=int(arrays["side"]),
+        )
+
+    def to_arrays(self) -> Dict[str, npt.NDArray]:
+        """Get the arrays of the ledger.
+
+        Returns:
+        ----
+            Dict[str, npt.NDArray]: The `gross_returns`, `positions` (of the rebalances), `traded_notional`, `n_assets` and `side` arrays.
+        """
+        return {
+            "gross_returns": self.gross_returns.to_numpy(dtype=np.float64),
+            "positions": self.gross_returns.index.get_indexer(self.traded_notional.index),
+            "traded_notional": self.traded_notional.to_numpy(dtype=np.float64),
+            "n_assets": self.n_assets,
+            "side": np.asarray(self.side),
+        }
+
+    @property
+    def turnover(self) -> pd.Series:
+        """The turnover of each rebalance, the sum of the traded notional."""
+        return self.traded_notional.sum(axis=1)
+
+    def rebalance_costs(
+        self,
+        transaction_cost: CostLevels = TRANSACTION_COST,
+        slippage_effect: CostLevels = SLIPPAGE_EFFECT,
+        cost_model: CostModel = CostModel.PER_REBALANCE,
+        asset_costs: Optional[pd.Series] = None,
+    ) -> pd.DataFrame:
+        """Compute the cost of each rebalance for each cost level.
+
+        Args:
+        ----
+            transaction_cost (CostLevels, optional): The transaction cost, or a vector of levels. Defaults to TRANSACTION_COST.
+            slippage_effect (CostLevels, optional): The slippage effect, or a vector of levels broadcast with the transaction costs. Defaults to SLIPPAGE_EFFECT.
+            cost_model (CostModel, optional): `PER_REBALANCE` charges `transaction_cost * k * 2 + slippage_effect` at each rebalance holding k > 0 assets as the backtester does, `TURNOVER` charges `(transaction_cost + slippage_effect)` per unit of traded notional. Defaults to CostModel.PER_REBALANCE.
+            asset_costs (Optional[pd.Series], optional): An additional cost per unit of traded notional of each asset e.g. the spread of the illiquid assets, only for the `TURNOVER` model, the missing assets cost 0. Defaults to None.
+
+        Returns:
+        ----
+            pd.DataFrame: The costs (rebalance dates x levels), the columns are the (transaction_cost, slippage_effect) levels.
+        """
+        levels, components = self.__cost_components(
+            transaction_cost, slippage_effect, cost_model, asset_costs
+        )
+        return pd.DataFrame(
+            sum(components), index=self.traded_notional.index, columns=levels
+        )
+
+    def reprice_costs(
+        self,
+        transaction_cost: CostLevels = TRANSACTION_COST,
+        slippage_effect: CostLevels = SLIPPAGE_EFFECT,
+        cost_model: CostModel = CostModel.PER_REBALANCE,
+        asset_costs: Optional[pd.Series] = None,
+    ) -> Union[pd.Series, pd.DataFrame]:
+        """Charge other costs to the gross returns, all the cost levels at once. With the costs of the backtest and the `PER_REBALANCE` model the returns of the backtest are given back exactly.
+
+        Args:
+        ----
+            transaction_cost (CostLevels, optional): The transaction cost, or a vector of levels. Defaults to TRANSACTION_COST.
+            slippage_effect (CostLevels, optional): The slippage effect, or a vector of levels broadcast with the transaction costs. Defaults to SLIPPAGE_EFFECT.
+            cost_model (CostModel, optional): The cost model (see `rebalance_costs`). Defaults to CostModel.PER_REBALANCE.
+            asset_costs (Optional[pd.Series], optional): An additional cost per unit of traded notional of each asset (see `rebalance_costs`). Defaults to None.
+
+        Returns:
+        ----
+            Union[pd.Series, pd.DataFrame]: The net returns, a DataFrame (dates x levels) when a vector of levels is given.
+        """
+        levels, components = self.__cost_components(
+            transaction_cost, slippage_effect, cost_model, asset_costs
+        )
+        net_returns = np.repeat(
+            self.gross_returns.to_numpy(dtype=np.float64)[:, None], levels.size, axis=1
+        )
+        positions = self.gross_returns.index.get_indexer(self.traded_notional.index)
+        rebalance_returns = net_returns[positions]
+        # The components are charged one after the other as the backtester does, so that the rounding is the same
+        for component in components:
+            rebalance_returns -= self.side * component
+        net_returns[positions] = rebalance_returns
+        if np.ndim(transaction_cost) == 0 and np.ndim(slippage_effect) == 0:
+            return pd.Series(net_returns[:, 0], index=self.gross_returns.index, dtype=float)
+        return pd.DataFrame(net_returns, index=self.gross_returns.index, columns=levels)
+
+    def __cost_components(
+        self,
+        transaction_cost: CostLevels,
+        slippage_effect: CostLevels,
+        cost_model: CostModel,
+        asset_costs: Optional[pd.Series],
+    ) -> Tuple[pd.MultiIndex, List[npt.NDArray[np.float64]]]:
+        """Compute the `(rebalance, level)` costs of the model as the list of the amounts the backtester subtracts one after the other, and the (transaction_cost, slippage_effect) levels."""
+        transaction_costs, slippage_effects = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(transaction_cost, dtype=np.float64)),
+            np.atleast_1d(np.asarray(slippage_effect, dtype=np.float64)),
+        )
+        assert transaction_costs.ndim == 1, "The cost levels must be scalars or vectors"
+        levels = pd.MultiIndex.from_arrays(
+            [transaction_costs, slippage_effects],
+            names=["transaction_cost", "slippage_effect"],
+        )
+        n_rebalances = self.traded_notional.shape[0]
+        if cost_model == CostModel.PER_REBALANCE:
+            assert asset_costs is None, "The asset costs need the TURNOVER cost model"
+            return levels, [
+                np.multiply.outer(self.n_assets, transaction_costs) * 2,
+                # An empty book trades nothing and is not charged the slippage
+                np.multiply.outer(self.n_assets > 0, slippage_effects),
+            ]
+        components = [
+            np.multiply.outer(self.turnover.to_numpy(), transaction_costs + slippage_effects)
+        ]
+        if asset_costs is not None:
+            components.append(
+                np.broadcast_to(
+                    (
+                        self.traded_notional.to_numpy()
+                        @ asset_costs.reindex(
+                            self.traded_notional.columns, fill_value=0.0
+                        ).to_numpy(dtype=np.float64)
+                    )[:, None],
+                    (n_rebalances, levels.size),
+                )
+            )
+        return levels, components
+
+
+def cost_sensitivity(
+    ledgers: Mapping[str, CostLedger],
+    benchmark_returns: pd.Series,
+    transaction_cost: CostLevels = TRANSACTION_COST,
+    slippage_effect: CostLevels = SLIPPAGE_EFFECT,
+    cost_model: CostModel = CostModel.PER_REBALANCE,
+    asset_costs: Optional[pd.Series] = None,
+    periods_per_year: int = PERIODS_PER_YEAR,
+) -> pd.DataFrame:
+    """Compute the cost sensitivity curves of a sweep: the `ARTICLE_METRICS` of every run at every cost level, the repriced returns of all the runs and levels are scored in one batch.
+
+    Args:
+    ----
+        ledgers (Mapping[str, CostLedger]): The ledgers of the runs e.g. `ResultStore.load_ledgers`, on the dates of the benchmark.
+        benchmark_returns (pd.Series): The returns of the benchmark.
+        transaction_cost (CostLevels, optional): The transaction cost, or a vector of levels. Defaults to TRANSACTION_COST.
+        slippage_effect (CostLevels, optional): The slippage effect, or a vector of levels. Defaults to SLIPPAGE_EFFECT.
+        cost_model (CostModel, optional): The cost model (see `CostLedger.rebalance_costs`). Defaults to CostModel.PER_REBALANCE.
+        asset_costs (Optional[pd.Series], optional): An additional cost per unit of traded notional of each asset. Defaults to None.
+        periods_per_year (int, optional): The number of bars per year used to annualize. Defaults to PERIODS_PER_YEAR.
+
+    Returns:
+    ----
+        pd.DataFrame: The metrics ((run, transaction_cost, slippage_effect) x ARTICLE_METRICS).
+    """
+    repriced = {}
+    for run, ledger in ledgers.items():
+        net_returns = ledger.reprice_costs(
+            np.atleast_1d(transaction_cost),
+            np.atleast_1d(slippage_effect),
+            cost_model,
+            asset_costs,
+        )
+        assert net_returns.index.equals(
+            benchmark_returns.index
+        ), f"The returns of the run {run} are not on the dates of the benchmark"
+        repriced[run] = net_returns
+    net_returns = pd.concat(repriced, axis=1, names=["run"])
+    metrics = batched_article_metrics(
+        net_returns.to_numpy().T,
+        np.broadcast_to(
+            benchmark_returns.to_numpy(dtype=np.float64), net_returns.shape[::-1]
+        ),
+        periods_per_year,
+    )
+    metrics.index = net_returns.columns
+    return metrics
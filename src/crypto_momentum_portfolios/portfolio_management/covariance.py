@@ -0,0 +1,417 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Tuple
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from crypto_momentum_portfolios.utility.types import CovarianceEstimator
+
+
+@dataclass
+class AllocationDiagnostics:
+    """The numerical health of the covariance based allocation of each rebalance of a backtest.
+
+    Attributes:
+    ----
+        condition_number (npt.NDArray[np.float64]): The condition number of the estimated covariance, NaN when the covariance is not finite and inf when it is singular.
+        shrinkage (npt.NDArray[np.float64]): The shrinkage intensity of the Ledoit-Wolf and OAS estimators, 0 for the other estimators.
+        converged (npt.NDArray[np.bool_]): Whether the optimizer converged, always True for the closed form allocators. The weights of a failed optimization are replaced by the inverse variance weights.
+        iterations (npt.NDArray[np.int64]): The iterations of the optimizer, 0 for the closed form allocators.
+    """
+
+    condition_number: npt.NDArray[np.float64]
+    shrinkage: npt.NDArray[np.float64]
+    converged: npt.NDArray[np.bool_]
+    iterations: npt.NDArray[np.int64]
+
+    @classmethod
+    def empty(cls, n_rebalances: int) -> "AllocationDiagnostics":
+        """Build the diagnostics of allocations without covariance: NaN conditions, no shrinkage and converged.
+
+        Args:
+        ----
+            n_rebalances (int): The number of rebalances.
+
+        Returns:
+        ----
+            AllocationDiagnostics: The diagnostics, filled in place by the covariance allocators.
+        """
+        return cls(
+            condition_number=np.full(n_rebalances, np.nan),
+            shrinkage=np.zeros(n_rebalances),
+            converged=np.ones(n_rebalances, dtype=bool),
+            iterations=np.zeros(n_rebalances, dtype=np.int64),
+        )
+
+    @classmethod
+    def concatenate(cls, diagnostics: List["AllocationDiagnostics"]) -> "AllocationDiagnostics":
+        """Join the diagnostics of successive allocations e.g. the rebalances allocated one at a time.
+
+        Args:
+        ----
+            diagnostics (List[AllocationDiagnostics]): The diagnostics, in the order of the rebalances.
+
+        Returns:
+        ----
+            AllocationDiagnostics: The diagnostics of all the rebalances.
+        """
+        return cls(
+            condition_number=np.concatenate([d.condition_number for d in diagnostics]),
+            shrinkage=np.concatenate([d.shrinkage for d in diagnostics]),
+            converged=np.concatenate([d.converged for d in diagnostics]),
+            iterations=np.concatenate([d.iterations for d in diagnostics]),
+        )
+
+    def to_dataframe(self, rebalance_dates: pd.Index) -> pd.DataFrame:
+        """Get the diagnostics as a DataFrame.
+
+        Args:
+        ----
+            rebalance_dates (pd.Index): The dates of the rebalances.
+
+        Returns:
+        ----
+            pd.DataFrame: The diagnostics (rebalance dates x `condition_number`, `shrinkage`, `converged`, `iterations`).
+        """
+        return pd.DataFrame(
+            {
+                "condition_number": self.condition_number,
+                "shrinkage": self.shrinkage,
+                "converged": self.converged,
+                "iterations": self.iterations,
+            },
+            index=rebalance_dates,
+        )
+
+
+class MomentsCache:
+    """
+    MomentsCache shares the covariances estimated on one returns panel across the allocators and the rebalances, e.g. the runs of a backtester comparing the covariance based allocators or frequencies with the same estimation windows. A covariance is keyed by its estimator, its window (first and last panel rows) and the set of its assets, whatever their order, and only the missing ones of a batch are estimated.
+
+    The cache does not know the panel: it must only be used with the panel it was filled with. The oldest covariances are dropped beyond `max_entries`.
+
+    Private Attributes:
+    ----
+        __entries (Dict[Hashable, Tuple[npt.NDArray[np.float64], float]]): The covariances (assets in ascending panel position) and shrinkage intensities.
+        __max_entries (int): The maximum number of covariances kept.
+        __lock (threading.Lock): Guards the entries, the backtests of a thread pool share the cache.
+        __hits (int): The number of covariances read from the cache.
+        __misses (int): The number of covariances estimated.
+    """
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        """Constructor method.
+
+        Args:
+            max_entries (int, optional): The maximum number of covariances kept. Defaults to 10_000.
+        """
+        assert max_entries > 0, "The maximum number of entries must be positive"
+        self.__entries: Dict[Hashable, Tuple[npt.NDArray[np.float64], float]] = {}
+        self.__max_entries = max_entries
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def estimate(
+        self,
+        selection: npt.NDArray[np.intp],
+        panel: npt.NDArray[np.float64],
+        rebalance_positions: npt.NDArray[np.intp],
+        window_starts: npt.NDArray[np.intp],
+        estimator: CovarianceEstimator = CovarianceEstimator.SAMPLE,
+        ewma_decay: float = 0.94,
+    ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """Get the covariances of the rebalances from the cache, the missing ones are estimated at once by `BatchedCovariance.estimate` and stored.
+
+        Args:
+        ----
+            selection (npt.NDArray[np.intp]): The `(n_rebalances, k)` positions of the selected assets in the panel columns.
+            panel (npt.NDArray[np.float64]): The `(date, asset)` returns of the whole universe, always the same for a cache.
+            rebalance_positions (npt.NDArray[np.intp]): The `(n_rebalances,)` positions of the rebalance dates in the panel rows.
+            window_starts (npt.NDArray[np.intp]): The `(n_rebalances,)` first row of the estimation window of each rebalance.
+            estimator (CovarianceEstimator, optional): The covariance estimator. Defaults to CovarianceEstimator.SAMPLE.
+            ewma_decay (float, optional): The daily decay of the EWMA weights. Defaults to 0.94.
+
+        Returns:
+        ----
+            Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]: The `(n_rebalances, k, k)` covariances and the `(n_rebalances,)` shrinkage intensities, as `BatchedCovariance.estimate`.
+        """
+        # The decay only identifies the EWMA covariances
+        decay = ewma_decay if estimator == CovarianceEstimator.EWMA else None
+        ordered = np.sort(selection, axis=1)
+        keys = [
+            (estimator, decay, int(start), int(end), assets.tobytes())
+            for start, end, assets in zip(window_starts, rebalance_positions, ordered)
+        ]
+        covariances = np.empty((selection.shape[0], selection.shape[1], selection.shape[1]))
+        shrinkage = np.zeros(selection.shape[0])
+        missing = []
+        with self.__lock:
+            for i, key in enumerate(keys):
+                entry = self.__entries.get(key)
+                if entry is None:
+                    missing.append(i)
+                    continue
+                # The stored covariance is in ascending asset positions, back to the selection order
+                order = np.searchsorted(ordered[i], selection[i])
+                covariances[i] = entry[0][np.ix_(order, order)]
+                shrinkage[i] = entry[1]
+            self.__hits += len(keys) - len(missing)
+            self.__misses += len(missing)
+        if not missing:
+            return covariances, shrinkage
+
+        missing = np.array(missing)
+        estimated, estimated_shrinkage = BatchedCovariance.estimate(
+            ordered[missing],
+            panel,
+            rebalance_positions[missing],
+            window_starts[missing],
+            estimator,
+            ewma_decay,
+        )
+        with self.__lock:
+            for i, covariance, intensity in zip(missing, estimated, estimated_shrinkage):
+                self.__entries[keys[i]] = (covariance, float(intensity))
+                order = np.searchsorted(ordered[i], selection[i])
+                covariances[i] = covariance[np.ix_(order, order)]
+                shrinkage[i] = intensity
+            # The oldest entries are dropped first, the dict keeps the insertion order
+            for key in list(self.__entries)[: max(len(self.__entries) - self.__max_entries, 0)]:
+                del self.__entries[key]
+        return covariances, shrinkage
+
+
+class BatchedCovariance:
+    """
+    BatchedCovariance estimates the covariances of the selected assets of all the rebalances of a backtest at once. The estimation windows are gathered into a single `(n_rebalances, date, k)` array padded to the longest window, every estimator is then a few batched matrix products instead of one call per rebalance:
+    - sample: the unbiased sample covariance, pairwise complete as `DataFrame.cov`: each pair is estimated on the dates where both returns are available,
+    - Ledoit-Wolf: the sample covariance shrunk toward a scaled identity with the optimal intensity of Ledoit & Wolf (2004),
+    - OAS: the oracle approximating shrinkage of Chen et al. (2010), better than Ledoit-Wolf for the short windows,
+    - EWMA: the exponentially weighted covariance (RiskMetrics), the last dates of the window weigh the most,
+    - factor model: a one factor model on the equally weighted return of the whole universe, `var(m) b b' + diag(residual variances)`, always positive definite when the residual variances are positive.
+
+    For the other estimators the rows and columns of an asset with a missing return in the window are NaN, the allocators then only allocate the complete assets (see `allocate_complete_assets`). The covariance is NaN when the window holds less than 2 dates.
+    """
+
+    @staticmethod
+    def estimate(
+        selection: npt.NDArray[np.intp],
+        panel: npt.NDArray[np.float64],
+        rebalance_positions: npt.NDArray[np.intp],
+        window_starts: npt.NDArray[np.intp],
+        estimator: CovarianceEstimator = CovarianceEstimator.SAMPLE,
+        ewma_decay: float = 0.94,
+    ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """Estimate the covariances of all the rebalances.
+
+        Args:
+        ----
+            selection (npt.NDArray[np.intp]): The `(n_rebalances, k)` positions of the selected assets in the panel columns.
+            panel (npt.NDArray[np.float64]): The `(date, asset)` returns of the whole universe.
+            rebalance_positions (npt.NDArray[np.intp]): The `(n_rebalances,)` positions of the rebalance dates in the panel rows.
+            window_starts (npt.NDArray[np.intp]): The `(n_rebalances,)` first row of the estimation window of each rebalance, the window ends at the rebalance date (included).
+            estimator (CovarianceEstimator, optional): The covariance estimator. Defaults to CovarianceEstimator.SAMPLE.
+            ewma_decay (float, optional): The daily decay of the EWMA weights. Defaults to 0.94.
+
+        Returns:
+        ----
+            Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]: The `(n_rebalances, k, k)` covariances and the `(n_rebalances,)` shrinkage intensities (0 for the estimators without shrinkage).
+        """
+        assert (
+            estimator in CovarianceEstimator.list_values()
+        ), f"estimator must be one of {CovarianceEstimator.list_values()}"
+        assert 0 < ewma_decay < 1, "The EWMA decay must be in ]0, 1["
+        rows, valid = BatchedCovariance.__window_rows(rebalance_positions, window_starts)
+        windows = panel[rows[:, :, None], selection[:, None, :]]
+        available = valid[:, :, None] & ~np.isnan(windows)
+        missing = (valid[:, :, None] & ~available).any(axis=1)
+        windows = np.where(available, windows, 0.0)
+        n_dates = valid.sum(axis=1)
+        shrinkage = np.zeros(selection.shape[0])
+
+        if estimator == CovarianceEstimator.SAMPLE and missing.any():
+            covariances = BatchedCovariance.__pairwise_sample(windows, available)
+        elif estimator == CovarianceEstimator.EWMA:
+            # The weight of a date decays with its distance to the rebalance date
+            weights = np.where(
+                valid,
+                ewma_decay ** (rebalance_positions[:, None] - rows).astype(np.float64),
+                0.0,
+            )
+            weights /= weights.sum(axis=1, keepdims=True)
+            centered = np.where(
+                valid[:, :, None],
+                windows - np.einsum("rl,rlk->rk", weights, windows)[:, None, :],
+                0.0,
+            )
+            with np.errstate(invalid="ignore", divide="ignore"):
+                covariances = np.matmul(
+                    (weights[:, :, None] * centered).transpose(0, 2, 1), centered
+                ) / (1 - (weights**2).sum(axis=1))[:, None, None]
+        elif estimator == CovarianceEstimator.FACTOR_MODEL:
+            market = BatchedCovariance.__market_returns(panel)[rows]
+            market = np.where(valid, market, 0.0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                market_centered = np.where(
+                    valid, market - market.sum(axis=1, keepdims=True) / n_dates[:, None], 0.0
+                )
+                centered = BatchedCovariance.__centered(windows, valid, n_dates)
+                market_variance = (market_centered**2).sum(axis=1) / (n_dates - 1)
+                betas = (
+                    np.einsum("rl,rlk->rk", market_centered, centered)
+                    / (n_dates - 1)[:, None]
+                    / market_variance[:, None]
+                )
+                variances = (centered**2).sum(axis=1) / (n_dates - 1)[:, None]
+            residual_variances = np.clip(
+                variances - betas**2 * market_variance[:, None], 0.0, None
+            )
+            covariances = market_variance[:, None, None] * (
+                betas[:, :, None] * betas[:, None, :]
+            )
+            diagonal = np.arange(selection.shape[1])
+            covariances[:, diagonal, diagonal] += residual_variances
+        else:
+            centered = BatchedCovariance.__centered(windows, valid, n_dates)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                covariances = np.matmul(centered.transpose(0, 2, 1), centered) / (
+                    n_dates - 1
+                )[:, None, None]
+            if estimator in (
+                CovarianceEstimator.LEDOIT_WOLF,
+                CovarianceEstimator.ORACLE_APPROXIMATING_SHRINKAGE,
+            ):
+                covariances, shrinkage = BatchedCovariance.__shrink(
+                    covariances, centered, n_dates, estimator
+                )
+
+        covariances[n_dates < 2] = np.nan
+        if estimator != CovarianceEstimator.SAMPLE:
+            covariances = np.where(
+                missing[:, :, None] | missing[:, None, :], np.nan, covariances
+            )
+        return covariances, shrinkage
+
+    @staticmethod
+    def condition_numbers(
+        covariances: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """Compute the condition number (largest over smallest eigenvalue) of a batch of covariances.
+
+        Args:
+        ----
+            covariances (npt.NDArray[np.float64]): The `(n, k, k)` covariances.
+
+        Returns:
+        ----
+            npt.NDArray[np.float64]: The `(n,)` condition numbers, NaN for the non finite covariances and inf for the singular ones.
+        """
+        finite = np.isfinite(covariances).all(axis=(1, 2))
+        condition = np.full(covariances.shape[0], np.nan)
+        if finite.any():
+            eigenvalues = np.linalg.eigvalsh(covariances[finite])
+            largest, smallest = eigenvalues[:, -1], eigenvalues[:, 0]
+            # The eigenvalues below the rounding noise of the largest one are zeros
+            singular = smallest <= np.finfo(np.float64).eps * covariances.shape[1] * np.abs(largest)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                condition[finite] = np.where(singular, np.inf, largest / smallest)
+        return condition
+
+    @staticmethod
+    def __window_rows(
+        rebalance_positions: npt.NDArray[np.intp], window_starts: npt.NDArray[np.intp]
+    ) -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.bool_]]:
+        """The `(n_rebalances, longest window)` panel rows of the windows and the mask of the rows inside them, the padding rows point to the rebalance date."""
+        lengths = rebalance_positions + 1 - window_starts
+        rows = window_starts[:, None] + np.arange(max(int(lengths.max(initial=0)), 1))
+        valid = rows <= rebalance_positions[:, None]
+        return np.where(valid, rows, rebalance_positions[:, None]), valid
+
+    @staticmethod
+    def __centered(
+        windows: npt.NDArray[np.float64],
+        valid: npt.NDArray[np.bool_],
+        n_dates: npt.NDArray[np.int64],
+    ) -> npt.NDArray[np.float64]:
+        """Center the windows on their mean, the padding rows stay at 0."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = windows.sum(axis=1) / n_dates[:, None]
+        return np.where(valid[:, :, None], windows - mean[:, None, :], 0.0)
+
+    @staticmethod
+    def __pairwise_sample(
+        windows: npt.NDArray[np.float64], available: npt.NDArray[np.bool_]
+    ) -> npt.NDArray[np.float64]:
+        """The pairwise complete sample covariances: each pair on the dates where both returns are available (the windows hold 0 elsewhere), NaN when they share less than 2 dates."""
+        covariances = np.empty((windows.shape[0], windows.shape[2], windows.shape[2]))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Center each asset on its available mean first to limit the cancellation, the covariance is shift invariant
+            counts = available.sum(axis=1)
+            centered = np.where(
+                available, windows - (windows.sum(axis=1) / counts)[:, None, :], 0.0
+            )
+            mask = available.astype(np.float64)
+            n_pairs = np.matmul(mask.transpose(0, 2, 1), mask)
+            sums = np.matmul(centered.transpose(0, 2, 1), mask)
+            covariances[:] = (
+                np.matmul(centered.transpose(0, 2, 1), centered)
+                - sums * sums.transpose(0, 2, 1) / n_pairs
+            ) / (n_pairs - 1)
+        covariances[n_pairs < 2] = np.nan
+        return covariances
+
+    @staticmethod
+    def __market_returns(panel: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """The equally weighted return of the available assets of each date."""
+        available = ~np.isnan(panel)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(available, panel, 0.0).sum(axis=1) / available.sum(axis=1)
+
+    @staticmethod
+    def __shrink(
+        covariances: npt.NDArray[np.float64],
+        centered: npt.NDArray[np.float64],
+        n_dates: npt.NDArray[np.int64],
+        estimator: CovarianceEstimator,
+    ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """Shrink the maximum likelihood covariances toward `mu I` (`mu` the average variance) with the Ledoit-Wolf or OAS intensity, as scikit-learn."""
+        n_assets = covariances.shape[1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            empirical = covariances * ((n_dates - 1) / n_dates)[:, None, None]
+            trace = np.trace(empirical, axis1=1, axis2=2)
+            mu = trace / n_assets
+            squared_norm = (empirical**2).sum(axis=(1, 2))
+            if estimator == CovarianceEstimator.LEDOIT_WOLF:
+                # The sum of the squared entries of X2' X2 is the sum over the dates of the squared norms of the rows
+                row_norms = (centered**2).sum(axis=2)
+                beta = ((row_norms**2).sum(axis=1) / n_dates - squared_norm) / (
+                    n_assets * n_dates
+                )
+                delta = (squared_norm - 2 * mu * trace + n_assets * mu**2) / n_assets
+                shrinkage = np.where(delta > 0, np.minimum(beta, delta) / delta, 0.0)
+            else:
+                alpha = squared_norm / n_assets**2
+                denominator = (n_dates + 1) * (alpha - mu**2 / n_assets)
+                shrinkage = np.where(
+                    denominator != 0,
+                    np.minimum((alpha + mu**2) / denominator, 1.0),
+                    1.0,
+                )
+        shrinkage = np.clip(np.nan_to_num(shrinkage), 0.0, 1.0)
+        shrunk = (1 - shrinkage)[:, None, None] * empirical
+        diagonal = np.arange(n_assets)
+        shrunk[:, diagonal, diagonal] += (shrinkage * mu)[:, None]
+        return shrunk, shrinkage
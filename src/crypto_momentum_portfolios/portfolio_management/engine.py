@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+import numpy as np
+import numpy.typing as npt
+
+
+@dataclass
+class HoldingsPass:
+    """The output of `run_holdings_pass`, all the daily arrays are aligned with the dates of the asset returns.
+
+    Attributes:
+    ----
+        gross_returns (npt.NDArray[np.float64]): The returns of the book before costs.
+        long_contribution (npt.NDArray[np.float64]): The return contribution of the long positions.
+        short_contribution (npt.NDArray[np.float64]): The return contribution of the short positions.
+        long_exposure (npt.NDArray[np.float64]): The start of day value of the long positions, as a share of the book value.
+        short_exposure (npt.NDArray[np.float64]): The start of day absolute value of the short positions, as a share of the book value.
+        turnover (npt.NDArray[np.float64]): The `(n_rebalances,)` traded notional of each rebalance, as a share of the book value.
+    """
+
+    gross_returns: npt.NDArray[np.float64]
+    long_contribution: npt.NDArray[np.float64]
+    short_contribution: npt.NDArray[np.float64]
+    long_exposure: npt.NDArray[np.float64]
+    short_exposure: npt.NDArray[np.float64]
+    turnover: npt.NDArray[np.float64]
+
+
+def run_holdings_pass(
+    asset_returns: npt.NDArray[np.float64],
+    rebalance_positions: npt.NDArray[np.intp],
+    selection: npt.NDArray[np.intp],
+    holdings: npt.NDArray[np.float64],
+) -> HoldingsPass:
+    """Drift signed holdings between the rebalances, one vectorized step per holding period.
+
+    At a rebalance date the book holds the target holdings (signed shares of the book value, the rest is cash) and earns the returns of that date, as in `PortfolioBacktester.run_strategy`. Between two rebalances the position `i` is worth `h_i * G_i` where `G_i` is its cumulated gross return since the rebalance, and the book value is `1 + (G - 1) @ h`. For a long only book fully invested this is the `weights_drift` rule.
+
+    Args:
+    ----
+        asset_returns (npt.NDArray[np.float64]): The `(date, asset)` returns, the NaN are treated as 0.
+        rebalance_positions (npt.NDArray[np.intp]): The `(n_rebalances,)` increasing positions of the rebalance dates.
+        selection (npt.NDArray[np.intp]): The `(n_rebalances, n_positions)` held assets of each rebalance.
+        holdings (npt.NDArray[np.float64]): The `(n_rebalances, n_positions)` signed target holdings.
+
+    Returns:
+    ----
+        HoldingsPass: The daily returns, contributions and exposures, and the turnover of each rebalance.
+    """
+    n_dates, n_assets = asset_returns.shape
+    gross_returns = np.zeros(n_dates)
+    long_contribution = np.zeros(n_dates)
+    short_contribution = np.zeros(n_dates)
+    long_exposure = np.zeros(n_dates)
+    short_exposure = np.zeros(n_dates)
+    turnover = np.zeros(rebalance_positions.size)
+    drifted = np.zeros(n_assets)  # The holdings before the rebalance trades
+    ends = np.append(rebalance_positions[1:], n_dates)
+    for r, (start, end) in enumerate(zip(rebalance_positions, ends)):
+        assets, target = selection[r], holdings[r]
+        dense_target = np.zeros(n_assets)
+        np.add.at(dense_target, assets, target)
+        turnover[r] = np.abs(dense_target - drifted).sum()
+
+        period_returns = np.nan_to_num(asset_returns[start:end][:, assets])
+        growth = np.cumprod(1 + period_returns, axis=0)
+        # Start of day values of the positions: the targets the rebalance day, then the drifted ones
+        values = np.empty_like(growth)
+        values[0] = target
+        values[1:] = target * growth[:-1]
+        book_value = 1 + (values - target).sum(axis=1)
+        pnl = values * period_returns / book_value[:, None]
+        is_long = target > 0
+        long_contribution[start:end] = pnl[:, is_long].sum(axis=1)
+        short_contribution[start:end] = pnl[:, ~is_long].sum(axis=1)
+        gross_returns[start:end] = pnl.sum(axis=1)
+        long_exposure[start:end] = values[:, is_long].sum(axis=1) / book_value
+        short_exposure[start:end] = -values[:, ~is_long].sum(axis=1) / book_value
+
+        final_values = target * growth[-1]
+        drifted = np.zeros(n_assets)
+        np.add.at(
+            drifted, assets, final_values / (1 + (final_values - target).sum())
+        )
+    return HoldingsPass(
+        gross_returns=gross_returns,
+        long_contribution=long_contribution,
+        short_contribution=short_contribution,
+        long_exposure=long_exposure,
+        short_exposure=short_exposure,
+        turnover=turnover,
+    )
+
+
+def run_batched_holdings_pass(
+    asset_returns: npt.NDArray[np.float64],
+    rebalance_positions: npt.NDArray[np.intp],
+    selection: npt.NDArray[np.intp],
+    holdings: npt.NDArray[np.float64],
+) -> HoldingsPass:
+    """Run `run_holdings_pass` on many paths sharing their rebalance dates (e.g. simulated universes) at once, each holding period is a single step over all the paths.
+
+    Args:
+    ----
+        asset_returns (npt.NDArray[np.float64]): The `(path, date, asset)` returns, the NaN are treated as 0.
+        rebalance_positions (npt.NDArray[np.intp]): The `(n_rebalances,)` increasing positions of the rebalance dates.
+        selection (npt.NDArray[np.intp]): The `(path, n_rebalances, n_positions)` held assets of each rebalance.
+        holdings (npt.NDArray[np.float64]): The `(path, n_rebalances, n_positions)` signed target holdings.
+
+    Returns:
+    ----
+        HoldingsPass: The outputs of `run_holdings_pass` with a leading path axis.
+    """
+    n_paths, n_dates, n_assets = asset_returns.shape
+    gross_returns = np.zeros((n_paths, n_dates))
+    long_contribution = np.zeros((n_paths, n_dates))
+    short_contribution = np.zeros((n_paths, n_dates))
+    long_exposure = np.zeros((n_paths, n_dates))
+    short_exposure = np.zeros((n_paths, n_dates))
+    turnover = np.zeros((n_paths, rebalance_positions.size))
+    drifted = np.zeros((n_paths, n_assets))
+    paths = np.arange(n_paths)[:, None]
+    ends = np.append(rebalance_positions[1:], n_dates)
+    for r, (start, end) in enumerate(zip(rebalance_positions, ends)):
+        assets, target = selection[:, r], holdings[:, r]
+        dense_target = np.zeros((n_paths, n_assets))
+        np.add.at(dense_target, (paths, assets), target)
+        turnover[:, r] = np.abs(dense_target - drifted).sum(axis=1)
+
+        period_returns = np.nan_to_num(
+            np.take_along_axis(asset_returns[:, start:end], assets[:, None, :], axis=2)
+        )
+        growth = np.cumprod(1 + period_returns, axis=1)
+        values = np.empty_like(growth)
+        values[:, 0] = target
+        values[:, 1:] = target[:, None] * growth[:, :-1]
+        book_value = 1 + (values - target[:, None]).sum(axis=2)
+        pnl = values * period_returns / book_value[:, :, None]
+        is_long = (target > 0)[:, None]
+        long_contribution[:, start:end] = (pnl * is_long).sum(axis=2)
+        short_contribution[:, start:end] = (pnl * ~is_long).sum(axis=2)
+        gross_returns[:, start:end] = pnl.sum(axis=2)
+        long_exposure[:, start:end] = (values * is_long).sum(axis=2) / book_value
+        short_exposure[:, start:end] = -(values * ~is_long).sum(axis=2) / book_value
+
+        final_values = target * growth[:, -1]
+        drifted = np.zeros((n_paths, n_assets))
+        np.add.at(
+            drifted,
+            (paths, assets),
+            final_values / (1 + (final_values - target).sum(axis=1, keepdims=True)),
+        )
+    return HoldingsPass(
+        gross_returns=gross_returns,
+        long_contribution=long_contribution,
+        short_contribution=short_contribution,
+        long_exposure=long_exposure,
+        short_exposure=short_exposure,
+        turnover=turnover,
+    )
@@ -0,0 +1,259 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from crypto_momentum_portfolios.portfolio_management.indicators import Indicators
+from crypto_momentum_portfolios.portfolio_management.kernels import rolling_std
+from crypto_momentum_portfolios.utility.types import Fields, GetCryptoKwargs
+
+
+@dataclass(frozen=True)
+class IndicatorState:
+    """An indicator computed on a price panel and the state needed to extend it with new bars without going through the history again.
+
+    Attributes:
+    ----
+        field (Fields): The indicator.
+        lookback (int): The effective lookback of the indicator.
+        index (pd.Index): The dates of the computed rows.
+        columns (pd.Index): The assets.
+        buffer (npt.NDArray): The `(capacity, asset)` storage of the indicator, the first `len(index)` rows are computed, the next ones are free for the updates.
+        tail (npt.NDArray[np.float64]): The last `lookback - 1` prices, NaN padded at the start of the history, i.e. the part of the windows of the next bars already known.
+        numerator (Optional[npt.NDArray[np.float64]]): The decayed sum of the prices of the EWM, None for the rolling indicators.
+        denominator (Optional[npt.NDArray[np.float64]]): The decayed sum of the weights of the EWM, None for the rolling indicators.
+    """
+
+    field: Fields
+    lookback: int
+    index: pd.Index
+    columns: pd.Index
+    buffer: npt.NDArray
+    tail: npt.NDArray[np.float64]
+    numerator: Optional[npt.NDArray[np.float64]] = None
+    denominator: Optional[npt.NDArray[np.float64]] = None
+
+    @property
+    def values(self) -> npt.NDArray:
+        return self.buffer[: self.index.size]
+
+    def frame(self) -> pd.DataFrame:
+        """Wrap the computed rows as a DataFrame (dates x assets) without copying them.
+
+        Returns:
+        ----
+            pd.DataFrame: The indicator.
+        """
+        return pd.DataFrame(
+            self.values, index=self.index, columns=self.columns, copy=False
+        )
+
+    def extends(self, crypto_data: pd.DataFrame) -> bool:
+        """Check that a price panel only appends dates to the one of the state, so that the state can be updated with it.
+
+        Args:
+        ----
+            crypto_data (pd.DataFrame): The new prices (dates x assets).
+
+        Returns:
+        ----
+            bool: Whether the panel has the same assets and starts with the dates of the state.
+        """
+        return (
+            crypto_data.columns.equals(self.columns)
+            and crypto_data.index.size >= self.index.size
+            and crypto_data.index[: self.index.size].equals(self.index)
+        )
+
+
+class IncrementalIndicators:
+    """
+    Incremental computation of the indicators whose last value only depends on a bounded window of prices or on the previous EWM state: momentum, volatility and ema_momentum. The full history is computed once by `initialize`, then `update` only computes the appended bars in O(lookback x assets) per bar, the result matches the full recomputation.
+    """
+
+    @staticmethod
+    def lookback(field: Fields, **kwargs: GetCryptoKwargs) -> int:
+        """Resolve the lookback used by `Indicators` for a field from the `get_crypto` keyword arguments.
+
+        Args:
+        ----
+            field (Fields): The indicator.
+
+            **kwargs: The optional arguments of the indicators functions, `lookback` included.
+
+        Returns:
+        ----
+            int: The effective lookback.
+        """
+        lookback = kwargs.get("lookback", 24)
+        if field == Fields.MOMENTUM:
+            return kwargs.get("momentum_lookback", lookback)
+        if field == Fields.VOLATILITY:
+            return kwargs.get("volatility_lookback", lookback)
+        # `Indicators.ema_momentum` forwards its kwargs to `long_ema`, which gives the priority to `long_ema_lookback`
+        return kwargs.get(
+            "long_ema_lookback", kwargs.get("ema_momentum_lookback", lookback)
+        )
+
+    @staticmethod
+    def supports(field: Fields, **kwargs: GetCryptoKwargs) -> bool:
+        """Check whether an indicator can be updated incrementally.
+
+        Args:
+        ----
+            field (Fields): The indicator.
+
+        Returns:
+        ----
+            bool: Whether the field is one of `INCREMENTAL_FIELDS` with a usable lookback.
+        """
+        if field not in INCREMENTAL_FIELDS:
+            return False
+        minimum = 2 if field == Fields.VOLATILITY else 1
+        return IncrementalIndicators.lookback(field, **kwargs) >= minimum
+
+    @staticmethod
+    def initialize(
+        crypto_data: pd.DataFrame, field: Fields, **kwargs: GetCryptoKwargs
+    ) -> IndicatorState:
+        """Compute an indicator on the whole history, as `Indicators`, and keep the state of its last bar.
+
+        Args:
+        ----
+            crypto_data (pd.DataFrame): The prices (dates x assets).
+            field (Fields): The indicator, one of `INCREMENTAL_FIELDS`.
+
+            **kwargs: The optional arguments of the indicators functions.
+
+        Returns:
+        ----
+            IndicatorState: The indicator and its state.
+        """
+        assert IncrementalIndicators.supports(
+            field, **kwargs
+        ), f"The field {field} can not be updated incrementally with these lookbacks"
+        lookback = IncrementalIndicators.lookback(field, **kwargs)
+        values = getattr(Indicators, str(field))(crypto_data, **kwargs).to_numpy()
+        prices = crypto_data.to_numpy(dtype=np.float64)
+
+        numerator, denominator = None, None
+        if field == Fields.EMA_MOMENTUM:
+            decay = lookback / (1.0 + lookback)
+            valid = ~np.isnan(prices)
+            weights = decay ** np.arange(prices.shape[0] - 1.0, -1.0, -1.0)
+            numerator = weights @ np.where(valid, prices, 0.0)
+            denominator = weights @ valid
+            tail = prices[:0]
+        else:
+            tail = IncrementalIndicators.__tail(prices, lookback)
+        return IndicatorState(
+            field,
+            lookback,
+            crypto_data.index,
+            crypto_data.columns,
+            np.ascontiguousarray(values),
+            tail,
+            numerator,
+            denominator,
+        )
+
+    @staticmethod
+    def update(state: IndicatorState, crypto_data: pd.DataFrame) -> IndicatorState:
+        """Extend an indicator with the bars appended to its price panel, only the new rows are computed. The rows are written in the free capacity of the buffer of `state`, so a state must be updated only once.
+
+        Args:
+        ----
+            state (IndicatorState): The state of the indicator on the previous panel.
+            crypto_data (pd.DataFrame): The new prices (dates x assets), the previous panel followed by the new bars (see `IndicatorState.extends`).
+
+        Returns:
+        ----
+            IndicatorState: The state of the indicator on the new panel, it shares the computed rows of `state`.
+        """
+        assert state.extends(
+            crypto_data
+        ), "The prices must only append dates to the panel of the state"
+        n_new = crypto_data.index.size - state.index.size
+        if n_new == 0:
+            return state
+        new_prices = crypto_data.iloc[state.index.size :].to_numpy(dtype=np.float64)
+
+        numerator, denominator = state.numerator, state.denominator
+        if state.field == Fields.EMA_MOMENTUM:
+            decay = state.lookback / (1.0 + state.lookback)
+            numerator, denominator = numerator.copy(), denominator.copy()
+            new_values = np.empty_like(new_prices)
+            for t, prices in enumerate(new_prices):
+                valid = ~np.isnan(prices)
+                numerator *= decay
+                numerator += np.where(valid, prices, 0.0)
+                denominator *= decay
+                denominator += valid
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    new_values[t] = prices / (numerator / denominator)
+            tail = state.tail
+        else:
+            # The windows of the new bars: the known tail followed by the new prices
+            window_prices = np.concatenate([state.tail, new_prices])
+            if state.field == Fields.VOLATILITY:
+                new_values = rolling_std(window_prices, state.lookback)[
+                    state.lookback - 1 :
+                ]
+            else:
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    new_values = (
+                        window_prices[state.lookback - 1 :] / window_prices[:n_new] - 1
+                    )
+                # Only the windows without missing values are defined (pandas rolling default `min_periods`)
+                counts = np.concatenate(
+                    [
+                        np.zeros((1, new_prices.shape[1]), dtype=np.int64),
+                        np.cumsum(~np.isnan(window_prices), axis=0),
+                    ]
+                )
+                incomplete = (
+                    counts[state.lookback :] - counts[:-state.lookback]
+                ) < state.lookback
+                new_values[incomplete] = np.nan
+            tail = IncrementalIndicators.__tail(window_prices, state.lookback)
+
+        buffer = IncrementalIndicators.__reserve(state, n_new)
+        buffer[state.index.size : crypto_data.index.size] = new_values
+        return IndicatorState(
+            state.field,
+            state.lookback,
+            crypto_data.index,
+            state.columns,
+            buffer,
+            tail,
+            numerator,
+            denominator,
+        )
+
+    @staticmethod
+    def __tail(prices: npt.NDArray[np.float64], lookback: int) -> npt.NDArray[np.float64]:
+        """The last `lookback - 1` rows of the prices, NaN padded when the history is shorter."""
+        n_rows = lookback - 1
+        tail = np.full((n_rows, prices.shape[1]), np.nan)
+        if n_rows > 0:
+            known = prices[-n_rows:]
+            tail[n_rows - known.shape[0] :] = known
+        return tail
+
+    @staticmethod
+    def __reserve(state: IndicatorState, n_new: int) -> npt.NDArray:
+        """Get a buffer with room for the new rows, the capacity doubles when it is full so that the appends are amortized O(new rows)."""
+        size = state.index.size + n_new
+        if size <= state.buffer.shape[0]:
+            return state.buffer
+        buffer = np.empty(
+            (max(size, 2 * state.buffer.shape[0]), state.buffer.shape[1]),
+            dtype=state.buffer.dtype,
+        )
+        buffer[: state.index.size] = state.values
+        return buffer
+
+
+INCREMENTAL_FIELDS = [Fields.MOMENTUM, Fields.EMA_MOMENTUM, Fields.VOLATILITY]
@@ -1,35 +1,136 @@
 from __future__ import annotations
-from typing import Any, Callable, Optional, Self, Union
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
 import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
+from crypto_momentum_portfolios.portfolio_management.kernels import (
+    KernelWorkspace,
+    as_panel,
+    ewm_mean,
+    rolling_mean,
+    rolling_std,
+)
+from crypto_momentum_portfolios.utility.types import Fields, IndicatorBackend
 
-class Indicators:
-    _instance: Optional[Self] = None
 
+@dataclass(frozen=True)
+class LookbackPanel:
+    """A 3-D indicator panel holding one field computed for several lookbacks at once.
+
+    Attributes:
+    ----
+        field (Fields): The indicator stored in the panel.
+        lookbacks (npt.NDArray[np.int64]): The lookbacks, first axis of `values`.
+        index (pd.Index): The dates, second axis of `values`.
+        columns (pd.Index): The assets, third axis of `values`.
+        values (npt.NDArray[np.float64]): The `(lookback, date, asset)` array.
+    """
+
+    field: Fields
+    lookbacks: npt.NDArray[np.int64]
+    index: pd.Index
+    columns: pd.Index
+    values: npt.NDArray[np.float64]
+
+    def position(self, lookback: int) -> int:
+        """Get the position of a lookback on the first axis of the panel.
+
+        Args:
+        ----
+            lookback (int): The wanted lookback.
+
+        Raises:
+        ----
+            KeyError: The lookback is not part of the panel.
+
+        Returns:
+        ----
+            int: The position of the lookback.
+        """
+        positions = np.flatnonzero(self.lookbacks == lookback)
+        if positions.size == 0:
+            raise KeyError(f"Lookback {lookback} is not part of the {self.field} panel")
+        return int(positions[0])
+
+    def frame(self, lookback: int) -> pd.DataFrame:
+        """Wrap a single lookback slice as a DataFrame (dates x assets) without copying it.
+
+        Args:
+        ----
+            lookback (int): The wanted lookback.
+
+        Returns:
+        ----
+            pd.DataFrame: The indicator for the given lookback.
+        """
+        return pd.DataFrame(
+            self.values[self.position(lookback)],
+            index=self.index,
+            columns=self.columns,
+            copy=False,
+        )
+
+    def aligned_values(
+        self, lookback: int, index: pd.Index, columns: pd.Index
+    ) -> npt.NDArray[np.float64]:
+        """Get a lookback slice aligned on another dates index and assets columns (e.g. a dropna'ed universe).
+
+        Args:
+        ----
+            lookback (int): The wanted lookback.
+            index (pd.Index): The target dates.
+            columns (pd.Index): The target assets.
+
+        Returns:
+        ----
+            npt.NDArray[np.float64]: The `(date, asset)` array, NaN where the panel has no value.
+        """
+        rows = self.index.get_indexer(index)
+        cols = self.columns.get_indexer(columns)
+        aligned = self.values[self.position(lookback)][np.ix_(rows, cols)]
+        aligned[rows < 0, :] = np.nan
+        aligned[:, cols < 0] = np.nan
+        return aligned
+
+
+class Indicators:
     @staticmethod
     def long_ema(
         crypto_data: Union[pd.Series, pd.DataFrame], lookback: int = 24, **kwargs
     ) -> Union[pd.Series, pd.DataFrame]:
-        return crypto_data.ewm(kwargs.get("long_ema_lookback", lookback)).mean()
+        lookback = kwargs.get("long_ema_lookback", lookback)
+        if kwargs.get("indicator_backend") == IndicatorBackend.NUMPY:
+            return Indicators.__apply_kernel(ewm_mean, crypto_data, lookback, **kwargs)
+        return crypto_data.ewm(lookback).mean()
 
     @staticmethod
     def short_ema(
         crypto_data: Union[pd.Series, pd.DataFrame], lookback: int = 24, **kwargs
     ) -> Union[pd.Series, pd.DataFrame]:
-        return crypto_data.ewm(kwargs.get("short_ema_lookback", lookback)).mean()
+        lookback = kwargs.get("short_ema_lookback", lookback)
+        if kwargs.get("indicator_backend") == IndicatorBackend.NUMPY:
+            return Indicators.__apply_kernel(ewm_mean, crypto_data, lookback, **kwargs)
+        return crypto_data.ewm(lookback).mean()
 
     @staticmethod
     def short_ma(
         crypto_data: Union[pd.Series, pd.DataFrame], lookback: int = 24, **kwargs
     ) -> Union[pd.Series, pd.DataFrame]:
-        return crypto_data.rolling(kwargs.get("short_ma_lookback", lookback)).mean()
+        lookback = kwargs.get("short_ma_lookback", lookback)
+        if kwargs.get("indicator_backend") == IndicatorBackend.NUMPY:
+            return Indicators.__apply_kernel(rolling_mean, crypto_data, lookback, **kwargs)
+        return crypto_data.rolling(lookback).mean()
 
     @staticmethod
     def long_ma(
         crypto_data: Union[pd.Series, pd.DataFrame], lookback: int = 24, **kwargs
     ) -> Union[pd.Series, pd.DataFrame]:
-        return crypto_data.rolling(kwargs.get("long_ma_lookback", lookback)).mean()
+        lookback = kwargs.get("long_ma_lookback", lookback)
+        if kwargs.get("indicator_backend") == IndicatorBackend.NUMPY:
+            return Indicators.__apply_kernel(rolling_mean, crypto_data, lookback, **kwargs)
+        return crypto_data.rolling(lookback).mean()
 
     @staticmethod
     def returns(
@@ -42,7 +143,7 @@ class Indicators:
         crypto_data: Union[pd.Series, pd.DataFrame], lookback: int = 24, **kwargs
     ) -> Union[pd.Series, pd.DataFrame]:
         return crypto_data.rolling(kwargs.get("momentum_lookback", lookback)).apply(
-            lambda x: (x[-1] / x[0]) - 1
+            lambda x: (x[-1] / x[0]) - 1, raw=True
         )
 
     @staticmethod
@@ -78,7 +179,10 @@ class Indicators:
     def volatility(
         crypto_data: Union[pd.Series, pd.DataFrame], lookback: int = 24, **kwargs
     ) -> Union[pd.Series, pd.DataFrame]:
-        return crypto_data.rolling(kwargs.get("volatility_lookback", lookback)).std()
+        lookback = kwargs.get("volatility_lookback", lookback)
+        if kwargs.get("indicator_backend") == IndicatorBackend.NUMPY:
+            return Indicators.__apply_kernel(rolling_std, crypto_data, lookback, **kwargs)
+        return crypto_data.rolling(lookback).std()
 
     # @staticmethod
     # def ex_ante_volatility(
@@ -97,7 +201,205 @@ class Indicators:
     ) -> Union[pd.Series, pd.DataFrame]:
         return crypto_data.pct_change() ** 2  # .fillna(0)
 
-    def __new__(cls) -> Self:
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    @staticmethod
+    def momentum_sweep(
+        crypto_data: pd.DataFrame, lookbacks: Iterable[int]
+    ) -> LookbackPanel:
+        """Compute the momentum for all the lookbacks at once from the log prices, the result matches `Indicators.momentum` for each lookback.
+
+        Args:
+        ----
+            crypto_data (pd.DataFrame): The prices (dates x assets).
+            lookbacks (Iterable[int]): The lookbacks to compute.
+
+        Returns:
+        ----
+            LookbackPanel: The `(lookback, date, asset)` momentum panel.
+        """
+        prices, lookbacks_np = Indicators.__prepare_sweep(crypto_data, lookbacks)
+        log_prices = np.log(prices)
+        valid_windows = Indicators.__valid_windows(~np.isnan(prices), lookbacks_np)
+        values = np.full((lookbacks_np.size, *prices.shape), np.nan)
+        for i, lookback in enumerate(lookbacks_np):
+            if lookback > prices.shape[0]:
+                continue
+            # A window of `lookback` rows spans `lookback - 1` log returns
+            values[i, lookback - 1 :] = np.expm1(
+                log_prices[lookback - 1 :] - log_prices[: prices.shape[0] - lookback + 1]
+            )
+        values[~valid_windows] = np.nan
+        return LookbackPanel(
+            Fields.MOMENTUM, lookbacks_np, crypto_data.index, crypto_data.columns, values
+        )
+
+    @staticmethod
+    def volatility_sweep(
+        crypto_data: pd.DataFrame, lookbacks: Iterable[int]
+    ) -> LookbackPanel:
+        """Compute the rolling standard deviation for all the lookbacks at once with the blocked prefix sums of `rolling_std` and a shared workspace, the result matches `Indicators.volatility` for each lookback.
+
+        Args:
+        ----
+            crypto_data (pd.DataFrame): The prices (dates x assets).
+            lookbacks (Iterable[int]): The lookbacks to compute.
+
+        Returns:
+        ----
+            LookbackPanel: The `(lookback, date, asset)` volatility panel.
+        """
+        prices, lookbacks_np = Indicators.__prepare_sweep(crypto_data, lookbacks)
+        workspace = KernelWorkspace()
+        values = np.full((lookbacks_np.size, *prices.shape), np.nan)
+        for i, lookback in enumerate(lookbacks_np):
+            if lookback < 2:
+                continue  # The sample standard deviation needs 2 observations
+            rolling_std(prices, lookback, out=values[i], workspace=workspace)
+        return LookbackPanel(
+            Fields.VOLATILITY,
+            lookbacks_np,
+            crypto_data.index,
+            crypto_data.columns,
+            values,
+        )
+
+    @staticmethod
+    def ema_momentum_sweep(
+        crypto_data: pd.DataFrame, lookbacks: Iterable[int]
+    ) -> LookbackPanel:
+        """Compute the EMA momentum for all the lookbacks in a single pass over the dates, the result matches `Indicators.ema_momentum` for each lookback.
+
+        Args:
+        ----
+            crypto_data (pd.DataFrame): The prices (dates x assets).
+            lookbacks (Iterable[int]): The lookbacks (EWM center of mass) to compute.
+
+        Returns:
+        ----
+            LookbackPanel: The `(lookback, date, asset)` EMA momentum panel.
+        """
+        prices, lookbacks_np = Indicators.__prepare_sweep(crypto_data, lookbacks)
+        decay = (lookbacks_np / (1.0 + lookbacks_np))[:, None]
+        valid = ~np.isnan(prices)
+        filled_prices = np.where(valid, prices, 0.0)
+        numerator = np.zeros((lookbacks_np.size, prices.shape[1]))
+        denominator = np.zeros_like(numerator)
+        values = np.empty((lookbacks_np.size, *prices.shape))
+        # Adjusted EWM (pandas default): the weights keep decaying on missing values
+        for t in range(prices.shape[0]):
+            numerator *= decay
+            numerator += filled_prices[t]
+            denominator *= decay
+            denominator += valid[t]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                np.divide(numerator, denominator, out=values[:, t])
+        values = prices[None, :, :] / values
+        return LookbackPanel(
+            Fields.EMA_MOMENTUM,
+            lookbacks_np,
+            crypto_data.index,
+            crypto_data.columns,
+            values,
+        )
+
+    @staticmethod
+    def lookback_sweep(
+        crypto_data: pd.DataFrame,
+        lookbacks: Iterable[int],
+        fields: List[Fields] = [Fields.MOMENTUM, Fields.EMA_MOMENTUM, Fields.VOLATILITY],
+    ) -> Dict[Fields, LookbackPanel]:
+        """Batch API computing several indicators for a whole array of lookbacks, e.g. `np.arange(10, 100, 10)`, without building one MultiIndex DataFrame per lookback.
+
+        Args:
+        ----
+            crypto_data (pd.DataFrame): The prices (dates x assets).
+            lookbacks (Iterable[int]): The lookbacks to compute.
+            fields (List[Fields], optional): The indicators to compute among momentum, ema_momentum, volatility and volatility_neutralized_momentum. Defaults to [Fields.MOMENTUM, Fields.EMA_MOMENTUM, Fields.VOLATILITY].
+
+        Raises:
+        ----
+            ValueError: A field has no batch implementation.
+
+        Returns:
+        ----
+            Dict[Fields, LookbackPanel]: The panels indexed by field.
+        """
+        unsupported = set(fields).difference(SWEEP_FIELDS)
+        if unsupported:
+            raise ValueError(
+                f"Invalid field name {','.join(unsupported)}, please use one of the following : {','.join(SWEEP_FIELDS)}"
+            )
+        panels: Dict[Fields, LookbackPanel] = {}
+        if Fields.MOMENTUM in fields or Fields.VOLATILITY_NEUTRALIZED_MOMENTUM in fields:
+            panels[Fields.MOMENTUM] = Indicators.momentum_sweep(crypto_data, lookbacks)
+        if Fields.VOLATILITY in fields or Fields.VOLATILITY_NEUTRALIZED_MOMENTUM in fields:
+            panels[Fields.VOLATILITY] = Indicators.volatility_sweep(
+                crypto_data, lookbacks
+            )
+        if Fields.EMA_MOMENTUM in fields:
+            panels[Fields.EMA_MOMENTUM] = Indicators.ema_momentum_sweep(
+                crypto_data, lookbacks
+            )
+        if Fields.VOLATILITY_NEUTRALIZED_MOMENTUM in fields:
+            momentum, volatility = panels[Fields.MOMENTUM], panels[Fields.VOLATILITY]
+            panels[Fields.VOLATILITY_NEUTRALIZED_MOMENTUM] = LookbackPanel(
+                Fields.VOLATILITY_NEUTRALIZED_MOMENTUM,
+                momentum.lookbacks,
+                momentum.index,
+                momentum.columns,
+                momentum.values / volatility.values,
+            )
+        return {field: panels[field] for field in fields}
+
+    @staticmethod
+    def __apply_kernel(
+        kernel: Callable[..., npt.NDArray],
+        crypto_data: Union[pd.Series, pd.DataFrame],
+        lookback: int,
+        **kwargs,
+    ) -> Union[pd.Series, pd.DataFrame]:
+        """Run a numpy kernel on a contiguous copy of the panel stored with the `indicator_dtype` (float64 by default) and wrap the result without copying it. The kernel writes into an output preallocated here and uses the scratch buffers of the `kernel_workspace` of the panel, a new workspace if none is given."""
+        panel = as_panel(crypto_data, kwargs.get("indicator_dtype", np.float64))
+        values = kernel(
+            panel,
+            lookback,
+            out=np.empty_like(panel),
+            workspace=kwargs.get("kernel_workspace"),
+        )
+        if isinstance(crypto_data, pd.Series):
+            return pd.Series(values[:, 0], index=crypto_data.index, name=crypto_data.name)
+        return pd.DataFrame(
+            values, index=crypto_data.index, columns=crypto_data.columns, copy=False
+        )
+
+    @staticmethod
+    def __prepare_sweep(
+        crypto_data: pd.DataFrame, lookbacks: Iterable[int]
+    ) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.int64]]:
+        lookbacks_np = np.asarray(list(lookbacks), dtype=np.int64)
+        assert lookbacks_np.ndim == 1 and np.all(
+            lookbacks_np >= 1
+        ), "The lookbacks must be a 1-D array of positive integers"
+        return crypto_data.to_numpy(dtype=np.float64), lookbacks_np
+
+    @staticmethod
+    def __valid_windows(
+        valid: npt.NDArray[np.bool_], lookbacks: npt.NDArray[np.int64]
+    ) -> npt.NDArray[np.bool_]:
+        """Flag the windows without missing values (pandas rolling default `min_periods`) using a prefix count."""
+        counts = np.concatenate(
+            [np.zeros((1, valid.shape[1]), dtype=np.int64), np.cumsum(valid, axis=0)]
+        )
+        valid_windows = np.zeros((lookbacks.size, *valid.shape), dtype=bool)
+        for i, lookback in enumerate(lookbacks):
+            valid_windows[i, lookback - 1 :] = (
+                counts[lookback:] - counts[:-lookback]
+            ) == lookback
+        return valid_windows
+
+
+SWEEP_FIELDS: List[Fields] = [
+    Fields.MOMENTUM,
+    Fields.EMA_MOMENTUM,
+    Fields.VOLATILITY,
+    Fields.VOLATILITY_NEUTRALIZED_MOMENTUM,
+]
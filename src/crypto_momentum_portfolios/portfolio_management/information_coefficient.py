@@ -0,0 +1,344 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional, Tuple, Union
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from scipy.stats import rankdata
+
+from crypto_momentum_portfolios.portfolio_management.indicators import LookbackPanel
+from crypto_momentum_portfolios.utility.types import (
+    CorrelationMethod,
+    Fields,
+    InformationCoefficientMode,
+)
+
+Signal = Union[pd.DataFrame, LookbackPanel]
+
+
+class InformationCoefficient:
+    """Vectorized predictive correlation (information coefficient) engine.
+
+    The signal is any field of the universe (e.g. `universe[Fields.MOMENTUM]`) or a `LookbackPanel`, it is compared with the average forward returns over `t+1 ... t+horizon` for a whole grid of horizons:
+    - `InformationCoefficientMode.TIME_SERIES` correlates the signal and the forward returns of each asset through time (the `ReturnPrediction` study of the market timing notebook).
+    - `InformationCoefficientMode.CROSS_SECTIONAL` correlates them across the assets at each date.
+    """
+
+    @staticmethod
+    def average_past_returns(
+        returns: pd.DataFrame, lookbacks: Iterable[int]
+    ) -> LookbackPanel:
+        """Compute the average returns over `t-lookback+1 ... t` for all the lookbacks with a prefix sum.
+
+        Args:
+        ----
+            returns (pd.DataFrame): The assets returns (dates x assets).
+            lookbacks (Iterable[int]): The lookbacks to compute.
+
+        Returns:
+        ----
+            LookbackPanel: The `(lookback, date, asset)` average past returns.
+        """
+        lookbacks_np = np.asarray(list(lookbacks), dtype=np.int64)
+        returns_np, sums, counts = InformationCoefficient.__prefix_sums(returns)
+        values = np.full((lookbacks_np.size, *returns_np.shape), np.nan)
+        n_dates = returns_np.shape[0]
+        for i, lookback in enumerate(lookbacks_np):
+            if lookback > n_dates:
+                continue
+            window_count = counts[lookback:] - counts[: n_dates + 1 - lookback]
+            values[i, lookback - 1 :] = np.where(
+                window_count == lookback,
+                (sums[lookback:] - sums[: n_dates + 1 - lookback]) / lookback,
+                np.nan,
+            )
+        return LookbackPanel(
+            Fields.RETURNS, lookbacks_np, returns.index, returns.columns, values
+        )
+
+    @staticmethod
+    def average_forward_returns(
+        returns: pd.DataFrame, horizons: Iterable[int]
+    ) -> npt.NDArray[np.float64]:
+        """Compute the average returns over `t+1 ... t+horizon` for all the horizons with a prefix sum.
+
+        Args:
+        ----
+            returns (pd.DataFrame): The assets returns (dates x assets).
+            horizons (Iterable[int]): The horizons to compute.
+
+        Returns:
+        ----
+            npt.NDArray[np.float64]: The `(horizon, date, asset)` average forward returns.
+        """
+        horizons_np = np.asarray(list(horizons), dtype=np.int64)
+        returns_np, sums, counts = InformationCoefficient.__prefix_sums(returns)
+        values = np.full((horizons_np.size, *returns_np.shape), np.nan)
+        n_dates = returns_np.shape[0]
+        for i, horizon in enumerate(horizons_np):
+            if horizon >= n_dates:
+                continue
+            window_count = counts[horizon + 1 :] - counts[1 : n_dates + 1 - horizon]
+            values[i, : n_dates - horizon] = np.where(
+                window_count == horizon,
+                (sums[horizon + 1 :] - sums[1 : n_dates + 1 - horizon]) / horizon,
+                np.nan,
+            )
+        return values
+
+    @staticmethod
+    def compute(
+        signal: Signal,
+        returns: pd.DataFrame,
+        horizons: Iterable[int],
+        mode: InformationCoefficientMode = InformationCoefficientMode.TIME_SERIES,
+        method: CorrelationMethod = CorrelationMethod.PEARSON,
+        min_observations: int = 3,
+    ) -> pd.DataFrame:
+        """Compute the information coefficient of a signal against the forward returns for a grid of horizons.
+
+        Args:
+        ----
+            signal (Signal): The signal, a DataFrame (dates x assets) or a `LookbackPanel`.
+            returns (pd.DataFrame): The assets returns (dates x assets), the signal is aligned on it.
+            horizons (Iterable[int]): The forward returns horizons.
+            mode (InformationCoefficientMode, optional): Time series (per asset) or cross sectional (per date) correlation. Defaults to InformationCoefficientMode.TIME_SERIES.
+            method (CorrelationMethod, optional): Pearson or rank (Spearman) correlation. Defaults to CorrelationMethod.PEARSON.
+            min_observations (int, optional): The minimum number of pairs to compute a correlation. Defaults to 3.
+
+        Returns:
+        ----
+            pd.DataFrame: In time series mode, one row per (lookback, horizon) and one column per asset. In cross sectional mode, one row per date and one column per (lookback, horizon). The lookback level is only present for `LookbackPanel` signals.
+        """
+        signal_np, lookbacks = InformationCoefficient.__align_signal(signal, returns)
+        horizons_np = np.asarray(list(horizons), dtype=np.int64)
+        forward_returns = InformationCoefficient.average_forward_returns(
+            returns, horizons_np
+        )
+        axis = 1 if mode == InformationCoefficientMode.TIME_SERIES else 2
+        ic = np.stack(
+            [
+                masked_correlation(
+                    signal_np, forward_returns[i], axis, method, min_observations
+                )
+                for i in range(horizons_np.size)
+            ],
+            axis=1,
+        )  # (lookback, horizon, asset or date)
+
+        keys = pd.MultiIndex.from_product(
+            [lookbacks, horizons_np], names=["lookback", "horizon"]
+        )
+        flat_ic = ic.reshape(-1, ic.shape[-1])
+        if mode == InformationCoefficientMode.TIME_SERIES:
+            result = pd.DataFrame(flat_ic, index=keys, columns=returns.columns)
+        else:
+            result = pd.DataFrame(flat_ic.T, index=returns.index, columns=keys)
+        if isinstance(signal, pd.DataFrame):
+            return result.droplevel(
+                "lookback",
+                axis=0 if mode == InformationCoefficientMode.TIME_SERIES else 1,
+            )
+        return result
+
+    @staticmethod
+    def best_lookback_horizon(ic: pd.DataFrame) -> Tuple[int, int, float]:
+        """Find the (lookback, horizon) couple with the highest mean time series information coefficient across assets.
+
+        Args:
+        ----
+            ic (pd.DataFrame): The time series output of `InformationCoefficient.compute` for a `LookbackPanel` signal.
+
+        Returns:
+        ----
+            Tuple[int, int, float]: The best lookback, horizon and the associated mean information coefficient.
+        """
+        mean_ic = ic.mean(axis=1)
+        lookback, horizon = mean_ic.idxmax()
+        return int(lookback), int(horizon), float(mean_ic.max())
+
+    @staticmethod
+    def bootstrap_subuniverse(
+        signal: Signal,
+        returns: pd.DataFrame,
+        horizon: int,
+        n_draws: int = 1000,
+        universe_fraction: float = 2 / 3,
+        mode: InformationCoefficientMode = InformationCoefficientMode.TIME_SERIES,
+        method: CorrelationMethod = CorrelationMethod.PEARSON,
+        seed: Optional[int] = None,
+        n_jobs: int = 1,
+        draws_per_chunk: int = 500,
+    ) -> pd.DataFrame:
+        """Evaluate the stability of the mean information coefficient on random sub universes (the `ResultStability` study of the market timing notebook). The draws are batched as a `(draw, asset)` selection matrix and evaluated as one matrix computation per chunk of draws.
+
+        Args:
+        ----
+            signal (Signal): The signal, a DataFrame (dates x assets) or a `LookbackPanel`.
+            returns (pd.DataFrame): The assets returns (dates x assets).
+            horizon (int): The forward returns horizon.
+            n_draws (int, optional): The number of random sub universes. Defaults to 1000.
+            universe_fraction (float, optional): The fraction of the universe kept in each draw. Defaults to 2/3.
+            mode (InformationCoefficientMode, optional): Time series (per asset) or cross sectional (per date) correlation. Defaults to InformationCoefficientMode.TIME_SERIES.
+            method (CorrelationMethod, optional): Pearson or rank (Spearman) correlation. Defaults to CorrelationMethod.PEARSON.
+            seed (Optional[int], optional): The random seed. Defaults to None.
+            n_jobs (int, optional): The number of worker processes, the chunks of draws are dispatched on a process pool when greater than 1. Defaults to 1.
+            draws_per_chunk (int, optional): The number of draws evaluated at once, it bounds the memory usage. Defaults to 500.
+
+        Returns:
+        ----
+            pd.DataFrame: The mean information coefficient of each draw (rows) for each lookback (columns).
+        """
+        signal_np, lookbacks = InformationCoefficient.__align_signal(signal, returns)
+        forward_returns = InformationCoefficient.average_forward_returns(
+            returns, [horizon]
+        )[0]
+        n_assets = returns.shape[1]
+        n_selected = max(2, int(universe_fraction * n_assets))
+        assert (
+            n_selected <= n_assets
+        ), "universe_fraction is too small or too large for the universe"
+
+        chunk_sizes = [
+            min(draws_per_chunk, n_draws - start)
+            for start in range(0, n_draws, draws_per_chunk)
+        ]
+        seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+        tasks = [
+            (signal_np, forward_returns, size, n_selected, mode, method, chunk_seed)
+            for size, chunk_seed in zip(chunk_sizes, seeds)
+        ]
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                chunks = list(executor.map(_bootstrap_chunk, tasks))
+        else:
+            chunks = list(map(_bootstrap_chunk, tasks))
+        result = pd.DataFrame(np.concatenate(chunks, axis=0), columns=lookbacks)
+        result.columns.name = "lookback"
+        if isinstance(signal, pd.DataFrame):
+            return result.iloc[:, 0].rename("information_coefficient").to_frame()
+        return result
+
+    @staticmethod
+    def __prefix_sums(
+        returns: pd.DataFrame,
+    ) -> Tuple[
+        npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.int64]
+    ]:
+        returns_np = returns.to_numpy(dtype=np.float64)
+        valid = ~np.isnan(returns_np)
+        zeros = np.zeros((1, returns_np.shape[1]))
+        sums = np.concatenate(
+            [zeros, np.cumsum(np.where(valid, returns_np, 0.0), axis=0)]
+        )
+        counts = np.concatenate([zeros.astype(np.int64), np.cumsum(valid, axis=0)])
+        return returns_np, sums, counts
+
+    @staticmethod
+    def __align_signal(
+        signal: Signal, returns: pd.DataFrame
+    ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.int64]]:
+        """Align the signal on the returns dates and assets as a `(lookback, date, asset)` array."""
+        if isinstance(signal, LookbackPanel):
+            rows = signal.index.get_indexer(returns.index)
+            cols = signal.columns.get_indexer(returns.columns)
+            values = signal.values[:, rows][:, :, cols]
+            values[:, rows < 0] = np.nan
+            values[:, :, cols < 0] = np.nan
+            return values, signal.lookbacks
+        return (
+            signal.reindex(index=returns.index, columns=returns.columns)
+            .to_numpy(dtype=np.float64)[None],
+            np.zeros(1, dtype=np.int64),
+        )
+
+
+def masked_correlation(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    axis: int,
+    method: CorrelationMethod = CorrelationMethod.PEARSON,
+    min_observations: int = 3,
+) -> npt.NDArray[np.float64]:
+    """Pearson or Spearman correlation along an axis of two broadcastable arrays, on the pairs where both values are available (as pandas `corrwith`).
+
+    Args:
+    ----
+        x (npt.NDArray[np.float64]): The first array.
+        y (npt.NDArray[np.float64]): The second array.
+        axis (int): The axis along which the correlation is computed.
+        method (CorrelationMethod, optional): Pearson or rank (Spearman) correlation. Defaults to CorrelationMethod.PEARSON.
+        min_observations (int, optional): The minimum number of pairs to compute a correlation. Defaults to 3.
+
+    Returns:
+    ----
+        npt.NDArray[np.float64]: The correlations, the axis is reduced.
+    """
+    x, y = np.broadcast_arrays(x, y)
+    mask = ~(np.isnan(x) | np.isnan(y))
+    if method == CorrelationMethod.SPEARMAN:
+        x = rankdata(np.where(mask, x, np.nan), axis=axis, nan_policy="omit")
+        y = rankdata(np.where(mask, y, np.nan), axis=axis, nan_policy="omit")
+    n_pairs = mask.sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_centered = np.where(
+            mask,
+            x - np.where(mask, x, 0.0).sum(axis=axis, keepdims=True)
+            / np.expand_dims(n_pairs, axis),
+            0.0,
+        )
+        y_centered = np.where(
+            mask,
+            y - np.where(mask, y, 0.0).sum(axis=axis, keepdims=True)
+            / np.expand_dims(n_pairs, axis),
+            0.0,
+        )
+        correlation = (x_centered * y_centered).sum(axis=axis) / np.sqrt(
+            (x_centered**2).sum(axis=axis) * (y_centered**2).sum(axis=axis)
+        )
+    return np.where(n_pairs >= min_observations, correlation, np.nan)
+
+
+def _bootstrap_chunk(
+    task: Tuple[
+        npt.NDArray[np.float64],
+        npt.NDArray[np.float64],
+        int,
+        int,
+        InformationCoefficientMode,
+        CorrelationMethod,
+        np.random.SeedSequence,
+    ]
+) -> npt.NDArray[np.float64]:
+    """Evaluate a chunk of random sub universes, module level so it can be sent to a process pool.
+
+    Returns:
+    ----
+        npt.NDArray[np.float64]: The `(draw, lookback)` mean information coefficients.
+    """
+    signal_np, forward_returns, n_draws, n_selected, mode, method, seed = task
+    rng = np.random.default_rng(seed)
+    n_assets = forward_returns.shape[1]
+    # Each row holds the assets of one draw (sampling without replacement)
+    selection = np.argsort(rng.random((n_draws, n_assets)), axis=1)[:, :n_selected]
+
+    if mode == InformationCoefficientMode.TIME_SERIES:
+        # The per asset correlations do not depend on the draw: average them with a selection matrix
+        ic = masked_correlation(signal_np, forward_returns[None], 1, method)
+        selection_matrix = np.zeros((n_draws, n_assets))
+        np.put_along_axis(selection_matrix, selection, 1.0, axis=1)
+        available = ~np.isnan(ic)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (selection_matrix @ np.where(available, ic, 0.0).T) / (
+                selection_matrix @ available.T
+            )
+
+    result = np.empty((n_draws, signal_np.shape[0]))
+    selected_returns = forward_returns[:, selection]  # (date, draw, asset)
+    for i in range(signal_np.shape[0]):
+        ic = masked_correlation(signal_np[i][:, selection], selected_returns, 2, method)
+        available = ~np.isnan(ic)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[:, i] = np.where(available, ic, 0.0).sum(axis=0) / available.sum(
+                axis=0
+            )
+    return result
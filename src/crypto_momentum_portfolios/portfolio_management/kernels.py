@@ -0,0 +1,330 @@
+from typing import Optional, Tuple, Union
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+# The maximum block length of the rolling standard deviation (unless 4 windows are longer)
+STD_BLOCK_ROWS = 64
+# The rolling standard deviation of the windows up to this length is computed in two passes over the shifted rows
+STD_DIRECT_WINDOW = 8
+
+
+class KernelWorkspace:
+    """
+    KernelWorkspace holds the float64 scratch buffers of the indicator kernels so that a sweep recomputing the same indicators does not allocate. The kernels process the panel by blocks of contiguous rows of about `block_size` values, so the buffers stay small whatever the length of the history.
+
+    Private Attributes:
+    ----
+        __block_size (int): The number of values processed at once by the kernels.
+        __buffers (Dict[str, npt.NDArray]): The flat buffers, grown on demand and never shrunk.
+    """
+
+    def __init__(self, block_size: int = 1 << 16) -> None:
+        """Constructor method.
+
+        Args:
+            block_size (int, optional): The number of values processed at once by the kernels. Defaults to 2**16.
+        """
+        assert block_size > 0, "The block size must be positive"
+        self.__block_size = block_size
+        self.__buffers = {}
+
+    def block_rows(self, n_columns: int, minimum: int = 1) -> int:
+        """Get the number of rows of a block.
+
+        Args:
+        ----
+            n_columns (int): The number of columns of the panel.
+            minimum (int, optional): The minimum number of rows. Defaults to 1.
+
+        Returns:
+        ----
+            int: The number of rows.
+        """
+        return max(self.__block_size // max(n_columns, 1), minimum, 1)
+
+    def buffer(
+        self, name: str, shape: Tuple[int, ...], dtype: npt.DTypeLike = np.float64
+    ) -> npt.NDArray:
+        """Get a scratch buffer of the given shape, a view on a reused allocation.
+
+        Args:
+        ----
+            name (str): The buffer name, two names never share memory.
+            shape (Tuple[int, ...]): The wanted shape.
+            dtype (npt.DTypeLike, optional): The buffer type. Defaults to np.float64.
+
+        Returns:
+        ----
+            npt.NDArray: The uninitialized buffer.
+        """
+        size = int(np.prod(shape))
+        flat = self.__buffers.get(name)
+        if flat is None or flat.size < size or flat.dtype != dtype:
+            flat = np.empty(size, dtype=dtype)
+            self.__buffers[name] = flat
+        return flat[:size].reshape(shape)
+
+
+def as_panel(
+    crypto_data: Union[pd.Series, pd.DataFrame, npt.NDArray],
+    dtype: npt.DTypeLike = np.float64,
+) -> npt.NDArray:
+    """Get the values of a panel as a C contiguous `(date, asset)` array of the given type, without copying when it already is one.
+
+    Args:
+    ----
+        crypto_data (Union[pd.Series, pd.DataFrame, npt.NDArray]): The panel, a Series is a single asset.
+        dtype (npt.DTypeLike, optional): The storage type, float32 halves the memory of the panel. Defaults to np.float64.
+
+    Returns:
+    ----
+        npt.NDArray: The 2-D array.
+    """
+    values = (
+        crypto_data.to_numpy() if isinstance(crypto_data, (pd.Series, pd.DataFrame)) else crypto_data
+    )
+    values = np.ascontiguousarray(values, dtype=dtype)
+    return values.reshape(-1, 1) if values.ndim == 1 else values
+
+
+def rolling_mean(
+    values: npt.NDArray,
+    window: int,
+    out: Optional[npt.NDArray] = None,
+    workspace: Optional[KernelWorkspace] = None,
+) -> npt.NDArray:
+    """Rolling mean in one pass of prefix sums, it matches `DataFrame.rolling(window).mean()`: NaN until `window` observations and for the windows holding a missing value.
+
+    Args:
+    ----
+        values (npt.NDArray): The `(date, asset)` float32 or float64 panel.
+        window (int): The window length.
+        out (Optional[npt.NDArray], optional): The preallocated output, same shape as `values`. Defaults to None i.e. a new array of the type of `values`.
+        workspace (Optional[KernelWorkspace], optional): The scratch buffers. Defaults to None i.e. a new workspace.
+
+    Returns:
+    ----
+        npt.NDArray: `out`.
+    """
+    return _rolling(values, window, out, workspace, std=False)
+
+
+def rolling_std(
+    values: npt.NDArray,
+    window: int,
+    out: Optional[npt.NDArray] = None,
+    workspace: Optional[KernelWorkspace] = None,
+) -> npt.NDArray:
+    """Rolling sample standard deviation in one pass of prefix sums centered on short blocks of rows, it matches `DataFrame.rolling(window).std()`. The short windows, whose variance can be tiny against the spread of a block, are centered on their own mean instead.
+
+    Args:
+    ----
+        values (npt.NDArray): The `(date, asset)` float32 or float64 panel.
+        window (int): The window length, at least 2.
+        out (Optional[npt.NDArray], optional): The preallocated output, same shape as `values`. Defaults to None i.e. a new array of the type of `values`.
+        workspace (Optional[KernelWorkspace], optional): The scratch buffers. Defaults to None i.e. a new workspace.
+
+    Returns:
+    ----
+        npt.NDArray: `out`.
+    """
+    assert window >= 2, "The sample standard deviation needs a window of 2 at least"
+    if window <= STD_DIRECT_WINDOW:
+        return _direct_std(values, window, out, workspace)
+    return _rolling(values, window, out, workspace, std=True)
+
+
+def ewm_mean(
+    values: npt.NDArray,
+    com: float,
+    out: Optional[npt.NDArray] = None,
+    workspace: Optional[KernelWorkspace] = None,
+) -> npt.NDArray:
+    """Exponentially weighted mean in a single pass over the dates, it matches `DataFrame.ewm(com).mean()` (adjusted weights that keep decaying on the missing values). Inside a block of rows the recursion is solved in closed form with a cumulative sum of the values scaled by the inverse decay powers, the block length keeps these powers below 1e6.
+
+    Args:
+    ----
+        values (npt.NDArray): The `(date, asset)` float32 or float64 panel.
+        com (float): The center of mass, the decay is `com / (1 + com)`.
+        out (Optional[npt.NDArray], optional): The preallocated output, same shape as `values`. Defaults to None i.e. a new array of the type of `values`.
+        workspace (Optional[KernelWorkspace], optional): The scratch buffers. Defaults to None i.e. a new workspace.
+
+    Returns:
+    ----
+        npt.NDArray: `out`.
+    """
+    assert com >= 0, "The center of mass must be non negative"
+    out, workspace = _prepare(values, out, workspace)
+    n_rows, n_columns = values.shape
+    decay = com / (1.0 + com)
+    if decay == 0.0:
+        # No memory: the mean is the last valid value
+        missing = workspace.buffer("ewm_missing", (n_columns,), np.bool_)
+        for t in range(n_rows):
+            np.copyto(out[t], values[t], casting="same_kind")
+            if t > 0:
+                np.isnan(values[t], out=missing)
+                np.copyto(out[t], out[t - 1], where=missing)
+        return out
+
+    n_block_rows = min(
+        workspace.block_rows(n_columns), max(int(np.log(1e6) / -np.log(decay)), 1)
+    )
+    powers = workspace.buffer("ewm_powers", (n_block_rows + 1, 1))
+    np.power(decay, np.arange(n_block_rows + 1.0)[:, None], out=powers)
+    numerator_carry = workspace.buffer("ewm_numerator_carry", (n_columns,))
+    denominator_carry = workspace.buffer("ewm_denominator_carry", (n_columns,))
+    numerator_carry[:] = 0.0
+    denominator_carry[:] = 0.0
+    for start in range(0, n_rows, n_block_rows):
+        end = min(start + n_block_rows, n_rows)
+        n = end - start
+        numerator = workspace.buffer("ewm_numerator", (n, n_columns))
+        denominator = workspace.buffer("ewm_denominator", (n, n_columns))
+        carry = workspace.buffer("ewm_carry", (n, n_columns))
+        missing = workspace.buffer("ewm_missing", (n, n_columns), np.bool_)
+
+        block = values[start:end]
+        np.isnan(block, out=missing)
+        np.copyto(numerator, block)
+        np.copyto(numerator, 0.0, where=missing)
+        np.logical_not(missing, out=missing)
+        np.copyto(denominator, missing)
+        # sum_{s<=t} d^(t-s) x_s = d^t cumsum(x_s / d^s), plus the decayed carry d^(t+1) S_{start-1}
+        for running, previous in (
+            (numerator, numerator_carry),
+            (denominator, denominator_carry),
+        ):
+            np.divide(running, powers[:n], out=running)
+            np.cumsum(running, axis=0, out=running)
+            np.multiply(running, powers[:n], out=running)
+            np.multiply(powers[1 : n + 1], previous, out=carry)
+            running += carry
+            np.copyto(previous, running[-1])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            np.divide(numerator, denominator, out=out[start:end], casting="same_kind")
+    return out
+
+
+def _prepare(
+    values: npt.NDArray,
+    out: Optional[npt.NDArray],
+    workspace: Optional[KernelWorkspace],
+) -> Tuple[npt.NDArray, KernelWorkspace]:
+    assert values.ndim == 2, "The kernels work on (date, asset) arrays, see `as_panel`"
+    if out is None:
+        out = np.empty_like(values, order="C")
+    assert out.shape == values.shape, "The output must have the shape of the values"
+    return out, KernelWorkspace() if workspace is None else workspace
+
+
+def _rolling(
+    values: npt.NDArray,
+    window: int,
+    out: Optional[npt.NDArray],
+    workspace: Optional[KernelWorkspace],
+    std: bool,
+) -> npt.NDArray:
+    assert window >= 1, "The window must be positive"
+    out, workspace = _prepare(values, out, workspace)
+    n_rows, n_columns = values.shape
+    out[: window - 1] = np.nan
+    n_block_rows = workspace.block_rows(n_columns, minimum=4 * window)
+    if std:
+        # The cancellation in `sum(x^2) - sum(x)^2 / n` grows with the spread of the block around its
+        # mean, short blocks keep it negligible against the variance of a short window
+        n_block_rows = min(n_block_rows, max(STD_BLOCK_ROWS, 4 * window))
+    # Each block of output rows reads its `window - 1` previous rows, the prefix sums restart at each block
+    for start in range(window - 1, n_rows, n_block_rows):
+        end = min(start + n_block_rows, n_rows)
+        n_windows = end - start
+        n = n_windows + window - 1
+        block = values[start - window + 1 : end]
+        sums = workspace.buffer("sums", (n + 1, n_columns))
+        counts = workspace.buffer("counts", (n + 1, n_columns), np.int64)
+        missing = workspace.buffer("missing", (n, n_columns), np.bool_)
+        window_sum = workspace.buffer("window_sum", (n_windows, n_columns))
+        window_counts = workspace.buffer(
+            "window_counts", (n_windows, n_columns), np.int64
+        )
+        center = workspace.buffer("center", (n_columns,))
+
+        np.isnan(block, out=missing)
+        sums[0] = 0.0
+        counts[0] = 0
+        np.copyto(sums[1:], block)
+        np.copyto(sums[1:], 0.0, where=missing)
+        np.logical_not(missing, out=missing)
+        np.cumsum(missing, axis=0, out=counts[1:])
+        # Center each asset on its block mean to limit the cancellation in the prefix sums
+        np.sum(sums[1:], axis=0, out=center)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            np.divide(center, counts[-1], out=center)
+        np.subtract(sums[1:], center, out=sums[1:], where=missing)
+
+        result = out[start:end]
+        if std:
+            squared_sums = workspace.buffer("squared_sums", (n + 1, n_columns))
+            window_squared_sum = workspace.buffer(
+                "window_squared_sum", (n_windows, n_columns)
+            )
+            squared_sums[0] = 0.0
+            np.multiply(sums[1:], sums[1:], out=squared_sums[1:])
+            np.cumsum(squared_sums[1:], axis=0, out=squared_sums[1:])
+            np.cumsum(sums[1:], axis=0, out=sums[1:])
+            np.subtract(sums[window:], sums[:-window], out=window_sum)
+            np.subtract(
+                squared_sums[window:], squared_sums[:-window], out=window_squared_sum
+            )
+            # Sample variance: (sum(x^2) - sum(x)^2 / n) / (n - 1)
+            np.multiply(window_sum, window_sum, out=window_sum)
+            window_sum /= window
+            np.subtract(window_squared_sum, window_sum, out=window_squared_sum)
+            window_squared_sum /= window - 1
+            np.clip(window_squared_sum, 0.0, None, out=window_squared_sum)
+            np.sqrt(window_squared_sum, out=result, casting="same_kind")
+        else:
+            np.cumsum(sums[1:], axis=0, out=sums[1:])
+            np.subtract(sums[window:], sums[:-window], out=window_sum)
+            window_sum /= window
+            window_sum += center
+            np.copyto(result, window_sum, casting="same_kind")
+        # The windows holding a missing value are NaN (pandas default `min_periods`)
+        np.subtract(counts[window:], counts[:-window], out=window_counts)
+        incomplete = missing[:n_windows]
+        np.less(window_counts, window, out=incomplete)
+        np.copyto(result, np.nan, where=incomplete)
+    return out
+
+
+def _direct_std(
+    values: npt.NDArray,
+    window: int,
+    out: Optional[npt.NDArray],
+    workspace: Optional[KernelWorkspace],
+) -> npt.NDArray:
+    out, workspace = _prepare(values, out, workspace)
+    n_rows, n_columns = values.shape
+    out[: window - 1] = np.nan
+    n_block_rows = workspace.block_rows(n_columns, minimum=4 * window)
+    for start in range(window - 1, n_rows, n_block_rows):
+        end = min(start + n_block_rows, n_rows)
+        n_windows = end - start
+        block = values[start - window + 1 : end]
+        mean = workspace.buffer("mean", (n_windows, n_columns))
+        deviation = workspace.buffer("deviation", (n_windows, n_columns))
+        squared_sum = workspace.buffer("squared_sum", (n_windows, n_columns))
+        # Two passes over the `window` shifted views, a missing value propagates to its windows
+        np.copyto(mean, block[:n_windows])
+        for offset in range(1, window):
+            mean += block[offset : offset + n_windows]
+        mean /= window
+        squared_sum[:] = 0.0
+        for offset in range(window):
+            np.subtract(block[offset : offset + n_windows], mean, out=deviation)
+            deviation *= deviation
+            squared_sum += deviation
+        squared_sum /= window - 1
+        np.sqrt(squared_sum, out=out[start:end], casting="same_kind")
+    return out
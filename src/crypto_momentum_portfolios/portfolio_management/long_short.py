@@ -0,0 +1,213 @@
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from crypto_momentum_portfolios.portfolio_management.allocation import (
+    ALLOCATION_FIELDS,
+    allocate_valid_selection,
+)
+from crypto_momentum_portfolios.portfolio_management.engine import run_holdings_pass
+from crypto_momentum_portfolios.portfolio_management.selection import (
+    select_tails_for_rows,
+)
+from crypto_momentum_portfolios.utility.constants import (
+    PERIODS_PER_YEAR,
+    SLIPPAGE_EFFECT,
+    TRANSACTION_COST,
+)
+from crypto_momentum_portfolios.utility.membership import MembershipMask
+from crypto_momentum_portfolios.utility.rebalance_calendar import (
+    RebalanceCalendar,
+    RebalanceSchedule,
+)
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    AllocationMode,
+    RankingMethod,
+    RankingMode,
+    RebalanceFrequency,
+)
+from crypto_momentum_portfolios.utility.utils import (
+    EstimationWindow,
+    estimation_window_starts,
+)
+
+
+@dataclass
+class LongShortResult:
+    """The output of `LongShortBacktester.run_long_short`.
+
+    Attributes:
+    ----
+        returns (pd.Series): The net returns of the book.
+        gross_returns (pd.Series): The returns of the book before costs.
+        trading_costs (pd.Series): The transaction costs and slippage charged on the turnover of both legs.
+        carry_costs (pd.Series): The daily borrow cost of the short leg and funding cost of the leveraged long leg.
+        long_contribution (pd.Series): The gross return contribution of the long leg.
+        short_contribution (pd.Series): The gross return contribution of the short leg.
+        exposures (pd.DataFrame): The daily long, short, gross and net exposures (share of the book value).
+        turnover (pd.Series): The traded notional of each rebalance (share of the book value).
+        targets (pd.DataFrame): The signed target holdings of each rebalance (rebalance dates x assets).
+    """
+
+    returns: pd.Series
+    gross_returns: pd.Series
+    trading_costs: pd.Series
+    carry_costs: pd.Series
+    long_contribution: pd.Series
+    short_contribution: pd.Series
+    exposures: pd.DataFrame
+    turnover: pd.Series
+    targets: pd.DataFrame
+
+
+class LongShortBacktester:
+    def __init__(
+        self, universe: pd.DataFrame, membership: Optional[MembershipMask] = None
+    ) -> None:
+        """Constructor method.
+
+        Args:
+            universe (pd.DataFrame): The universe of assets with the ranking and allocation fields (MultiIndex columns field x asset).
+            membership (Optional[MembershipMask], optional): The eligibility of the assets, aligned on the dates of the universe, neither leg holds a not eligible asset. Defaults to None.
+        """
+        if membership is not None:
+            membership = membership.reindex(universe.index)
+        self.__universe = universe
+        self.__membership = membership
+
+    def run_long_short(
+        self,
+        ranking_method: RankingMethod = RankingMethod.EMA_MOMENTUM,
+        ranking_mode: RankingMode = RankingMode.DESCENDING,
+        long_k: int = 5,
+        short_k: int = 5,
+        allocation_method: AllocationMethod = AllocationMethod.EQUAL_WEIGHTED,
+        allocation_mode: AllocationMode = AllocationMode.CLASSIC,
+        estimation_window: Optional[EstimationWindow] = None,
+        rebalance_frequency: RebalanceSchedule = RebalanceFrequency.MONTHLY,
+        gross_exposure: float = 2.0,
+        net_exposure: float = 0.0,
+        borrow_cost: float = 0.0,
+        funding_cost: float = 0.0,
+        transaction_cost: float = TRANSACTION_COST,
+        slippage_effect: float = SLIPPAGE_EFFECT,
+        periods_per_year: int = PERIODS_PER_YEAR,
+    ) -> LongShortResult:
+        """Run a long top-k / short bottom-k portfolio. Both legs are selected with a single argsort per rebalance date, allocated with the same method, and drifted in the same vectorized pass, so their trades are charged together. A rebalance date with less than `long_k + short_k` valid assets shrinks both legs (see `select_tails_for_rows`), a leg without asset holds nothing.
+
+        Args:
+        -----
+            ranking_method (RankingMethod, optional): The field used to rank the securities. Defaults to RankingMethod.EMA_MOMENTUM.
+            ranking_mode (RankingMode, optional): The ranking order, the long leg holds the first ranked assets. Defaults to RankingMode.DESCENDING.
+            long_k (int, optional): The number of assets of the long leg. Defaults to 5.
+            short_k (int, optional): The number of assets of the short leg. Defaults to 5.
+            allocation_method (AllocationMethod, optional): The allocation method of each leg. Defaults to AllocationMethod.EQUAL_WEIGHTED.
+            allocation_mode (AllocationMode, optional): The allocation way classic or inverse. Defaults to AllocationMode.CLASSIC.
+            estimation_window (Optional[EstimationWindow], optional): The returns window of the allocation, a number of rows or a time span (e.g. "90D"). Defaults to None i.e. the dates since the previous rebalance.
+            rebalance_frequency (RebalanceSchedule, optional): The rebalance period, or a `RebalanceCalendar` of custom dates. Defaults to RebalanceFrequency.MONTHLY.
+            gross_exposure (float, optional): The long plus short exposure set at each rebalance i.e. the leverage. Defaults to 2.0.
+            net_exposure (float, optional): The long minus short exposure set at each rebalance, 0 for a market neutral book. Defaults to 0.0.
+            borrow_cost (float, optional): The annual borrow rate accrued daily on the short exposure. Defaults to 0.0.
+            funding_cost (float, optional): The annual funding rate accrued daily on the long exposure above the book value. Defaults to 0.0.
+            transaction_cost (float, optional): The cost charged per unit of traded notional. Defaults to TRANSACTION_COST.
+            slippage_effect (float, optional): The slippage charged per unit of traded notional. Defaults to SLIPPAGE_EFFECT.
+            periods_per_year (int, optional): The number of bars per year used to accrue the carry costs. Defaults to PERIODS_PER_YEAR.
+
+        Returns:
+        -----
+            LongShortResult: The book returns, costs, legs contributions, exposures and targets.
+        """
+        assert gross_exposure > 0, "The gross exposure must be positive"
+        assert abs(net_exposure) <= gross_exposure, "The net exposure must lie in [-gross, gross]"
+        long_exposure = (gross_exposure + net_exposure) / 2
+        short_exposure = (gross_exposure - net_exposure) / 2
+        assert long_k > 0 or long_exposure == 0, "A long exposure needs long_k > 0"
+        assert short_k > 0 or short_exposure == 0, "A short exposure needs short_k > 0"
+
+        dates = self.__universe.index
+        securities = self.__universe["returns"].columns
+        calendar = RebalanceCalendar.resolve(rebalance_frequency, dates)
+        rebalance_positions = calendar.positions
+        window_starts = estimation_window_starts(
+            dates, rebalance_positions, calendar.previous_positions, estimation_window
+        )
+
+        long_selection, long_valid, short_selection, short_valid = select_tails_for_rows(
+            self.__universe[ranking_method][securities].to_numpy(dtype=float)[
+                rebalance_positions
+            ],
+            long_k,
+            short_k,
+            ascending=bool(ranking_mode),
+            eligible=None
+            if self.__membership is None
+            else self.__membership.rows(rebalance_positions, securities),
+        )
+        allocation_panel = self.__universe[ALLOCATION_FIELDS[allocation_method]][
+            securities
+        ].to_numpy(dtype=float)
+        # The invalid slots of a leg short of assets (e.g. before a listing) are held at 0
+        legs_weights = [
+            allocate_valid_selection(
+                allocation_method,
+                leg_selection,
+                leg_valid,
+                allocation_panel,
+                rebalance_positions,
+                window_starts,
+                bool(allocation_mode),
+            )
+            if leg_selection.shape[1] > 0
+            else np.empty(leg_selection.shape)
+            for leg_selection, leg_valid in (
+                (long_selection, long_valid),
+                (short_selection, short_valid),
+            )
+        ]
+        selection = np.hstack((long_selection, short_selection))
+        holdings = np.hstack(
+            (long_exposure * legs_weights[0], -short_exposure * legs_weights[1])
+        )
+
+        book = run_holdings_pass(
+            self.__universe["returns"][securities].to_numpy(dtype=float),
+            rebalance_positions,
+            selection,
+            holdings,
+        )
+        trading_costs = np.zeros(dates.size)
+        trading_costs[rebalance_positions] = (
+            transaction_cost + slippage_effect
+        ) * book.turnover
+        carry_costs = (
+            borrow_cost * book.short_exposure
+            + funding_cost * np.clip(book.long_exposure - 1, 0, None)
+        ) / periods_per_year
+
+        targets = np.zeros((rebalance_positions.size, securities.size))
+        np.put_along_axis(targets, selection, holdings, axis=1)
+        return LongShortResult(
+            returns=pd.Series(
+                book.gross_returns - trading_costs - carry_costs, index=dates
+            ),
+            gross_returns=pd.Series(book.gross_returns, index=dates),
+            trading_costs=pd.Series(trading_costs, index=dates),
+            carry_costs=pd.Series(carry_costs, index=dates),
+            long_contribution=pd.Series(book.long_contribution, index=dates),
+            short_contribution=pd.Series(book.short_contribution, index=dates),
+            exposures=pd.DataFrame(
+                {
+                    "long": book.long_exposure,
+                    "short": book.short_exposure,
+                    "gross": book.long_exposure + book.short_exposure,
+                    "net": book.long_exposure - book.short_exposure,
+                },
+                index=dates,
+            ),
+            turnover=pd.Series(book.turnover, index=dates[rebalance_positions]),
+            targets=pd.DataFrame(
+                targets, index=dates[rebalance_positions], columns=securities
+            ),
+        )
@@ -0,0 +1,260 @@
+from dataclasses import dataclass
+from typing import Hashable, Optional
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from scipy import stats
+
+from crypto_momentum_portfolios.utility.constants import PERIODS_PER_YEAR
+from crypto_momentum_portfolios.utility.types import FalseDiscoveryMethod
+
+SWEEP_STATISTICS = [
+    "Sharpe ratio",
+    "Deflated Sharpe ratio",
+    "p-value",
+    "Adjusted p-value",
+]
+
+
+@dataclass
+class SweepTestResult:
+    """The output of `MultipleTesting.evaluate`.
+
+    Attributes:
+    ----
+        statistics (pd.DataFrame): The `SWEEP_STATISTICS` of each strategy (strategies x statistics): the annualized Sharpe ratio of the tested returns, its deflated version, the bootstrap p-value of a positive mean and the same p-value adjusted for the false discovery rate.
+        reality_check_p_value (float): The p-value of White's Reality Check, the null hypothesis being that no strategy beats the benchmark.
+        spa_p_value (float): The p-value of Hansen's test of Superior Predictive Ability, same null hypothesis as the Reality Check but less sensitive to the poor strategies of the sweep.
+        best_strategy (Hashable): The strategy with the highest mean tested return, the one both tests are about.
+    """
+
+    statistics: pd.DataFrame
+    reality_check_p_value: float
+    spa_p_value: float
+    best_strategy: Hashable
+
+
+class MultipleTesting:
+    """
+    Statistics accounting for the number of strategies tried in a sweep, so that the best configurations are not picked out of the luck of hundreds of trials:
+    - the deflated Sharpe ratio (Bailey & Lopez de Prado) compares each Sharpe ratio with the maximum expected from the number of trials,
+    - White's Reality Check and Hansen's SPA test whether the best strategy beats the benchmark once the data snooping is accounted for,
+    - the false discovery rate adjustment (Benjamini-Hochberg or Benjamini-Yekutieli) of the individual p-values.
+
+    All the strategies are scored at once: the stationary bootstrap draws are a single `(draw, date)` index matrix shared by all of them, turned into a `(draw, date)` count matrix so that the resampled means of every strategy are one matrix product per chunk of draws.
+    """
+
+    @staticmethod
+    def stationary_bootstrap_indices(
+        n_dates: int,
+        n_draws: int,
+        block_size: float,
+        rng: np.random.Generator,
+    ) -> npt.NDArray[np.intp]:
+        """Draw the dates of the stationary bootstrap (Politis & Romano): blocks of consecutive dates (circular) of geometric length with mean `block_size`.
+
+        Args:
+        ----
+            n_dates (int): The number of dates of the sample.
+            n_draws (int): The number of bootstrap samples.
+            block_size (float): The mean length of the blocks.
+            rng (np.random.Generator): The random generator.
+
+        Returns:
+        ----
+            npt.NDArray[np.intp]: The `(draw, date)` positions of the resampled dates.
+        """
+        assert block_size >= 1, "The mean block size must be at least 1"
+        dates = np.arange(n_dates)
+        new_block = rng.random((n_draws, n_dates)) < 1 / block_size
+        new_block[:, 0] = True
+        block_starts = np.where(new_block, rng.integers(0, n_dates, (n_draws, n_dates)), 0)
+        # Each date follows the start of its block, i.e. the last new block before it
+        block_positions = np.maximum.accumulate(np.where(new_block, dates, 0), axis=1)
+        starts = np.take_along_axis(block_starts, block_positions, axis=1)
+        return (starts + dates - block_positions) % n_dates
+
+    @staticmethod
+    def deflated_sharpe_ratio(
+        returns: npt.NDArray[np.float64], n_trials: Optional[int] = None
+    ) -> npt.NDArray[np.float64]:
+        """Compute the deflated Sharpe ratio of each strategy: the probability that its true Sharpe ratio exceeds the maximum Sharpe ratio expected among `n_trials` strategies without skill, given the length, skewness and kurtosis of its returns.
+
+        Args:
+        ----
+            returns (npt.NDArray[np.float64]): The `(date, strategy)` returns.
+            n_trials (Optional[int], optional): The number of independent trials of the sweep, the number of strategies if None. Defaults to None.
+
+        Returns:
+        ----
+            npt.NDArray[np.float64]: The deflated Sharpe ratio (a probability) of each strategy.
+        """
+        n_dates, n_strategies = returns.shape
+        n_trials = n_strategies if n_trials is None else n_trials
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sharpe_ratio = returns.mean(axis=0) / returns.std(axis=0, ddof=1)
+            skewness = stats.skew(returns, axis=0)
+            kurtosis = stats.kurtosis(returns, axis=0, fisher=False)
+            expected_maximum = 0.0
+            if n_trials > 1 and n_strategies > 1:
+                expected_maximum = np.sqrt(np.nanvar(sharpe_ratio, ddof=1)) * (
+                    (1 - np.euler_gamma) * stats.norm.ppf(1 - 1 / n_trials)
+                    + np.euler_gamma * stats.norm.ppf(1 - 1 / (n_trials * np.e))
+                )
+            return stats.norm.cdf(
+                (sharpe_ratio - expected_maximum)
+                * np.sqrt(n_dates - 1)
+                / np.sqrt(
+                    1 - skewness * sharpe_ratio + (kurtosis - 1) / 4 * sharpe_ratio**2
+                )
+            )
+
+    @staticmethod
+    def adjust_p_values(
+        p_values: npt.NDArray[np.float64],
+        method: FalseDiscoveryMethod = FalseDiscoveryMethod.BENJAMINI_HOCHBERG,
+    ) -> npt.NDArray[np.float64]:
+        """Adjust p-values for the false discovery rate, a strategy is a discovery at the rate `q` when its adjusted p-value is below `q`.
+
+        Args:
+        ----
+            p_values (npt.NDArray[np.float64]): The p-values of the strategies.
+            method (FalseDiscoveryMethod, optional): Benjamini-Hochberg (independent or positively dependent tests) or Benjamini-Yekutieli (any dependence). Defaults to FalseDiscoveryMethod.BENJAMINI_HOCHBERG.
+
+        Returns:
+        ----
+            npt.NDArray[np.float64]: The adjusted p-values, in the order of `p_values`.
+        """
+        assert (
+            method in FalseDiscoveryMethod.list_values()
+        ), f"method must be one of {FalseDiscoveryMethod.list_values()}"
+        n_tests = p_values.size
+        order = np.argsort(p_values)
+        ranks = np.arange(1, n_tests + 1)
+        scale = n_tests / ranks
+        if method == FalseDiscoveryMethod.BENJAMINI_YEKUTIELI:
+            scale = scale * (1 / ranks).sum()
+        # The step up procedure: the running minimum from the largest p-value
+        adjusted_sorted = np.minimum.accumulate((p_values[order] * scale)[::-1])[::-1]
+        adjusted = np.empty(n_tests)
+        adjusted[order] = np.minimum(adjusted_sorted, 1.0)
+        return adjusted
+
+    @staticmethod
+    def evaluate(
+        returns: pd.DataFrame,
+        benchmark_returns: Optional[pd.Series] = None,
+        n_draws: int = 1000,
+        block_size: float = 10,
+        method: FalseDiscoveryMethod = FalseDiscoveryMethod.BENJAMINI_HOCHBERG,
+        n_trials: Optional[int] = None,
+        seed: Optional[int] = None,
+        draws_per_chunk: int = 250,
+        periods_per_year: int = PERIODS_PER_YEAR,
+    ) -> SweepTestResult:
+        """Score all the strategies of a sweep, e.g. `ResultStore.load_returns` of the runs of a grid. The tested returns are the returns of the strategies in excess of the benchmark (the raw returns without benchmark), on the dates where all of them are available.
+
+        Args:
+        ----
+            returns (pd.DataFrame): The daily returns (dates x strategies).
+            benchmark_returns (Optional[pd.Series], optional): The daily returns of the benchmark, the strategies are compared with 0 if None. Defaults to None.
+            n_draws (int, optional): The number of stationary bootstrap samples. Defaults to 1000.
+            block_size (float, optional): The mean length of the bootstrap blocks. Defaults to 10.
+            method (FalseDiscoveryMethod, optional): The false discovery rate adjustment. Defaults to FalseDiscoveryMethod.BENJAMINI_HOCHBERG.
+            n_trials (Optional[int], optional): The number of independent trials used by the deflated Sharpe ratio, the number of strategies if None. Defaults to None.
+            seed (Optional[int], optional): The random seed. Defaults to None.
+            draws_per_chunk (int, optional): The number of draws evaluated at once, it bounds the memory usage to `draws_per_chunk x strategies`. Defaults to 250.
+            periods_per_year (int, optional): The number of bars per year used to annualize the Sharpe ratio. Defaults to PERIODS_PER_YEAR.
+
+        Returns:
+        ----
+            SweepTestResult: The per strategy statistics and the p-values of the sweep.
+        """
+        if benchmark_returns is not None:
+            returns = returns.sub(benchmark_returns, axis=0)
+        returns = returns.dropna()
+        differentials = returns.to_numpy(dtype=np.float64)
+        n_dates, n_strategies = differentials.shape
+        assert n_dates > 1, "Not enough common dates to test the strategies"
+        rng = np.random.default_rng(seed)
+
+        mean = differentials.mean(axis=0)
+        scaled_mean = np.sqrt(n_dates) * mean
+        omega = np.sqrt(
+            MultipleTesting.__stationary_bootstrap_variance(differentials, block_size)
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            studentized = np.nan_to_num(scaled_mean / omega, nan=-np.inf)
+            # Hansen's consistent recentering: the clearly poor strategies are not recentered so they cannot drive the null distribution
+            recentering = np.where(
+                studentized >= -np.sqrt(2 * np.log(np.log(n_dates))), mean, 0.0
+            )
+        reality_check_statistic = scaled_mean.max()
+        spa_statistic = max(studentized.max(), 0.0)
+
+        reality_check_exceedances, spa_exceedances = 0, 0
+        individual_exceedances = np.zeros(n_strategies)
+        for start in range(0, n_draws, draws_per_chunk):
+            size = min(draws_per_chunk, n_draws - start)
+            indices = MultipleTesting.stationary_bootstrap_indices(
+                n_dates, size, block_size, rng
+            )
+            counts = np.bincount(
+                (indices + n_dates * np.arange(size)[:, None]).ravel(),
+                minlength=size * n_dates,
+            ).reshape(size, n_dates)
+            bootstrap_mean = counts @ differentials / n_dates
+            centered = np.sqrt(n_dates) * (bootstrap_mean - mean)
+            reality_check_exceedances += (
+                centered.max(axis=1) >= reality_check_statistic
+            ).sum()
+            with np.errstate(invalid="ignore", divide="ignore"):
+                spa_draws = np.nan_to_num(
+                    np.sqrt(n_dates) * (bootstrap_mean - recentering) / omega,
+                    nan=-np.inf,
+                )
+            spa_exceedances += (
+                np.maximum(spa_draws.max(axis=1), 0.0) >= spa_statistic
+            ).sum()
+            individual_exceedances += (centered >= scaled_mean).sum(axis=0)
+
+        # The observed sample counts as a draw, so that no p-value is 0 and the smallest ones survive the adjustment only if `n_draws` is large compared with the number of strategies
+        p_values = (1 + individual_exceedances) / (1 + n_draws)
+        statistics = pd.DataFrame(
+            {
+                "Sharpe ratio": np.sqrt(periods_per_year)
+                * mean
+                / differentials.std(axis=0, ddof=1),
+                "Deflated Sharpe ratio": MultipleTesting.deflated_sharpe_ratio(
+                    differentials, n_trials
+                ),
+                "p-value": p_values,
+                "Adjusted p-value": MultipleTesting.adjust_p_values(p_values, method),
+            },
+            index=returns.columns,
+        )[SWEEP_STATISTICS]
+        return SweepTestResult(
+            statistics=statistics,
+            reality_check_p_value=(1 + reality_check_exceedances) / (1 + n_draws),
+            spa_p_value=(1 + spa_exceedances) / (1 + n_draws),
+            best_strategy=returns.columns[int(np.argmax(mean))],
+        )
+
+    @staticmethod
+    def __stationary_bootstrap_variance(
+        differentials: npt.NDArray[np.float64], block_size: float
+    ) -> npt.NDArray[np.float64]:
+        """The variance of `sqrt(n) x mean` under the stationary bootstrap (the kernel estimator of Hansen's SPA), the autocovariances of all the strategies are computed with one FFT."""
+        n_dates = differentials.shape[0]
+        centered = differentials - differentials.mean(axis=0)
+        spectrum = np.fft.rfft(centered, n=2 * n_dates, axis=0)
+        autocovariances = (
+            np.fft.irfft(np.abs(spectrum) ** 2, n=2 * n_dates, axis=0)[:n_dates]
+            / n_dates
+        )
+        lags = np.arange(1, n_dates)
+        decay = 1 - 1 / block_size
+        kernel = (n_dates - lags) / n_dates * decay**lags + lags / n_dates * decay ** (
+            n_dates - lags
+        )
+        return autocovariances[0] + 2 * kernel @ autocovariances[1:]
@@ -0,0 +1,235 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from crypto_momentum_portfolios.portfolio_management.weights import WeightsHistory
+from crypto_momentum_portfolios.utility.constants import (
+    PERIODS_PER_YEAR,
+    SLIPPAGE_EFFECT,
+    TRANSACTION_COST,
+)
+from crypto_momentum_portfolios.utility.types import VolatilityForecast
+
+
+@dataclass
+class VolatilityTargetResult:
+    """The output of `VolatilityTargeting.apply`.
+
+    Attributes:
+    ----
+        returns (pd.Series): The net returns of the scaled strategy.
+        gross_returns (pd.Series): The returns of the scaled strategy before the overlay costs.
+        costs (pd.Series): The trading costs of the leverage changes and the funding cost of the leverage above 1.
+        leverage (pd.Series): The daily exposure multiplier applied to the strategy.
+        forecast_volatility (pd.Series): The annualized volatility forecast, only built from the returns of the previous days.
+        weights (Optional[pd.DataFrame]): The scaled daily weights (dates x assets), None when no weights were given.
+    """
+
+    returns: pd.Series
+    gross_returns: pd.Series
+    costs: pd.Series
+    leverage: pd.Series
+    forecast_volatility: pd.Series
+    weights: Optional[pd.DataFrame] = None
+
+
+class VolatilityTargeting:
+    """
+    Portfolio level volatility targeting, applied as a post-process on the output of a backtest: the selection and the allocation are never rerun, the daily exposure is the ratio of the target volatility to a forecast of the realized volatility of the strategy.
+    """
+
+    @staticmethod
+    def forecast_volatility(
+        strategy_returns: pd.Series,
+        method: VolatilityForecast = VolatilityForecast.EWMA,
+        lookback: int = 30,
+        periods_per_year: int = PERIODS_PER_YEAR,
+    ) -> pd.Series:
+        """Forecast the annualized volatility of the strategy. The forecast of a date only uses the returns of the previous dates so it can size the exposure of that date.
+
+        Args:
+        ----
+            strategy_returns (pd.Series): The daily returns of the strategy.
+            method (VolatilityForecast, optional): EWMA of the squared returns or rolling standard deviation. Defaults to VolatilityForecast.EWMA.
+            lookback (int, optional): The span of the EWMA or the window of the rolling estimator, also the warm-up length. Defaults to 30.
+            periods_per_year (int, optional): The number of bars per year used to annualize. Defaults to PERIODS_PER_YEAR.
+
+        Returns:
+        ----
+            pd.Series: The annualized volatility forecast, NaN during the warm-up.
+        """
+        assert lookback > 1, "The lookback must be greater than 1"
+        assert (
+            method in VolatilityForecast.list_values()
+        ), f"The method must be one of {VolatilityForecast.list_values()}"
+        if method == VolatilityForecast.EWMA:
+            variance = (
+                strategy_returns.pow(2).ewm(span=lookback, min_periods=lookback).mean()
+            )
+            volatility = np.sqrt(variance)
+        else:
+            volatility = strategy_returns.rolling(lookback).std()
+        return volatility.shift(1) * np.sqrt(periods_per_year)
+
+    @staticmethod
+    def leverage(
+        forecast_volatility: npt.NDArray[np.float64],
+        target_volatilities: npt.NDArray[np.float64],
+        min_leverage: float = 0.0,
+        max_leverage: float = 2.0,
+    ) -> npt.NDArray[np.float64]:
+        """Compute the exposure multipliers of several volatility targets in one broadcast.
+
+        Args:
+        ----
+            forecast_volatility (npt.NDArray[np.float64]): The `(date,)` annualized volatility forecast.
+            target_volatilities (npt.NDArray[np.float64]): The `(target,)` annualized volatility targets.
+            min_leverage (float, optional): The lower cap of the leverage. Defaults to 0.0.
+            max_leverage (float, optional): The upper cap of the leverage. Defaults to 2.0.
+
+        Returns:
+        ----
+            npt.NDArray[np.float64]: The `(date, target)` leverage, 1 while the forecast is not available.
+        """
+        assert 0 <= min_leverage <= max_leverage, "The leverage caps must satisfy 0 <= min <= max"
+        with np.errstate(divide="ignore", invalid="ignore"):
+            leverage = target_volatilities[None, :] / forecast_volatility[:, None]
+        leverage = np.clip(leverage, min_leverage, max_leverage)
+        leverage[np.isnan(forecast_volatility)] = 1.0
+        return leverage
+
+    @staticmethod
+    def apply(
+        strategy_returns: pd.Series,
+        target_volatility: float = 0.4,
+        method: VolatilityForecast = VolatilityForecast.EWMA,
+        lookback: int = 30,
+        min_leverage: float = 0.0,
+        max_leverage: float = 2.0,
+        weights: Optional[Union[pd.DataFrame, WeightsHistory]] = None,
+        transaction_cost: float = TRANSACTION_COST,
+        slippage_effect: float = SLIPPAGE_EFFECT,
+        funding_cost: float = 0.0,
+        periods_per_year: int = PERIODS_PER_YEAR,
+    ) -> VolatilityTargetResult:
+        """Scale a strategy to a target volatility.
+
+        Args:
+        ----
+            strategy_returns (pd.Series): The daily returns of the strategy e.g. the `returns` of the `StrategyResult` of `PortfolioBacktester.run_strategy`.
+            target_volatility (float, optional): The annualized volatility target. Defaults to 0.4.
+            method (VolatilityForecast, optional): The volatility forecast method. Defaults to VolatilityForecast.EWMA.
+            lookback (int, optional): The span or window of the volatility forecast. Defaults to 30.
+            min_leverage (float, optional): The lower cap of the leverage. Defaults to 0.0.
+            max_leverage (float, optional): The upper cap of the leverage. Defaults to 2.0.
+            weights (Optional[Union[pd.DataFrame, WeightsHistory]], optional): The daily weights of the strategy to scale, as a DataFrame or the `weights_history` of a `StrategyResult`. Defaults to None.
+            transaction_cost (float, optional): The cost charged per unit of leverage change. Defaults to TRANSACTION_COST.
+            slippage_effect (float, optional): The slippage charged per unit of leverage change. Defaults to SLIPPAGE_EFFECT.
+            funding_cost (float, optional): The annual funding rate accrued daily on the leverage above 1. Defaults to 0.0.
+            periods_per_year (int, optional): The number of bars per year. Defaults to PERIODS_PER_YEAR.
+
+        Returns:
+        ----
+            VolatilityTargetResult: The scaled returns, costs, leverage, forecast and weights.
+        """
+        forecast = VolatilityTargeting.forecast_volatility(
+            strategy_returns, method, lookback, periods_per_year
+        )
+        leverage, gross_returns, costs = VolatilityTargeting.__scale(
+            strategy_returns.to_numpy(dtype=float),
+            forecast.to_numpy(dtype=float),
+            np.array([target_volatility], dtype=float),
+            min_leverage,
+            max_leverage,
+            transaction_cost + slippage_effect,
+            funding_cost / periods_per_year,
+        )
+        index = strategy_returns.index
+        scaled_weights = None
+        if weights is not None:
+            if isinstance(weights, WeightsHistory):
+                weights = weights.to_dataframe()
+            scaled_weights = weights.mul(
+                pd.Series(leverage[:, 0], index=index), axis=0
+            )
+        return VolatilityTargetResult(
+            returns=pd.Series(gross_returns[:, 0] - costs[:, 0], index=index),
+            gross_returns=pd.Series(gross_returns[:, 0], index=index),
+            costs=pd.Series(costs[:, 0], index=index),
+            leverage=pd.Series(leverage[:, 0], index=index),
+            forecast_volatility=forecast,
+            weights=scaled_weights,
+        )
+
+    @staticmethod
+    def sweep(
+        strategy_returns: pd.Series,
+        target_volatilities: Sequence[float],
+        method: VolatilityForecast = VolatilityForecast.EWMA,
+        lookback: int = 30,
+        min_leverage: float = 0.0,
+        max_leverage: float = 2.0,
+        transaction_cost: float = TRANSACTION_COST,
+        slippage_effect: float = SLIPPAGE_EFFECT,
+        funding_cost: float = 0.0,
+        periods_per_year: int = PERIODS_PER_YEAR,
+    ) -> pd.DataFrame:
+        """Scale a strategy to many volatility targets at once. The forecast is computed once, the leverage and the costs of all the targets are a single `(date, target)` broadcast.
+
+        Args:
+        ----
+            strategy_returns (pd.Series): The daily returns of the strategy.
+            target_volatilities (Sequence[float]): The annualized volatility targets.
+            method (VolatilityForecast, optional): The volatility forecast method. Defaults to VolatilityForecast.EWMA.
+            lookback (int, optional): The span or window of the volatility forecast. Defaults to 30.
+            min_leverage (float, optional): The lower cap of the leverage. Defaults to 0.0.
+            max_leverage (float, optional): The upper cap of the leverage. Defaults to 2.0.
+            transaction_cost (float, optional): The cost charged per unit of leverage change. Defaults to TRANSACTION_COST.
+            slippage_effect (float, optional): The slippage charged per unit of leverage change. Defaults to SLIPPAGE_EFFECT.
+            funding_cost (float, optional): The annual funding rate accrued daily on the leverage above 1. Defaults to 0.0.
+            periods_per_year (int, optional): The number of bars per year. Defaults to PERIODS_PER_YEAR.
+
+        Returns:
+        ----
+            pd.DataFrame: The net returns of each target (dates x targets).
+        """
+        targets = np.asarray(target_volatilities, dtype=float)
+        assert targets.ndim == 1 and targets.size > 0, "Give at least one target"
+        forecast = VolatilityTargeting.forecast_volatility(
+            strategy_returns, method, lookback, periods_per_year
+        )
+        _, gross_returns, costs = VolatilityTargeting.__scale(
+            strategy_returns.to_numpy(dtype=float),
+            forecast.to_numpy(dtype=float),
+            targets,
+            min_leverage,
+            max_leverage,
+            transaction_cost + slippage_effect,
+            funding_cost / periods_per_year,
+        )
+        return pd.DataFrame(
+            gross_returns - costs, index=strategy_returns.index, columns=targets
+        )
+
+    @staticmethod
+    def __scale(
+        returns: npt.NDArray[np.float64],
+        forecast: npt.NDArray[np.float64],
+        targets: npt.NDArray[np.float64],
+        min_leverage: float,
+        max_leverage: float,
+        trading_cost: float,
+        daily_funding_cost: float,
+    ):
+        leverage = VolatilityTargeting.leverage(
+            forecast, targets, min_leverage, max_leverage
+        )
+        gross_returns = leverage * returns[:, None]
+        # The strategy starts unscaled, only the later changes of exposure are traded
+        leverage_changes = np.abs(np.diff(leverage, axis=0, prepend=1.0))
+        costs = trading_cost * leverage_changes + daily_funding_cost * np.clip(
+            leverage - 1, 0, None
+        )
+        return leverage, gross_returns, costs
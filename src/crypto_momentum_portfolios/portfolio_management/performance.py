@@ -1,9 +1,8 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
-from quant_invest_lab.portfolio import construct_report_dataframe
+import numpy.typing as npt
 
-from crypto_momentum_portfolios.utility.constants import PERCENT_METRICS
+from crypto_momentum_portfolios.utility.constants import PERCENT_METRICS, PERIODS_PER_YEAR
 
 # Only the metrics calculated in the article are considered:
 ARTICLE_METRICS = [
@@ -19,6 +18,73 @@ ARTICLE_METRICS = [
 ]
 
 
+def batched_article_metrics(
+    strategy_returns: npt.NDArray[np.float64],
+    benchmark_returns: npt.NDArray[np.float64],
+    periods_per_year: int = PERIODS_PER_YEAR,
+    level: int = 5,
+) -> pd.DataFrame:
+    """Compute the `ARTICLE_METRICS` of many return paths at once, with the definitions of `construct_report_dataframe` (historic VaR and CVaR, tail ratio on the 5% tails, beta as the slope of the regression on the benchmark).
+
+    Args:
+    ----
+        strategy_returns (npt.NDArray[np.float64]): The `(path, date)` daily returns of the strategy.
+        benchmark_returns (npt.NDArray[np.float64]): The `(path, date)` daily returns of the benchmark.
+        periods_per_year (int, optional): The number of bars per year used to annualize. Defaults to PERIODS_PER_YEAR.
+        level (int, optional): The percentile of the VaR, the CVaR and the tails of the tail ratio. Defaults to 5.
+
+    Returns:
+    ----
+        pd.DataFrame: The metrics (paths x ARTICLE_METRICS).
+    """
+    assert (
+        strategy_returns.shape == benchmark_returns.shape
+    ), "Error: different shapes"
+    mean = strategy_returns.mean(axis=1)
+    volatility = strategy_returns.std(axis=1, ddof=1)
+    value_at_risk = np.percentile(strategy_returns, level, axis=1)
+    upper_quantile = np.percentile(strategy_returns, 100 - level, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # The CVaR falls back on the VaR when no return is below it
+        below = strategy_returns < value_at_risk[:, None]
+        conditional_value_at_risk = np.where(
+            below.any(axis=1),
+            (strategy_returns * below).sum(axis=1) / below.sum(axis=1),
+            value_at_risk,
+        )
+        upper_tail = strategy_returns >= upper_quantile[:, None]
+        lower_tail = strategy_returns <= value_at_risk[:, None]
+        tail_ratio = np.abs(
+            ((strategy_returns * upper_tail).sum(axis=1) / upper_tail.sum(axis=1))
+            / ((strategy_returns * lower_tail).sum(axis=1) / lower_tail.sum(axis=1))
+        )
+        centered_benchmark = benchmark_returns - benchmark_returns.mean(
+            axis=1, keepdims=True
+        )
+        beta = (centered_benchmark * strategy_returns).sum(axis=1) / (
+            centered_benchmark**2
+        ).sum(axis=1)
+        active_returns = strategy_returns - benchmark_returns
+        tracking_error = active_returns.std(axis=1, ddof=1) * np.sqrt(periods_per_year)
+        information_ratio = (
+            periods_per_year * active_returns.mean(axis=1) / tracking_error
+        )
+        sharpe_ratio = mean * periods_per_year / (volatility * np.sqrt(periods_per_year))
+    return pd.DataFrame(
+        {
+            "Expected return": mean * periods_per_year,
+            "Expected volatility": volatility * np.sqrt(periods_per_year),
+            "VaR": value_at_risk,
+            "CVaR": conditional_value_at_risk,
+            "Sharpe ratio": sharpe_ratio,
+            "Tail ratio": tail_ratio,
+            "Portfolio beta": beta,
+            "Tracking error": tracking_error,
+            "Information ratio": information_ratio,
+        }
+    )[ARTICLE_METRICS]
+
+
 def print_performance_statistics(
     strategy_returns: pd.Series,
     benchmark_returns: pd.Series,
@@ -31,6 +97,9 @@ def print_performance_statistics(
         strategy_returns.shape[0] == benchmark_returns.shape[0]
     ), "Error: different length"
     assert strategy_returns.shape[0] > sample_size, "Error: sample size too large"
+    # Imported here to keep the import of the package headless and fast in process pool workers
+    from quant_invest_lab.portfolio import construct_report_dataframe
+    from scipy import stats
 
     df = pd.concat([strategy_returns, benchmark_returns], axis=1)
     df.columns = ["strategy", "benchmark"]
@@ -115,3 +184,15 @@ def print_performance_statistics(
                 )
 
     return pd.DataFrame(final_list_stats)
+
+
+def print_stored_statistics(stats: pd.DataFrame) -> None:
+    """Print the statistics built by `print_performance_statistics` without computing them again, e.g. the ones of a run loaded from a `ResultStore`.
+
+    Args:
+    ----
+        stats (pd.DataFrame): The `metric` and `value` (with its t-stat against the benchmark) of each metric.
+    """
+    for metric, value in zip(stats["metric"], stats["value"]):
+        print(f"\n{metric:-^50}")
+        print(f"Strategy: {value} (t-stat against the benchmark)")
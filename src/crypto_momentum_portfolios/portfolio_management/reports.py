@@ -0,0 +1,29 @@
+import pandas as pd
+
+from crypto_momentum_portfolios.portfolio_management.weights import WeightsHistory
+
+
+def plot_strategy(
+    strategy_returns: pd.Series,
+    benchmark_returns: pd.Series,
+    weights_history: WeightsHistory,
+) -> None:
+    """Plot the performance curves of a strategy against its benchmark and its average allocation. The plotting stack (quant_invest_lab, plotly, matplotlib) is only imported when a plot is requested, so headless runs (e.g. process pool workers) never load it.
+
+    Args:
+    ----
+        strategy_returns (pd.Series): The returns of the strategy.
+        benchmark_returns (pd.Series): The returns of the benchmark.
+        weights_history (WeightsHistory): The weights history of the strategy.
+    """
+    from quant_invest_lab.reports import plot_from_trade_df_and_ptf_optimization
+
+    alloc = pd.DataFrame(weights_history.mean_weights())
+    alloc.columns = [0]
+    alloc = alloc.T
+
+    plot_from_trade_df_and_ptf_optimization(
+        portfolio_returns=strategy_returns,
+        benchmark_returns=benchmark_returns,
+        asset_allocation_dataframe=alloc,
+    )
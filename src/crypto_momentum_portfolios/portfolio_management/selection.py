@@ -1,5 +1,7 @@
-from typing import Union
+from typing import Optional, Tuple, Union
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
 
@@ -15,3 +17,75 @@ def rank_by_field_for_rows(
     row: Union[pd.DataFrame, pd.Series], field: str, ascending: bool = False
 ):
     return row[f"{field}"].sort_values(ascending=ascending).index.to_list()
+
+
+def select_top_k_for_rows(
+    values: npt.NDArray[np.float64],
+    k: int,
+    ascending: bool = False,
+    eligible: Optional[npt.NDArray[np.bool_]] = None,
+) -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.bool_]]:
+    """Rank the assets of many rows at once and select the top k, the vectorized version of `rank_by_field_for_rows` (the NaN values and the not eligible assets are never selected: a row with less than k valid assets is padded with invalid slots after its valid ones).
+
+    Args:
+    ----
+        values (npt.NDArray[np.float64]): The `(row, asset)` values of the ranking field.
+        k (int): The number of assets to select.
+        ascending (bool, optional): Rank in ascending order. Defaults to False.
+        eligible (Optional[npt.NDArray[np.bool_]], optional): The `(row, asset)` eligibility e.g. `MembershipMask.rows`. Defaults to None i.e. all the assets.
+
+    Returns:
+    ----
+        Tuple[npt.NDArray[np.intp], npt.NDArray[np.bool_]]: The `(row, k)` positions of the selected assets, best ranked first, and whether each slot holds a valid asset (the padding slots must be dropped).
+    """
+    keys = values if ascending else -values
+    excluded = np.isnan(keys) if eligible is None else np.isnan(keys) | ~eligible
+    selection = np.argsort(np.where(excluded, np.inf, keys), axis=1, kind="stable")[:, :k]
+    valid = ~np.take_along_axis(excluded, selection, axis=1)
+    # A valid asset ranked at inf is sorted among the excluded ones, the valid slots are moved first
+    order = np.argsort(~valid, axis=1, kind="stable")
+    return np.take_along_axis(selection, order, axis=1), np.take_along_axis(
+        valid, order, axis=1
+    )
+
+
+def select_tails_for_rows(
+    values: npt.NDArray[np.float64],
+    k_top: int,
+    k_bottom: int,
+    ascending: bool = False,
+    eligible: Optional[npt.NDArray[np.bool_]] = None,
+) -> Tuple[
+    npt.NDArray[np.intp], npt.NDArray[np.bool_], npt.NDArray[np.intp], npt.NDArray[np.bool_]
+]:
+    """Select both tails of the ranking of many rows with a single argsort per row, e.g. the long and short legs of a long-short portfolio (the NaN values and the not eligible assets are never selected). A row with less than `k_top + k_bottom` valid assets (e.g. before the listing of some assets) shrinks both tails by half the shortfall so that they never overlap, their slots are padded with invalid slots after the valid ones as in `select_top_k_for_rows`.
+
+    Args:
+    ----
+        values (npt.NDArray[np.float64]): The `(row, asset)` values of the ranking field.
+        k_top (int): The number of best ranked assets to select.
+        k_bottom (int): The number of worst ranked assets to select.
+        ascending (bool, optional): Rank in ascending order. Defaults to False.
+        eligible (Optional[npt.NDArray[np.bool_]], optional): The `(row, asset)` eligibility e.g. `MembershipMask.rows`. Defaults to None i.e. all the assets.
+
+    Returns:
+    ----
+        Tuple[npt.NDArray[np.intp], npt.NDArray[np.bool_], npt.NDArray[np.intp], npt.NDArray[np.bool_]]: The `(row, k_top)` best ranked assets (best first) and their valid slots, the `(row, k_bottom)` worst ranked ones (worst first) and their valid slots.
+    """
+    if eligible is not None:
+        values = np.where(eligible, values, np.nan)
+    n_valid = (~np.isnan(values)).sum(axis=1)
+    # Each tail gives up half of the missing assets, the bottom one the rounding
+    shortfall = np.maximum(k_top + k_bottom - n_valid, 0)
+    n_top = np.clip(k_top - (shortfall + 1) // 2, 0, None)
+    n_bottom = np.minimum(k_bottom, n_valid - n_top)
+    n_top = np.minimum(k_top, n_valid - n_bottom)
+    keys = values if ascending else -values
+    order = np.argsort(np.where(np.isnan(keys), np.inf, keys), axis=1, kind="stable")
+    bottom_positions = np.clip(n_valid[:, None] - 1 - np.arange(k_bottom), 0, None)
+    return (
+        order[:, :k_top],
+        np.arange(k_top) < n_top[:, None],
+        np.take_along_axis(order, bottom_positions, axis=1),
+        np.arange(k_bottom) < n_bottom[:, None],
+    )
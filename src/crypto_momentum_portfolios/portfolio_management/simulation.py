@@ -0,0 +1,510 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from crypto_momentum_portfolios.portfolio_management.allocation import (
+    ALLOCATION_FIELDS,
+    allocate_valid_selection,
+)
+from crypto_momentum_portfolios.portfolio_management.engine import (
+    run_batched_holdings_pass,
+)
+from crypto_momentum_portfolios.portfolio_management.indicators import (
+    SWEEP_FIELDS,
+    Indicators,
+)
+from crypto_momentum_portfolios.portfolio_management.performance import (
+    batched_article_metrics,
+)
+from crypto_momentum_portfolios.portfolio_management.selection import (
+    select_top_k_for_rows,
+)
+from crypto_momentum_portfolios.utility.constants import (
+    PERIODS_PER_YEAR,
+    SLIPPAGE_EFFECT,
+    TRANSACTION_COST,
+)
+from crypto_momentum_portfolios.utility.rebalance_calendar import (
+    RebalanceCalendar,
+    RebalanceSchedule,
+)
+from crypto_momentum_portfolios.utility.types import (
+    Fields,
+    RebalanceFrequency,
+    ScenarioMethod,
+    StrategySpec,
+)
+from crypto_momentum_portfolios.utility.utils import estimation_window_starts
+
+# The fields a simulated universe can provide, to rank or to allocate
+SIMULATED_FIELDS: List[Fields] = [
+    Fields.PRICE,
+    Fields.RETURNS,
+    Fields.MARKET_CAP,
+    Fields.VOLUME,
+    *SWEEP_FIELDS,
+]
+
+
+class ScenarioGenerator:
+    """
+    ScenarioGenerator draws batches of synthetic daily log returns fitted on a historical price panel. Only the dates where every asset has a price are used, so the cross-sectional dependence of the assets is kept by the three methods:
+    - correlated GBM: gaussian log returns with the empirical mean and covariance,
+    - block bootstrap: blocks of consecutive historical dates resampled with replacement (circular), which keeps the volatility clustering and the fat tails within a block,
+    - regime switching: a Markov chain over volatility regimes (the quantiles of the rolling volatility of the equal weighted market) with a gaussian of the regime mean and covariance each day.
+
+    Private Attributes:
+    ----
+        __log_returns (npt.NDArray[np.float64]): The `(date, asset)` historical log returns.
+        __mean (npt.NDArray[np.float64]): The mean of the log returns.
+        __factor (npt.NDArray[np.float64]): A square root of the covariance of the log returns.
+        __regime_means (npt.NDArray[np.float64]): The `(regime, asset)` means of the regimes.
+        __regime_factors (npt.NDArray[np.float64]): The `(regime, asset, asset)` square roots of the covariances of the regimes.
+        __transitions (npt.NDArray[np.float64]): The `(regime, regime)` transition probabilities of the regimes.
+        __regime_frequencies (npt.NDArray[np.float64]): The historical frequency of each regime, the distribution of the first day.
+    """
+
+    def __init__(
+        self, prices: pd.DataFrame, n_regimes: int = 2, regime_lookback: int = 30
+    ) -> None:
+        """Constructor method.
+
+        Args:
+            prices (pd.DataFrame): The historical prices (dates x assets).
+            n_regimes (int, optional): The number of volatility regimes of the regime switching scenarios. Defaults to 2.
+            regime_lookback (int, optional): The window of the rolling volatility defining the regimes. Defaults to 30.
+        """
+        log_returns = np.log(prices).diff().dropna()
+        assert (
+            log_returns.shape[0] > max(regime_lookback, prices.shape[1])
+        ), "Not enough dates where all the assets have a price to fit the scenarios"
+        assert n_regimes >= 1, "The number of regimes must be positive"
+        self.__log_returns = log_returns.to_numpy(dtype=float)
+        self.__mean = self.__log_returns.mean(axis=0)
+        self.__factor = ScenarioGenerator.__covariance_factor(self.__log_returns)
+
+        market_volatility = (
+            log_returns.mean(axis=1).rolling(regime_lookback).std().bfill().to_numpy()
+        )
+        thresholds = np.quantile(market_volatility, np.arange(1, n_regimes) / n_regimes)
+        regimes = np.searchsorted(thresholds, market_volatility, side="right")
+        self.__regime_means = np.stack(
+            [self.__log_returns[regimes == r].mean(axis=0) for r in range(n_regimes)]
+        )
+        self.__regime_factors = np.stack(
+            [
+                ScenarioGenerator.__covariance_factor(self.__log_returns[regimes == r])
+                for r in range(n_regimes)
+            ]
+        )
+        counts = np.zeros((n_regimes, n_regimes))
+        np.add.at(counts, (regimes[:-1], regimes[1:]), 1)
+        # A regime never left (the last one of the history) stays in place
+        counts[counts.sum(axis=1) == 0] = np.eye(n_regimes)[counts.sum(axis=1) == 0]
+        self.__transitions = counts / counts.sum(axis=1, keepdims=True)
+        self.__regime_frequencies = np.bincount(regimes, minlength=n_regimes) / regimes.size
+
+    @property
+    def n_assets(self) -> int:
+        return self.__log_returns.shape[1]
+
+    @property
+    def transitions(self) -> npt.NDArray[np.float64]:
+        return self.__transitions
+
+    def generate(
+        self,
+        method: ScenarioMethod,
+        n_paths: int,
+        n_days: int,
+        rng: np.random.Generator,
+        block_size: int = 20,
+    ) -> npt.NDArray[np.float64]:
+        """Draw a batch of scenarios.
+
+        Args:
+        ----
+            method (ScenarioMethod): The scenario method.
+            n_paths (int): The number of paths.
+            n_days (int): The number of daily log returns of each path.
+            rng (np.random.Generator): The random generator.
+            block_size (int, optional): The number of consecutive dates of a block of the block bootstrap. Defaults to 20.
+
+        Returns:
+        ----
+            npt.NDArray[np.float64]: The `(path, date, asset)` log returns.
+        """
+        assert (
+            method in ScenarioMethod.list_values()
+        ), f"The method must be one of {ScenarioMethod.list_values()}"
+        if method == ScenarioMethod.GBM:
+            shocks = rng.standard_normal((n_paths, n_days, self.n_assets))
+            return self.__mean + shocks @ self.__factor.T
+
+        if method == ScenarioMethod.BLOCK_BOOTSTRAP:
+            assert block_size > 0, "The block size must be positive"
+            n_history = self.__log_returns.shape[0]
+            n_blocks = -(-n_days // block_size)
+            starts = rng.integers(0, n_history, (n_paths, n_blocks))
+            rows = (starts[:, :, None] + np.arange(block_size)) % n_history
+            return self.__log_returns[rows.reshape(n_paths, -1)[:, :n_days]]
+
+        regimes = self.simulate_regimes(n_paths, n_days, rng)
+        shocks = rng.standard_normal((n_paths, n_days, self.n_assets))
+        log_returns = np.empty_like(shocks)
+        for regime, (mean, factor) in enumerate(
+            zip(self.__regime_means, self.__regime_factors)
+        ):
+            in_regime = regimes == regime
+            log_returns[in_regime] = mean + shocks[in_regime] @ factor.T
+        return log_returns
+
+    def simulate_regimes(
+        self, n_paths: int, n_days: int, rng: np.random.Generator
+    ) -> npt.NDArray[np.intp]:
+        """Simulate the regime chains of a batch of paths, one vectorized step per day.
+
+        Args:
+        ----
+            n_paths (int): The number of paths.
+            n_days (int): The number of days.
+            rng (np.random.Generator): The random generator.
+
+        Returns:
+        ----
+            npt.NDArray[np.intp]: The `(path, date)` regimes.
+        """
+        cumulated_transitions = np.cumsum(self.__transitions, axis=1)
+        draws = rng.random((n_paths, n_days))
+        regimes = np.empty((n_paths, n_days), dtype=np.intp)
+        regimes[:, 0] = np.searchsorted(
+            np.cumsum(self.__regime_frequencies), draws[:, 0], side="right"
+        )
+        for t in range(1, n_days):
+            regimes[:, t] = (
+                draws[:, t, None] >= cumulated_transitions[regimes[:, t - 1]]
+            ).sum(axis=1)
+        return np.minimum(regimes, self.__transitions.shape[0] - 1)
+
+    @staticmethod
+    def __covariance_factor(
+        log_returns: npt.NDArray[np.float64],
+    ) -> npt.NDArray[np.float64]:
+        """A square root `L` of the sample covariance (`L @ L.T`), from its eigen decomposition so that a singular covariance is supported."""
+        eigenvalues, eigenvectors = np.linalg.eigh(np.cov(log_returns, rowvar=False))
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+
+@dataclass
+class SimulationResult:
+    """The output of `MonteCarloSimulator.run`.
+
+    Attributes:
+    ----
+        method (ScenarioMethod): The scenario method.
+        metrics (pd.DataFrame): The `ARTICLE_METRICS` of the strategy on each path (paths x metrics).
+        benchmark_metrics (pd.DataFrame): The `ARTICLE_METRICS` of the equal weighted benchmark on each path, against itself.
+        final_wealth (pd.Series): The compounded value of 1 invested in the strategy at the end of each path.
+    """
+
+    method: ScenarioMethod
+    metrics: pd.DataFrame
+    benchmark_metrics: pd.DataFrame
+    final_wealth: pd.Series
+
+    def summary(
+        self, percentiles: Sequence[float] = (0.05, 0.25, 0.5, 0.75, 0.95)
+    ) -> pd.DataFrame:
+        """Describe the distributions of the metrics across the paths.
+
+        Args:
+        ----
+            percentiles (Sequence[float], optional): The percentiles to report. Defaults to (0.05, 0.25, 0.5, 0.75, 0.95).
+
+        Returns:
+        ----
+            pd.DataFrame: The statistics (metrics x statistics).
+        """
+        return self.metrics.describe(percentiles=list(percentiles)).T
+
+    def probability_of_outperformance(self) -> pd.Series:
+        """Get the share of the paths where the strategy beats the benchmark, for the metrics where higher is better.
+
+        Returns:
+        ----
+            pd.Series: The probability per metric.
+        """
+        metrics = ["Expected return", "Sharpe ratio", "VaR", "CVaR"]
+        return (self.metrics[metrics] > self.benchmark_metrics[metrics]).mean()
+
+
+class MonteCarloSimulator:
+    """
+    MonteCarloSimulator stress-tests a strategy on thousands of synthetic universes instead of the single historical path. The scenarios are drawn by a `ScenarioGenerator` fitted on the historical panel and streamed in chunks of paths: the fields of a chunk are computed at once on a `(date, path x asset)` panel, the strategy runs through the vectorized engine (`select_top_k_for_rows`, `allocate_valid_selection` and `run_batched_holdings_pass`) and only the metrics of the paths are kept, so the memory is bounded by the chunk size.
+
+    The simulated universes follow the backtester conventions: the strategy is charged `transaction_cost * k * 2 + slippage_effect` at each rebalance (k > 0 the number of assets held, an empty book is not charged) and compared with an equal weighted benchmark charged `transaction_cost * n_assets + slippage_effect` at each of its rebalances, as in `BenchmarkDataFrameBuilder`.
+
+    Private Attributes:
+    ----
+        __generator (ScenarioGenerator): The scenarios source.
+        __initial_prices (npt.NDArray[np.float64]): The last historical prices, the start of every path.
+        __amount (npt.NDArray[np.float64]): The last historical amount of each asset, kept constant to derive the market capitalization.
+        __volume (npt.NDArray[np.float64]): The average historical volume of each asset, kept constant.
+        __assets (pd.Index): The assets.
+    """
+
+    def __init__(
+        self,
+        panel: pd.DataFrame,
+        n_regimes: int = 2,
+        regime_lookback: int = 30,
+    ) -> None:
+        """Constructor method.
+
+        Args:
+            panel (pd.DataFrame): The historical panel (MultiIndex columns field x asset) with the price field, and the amount and volume fields to simulate the capitalization and volume weighted allocations, e.g. the output of `get_crypto`.
+            n_regimes (int, optional): The number of volatility regimes of the regime switching scenarios. Defaults to 2.
+            regime_lookback (int, optional): The window of the rolling volatility defining the regimes. Defaults to 30.
+        """
+        prices = panel[Fields.PRICE]
+        self.__assets = prices.columns
+        self.__generator = ScenarioGenerator(prices, n_regimes, regime_lookback)
+        self.__initial_prices = prices.ffill().iloc[-1].to_numpy(dtype=float)
+        available = panel.columns.get_level_values(0)
+        self.__amount = (
+            panel[Fields.AMOUNT][self.__assets].ffill().iloc[-1].to_numpy(dtype=float)
+            if Fields.AMOUNT in available
+            else np.full(self.__assets.size, np.nan)
+        )
+        self.__volume = (
+            panel[Fields.VOLUME][self.__assets].mean().to_numpy(dtype=float)
+            if Fields.VOLUME in available
+            else np.full(self.__assets.size, np.nan)
+        )
+
+    @property
+    def generator(self) -> ScenarioGenerator:
+        return self.__generator
+
+    def run(
+        self,
+        spec: StrategySpec = StrategySpec(),
+        n_paths: int = 1000,
+        n_days: int = 3 * 365,
+        method: ScenarioMethod = ScenarioMethod.GBM,
+        lookback: int = 30,
+        chunk_size: int = 100,
+        seed: Optional[int] = None,
+        block_size: int = 20,
+        benchmark_rebalance_frequency: RebalanceSchedule = RebalanceFrequency.MONTHLY,
+        transaction_cost: float = TRANSACTION_COST,
+        slippage_effect: float = SLIPPAGE_EFFECT,
+        start_date: str = "2018-01-01",
+        benchmark_costs: bool = True,
+    ) -> SimulationResult:
+        """Run a strategy on simulated universes.
+
+        Args:
+        ----
+            spec (StrategySpec, optional): The strategy. Defaults to StrategySpec().
+            n_paths (int, optional): The number of paths. Defaults to 1000.
+            n_days (int, optional): The number of backtested days of each path, after the warm up of the indicators. Defaults to 3*365.
+            method (ScenarioMethod, optional): The scenario method. Defaults to ScenarioMethod.GBM.
+            lookback (int, optional): The lookback of the indicators, also the number of warm up days. Defaults to 30.
+            chunk_size (int, optional): The number of paths simulated at once. Defaults to 100.
+            seed (Optional[int], optional): The random seed. Defaults to None.
+            block_size (int, optional): The block length of the block bootstrap. Defaults to 20.
+            benchmark_rebalance_frequency (RebalanceSchedule, optional): The rebalance frequency or calendar of the equal weighted benchmark. Defaults to RebalanceFrequency.MONTHLY.
+            transaction_cost (float, optional): The transaction cost. Defaults to TRANSACTION_COST.
+            slippage_effect (float, optional): The slippage effect. Defaults to SLIPPAGE_EFFECT.
+            start_date (str, optional): The first simulated date, it only matters for the calendar rebalance frequencies. Defaults to "2018-01-01".
+            benchmark_costs (bool, optional): Charge the equal weighted benchmark `transaction_cost * n_assets + slippage_effect` at each of its rebalances as `BenchmarkDataFrameBuilder` does, else the benchmark is frictionless. Defaults to True.
+
+        Returns:
+        ----
+            SimulationResult: The distributions of the metrics across the paths.
+        """
+        assert n_paths > 0 and chunk_size > 0, "The number of paths and the chunk size must be positive"
+        assert (
+            spec.ranking_method in SIMULATED_FIELDS
+        ), f"The ranking method must be one of {SIMULATED_FIELDS}"
+        assert (
+            spec.select_top_k_assets <= self.__assets.size
+        ), f"select_top_k_assets must be less than or equal to {self.__assets.size}"
+        dates = pd.date_range(start_date, periods=n_days, freq="1D")
+        rebalance_positions = MonteCarloSimulator.__rebalance_positions(
+            dates, spec.rebalance_frequency
+        )
+        benchmark_positions = MonteCarloSimulator.__rebalance_positions(
+            dates, benchmark_rebalance_frequency
+        )
+        window_starts = estimation_window_starts(
+            dates,
+            rebalance_positions,
+            np.concatenate(([0], rebalance_positions[:-1])),
+            spec.estimation_window,
+        )
+        fields = {spec.ranking_method, ALLOCATION_FIELDS[spec.allocation_method]}
+
+        rng = np.random.default_rng(seed)
+        metrics, benchmark_metrics, final_wealth = [], [], []
+        for _, universe in self.iter_universes(
+            n_paths, n_days, method, lookback, chunk_size, rng, block_size, fields
+        ):
+            strategy_returns, benchmark_returns = MonteCarloSimulator.__run_chunk(
+                universe,
+                spec,
+                rebalance_positions,
+                window_starts,
+                benchmark_positions,
+                transaction_cost,
+                slippage_effect,
+                benchmark_costs,
+            )
+            # Only the metrics of the chunk are kept
+            metrics.append(
+                batched_article_metrics(
+                    strategy_returns, benchmark_returns, PERIODS_PER_YEAR
+                )
+            )
+            benchmark_metrics.append(
+                batched_article_metrics(
+                    benchmark_returns, benchmark_returns, PERIODS_PER_YEAR
+                )
+            )
+            final_wealth.append(np.prod(1 + strategy_returns, axis=1))
+        paths = pd.RangeIndex(n_paths, name="path")
+        return SimulationResult(
+            method=method,
+            metrics=pd.concat(metrics).set_axis(paths),
+            benchmark_metrics=pd.concat(benchmark_metrics).set_axis(paths),
+            final_wealth=pd.Series(np.concatenate(final_wealth), index=paths),
+        )
+
+    def iter_universes(
+        self,
+        n_paths: int,
+        n_days: int,
+        method: ScenarioMethod,
+        lookback: int,
+        chunk_size: int,
+        rng: np.random.Generator,
+        block_size: int = 20,
+        fields: Optional[Sequence[Fields]] = None,
+    ) -> Iterator[tuple[int, Dict[Fields, npt.NDArray[np.float64]]]]:
+        """Stream the simulated universes by chunks of paths.
+
+        Args:
+        ----
+            n_paths (int): The number of paths.
+            n_days (int): The number of days of each path, after the warm up.
+            method (ScenarioMethod): The scenario method.
+            lookback (int): The lookback of the indicators, also the number of warm up days dropped.
+            chunk_size (int): The number of paths of a chunk.
+            rng (np.random.Generator): The random generator.
+            block_size (int, optional): The block length of the block bootstrap. Defaults to 20.
+            fields (Optional[Sequence[Fields]], optional): The fields to compute among `SIMULATED_FIELDS`, the returns are always computed. Defaults to None i.e. all of them.
+
+        Yields:
+        ----
+            tuple[int, Dict[Fields, npt.NDArray[np.float64]]]: The first path of the chunk and the `(path, date, asset)` fields.
+        """
+        fields = set(SIMULATED_FIELDS if fields is None else fields) | {Fields.RETURNS}
+        assert fields.issubset(SIMULATED_FIELDS), f"The fields must be among {SIMULATED_FIELDS}"
+        sweep_fields = [field for field in SWEEP_FIELDS if field in fields]
+        for start in range(0, n_paths, chunk_size):
+            n_chunk = min(chunk_size, n_paths - start)
+            log_returns = self.__generator.generate(
+                method, n_chunk, lookback + n_days, rng, block_size
+            )
+            prices = self.__initial_prices * np.exp(np.cumsum(log_returns, axis=1))
+            universe = {
+                Fields.PRICE: prices,
+                Fields.RETURNS: np.expm1(log_returns),
+                Fields.MARKET_CAP: prices * self.__amount,
+                Fields.VOLUME: np.broadcast_to(self.__volume, prices.shape),
+            }
+            if sweep_fields:
+                # The indicators of all the paths of the chunk in one pass over a (date, path x asset) panel
+                wide_prices = pd.DataFrame(
+                    prices.transpose(1, 0, 2).reshape(prices.shape[1], -1)
+                )
+                for field, panel in Indicators.lookback_sweep(
+                    wide_prices, [lookback], sweep_fields
+                ).items():
+                    universe[field] = (
+                        panel.values[0].reshape(prices.shape[1], n_chunk, -1).transpose(1, 0, 2)
+                    )
+            yield start, {
+                field: values[:, lookback:]
+                for field, values in universe.items()
+                if field in fields
+            }
+
+    @staticmethod
+    def __rebalance_positions(
+        dates: pd.DatetimeIndex, frequency: RebalanceSchedule
+    ) -> npt.NDArray[np.intp]:
+        """The positions of the rebalance dates, as in `PortfolioBacktester`: the first date then the dates of the frequency."""
+        return RebalanceCalendar.resolve(frequency, dates).positions
+
+    @staticmethod
+    def __run_chunk(
+        universe: Dict[Fields, npt.NDArray[np.float64]],
+        spec: StrategySpec,
+        rebalance_positions: npt.NDArray[np.intp],
+        window_starts: npt.NDArray[np.intp],
+        benchmark_positions: npt.NDArray[np.intp],
+        transaction_cost: float,
+        slippage_effect: float,
+        benchmark_costs: bool,
+    ) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """Run the strategy and the equal weighted benchmark on the `(path, date, asset)` fields of a chunk, the selection and the holdings pass process all the paths at once."""
+        asset_returns = universe[Fields.RETURNS]
+        n_paths, _, n_assets = asset_returns.shape
+        selection, valid = select_top_k_for_rows(
+            universe[spec.ranking_method][:, rebalance_positions].reshape(-1, n_assets),
+            spec.select_top_k_assets,
+            ascending=bool(spec.ranking_mode),
+        )
+        selection = selection.reshape(n_paths, rebalance_positions.size, -1)
+        valid = valid.reshape(selection.shape)
+        allocation_panel = universe[ALLOCATION_FIELDS[spec.allocation_method]]
+        weights = np.stack(
+            [
+                allocate_valid_selection(
+                    spec.allocation_method,
+                    selection[path],
+                    valid[path],
+                    allocation_panel[path],
+                    rebalance_positions,
+                    window_starts,
+                    bool(spec.allocation_mode),
+                    covariance_estimator=spec.covariance_estimator,
+                )
+                for path in range(n_paths)
+            ]
+        )
+        strategy = run_batched_holdings_pass(
+            asset_returns, rebalance_positions, selection, weights
+        ).gross_returns
+        n_held = valid.sum(axis=2)
+        strategy[:, rebalance_positions] -= np.where(
+            n_held > 0, transaction_cost * n_held * 2 + slippage_effect, 0.0
+        )
+
+        benchmark = run_batched_holdings_pass(
+            asset_returns,
+            benchmark_positions,
+            np.broadcast_to(
+                np.arange(n_assets), (n_paths, benchmark_positions.size, n_assets)
+            ),
+            np.full((n_paths, benchmark_positions.size, n_assets), 1 / n_assets),
+        ).gross_returns
+        if benchmark_costs:
+            benchmark[:, benchmark_positions] -= (
+                transaction_cost * n_assets + slippage_effect
+            )
+        return strategy * spec.side, benchmark
@@ -0,0 +1,397 @@
+import os
+import textwrap
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Literal, Optional, Union
+import numpy as np
+import pandas as pd
+
+from crypto_momentum_portfolios.utility.constants import PERCENT_METRICS
+from crypto_momentum_portfolios.utility.result_store import ResultStore
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    Benchmark,
+    Fields,
+    RankingMethod,
+    RebalanceFrequency,
+)
+
+# The statistics strings of `print_performance_statistics` e.g. "-0.74 (-5.65)" or "48.06% (77.38)"
+STAT_PATTERN = r"^\s*(?P<value>[-+]?(?:\d+(?:\.\d*)?|nan|inf))(?P<percent>%?)\s*(?:\((?P<t_stat>[-+]?(?:\d+(?:\.\d*)?|nan|inf))\))?\s*$"
+T_STAT_SUFFIX = " (t-stat)"
+# The names of the momentum formulas in the statistics files of the article
+FORMULA_FILE_NAMES = {"MoM": Fields.MOMENTUM}
+LABELS = {
+    "ranking_method": "Momentum formula",
+    "allocation_method": "Allocation",
+    "select_top_k_assets": "Number of assets in the portfolio",
+    "benchmark": "Benchmark",
+    "rebalance_frequency": "Rebalance frequency",
+    Fields.MOMENTUM: "MoM",
+    Fields.EMA_MOMENTUM: "EMA-MoM",
+    Fields.TS_MOMENTUM: "TS-MoM",
+    Fields.VOLATILITY_NEUTRALIZED_MOMENTUM: "Vol-Neutral-MoM",
+    Benchmark.BITCOIN: "Bitcoin Benchmark",
+    Benchmark.CAPITALIZATION_WEIGHTED: "Capitalization Weighted Benchmark",
+    Benchmark.EQUAL_WEIGHTED: "Equal Weighted Benchmark",
+    **{
+        method.value: "".join(word.capitalize() for word in method.name.split("_"))
+        for method in AllocationMethod
+    },
+}
+
+
+@dataclass(frozen=True)
+class ChartSpec:
+    """A chart of a sweep: the average of a metric over the runs matching `filters`, by `x` and `series`.
+
+    Attributes:
+    ----
+        path (str): The PNG file, relative to the output folder of `SweepCharts.render`.
+        metric (str): The plotted metric e.g. "Information ratio", or its t-stat e.g. "Information ratio (t-stat)".
+        x (str): The column of the sweep table on the x axis (the rows of a heatmap) e.g. "allocation_method".
+        series (Optional[str]): The column of the sweep table giving the bars, lines (the columns of a heatmap), None for a single series. Defaults to None.
+        title (str): The title of the chart. Defaults to "".
+        kind (Literal["bar", "line", "heatmap"]): The chart type. Defaults to "bar".
+        filters (Dict[str, Any]): The configuration values of the plotted runs e.g. `{"benchmark": Benchmark.BITCOIN}`, a list matches any of its values. Defaults to {}.
+    """
+
+    path: str
+    metric: str
+    x: str
+    series: Optional[str] = None
+    title: str = ""
+    kind: Literal["bar", "line", "heatmap"] = "bar"
+    filters: Dict[str, Any] = field(default_factory=dict)
+
+
+# The charts of the `results` folder of the article
+RESULTS_CHARTS: List[ChartSpec] = [
+    ChartSpec(
+        "IR_by_aloc_for_all_mom.png",
+        "Information ratio",
+        "allocation_method",
+        "ranking_method",
+        "Average Information ratio by allocation method for each momentum formula (Bitcoin Benchmark)",
+        filters={"benchmark": Benchmark.BITCOIN},
+    ),
+    ChartSpec(
+        "IR_by_aloc_for_all_mom_5_assets.png",
+        "Information ratio",
+        "allocation_method",
+        "ranking_method",
+        "Information ratio by allocation method for each momentum formula for 5 assets (Bitcoin Benchmark)",
+        filters={"benchmark": Benchmark.BITCOIN, "select_top_k_assets": 5},
+    ),
+    ChartSpec(
+        "sharpe_by_aloc_for_all_mom.png",
+        "Sharpe ratio",
+        "allocation_method",
+        "ranking_method",
+        "Average Sharpe ratio by allocation method for each momentum formula",
+        filters={"benchmark": Benchmark.BITCOIN},
+    ),
+    ChartSpec(
+        "Sharpe ratio by allocation for each momentum for only 5  assets in portfolio.png",
+        "Sharpe ratio",
+        "allocation_method",
+        "ranking_method",
+        "Sharpe ratio by allocation for each momentum formula for 5 assets in the portfolio",
+        filters={"benchmark": Benchmark.BITCOIN, "select_top_k_assets": 5},
+    ),
+    ChartSpec(
+        "btc_bench_IR_by_k_assets_for_formula.png",
+        "Information ratio",
+        "select_top_k_assets",
+        "ranking_method",
+        "Average Information ratio by number of assets in the portfolio for each momentum formula (Bitcoin Benchmark)",
+        filters={"benchmark": Benchmark.BITCOIN},
+    ),
+    ChartSpec(
+        "btc_bench_TE_by_k_assets_for_formula.png",
+        "Tracking error",
+        "select_top_k_assets",
+        "ranking_method",
+        "Average tracking error by number of assets in the portfolio for each momentum formula (Bitcoin Benchmark)",
+        filters={"benchmark": Benchmark.BITCOIN},
+    ),
+    *(
+        ChartSpec(
+            f"{folder}/{metric}{separator}{label}{suffix}.png",
+            metric,
+            "select_top_k_assets",
+            "allocation_method",
+            f"{metric} by number of assets in the portfolio for each allocation with {LABELS[formula]}",
+            filters={"ranking_method": formula, "benchmark": benchmark},
+        )
+        for folder, formula, label, separator in [
+            ("MOM", Fields.MOMENTUM, "MoM", " "),
+            ("EMAMOM", Fields.EMA_MOMENTUM, "EMAMoM", "_"),
+            ("TSMOM", Fields.TS_MOMENTUM, "TSMoM", " "),
+            (
+                "VOLATILITY_NEUTRALIZED_MOM",
+                Fields.VOLATILITY_NEUTRALIZED_MOMENTUM,
+                "VolNeutalMoM",
+                " ",
+            ),
+        ]
+        for metric, benchmark, suffix in [
+            ("Information ratio", Benchmark.BITCOIN, "_BenchBTC"),
+            ("Information ratio", Benchmark.CAPITALIZATION_WEIGHTED, "_BenchCapi"),
+            ("Sharpe ratio", Benchmark.BITCOIN, ""),
+        ]
+    ),
+]
+
+
+class SweepCharts:
+    """
+    SweepCharts builds the charts of a sweep from its result table (one row per run, the configuration and the metrics as columns) instead of re-running the backtests:
+    - `parse_stats` turns the statistics strings of `print_performance_statistics` into floats and t-stats,
+    - `from_store` and `from_stats_files` build the table from a `ResultStore` or from the statistics CSV files of the article,
+    - `datasets` computes the data of every chart with one `pivot_table` per chart, plain DataFrames for further analysis,
+    - `render` draws all the PNGs in the current process on matplotlib Agg canvases, without pyplot: no window, no backend switch of a notebook.
+
+    matplotlib is only imported by `render`.
+    """
+
+    @staticmethod
+    def parse_stats(stats: pd.DataFrame) -> pd.DataFrame:
+        """Parse the statistics strings e.g. "48.06% (77.38)" into the metric (0.4806) and its t-stat (77.38). The numeric columns are kept as they are.
+
+        Args:
+        ----
+            stats (pd.DataFrame): The statistics (runs x metrics), e.g. `ResultStore.load_stats`.
+
+        Returns:
+        ----
+            pd.DataFrame: The metrics as floats, followed by a "<metric> (t-stat)" column for each metric having t-stats.
+        """
+        values, t_stats = {}, {}
+        for metric in stats.columns:
+            column = stats[metric]
+            if pd.api.types.is_numeric_dtype(column):
+                values[metric] = column.astype(float)
+                continue
+            parts = column.astype("string").str.extract(STAT_PATTERN)
+            values[metric] = parts["value"].astype(float) / np.where(
+                parts["percent"] == "%", 100.0, 1.0
+            )
+            if parts["t_stat"].notna().any():
+                t_stats[f"{metric}{T_STAT_SUFFIX}"] = parts["t_stat"].astype(float)
+        return pd.DataFrame({**values, **t_stats}, index=stats.index)
+
+    @staticmethod
+    def from_store(store: ResultStore, **filters: Any) -> pd.DataFrame:
+        """Build the sweep table of the runs saved in a result store, nothing is executed.
+
+        Args:
+        ----
+            store (ResultStore): The store.
+            **filters: The configuration values of the runs, as for `ResultStore.query`.
+
+        Returns:
+        ----
+            pd.DataFrame: One row per run with statistics: its key, configuration, costs, metrics and t-stats.
+        """
+        runs = store.query(**filters)
+        if runs.empty:
+            return runs
+        stats = SweepCharts.parse_stats(store.load_stats(runs["key"]))
+        return runs.join(stats, on="key", how="inner").reset_index(drop=True)
+
+    @staticmethod
+    def from_stats_files(
+        paths: Iterable[Union[str, os.PathLike]],
+    ) -> pd.DataFrame:
+        """Build the sweep table of statistics CSV files named "stats-<formula>-<allocation>-<frequency>_Rebalance.csv", with a row per (number of assets, benchmark) as in the `results` folder of the article.
+
+        Args:
+        ----
+            paths (Iterable[Union[str, os.PathLike]]): The files e.g. `Path("results").glob("*/stats-*.csv")`.
+
+        Returns:
+        ----
+            pd.DataFrame: One row per run: the configuration with the values of the enums, the metrics and t-stats.
+        """
+        tables = []
+        for path in paths:
+            _, formula, allocation, frequency = Path(path).stem.split("-")
+            stats = pd.read_csv(path, header=[0, 1], index_col=[0, 1])
+            stats.columns = stats.columns.get_level_values(-1)
+            table = SweepCharts.parse_stats(stats).reset_index(drop=True)
+            table.insert(
+                0,
+                "ranking_method",
+                (
+                    FORMULA_FILE_NAMES[formula]
+                    if formula in FORMULA_FILE_NAMES
+                    else RankingMethod[formula]
+                ).value,
+            )
+            table.insert(1, "allocation_method", AllocationMethod[allocation].value)
+            table.insert(
+                2,
+                "rebalance_frequency",
+                RebalanceFrequency[frequency.removesuffix("_Rebalance")].value,
+            )
+            table.insert(
+                3,
+                "select_top_k_assets",
+                stats.index.get_level_values(0).astype(int),
+            )
+            table.insert(
+                4,
+                "benchmark",
+                [Benchmark[name].value for name in stats.index.get_level_values(1)],
+            )
+            tables.append(table)
+        return pd.concat(tables, ignore_index=True)
+
+    @staticmethod
+    def dataset(table: pd.DataFrame, spec: ChartSpec) -> pd.DataFrame:
+        """Compute the data of a chart: the average of its metric over the matching runs.
+
+        Args:
+        ----
+            table (pd.DataFrame): The sweep table.
+            spec (ChartSpec): The chart.
+
+        Returns:
+        ----
+            pd.DataFrame: The averages (x values x series values), a single column named after the metric without series.
+        """
+        mask = np.ones(len(table), dtype=bool)
+        for name, value in spec.filters.items():
+            mask &= table[name].isin(
+                list(value) if isinstance(value, (list, tuple, set)) else [value]
+            ).to_numpy()
+        runs = table.loc[mask]
+        if spec.series is None:
+            return runs.groupby(spec.x, sort=True)[[spec.metric]].mean()
+        return runs.pivot_table(
+            index=spec.x,
+            columns=spec.series,
+            values=spec.metric,
+            aggfunc="mean",
+            sort=True,
+        )
+
+    @staticmethod
+    def datasets(
+        table: pd.DataFrame, specs: Iterable[ChartSpec] = RESULTS_CHARTS
+    ) -> Dict[str, pd.DataFrame]:
+        """Compute the data of many charts.
+
+        Args:
+        ----
+            table (pd.DataFrame): The sweep table.
+            specs (Iterable[ChartSpec], optional): The charts. Defaults to RESULTS_CHARTS.
+
+        Returns:
+        ----
+            Dict[str, pd.DataFrame]: The data of each chart by path.
+        """
+        return {spec.path: SweepCharts.dataset(table, spec) for spec in specs}
+
+    @staticmethod
+    def render(
+        table: pd.DataFrame,
+        output_dir: Union[str, os.PathLike],
+        specs: Iterable[ChartSpec] = RESULTS_CHARTS,
+        dpi: int = 150,
+    ) -> List[Path]:
+        """Draw the charts of a sweep as PNG files, all in the current process with the non-interactive Agg backend of matplotlib. The charts of missing columns or without matching runs are skipped.
+
+        Args:
+        ----
+            table (pd.DataFrame): The sweep table.
+            output_dir (Union[str, os.PathLike]): The folder of the PNG files, e.g. "results".
+            specs (Iterable[ChartSpec], optional): The charts. Defaults to RESULTS_CHARTS.
+            dpi (int, optional): The resolution of the PNG files. Defaults to 150.
+
+        Returns:
+        ----
+            List[Path]: The written files.
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        written = []
+        for spec in specs:
+            columns = {spec.metric, spec.x, *spec.filters}
+            if spec.series is not None:
+                columns.add(spec.series)
+            if not columns.issubset(table.columns):
+                continue
+            data = SweepCharts.dataset(table, spec)
+            if data.empty:
+                continue
+            # Fixed margins (legend on the right): a layout engine would draw every figure twice
+            figure = Figure(figsize=(12, 7))
+            figure.subplots_adjust(left=0.08, right=0.78, top=0.88, bottom=0.1)
+            FigureCanvasAgg(figure)
+            axes = figure.add_subplot()
+            SweepCharts.__draw(axes, data, spec)
+            if spec.title:
+                axes.set_title(textwrap.fill(spec.title, 70))
+            path = Path(output_dir) / spec.path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            figure.savefig(path, dpi=dpi)
+            written.append(path)
+        return written
+
+    @staticmethod
+    def __draw(axes: Any, data: pd.DataFrame, spec: ChartSpec) -> None:
+        """Draw the data of a chart on matplotlib axes."""
+        metric = spec.metric.removesuffix(T_STAT_SUFFIX)
+        fmt = (
+            "{:.0%}"
+            if metric in PERCENT_METRICS and metric == spec.metric
+            else "{:.2f}"
+        )
+        x_labels = [SweepCharts.__label(value) for value in data.index]
+        series_labels = [SweepCharts.__label(value) for value in data.columns]
+        values = data.to_numpy(dtype=float)
+
+        if spec.kind == "heatmap":
+            image = axes.imshow(values, cmap="RdYlGn", aspect="auto")
+            axes.figure.colorbar(image, ax=axes, label=spec.metric)
+            axes.set_xticks(np.arange(values.shape[1]), series_labels)
+            axes.set_yticks(np.arange(values.shape[0]), x_labels)
+            for (row, column), value in np.ndenumerate(values):
+                if np.isfinite(value):
+                    axes.text(column, row, fmt.format(value), ha="center", va="center")
+            axes.set_xlabel(SweepCharts.__label(spec.series))
+            axes.set_ylabel(SweepCharts.__label(spec.x))
+            axes.figure.subplots_adjust(left=0.2, right=0.95)
+            return
+
+        positions = np.arange(values.shape[0])
+        if spec.kind == "line":
+            for i, label in enumerate(series_labels):
+                axes.plot(positions, values[:, i], marker="o", label=label)
+        else:
+            width = 0.8 / values.shape[1]
+            offsets = (np.arange(values.shape[1]) - (values.shape[1] - 1) / 2) * width
+            for i, label in enumerate(series_labels):
+                bars = axes.bar(positions + offsets[i], values[:, i], width, label=label)
+                axes.bar_label(
+                    bars, labels=[fmt.format(v) if np.isfinite(v) else "" for v in values[:, i]]
+                )
+        axes.set_xticks(positions, x_labels)
+        axes.axhline(0, color="grey", linewidth=0.8)
+        axes.grid(axis="y", alpha=0.3)
+        axes.set_xlabel(SweepCharts.__label(spec.x))
+        axes.set_ylabel(spec.metric)
+        if spec.series is not None:
+            axes.legend(
+                title=SweepCharts.__label(spec.series),
+                loc="center left",
+                bbox_to_anchor=(1, 0.5),
+            )
+
+    @staticmethod
+    def __label(value: Any) -> str:
+        """The display name of a column or a configuration value of the sweep table."""
+        return LABELS.get(value, str(value))
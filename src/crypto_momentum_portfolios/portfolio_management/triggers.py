@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from crypto_momentum_portfolios.portfolio_management.selection import (
+    select_top_k_for_rows,
+)
+from crypto_momentum_portfolios.utility.membership import MembershipMask
+from crypto_momentum_portfolios.utility.rebalance_calendar import (
+    RebalanceCalendar,
+    RebalanceSchedule,
+)
+from crypto_momentum_portfolios.utility.types import RankingMethod, RankingMode
+
+# A predicate over the universe (the field x asset panel) giving the rebalance dates, a boolean Series indexed by dates or an array aligned on the universe
+RebalancePredicate = Callable[[pd.DataFrame], Union[pd.Series, npt.ArrayLike]]
+
+
+def membership_changes(
+    selection: npt.NDArray[np.intp], valid: Optional[npt.NDArray[np.bool_]] = None
+) -> npt.NDArray[np.bool_]:
+    """Find the rows whose selected assets differ from the previous row, whatever their rank.
+
+    Args:
+    ----
+        selection (npt.NDArray[np.intp]): The `(row, k)` positions of the selected assets e.g. `select_top_k_for_rows` of every date.
+        valid (Optional[npt.NDArray[np.bool_]], optional): The valid slots of the selection, the invalid ones are not members. Defaults to None i.e. all the slots.
+
+    Returns:
+    ----
+        npt.NDArray[np.bool_]: Whether the selection changed at each row, False for the first one.
+    """
+    members = np.sort(selection if valid is None else np.where(valid, selection, -1), axis=1)
+    changes = np.zeros(members.shape[0], dtype=bool)
+    changes[1:] = (members[1:] != members[:-1]).any(axis=1)
+    return changes
+
+
+def first_drift_breach(
+    returns: npt.NDArray[np.float64],
+    weights: npt.NDArray[np.float64],
+    threshold: float,
+) -> Optional[int]:
+    """Find the first date after a rebalance where the drifted weights are further than `threshold` from the targets. The drift is the total absolute deviation `sum(|drifted - target|)` i.e. the turnover of a rebalance back to the targets.
+
+    The drifted weights of all the dates are computed at once: the weights held at the row `s` are the targets grown by the returns of the rows `0` (the rebalance date) to `s - 1`, as `weights_drift` does one date at a time.
+
+    Args:
+    ----
+        returns (npt.NDArray[np.float64]): The `(date, k)` returns of the held assets from the rebalance date (row 0).
+        weights (npt.NDArray[np.float64]): The `(k,)` target weights of the rebalance.
+        threshold (float): The drift firing a rebalance.
+
+    Returns:
+    ----
+        Optional[int]: The row of the first breach (at least 1), None when the drift stays below the threshold.
+    """
+    held = weights * np.cumprod(1 + returns[:-1], axis=0)
+    drift = np.abs(held / held.sum(axis=1, keepdims=True) - weights).sum(axis=1)
+    breaches = np.flatnonzero(drift > threshold)
+    return int(breaches[0]) + 1 if breaches.size else None
+
+
+@dataclass(frozen=True)
+class RebalanceTriggers:
+    """The events firing a rebalance of an event driven strategy, instead of (or on top of) a calendar. The portfolio is always rebalanced on the first date.
+
+    The top-k membership change, the predicate and the calendar do not depend on the portfolio, they are evaluated over the whole history at once by `to_calendar` (the result can be used by any engine taking a `RebalanceCalendar`). The drift depends on the targets of the previous rebalance, `PortfolioBacktester.run_strategy` scans the dates between two events with `first_drift_breach` and only allocates on the dates where a trigger fires.
+
+    Attributes:
+    ----
+        membership_change (bool): Rebalance when the top-k assets of the ranking change. Defaults to False.
+        drift_threshold (Optional[float]): Rebalance when the total absolute deviation of the drifted weights from the targets exceeds it (e.g. 0.1). Defaults to None i.e. no drift trigger.
+        predicate (Optional[RebalancePredicate]): Rebalance when it is True, it is given the universe e.g. `lambda universe: universe["volatility"].mean(axis=1) > 0.05`. Defaults to None.
+        schedule (Optional[RebalanceSchedule]): Also rebalance at the dates of this frequency or calendar e.g. a monthly floor. Defaults to None.
+    """
+
+    membership_change: bool = False
+    drift_threshold: Optional[float] = None
+    predicate: Optional[RebalancePredicate] = None
+    schedule: Optional[RebalanceSchedule] = None
+
+    def __post_init__(self):
+        assert (
+            self.drift_threshold is None or self.drift_threshold > 0
+        ), "The drift threshold must be positive"
+
+    def to_calendar(
+        self,
+        universe: pd.DataFrame,
+        ranking_method: RankingMethod = RankingMethod.EMA_MOMENTUM,
+        ranking_mode: RankingMode = RankingMode.DESCENDING,
+        select_top_k_assets: int = 5,
+        membership: Optional[MembershipMask] = None,
+    ) -> RebalanceCalendar:
+        """Evaluate the triggers not depending on the portfolio (all except the drift) over the whole history.
+
+        Args:
+        ----
+            universe (pd.DataFrame): The universe (MultiIndex columns field x asset).
+            ranking_method (RankingMethod, optional): The ranking field of the membership trigger. Defaults to RankingMethod.EMA_MOMENTUM.
+            ranking_mode (RankingMode, optional): The ranking order of the membership trigger. Defaults to RankingMode.DESCENDING.
+            select_top_k_assets (int, optional): The number of selected assets of the membership trigger. Defaults to 5.
+            membership (Optional[MembershipMask], optional): The eligibility of the assets, as for the selection of the strategy. Defaults to None.
+
+        Returns:
+        ----
+            RebalanceCalendar: The dates where a trigger fires, and the first date.
+        """
+        index = universe.index
+        mask = np.zeros(index.size, dtype=bool)
+        mask[:1] = True
+        if self.schedule is not None:
+            mask |= RebalanceCalendar.resolve(self.schedule, index).mask
+        if self.membership_change:
+            ranking_field = universe[ranking_method]
+            mask |= membership_changes(
+                *select_top_k_for_rows(
+                    ranking_field.to_numpy(dtype=float),
+                    select_top_k_assets,
+                    ascending=bool(ranking_mode),
+                    eligible=None
+                    if membership is None
+                    else membership.reindex(index).rows(
+                        np.arange(index.size), ranking_field.columns
+                    ),
+                )
+            )
+        if self.predicate is not None:
+            mask |= RebalanceCalendar.from_signal(index, self.predicate(universe)).mask
+        return RebalanceCalendar(index, mask)
@@ -0,0 +1,248 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+
+class WeightsHistory:
+    """
+    WeightsHistory is a compact store of the weights of a portfolio. Only the target weights set at the rebalance dates are recorded (CSR layout: int32 asset indices and float32 weights), the drifted daily weights are rebuilt on demand from the assets returns.
+
+    The drift follows `weights_drift`: the day of a rebalance the portfolio holds the target weights, the following days the weights are `target * growth / (growth @ target)` where `growth` is the cumulated gross return of each asset since the rebalance.
+
+    Private Attributes:
+    ----
+        __dates (pd.Index): The dates of the backtest.
+        __assets (pd.Index): The assets of the universe, the asset indices refer to it.
+        __returns (npt.NDArray[np.float64]): The `(date, asset)` returns used to drift the weights.
+        __positions (List[int]): The integer positions of the rebalance dates.
+        __offsets (List[int]): The CSR offsets, the targets of the i-th rebalance are in `[offsets[i], offsets[i+1])`.
+        __asset_indices (npt.NDArray[np.int32]): The held assets of all the rebalances.
+        __weights (npt.NDArray[np.float32]): The target weights of all the rebalances.
+        __diagnostics (Optional[pd.DataFrame]): The numerical diagnostics of the allocation of each rebalance (see `AllocationDiagnostics`), None if not recorded.
+    """
+
+    def __init__(
+        self,
+        dates: pd.Index,
+        assets: pd.Index,
+        returns: npt.NDArray[np.float64],
+    ) -> None:
+        """Constructor method.
+
+        Args:
+            dates (pd.Index): The dates of the backtest.
+            assets (pd.Index): The assets of the universe.
+            returns (npt.NDArray[np.float64]): The `(date, asset)` returns used to drift the weights, it is referenced and not copied.
+        """
+        assert returns.shape == (
+            dates.size,
+            assets.size,
+        ), "The returns must be a (date, asset) array"
+        self.__dates = dates
+        self.__assets = assets
+        self.__returns = returns
+        self.__positions: List[int] = []
+        self.__offsets: List[int] = [0]
+        self.__indices_chunks: List[npt.NDArray[np.int32]] = []
+        self.__weights_chunks: List[npt.NDArray[np.float32]] = []
+        self.__asset_indices = np.empty(0, dtype=np.int32)
+        self.__weights = np.empty(0, dtype=np.float32)
+        self.__diagnostics: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def from_arrays(
+        cls,
+        dates: pd.Index,
+        assets: pd.Index,
+        returns: npt.NDArray[np.float64],
+        positions: npt.NDArray[np.int64],
+        offsets: npt.NDArray[np.int64],
+        asset_indices: npt.NDArray[np.int32],
+        weights: npt.NDArray[np.float32],
+        diagnostics: Optional[Dict[str, npt.NDArray]] = None,
+    ) -> "WeightsHistory":
+        """Rebuild a history from its CSR arrays (e.g. loaded from a result store).
+
+        Args:
+        ----
+            diagnostics (Optional[Dict[str, npt.NDArray]], optional): The per rebalance diagnostics columns. Defaults to None.
+
+        Returns:
+        ----
+            WeightsHistory: The weights history.
+        """
+        history = cls(dates, assets, returns)
+        history.__positions = [int(p) for p in positions]
+        history.__offsets = [int(o) for o in offsets]
+        history.__asset_indices = np.asarray(asset_indices, dtype=np.int32)
+        history.__weights = np.asarray(weights, dtype=np.float32)
+        if diagnostics:
+            history.set_diagnostics(
+                pd.DataFrame(diagnostics, index=history.rebalance_dates)
+            )
+        return history
+
+    def add_rebalance(
+        self,
+        position: int,
+        asset_indices: npt.NDArray[np.int64],
+        weights: npt.NDArray[np.float64],
+    ) -> None:
+        """Record the target weights of a rebalance.
+
+        Args:
+        ----
+            position (int): The integer position of the rebalance date, it must be greater than the previous one.
+            asset_indices (npt.NDArray[np.int64]): The positions of the held assets in the universe assets.
+            weights (npt.NDArray[np.float64]): The target weights of the held assets.
+        """
+        assert (
+            not self.__positions or position > self.__positions[-1]
+        ), "The rebalances must be recorded in chronological order"
+        self.__positions.append(int(position))
+        self.__indices_chunks.append(np.asarray(asset_indices, dtype=np.int32))
+        self.__weights_chunks.append(np.asarray(weights, dtype=np.float32))
+        self.__offsets.append(self.__offsets[-1] + len(asset_indices))
+
+    def set_diagnostics(self, diagnostics: pd.DataFrame) -> None:
+        """Attach the numerical diagnostics of the allocations, one row per rebalance.
+
+        Args:
+        ----
+            diagnostics (pd.DataFrame): The diagnostics indexed by the rebalance dates.
+        """
+        assert diagnostics.shape[0] == len(
+            self
+        ), "The diagnostics must have one row per rebalance"
+        self.__diagnostics = diagnostics
+
+    def to_arrays(self) -> Dict[str, npt.NDArray]:
+        """Get the CSR arrays of the history.
+
+        Returns:
+        ----
+            Dict[str, npt.NDArray]: The `positions`, `offsets`, `asset_indices` and `weights` arrays, and the `diagnostics_<column>` arrays when diagnostics are attached.
+        """
+        self.__consolidate()
+        arrays = {
+            "positions": np.asarray(self.__positions, dtype=np.int64),
+            "offsets": np.asarray(self.__offsets, dtype=np.int64),
+            "asset_indices": self.__asset_indices,
+            "weights": self.__weights,
+        }
+        if self.__diagnostics is not None:
+            arrays.update(
+                {
+                    f"diagnostics_{column}": self.__diagnostics[column].to_numpy()
+                    for column in self.__diagnostics.columns
+                }
+            )
+        return arrays
+
+    @property
+    def dates(self) -> pd.Index:
+        return self.__dates
+
+    @property
+    def assets(self) -> pd.Index:
+        return self.__assets
+
+    @property
+    def rebalance_dates(self) -> pd.Index:
+        return self.__dates[self.__positions]
+
+    @property
+    def diagnostics(self) -> Optional[pd.DataFrame]:
+        return self.__diagnostics
+
+    def target_weights(self, rebalance: int) -> pd.Series:
+        """Get the target weights of a rebalance.
+
+        Args:
+        ----
+            rebalance (int): The rebalance number (0 for the first one).
+
+        Returns:
+        ----
+            pd.Series: The target weights of the held assets.
+        """
+        indices, weights = self.__target(rebalance)
+        return pd.Series(weights, index=self.__assets[indices], dtype=float)
+
+    def iter_daily_weights(
+        self,
+    ) -> Iterator[Tuple[pd.Index, npt.NDArray[np.int32], npt.NDArray[np.float64]]]:
+        """Lazily rebuild the drifted weights, one holding period at a time.
+
+        Yields:
+        ----
+            Tuple[pd.Index, npt.NDArray[np.int32], npt.NDArray[np.float64]]: The dates of the period, the held assets and the `(date, held asset)` weights.
+        """
+        self.__consolidate()
+        ends = self.__positions[1:] + [self.__dates.size]
+        for rebalance, (start, end) in enumerate(zip(self.__positions, ends)):
+            indices, target = self.__target(rebalance)
+            target = target.astype(np.float64)
+            weights = np.empty((end - start, indices.size))
+            weights[0] = target
+            if end - start > 1:
+                growth = np.cumprod(
+                    1 + np.nan_to_num(self.__returns[start : end - 1, indices]), axis=0
+                )
+                drifted = target * growth
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    weights[1:] = drifted / drifted.sum(axis=1, keepdims=True)
+            yield self.__dates[start:end], indices, weights
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Explicitly build the dense (dates x held assets) drifted weights DataFrame.
+
+        Returns:
+        ----
+            pd.DataFrame: The daily weights, 0 for the assets not held and before the first rebalance.
+        """
+        self.__consolidate()
+        held = np.unique(self.__asset_indices)
+        columns_position = np.full(self.__assets.size, -1)
+        columns_position[held] = np.arange(held.size)
+        dense = np.zeros((self.__dates.size, held.size))
+        for start, (dates, indices, weights) in zip(
+            self.__positions, self.iter_daily_weights()
+        ):
+            dense[start : start + dates.size, columns_position[indices]] = weights
+        return pd.DataFrame(dense, index=self.__dates, columns=self.__assets[held])
+
+    def mean_weights(self) -> pd.Series:
+        """Compute the average daily weight of each held asset without building the dense DataFrame.
+
+        Returns:
+        ----
+            pd.Series: The average weights.
+        """
+        totals = np.zeros(self.__assets.size)
+        n_dates = 0
+        for dates, indices, weights in self.iter_daily_weights():
+            np.add.at(totals, indices, np.nan_to_num(weights).sum(axis=0))
+            n_dates += dates.size
+        held = np.unique(self.__asset_indices)
+        return pd.Series(totals[held] / max(n_dates, 1), index=self.__assets[held])
+
+    def __target(
+        self, rebalance: int
+    ) -> Tuple[npt.NDArray[np.int32], npt.NDArray[np.float32]]:
+        self.__consolidate()
+        start, end = self.__offsets[rebalance], self.__offsets[rebalance + 1]
+        return self.__asset_indices[start:end], self.__weights[start:end]
+
+    def __consolidate(self) -> None:
+        """Move the recorded chunks into the contiguous CSR arrays."""
+        if self.__indices_chunks:
+            self.__asset_indices = np.concatenate(
+                [self.__asset_indices, *self.__indices_chunks]
+            )
+            self.__weights = np.concatenate([self.__weights, *self.__weights_chunks])
+            self.__indices_chunks, self.__weights_chunks = [], []
+
+    def __len__(self) -> int:
+        return len(self.__positions)
@@ -0,0 +1,205 @@
+from collections import OrderedDict
+import hashlib
+import sys
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple, TypeVar
+import numpy as np
+import pandas as pd
+from crypto_momentum_portfolios.utility.constants import SHARED_CACHE_MAX_BYTES
+
+T = TypeVar("T")
+
+
+class SharedResourceCache:
+    """
+    SharedResourceCache is a thread safe store for the resources that are expensive to build and can be shared between independent instances: the loaded data panels, the benchmarks returns and the indicators.
+
+    The resources are stored by namespace and key, a resource is computed once even if several threads ask for it at the same time. The cached objects are shared, they must not be modified in place. A cache given a budget (a number of resources and/or bytes, see `resource_nbytes`) evicts its least recently used resources when a new one exceeds it, an evicted resource is computed again when it is asked for.
+
+    Private Attributes:
+    ----
+        __items (OrderedDict[Tuple[str, Hashable], Any]): The resources, the least recently used first.
+        __sizes (Dict[Tuple[str, Hashable], int]): The size in bytes of each resource.
+        __max_entries (Optional[int]): The maximum number of resources.
+        __max_bytes (Optional[int]): The maximum total size in bytes of the resources.
+
+    Methods:
+    ----
+        get_or_compute(namespace: str, key: Hashable, factory: Callable[[], T]) -> T: Get a resource, build it with the factory if it is missing.
+        invalidate(namespace: Optional[str] = None, predicate: Optional[Callable[[Hashable], bool]] = None) -> None: Drop some resources of a namespace, a namespace or the whole cache.
+        items(namespace: str) -> List[Tuple[Hashable, Any]]: List the resources of a namespace.
+        nbytes() -> int: The total size in bytes of the resources.
+    """
+
+    def __init__(
+        self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> None:
+        """Constructor method.
+
+        Args:
+        ----
+            max_entries (Optional[int], optional): The maximum number of resources. Defaults to None i.e. no limit.
+            max_bytes (Optional[int], optional): The maximum total size in bytes of the resources, a single resource larger than it is still kept until the next one is stored. Defaults to None i.e. no limit.
+        """
+        assert max_entries is None or max_entries > 0, "max_entries must be positive"
+        assert max_bytes is None or max_bytes > 0, "max_bytes must be positive"
+        self.__items: "OrderedDict[Tuple[str, Hashable], Any]" = OrderedDict()
+        self.__sizes: Dict[Tuple[str, Hashable], int] = {}
+        self.__max_entries = max_entries
+        self.__max_bytes = max_bytes
+        self.__keys_locks: Dict[Tuple[str, Hashable], threading.Lock] = {}
+        self.__lock = threading.Lock()
+
+    def get_or_compute(self, namespace: str, key: Hashable, factory: Callable[[], T]) -> T:
+        """Get a resource from the cache, build it with the factory if it is missing.
+
+        Args:
+        ----
+            namespace (str): The kind of resource e.g. "benchmarks".
+            key (Hashable): The parameters identifying the resource.
+            factory (Callable[[], T]): The function building the resource.
+
+        Returns:
+        ----
+            T: The cached resource.
+        """
+        full_key = (namespace, key)
+        with self.__lock:
+            if full_key in self.__items:
+                self.__items.move_to_end(full_key)
+                return self.__items[full_key]
+            key_lock = self.__keys_locks.setdefault(full_key, threading.Lock())
+        # Only the threads asking for the same resource wait for each other
+        with key_lock:
+            with self.__lock:
+                if full_key in self.__items:
+                    return self.__items[full_key]
+            value = factory()
+            size = resource_nbytes(value) if self.__max_bytes is not None else 0
+            with self.__lock:
+                self.__items[full_key] = value
+                self.__sizes[full_key] = size
+                self.__keys_locks.pop(full_key, None)
+                self.__evict()
+        return value
+
+    def __evict(self) -> None:
+        """Drop the least recently used resources until the cache is within its budget, the last stored resource is kept."""
+        total = sum(self.__sizes.values())
+        while len(self.__items) > 1 and (
+            (self.__max_entries is not None and len(self.__items) > self.__max_entries)
+            or (self.__max_bytes is not None and total > self.__max_bytes)
+        ):
+            full_key, _ = self.__items.popitem(last=False)
+            total -= self.__sizes.pop(full_key)
+
+    def invalidate(
+        self,
+        namespace: Optional[str] = None,
+        predicate: Optional[Callable[[Hashable], bool]] = None,
+    ) -> None:
+        """Drop the resources of a namespace, or the whole cache.
+
+        Args:
+        ----
+            namespace (Optional[str], optional): The namespace to drop, all of them if None. Defaults to None.
+            predicate (Optional[Callable[[Hashable], bool]], optional): Only drop the resources of the namespace whose key matches, e.g. the resources of a single owner. Defaults to None i.e. the whole namespace.
+        """
+        with self.__lock:
+            if namespace is None:
+                self.__items.clear()
+                self.__sizes.clear()
+            else:
+                for full_key in [
+                    k
+                    for k in self.__items
+                    if k[0] == namespace and (predicate is None or predicate(k[1]))
+                ]:
+                    del self.__items[full_key]
+                    del self.__sizes[full_key]
+
+    def items(self, namespace: str) -> List[Tuple[Hashable, Any]]:
+        """List the resources of a namespace, e.g. to update them instead of dropping them.
+
+        Args:
+        ----
+            namespace (str): The namespace to list.
+
+        Returns:
+        ----
+            List[Tuple[Hashable, Any]]: The keys and the resources.
+        """
+        with self.__lock:
+            return [(k[1], v) for k, v in self.__items.items() if k[0] == namespace]
+
+    def nbytes(self) -> int:
+        """The total size in bytes of the resources, 0 when the cache has no bytes budget (the sizes are not measured)."""
+        with self.__lock:
+            return sum(self.__sizes.values())
+
+    def __contains__(self, full_key: Tuple[str, Hashable]) -> bool:
+        with self.__lock:
+            return full_key in self.__items
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__items)
+
+
+def dataframe_fingerprint(dataframe: pd.DataFrame) -> str:
+    """Compute a content hash of a numeric DataFrame (index, columns and values), used to key the resources derived from a universe.
+
+    Args:
+    ----
+        dataframe (pd.DataFrame): The DataFrame to hash.
+
+    Returns:
+    ----
+        str: The hexadecimal fingerprint.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        pd.util.hash_pandas_object(dataframe.index, index=False).to_numpy().tobytes()
+    )
+    digest.update(repr(dataframe.columns.to_list()).encode())
+    digest.update(
+        np.ascontiguousarray(dataframe.to_numpy(dtype=np.float64)).tobytes()
+    )
+    return digest.hexdigest()
+
+
+def resource_nbytes(resource: Any, _seen: Optional[Set[int]] = None) -> int:
+    """Estimate the memory held by a cached resource: the buffers of the arrays, DataFrames and Series, the contents of the containers and the attributes of the other objects (e.g. a `CandleStore`), each object is counted once.
+
+    Args:
+    ----
+        resource (Any): The resource.
+
+    Returns:
+    ----
+        int: The estimated size in bytes.
+    """
+    seen = set() if _seen is None else _seen
+    if id(resource) in seen:
+        return 0
+    seen.add(id(resource))
+    if isinstance(resource, (pd.DataFrame, pd.Series)):
+        return int(resource.memory_usage(index=True, deep=False).sum())
+    if isinstance(resource, pd.Index):
+        return int(resource.memory_usage(deep=False))
+    if isinstance(resource, np.ndarray):
+        return int(resource.nbytes)
+    if isinstance(resource, dict):
+        return sum(
+            resource_nbytes(k, seen) + resource_nbytes(v, seen)
+            for k, v in resource.items()
+        )
+    if isinstance(resource, (list, tuple, set, frozenset)):
+        return sum(resource_nbytes(item, seen) for item in resource)
+    if hasattr(resource, "__dict__") and not callable(resource):
+        return resource_nbytes(vars(resource), seen)
+    return sys.getsizeof(resource)
+
+
+# The cache shared by default by the data loaders, the backtesters and the benchmark suite
+SHARED_CACHE = SharedResourceCache(max_bytes=SHARED_CACHE_MAX_BYTES)
@@ -35,6 +35,8 @@ else:
 
 TRANSACTION_COST = 0.001  # Binance taker spot fees
 SLIPPAGE_EFFECT = 0.0005  # 0.05% slippage effect
+PERIODS_PER_YEAR = 365  # Crypto markets trade every day
+SHARED_CACHE_MAX_BYTES = 2 * 1024**3  # The least recently used shared resources are evicted above 2 GiB
 
 
 PERCENT_METRICS = [
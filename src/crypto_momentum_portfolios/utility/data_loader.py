@@ -1,18 +1,51 @@
 from __future__ import annotations
-from typing import Callable, Final, List, Literal, Optional, Self, Union, Dict, Unpack
+import os
+from typing import (
+    Callable,
+    Final,
+    Hashable,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Self,
+    Union,
+    Dict,
+    Unpack,
+)
 import pandas as pd
-from quant_invest_lab.data_provider import CryptoService, build_multi_crypto_dataframe
-from crypto_momentum_portfolios.portfolio_management.indicators import Indicators
+from crypto_momentum_portfolios.portfolio_management.incremental import (
+    IncrementalIndicators,
+    IndicatorState,
+)
+from crypto_momentum_portfolios.portfolio_management.indicators import (
+    Indicators,
+    LookbackPanel,
+)
+from crypto_momentum_portfolios.portfolio_management.kernels import KernelWorkspace
+from crypto_momentum_portfolios.utility.cache import (
+    SHARED_CACHE,
+    SharedResourceCache,
+    dataframe_fingerprint,
+)
 from crypto_momentum_portfolios.utility.constants import (
     CRYPTOS,
     DATA_PATH,
 )
+from crypto_momentum_portfolios.utility.data_provider import (
+    CandleProvider,
+    CandleStore,
+    QuantInvestLabProvider,
+)
+from crypto_momentum_portfolios.utility.membership import MembershipMask
+from crypto_momentum_portfolios.utility.panel_file import PanelFile
 
 from crypto_momentum_portfolios.utility.types import (
     CryptoName,
     DataFrequency,
     Fields,
     GetCryptoKwargs,
+    IndicatorBackend,
 )
 
 INDICATOR_MAPPING: Dict[
@@ -38,87 +71,164 @@ INDICATOR_MAPPING: Dict[
 }
 
 
-class CryptoDataLoaderQIL:
-    """
-    CryptoDataLoaderQIL is a singleton class for loading and managing crypto data from Quant Invest Lab libray
+def compute_cached_indicator(
+    crypto_dataframe: pd.DataFrame,
+    field: Fields,
+    cache: Optional[SharedResourceCache] = None,
+    cache_key: Hashable = None,
+    **kwargs: GetCryptoKwargs,
+) -> pd.DataFrame:
+    """Compute an indicator of the `INDICATOR_MAPPING` or get it from the cache when it was already computed with the same parameters.
 
-    Protected Attributes:
+    Args:
     ----
-        _instance (Optional[CryptoDataLoaderQIL]): The singleton instance of CryptoDataLoader.
+        crypto_dataframe (pd.DataFrame): The prices (dates x assets).
+        field (Fields): The indicator to compute.
+        cache (Optional[SharedResourceCache], optional): The cache sharing the indicators, no caching if None. Defaults to None.
+        cache_key (Hashable, optional): The key identifying the prices in the cache. Defaults to None.
 
+        **kwargs: The optional arguments to pass to the indicators functions.
+
+    Returns:
+    ----
+        pd.DataFrame: The indicator, it must not be modified in place when it comes from the cache.
+    """
+    if cache is None:
+        return INDICATOR_MAPPING[field](crypto_dataframe, **kwargs)
+    # The scratch buffers do not change the indicator
+    key = (
+        cache_key,
+        str(field),
+        tuple(sorted((k, v) for k, v in kwargs.items() if k != "kernel_workspace")),
+    )
+    if IncrementalIndicators.supports(field, **kwargs):
+        # The state is kept next to the indicator so that the new bars can be appended without recomputing the history
+        state = cache.get_or_compute(
+            "indicator_states",
+            key,
+            lambda: IncrementalIndicators.initialize(crypto_dataframe, field, **kwargs),
+        )
+        return cache.get_or_compute("indicators", key, state.frame)
+    return cache.get_or_compute(
+        "indicators",
+        key,
+        lambda: INDICATOR_MAPPING[field](crypto_dataframe, **kwargs),
+    )
+
+
+class CryptoDataLoaderQIL:
+    """
+    CryptoDataLoaderQIL is a class for loading and managing crypto data from Quant Invest Lab libray. The loaded panel, the candles and the computed indicators are shared between the instances through a `SharedResourceCache` so the data is downloaded once per process.
 
     Private Attributes:
     ----
+        __cache (SharedResourceCache): The cache holding the loaded panel, the candles and the indicators.
+        __provider (CandleProvider): The candles source, quant_invest_lab by default.
+        __store (CandleStore): The candles of the cryptos, appended by `refresh`.
         __data (pd.DataFrame): The wrangled crypto data.
         __assets (List[str]): The list of crypto assets.
 
     Methods:
     ----
-        __init__(): Initialize the CryptoDataLoaderQIL instance.
-        __load_data() -> pd.DataFrame: Load and wrangle crypto data from the CSV file.
+        __init__(cache: SharedResourceCache, provider: Optional[CandleProvider], max_workers: int): Initialize the CryptoDataLoaderQIL instance.
+        __load_data() -> pd.DataFrame: Fetch the candles and build the crypto data.
+        refresh() -> Dict[str, int]: Append the new bars.
         get_crypto(crypto_name: Union[Union[CryptoName, Literal["all"]], List[CryptoName]]) -> Union[pd.Series, pd.DataFrame]:
             Factory method to get crypto data from the data loader.
         assets() -> List[str]: Get the list of available crypto assets.
-        __wrangle_data(raw_dataframe: pd.DataFrame) -> pd.DataFrame: Perform data wrangling on raw dataframe.
-        __new__() -> Self: Singleton pattern to get the data loader instance.
     """
 
-    _instance: Optional[Self] = None
-
-    def __init__(self):
-        self.__data = self.__load_data()
+    def __init__(
+        self,
+        cache: SharedResourceCache = SHARED_CACHE,
+        provider: Optional[CandleProvider] = None,
+        max_workers: int = 8,
+    ):
+        self.__cache = cache
+        # A custom provider (e.g. fixtures) never shares the panel of the default one
+        self.__provider = QuantInvestLabProvider() if provider is None else provider
+        self.__max_workers = max_workers
+        self.__panel_key = (
+            ("qil_panel", tuple(sorted(CRYPTOS)), "1day")
+            if provider is None
+            else ("qil_panel", tuple(sorted(CRYPTOS)), "1day", provider)
+        )
+        self.__store = self.__cache.get_or_compute(
+            "qil_candles", self.__panel_key[1:], lambda: CandleStore("1day")
+        )
+        self.__data = self.__cache.get_or_compute(
+            self.__panel_key[0], self.__panel_key[1:], self.__load_data
+        )
         self.__assets = self.__data["price"].columns.to_list()
 
     def __load_data(self) -> pd.DataFrame:
-        """Get the crypto data from the csv file and wrangle it.
+        """Fetch the candles of the cryptos once each, concurrently, and derive the price, volume, amount and market cap fields from them.
 
         Returns:
             pd.DataFrame: The wrangled crypto data.
         """
-        CryptoService().refresh_list_of_symbols()
-        price_df = self.__wrangle_data(
-            build_multi_crypto_dataframe(
-                CRYPTOS, timeframe="1day", column_to_keep="Close" # Close
-            ),
-            "_Close", # _Close
-            "price",
-        )
-        amount_df = self.__wrangle_data(
-            build_multi_crypto_dataframe(
-                CRYPTOS, timeframe="1day", column_to_keep="Amount"
-            ),
-            "_Amount",
-            "amount",
-        )
-        volume_df = self.__wrangle_data(
-            build_multi_crypto_dataframe(
-                CRYPTOS, timeframe="1day", column_to_keep="Volume"
-            ),
-            "_Volume",
-            "volume",
-        )
-        merged_universe = pd.merge(
-            pd.merge(
-                price_df,
-                volume_df,
-                left_index=True,
-                right_index=True,
-            ),
-            amount_df,
-            left_index=True,
-            right_index=True,
-        )
+        self.__store.update(self.__provider, CRYPTOS, self.__max_workers)
+        return self.__store.build_panel(CRYPTOS)
 
-        mkt_cap_df = merged_universe["price"] * merged_universe["amount"]
-        mkt_cap_df.columns = pd.MultiIndex.from_product(
-            [["market_cap"], mkt_cap_df.columns]
+    def refresh(self) -> Dict[str, int]:
+        """Append the bars published since the last load: only the candles after the last cached timestamp of each crypto are fetched. When new bars arrived the panel is rebuilt, the momentum, volatility and ema_momentum computed on it are extended with the new bars only (see `IncrementalIndicators`) and its other cached indicators are dropped, the resources of the other loaders sharing the cache are kept.
+
+        Returns:
+            Dict[str, int]: The number of new bars of each crypto.
+        """
+        appended = self.__store.update(self.__provider, CRYPTOS, self.__max_workers)
+        if any(appended.values()):
+            data = self.__store.build_panel(CRYPTOS)
+            # Only the resources of this panel are dropped, the other loaders sharing the cache keep theirs
+            states = [
+                (key, state)
+                for key, state in self.__cache.items("indicator_states")
+                if self.__owns(key)
+            ]
+            self.__cache.invalidate(
+                self.__panel_key[0], lambda key: key == self.__panel_key[1:]
+            )
+            self.__cache.invalidate("indicators", self.__owns)
+            self.__cache.invalidate("indicator_states", self.__owns)
+            self.__data = self.__cache.get_or_compute(
+                self.__panel_key[0], self.__panel_key[1:], lambda: data
+            )
+            self.__assets = self.__data["price"].columns.to_list()
+            for key, state in states:
+                self.__update_indicator(key, state)
+        return appended
+
+    def __owns(self, key: Hashable) -> bool:
+        """Whether an indicator key of the cache was computed on the panel of this loader, see `compute_cached_indicator`."""
+        return (
+            isinstance(key, tuple)
+            and isinstance(key[0], tuple)
+            and key[0][:1] == (self.__panel_key,)
         )
-        return pd.merge(
-            merged_universe,
-            mkt_cap_df,
-            left_index=True,
-            right_index=True,
+
+    def __update_indicator(self, key: Hashable, state: IndicatorState) -> None:
+        """Extend a cached indicator of the panel with the new bars and cache it again, it is left to be recomputed on demand when its prices are not the previous ones followed by new dates.
+
+        Args:
+        ----
+            key (Hashable): The cache key of the indicator, see `compute_cached_indicator`.
+            state (IndicatorState): The state of the indicator on the previous panel.
+        """
+        (panel_key, crypto_name, data_frequency, _), field, kwargs = key
+        prices = self.__select_cryptos(
+            list(crypto_name) if isinstance(crypto_name, tuple) else crypto_name
+        ).asfreq(data_frequency)["price"]
+        if not state.extends(prices):
+            return
+        state = IncrementalIndicators.update(state, prices)
+        # The indicator is cached again under the fingerprint of the new prices
+        key = (
+            (panel_key, crypto_name, data_frequency, dataframe_fingerprint(prices)),
+            field,
+            kwargs,
         )
+        self.__cache.get_or_compute("indicator_states", key, lambda: state)
+        self.__cache.get_or_compute("indicators", key, state.frame)
 
     def __select_cryptos(
         self,
@@ -155,6 +265,7 @@ class CryptoDataLoaderQIL:
         data_frequency: DataFrequency = DataFrequency.DAILY,
         fields: list[Fields] = [Fields.PRICE],
         flatten_fields_with_crypto: bool = False,
+        panel_path: Optional[Union[str, os.PathLike]] = None,
         **kwargs: GetCryptoKwargs,
     ) -> pd.DataFrame:
         """Factory method to get crypto data from the data loader. The method can return a single crypto series or a dataframe of multiple crypto series. You can use the `all` keyword to get all the crypto series. To check the crypto available use the `assets` property.
@@ -165,7 +276,7 @@ class CryptoDataLoaderQIL:
             data_frequency (DataFrequency, optional): The wanted frequency for the data. It uses `asfreq` function. Defaults to "daily".
             fields (list[Fields], optional): The fields to retrieve, the default field that will always be retrieved is price. Defaults to None.
             flatten_fields_with_crypto (bool, optional): Whether to flatten the crypto's names and the fields. If this field is true the result has not a MultiIndex. e.g.: BTC_price, BTC_momentum... Defaults to False.
-
+            panel_path (Optional[Union[str, os.PathLike]], optional): An Arrow IPC file (e.g. "universe.arrow") shared by the notebooks: when it holds the panel of the same cryptos, frequency, fields, lookbacks and data it is memory-mapped instead of computing the indicators, else the panel is computed and exported to it. The other kernels can also attach it without a data loader with `PanelFile.attach`. An attached panel is read-only (an in place assignment raises a ValueError) while a built one is writable, call `.copy()` on the result before modifying it. Defaults to None i.e. no file.
 
             **kwargs: The optional arguments to pass to the indicators functions it could be : `momentum_lookback`, `volatility_lookback`, `long_ma_lookback`, `short_ma_lookback`, `long_ema_lookback`, `short_ema_lookback`
 
@@ -176,7 +287,36 @@ class CryptoDataLoaderQIL:
         # Extract the wanted cryptos and resample the data to the wanted frequency
         df = self.__select_cryptos(crypto_name=crypto_name).asfreq(data_frequency)
 
-        result = self.___construct_indicators_dataframe(df, fields=fields, **kwargs)
+        def build() -> pd.DataFrame:
+            return self.___construct_indicators_dataframe(
+                df,
+                fields=fields,
+                cache=self.__cache,
+                cache_key=(
+                    self.__panel_key,
+                    tuple(crypto_name) if isinstance(crypto_name, list) else crypto_name,
+                    str(data_frequency),
+                    # The indicators of other prices (e.g. before a refresh) are never reused
+                    dataframe_fingerprint(df["price"]),
+                ),
+                **kwargs,
+            )
+
+        if panel_path is None:
+            result = build()
+        else:
+            result = PanelFile.attach_or_export(
+                panel_path,
+                {
+                    "loader": type(self).__name__,
+                    "crypto_name": crypto_name,
+                    "data_frequency": data_frequency,
+                    "fields": list(fields),
+                    "kwargs": kwargs,
+                    "data_fingerprint": dataframe_fingerprint(df),
+                },
+                build,
+            )
         if flatten_fields_with_crypto:
             result.columns = (
                 result.columns.get_level_values(1)
@@ -185,6 +325,56 @@ class CryptoDataLoaderQIL:
             )
         return result
 
+    def get_membership(
+        self,
+        crypto_name: Union[Union[CryptoName, Literal["all"]], List[CryptoName]] = "all",
+        data_frequency: DataFrequency = DataFrequency.DAILY,
+        min_volume: Optional[float] = None,
+        volume_lookback: int = 30,
+        max_market_cap_rank: Optional[int] = None,
+    ) -> MembershipMask:
+        """Build the eligibility mask of the cryptos on the whole history of the panel. The panel holds today's `CRYPTOS`, the mask flags the dates before the listing of each one (and the illiquid or small ones) so they are excluded by the selection and the benchmarks instead of being ranked last as NaN.
+
+        Args:
+        ----
+            crypto_name (Union[Union[CryptoName, Literal[&quot;all&quot;]], List[CryptoName]], optional): Whether you want to get a single crypto history, several cryptos or even the whole cryptos of the universe with `all`. Defaults to "all".
+            data_frequency (DataFrequency, optional): The wanted frequency for the data. It uses `asfreq` function. Defaults to "daily".
+            min_volume (Optional[float], optional): The minimum average volume, no liquidity rule if None. Defaults to None.
+            volume_lookback (int, optional): The number of dates of the average volume. Defaults to 30.
+            max_market_cap_rank (Optional[int], optional): The number of largest capitalizations eligible each date, no size rule if None. Defaults to None.
+
+        Returns:
+        ----
+            MembershipMask: The packed (date x asset) eligibility, pass it to `PortfolioBacktester`.
+        """
+        df = self.__select_cryptos(crypto_name=crypto_name).asfreq(data_frequency)
+        return MembershipMask.from_universe(
+            df, min_volume, volume_lookback, max_market_cap_rank
+        )
+
+    def get_lookback_sweep(
+        self,
+        lookbacks: Iterable[int],
+        crypto_name: Union[Union[CryptoName, Literal["all"]], List[CryptoName]] = "all",
+        data_frequency: DataFrequency = DataFrequency.DAILY,
+        fields: list[Fields] = [Fields.MOMENTUM, Fields.EMA_MOMENTUM, Fields.VOLATILITY],
+    ) -> Dict[Fields, LookbackPanel]:
+        """Compute lookback dependent indicators for a whole array of lookbacks at once instead of calling `get_crypto` for each lookback.
+
+        Args:
+        ----
+            lookbacks (Iterable[int]): The lookbacks to compute e.g. `np.arange(10, 100, 10)`.
+            crypto_name (Union[Union[CryptoName, Literal[&quot;all&quot;]], List[CryptoName]], optional): Whether you want to get a single crypto history, several cryptos or even the whole cryptos of the universe with `all`. Defaults to "all".
+            data_frequency (DataFrequency, optional): The wanted frequency for the data. It uses `asfreq` function. Defaults to "daily".
+            fields (list[Fields], optional): The indicators to compute. Defaults to [Fields.MOMENTUM, Fields.EMA_MOMENTUM, Fields.VOLATILITY].
+
+        Returns:
+        ----
+            Dict[Fields, LookbackPanel]: The `(lookback, date, asset)` panels indexed by field.
+        """
+        df = self.__select_cryptos(crypto_name=crypto_name).asfreq(data_frequency)
+        return Indicators.lookback_sweep(df["price"], lookbacks, fields)
+
     @property
     def assets(self) -> list[str]:
         """Property to get the list of cryptos available in the data loader.
@@ -198,6 +388,8 @@ class CryptoDataLoaderQIL:
     def ___construct_indicators_dataframe(
         crypto_dataframe: pd.DataFrame,
         fields: list[Fields] = [Fields.PRICE, Fields.MARKET_CAP],
+        cache: Optional[SharedResourceCache] = None,
+        cache_key: Hashable = None,
         **kwargs: GetCryptoKwargs,
     ) -> pd.DataFrame:
         """Handle the indicators to compute on the initial crypto data.
@@ -206,6 +398,8 @@ class CryptoDataLoaderQIL:
         ----
             crypto_dataframe (pd.DataFrame): The crypto data.
             fields (list[Fields]): The list of indicators to compute.
+            cache (Optional[SharedResourceCache], optional): The cache sharing the indicators between the calls, no caching if None. Defaults to None.
+            cache_key (Hashable, optional): The key identifying the crypto data in the cache. Defaults to None.
 
             **kwargs: The optional arguments to pass to the indicators functions it could be : `momentum_lookback`, `volatility_lookback`
 
@@ -222,13 +416,19 @@ class CryptoDataLoaderQIL:
         assert unique_fields.issubset(
             INDICATOR_MAPPING.keys()
         ), f"Invalid field name, please use one of the following : {','.join(INDICATOR_MAPPING.keys())},"
+        if kwargs.get("indicator_backend") == IndicatorBackend.NUMPY:
+            # The numpy kernels of all the indicators of the panel share their scratch buffers
+            kwargs.setdefault("kernel_workspace", KernelWorkspace())
 
         for field in unique_fields:
             # Compute the wanted indicator in the mapping dict for the given initial crypto_dataframe (w/o multiindex)
-            df_indicator = INDICATOR_MAPPING[field](crypto_dataframe["price"], **kwargs)
-            df_indicator.columns = pd.MultiIndex.from_product(
-                [[field], crypto_dataframe["price"].columns]
-            )  # Create the multiindex columns for this indicator
+            df_indicator = compute_cached_indicator(
+                crypto_dataframe["price"], field, cache, cache_key, **kwargs
+            )
+            # Create the multiindex columns for this indicator (the cached indicator is left untouched)
+            df_indicator = df_indicator.set_axis(
+                pd.MultiIndex.from_product([[field], crypto_dataframe["price"].columns]), axis=1
+            )
             # Merge the indicator dataframe with the final dataframe
             crypto_dataframe = pd.merge(
                 crypto_dataframe,
@@ -238,87 +438,36 @@ class CryptoDataLoaderQIL:
             )
         return crypto_dataframe[fields]
 
-    @staticmethod
-    def __wrangle_data(
-        raw_dataframe: pd.DataFrame,
-        to_remove: Optional[str] = None,
-        first_column_level: str = "price",
-    ) -> pd.DataFrame:
-        """Perform data wrangling on raw dataframe the steps are :
-        - Convert date column to datetime
-        - Set multiindex
-        - Change frequency to daily
-
-        Args:
-        ----
-            raw_dataframe (pd.DataFrame): The raw dataframe from a csv file.
-            to_remove (str): The suffix of prefix to remove
-            first_column_level (str, optional): The level to create for the columns. Defaults to "price".
-
-        Returns:
-        ----
-            pd.DataFrame: The wrangled dataframe.
-        """
-        raw_dataframe.index = raw_dataframe.index.map(
-            lambda x: x.replace(hour=0, minute=0, second=0, microsecond=0)
-        )
-        if to_remove is not None:
-            raw_dataframe.columns = pd.MultiIndex.from_product(
-                [
-                    [first_column_level],
-                    raw_dataframe.columns.map(lambda x: x.replace(to_remove, "")),
-                ]
-            )
-        else:
-            raw_dataframe.columns = pd.MultiIndex.from_product(
-                [[first_column_level], raw_dataframe.columns]
-            )
-
-        return raw_dataframe.asfreq("1D")
-
-    def __new__(cls) -> Self:
-        """Singleton pattern to get the data loader instance.
-
-        Returns:
-        ----
-            Self: The only one allowed data loader instance.
-        """
-        if cls._instance is None:
-            cls._instance = super(CryptoDataLoaderQIL, cls).__new__(cls)
-        return cls._instance
-
 
 class CryptoDataLoader:
     """
-    CryptoDataLoader is a singleton class for loading and managing crypto data.
-
-    Protected Attributes:
-    ----
-        _instance (Optional[CryptoDataLoader]): The singleton instance of CryptoDataLoader.
-
+    CryptoDataLoader is a class for loading and managing crypto data. The loaded panel and the computed indicators are shared between the instances through a `SharedResourceCache` so the CSV file is parsed once per process.
 
     Private Attributes:
     ----
         __PATH (Final): The path to the crypto data CSV file.
+        __cache (SharedResourceCache): The cache holding the loaded panel and the indicators.
         __data (pd.DataFrame): The wrangled crypto data.
         __assets (List[str]): The list of crypto assets.
 
     Methods:
     ----
-        __init__(): Initialize the CryptoDataLoader instance.
+        __init__(cache: SharedResourceCache): Initialize the CryptoDataLoader instance.
         __load_data() -> pd.DataFrame: Load and wrangle crypto data from the CSV file.
         get_crypto(crypto_name: Union[Union[CryptoName, Literal["all"]], List[CryptoName]]) -> Union[pd.Series, pd.DataFrame]:
             Factory method to get crypto data from the data loader.
         assets() -> List[str]: Get the list of available crypto assets.
         __wrangle_data(raw_dataframe: pd.DataFrame) -> pd.DataFrame: Perform data wrangling on raw dataframe.
-        __new__() -> Self: Singleton pattern to get the data loader instance.
     """
 
-    _instance: Optional[Self] = None
     __PATH: Final = DATA_PATH
 
-    def __init__(self):
-        self.__data = self.__load_data()
+    def __init__(self, cache: SharedResourceCache = SHARED_CACHE):
+        self.__cache = cache
+        self.__panel_key = ("csv_panel", self.__PATH)
+        self.__data = self.__cache.get_or_compute(
+            self.__panel_key[0], self.__panel_key[1:], self.__load_data
+        )
         self.__assets = self.__data.columns.to_list()
 
     def __load_data(self) -> pd.DataFrame:
@@ -364,6 +513,7 @@ class CryptoDataLoader:
         data_frequency: DataFrequency = DataFrequency.DAILY,
         fields: list[Fields] = [Fields.PRICE],
         flatten_fields_with_crypto: bool = False,
+        panel_path: Optional[Union[str, os.PathLike]] = None,
         **kwargs: GetCryptoKwargs,
     ) -> pd.DataFrame:
         """Factory method to get crypto data from the data loader. The method can return a single crypto series or a dataframe of multiple crypto series. You can use the `all` keyword to get all the crypto series. To check the crypto available use the `assets` property.
@@ -374,7 +524,7 @@ class CryptoDataLoader:
             data_frequency (DataFrequency, optional): The wanted frequency for the data. It uses `asfreq` function. Defaults to "daily".
             fields (list[Fields], optional): The fields to retrieve, the default field that will always be retrieved is price. Defaults to None.
             flatten_fields_with_crypto (bool, optional): Whether to flatten the crypto's names and the fields. If this field is true the result has not a MultiIndex. e.g.: BTC_price, BTC_momentum... Defaults to False.
-
+            panel_path (Optional[Union[str, os.PathLike]], optional): An Arrow IPC file (e.g. "universe.arrow") shared by the notebooks: when it holds the panel of the same cryptos, frequency, fields, lookbacks and data it is memory-mapped instead of computing the indicators, else the panel is computed and exported to it. The other kernels can also attach it without a data loader with `PanelFile.attach`. An attached panel is read-only (an in place assignment raises a ValueError) while a built one is writable, call `.copy()` on the result before modifying it. Defaults to None i.e. no file.
 
             **kwargs: The optional arguments to pass to the indicators functions it could be : long_ema_lookback, short_ema_lookback, short_ma_lookback, long_ma_lookback, momentum_lookback, ts_momentum_lookback, ema_momentum_lookback, volatility_lookback,
 
@@ -383,9 +533,39 @@ class CryptoDataLoader:
             pd.DataFrame The crypto dataframe with multiindex columns if `flatten_fields_with_crypto` is False. The first level contains the field (price, returns, ...) and the second the crypto name.
         """
         # Extract the wanted cryptos and resample the data to the wanted frequency
-        df = self.__select_cryptos(crypto_name=crypto_name).asfreq(DataFrequency)
+        df = self.__select_cryptos(crypto_name=crypto_name).asfreq(data_frequency)
+        data_fingerprint = dataframe_fingerprint(df)
+
+        def build() -> pd.DataFrame:
+            return self.___construct_indicators_dataframe(
+                df,
+                fields=fields,
+                cache=self.__cache,
+                cache_key=(
+                    self.__panel_key,
+                    tuple(crypto_name) if isinstance(crypto_name, list) else crypto_name,
+                    str(data_frequency),
+                    # The indicators of other prices (e.g. a reloaded file) are never reused
+                    data_fingerprint,
+                ),
+                **kwargs,
+            )
 
-        result = self.___construct_indicators_dataframe(df, fields=fields, **kwargs)
+        if panel_path is None:
+            result = build()
+        else:
+            result = PanelFile.attach_or_export(
+                panel_path,
+                {
+                    "loader": type(self).__name__,
+                    "crypto_name": crypto_name,
+                    "data_frequency": data_frequency,
+                    "fields": list(fields),
+                    "kwargs": kwargs,
+                    "data_fingerprint": data_fingerprint,
+                },
+                build,
+            )
         if flatten_fields_with_crypto:
             result.columns = (
                 result.columns.get_level_values(1)
@@ -394,6 +574,29 @@ class CryptoDataLoader:
             )
         return result
 
+    def get_lookback_sweep(
+        self,
+        lookbacks: Iterable[int],
+        crypto_name: Union[Union[CryptoName, Literal["all"]], List[CryptoName]] = "all",
+        data_frequency: DataFrequency = DataFrequency.DAILY,
+        fields: list[Fields] = [Fields.MOMENTUM, Fields.EMA_MOMENTUM, Fields.VOLATILITY],
+    ) -> Dict[Fields, LookbackPanel]:
+        """Compute lookback dependent indicators for a whole array of lookbacks at once instead of calling `get_crypto` for each lookback.
+
+        Args:
+        ----
+            lookbacks (Iterable[int]): The lookbacks to compute e.g. `np.arange(10, 100, 10)`.
+            crypto_name (Union[Union[CryptoName, Literal[&quot;all&quot;]], List[CryptoName]], optional): Whether you want to get a single crypto history, several cryptos or even the whole cryptos of the universe with `all`. Defaults to "all".
+            data_frequency (DataFrequency, optional): The wanted frequency for the data. It uses `asfreq` function. Defaults to "daily".
+            fields (list[Fields], optional): The indicators to compute. Defaults to [Fields.MOMENTUM, Fields.EMA_MOMENTUM, Fields.VOLATILITY].
+
+        Returns:
+        ----
+            Dict[Fields, LookbackPanel]: The `(lookback, date, asset)` panels indexed by field.
+        """
+        df = self.__select_cryptos(crypto_name=crypto_name).asfreq(data_frequency)
+        return Indicators.lookback_sweep(df, lookbacks, fields)
+
     @property
     def assets(self) -> list[str]:
         """Property to get the list of cryptos available in the data loader.
@@ -405,7 +608,11 @@ class CryptoDataLoader:
 
     @staticmethod
     def ___construct_indicators_dataframe(
-        crypto_dataframe: pd.DataFrame, fields: list[Fields] = [Fields.PRICE], **kwargs
+        crypto_dataframe: pd.DataFrame,
+        fields: list[Fields] = [Fields.PRICE],
+        cache: Optional[SharedResourceCache] = None,
+        cache_key: Hashable = None,
+        **kwargs,
     ) -> pd.DataFrame:
         """Handle the indicators to compute on the initial crypto data.
 
@@ -413,6 +620,8 @@ class CryptoDataLoader:
         ----
             crypto_dataframe (pd.DataFrame): The crypto data.
             fields (list[Fields]): The list of indicators to compute.
+            cache (Optional[SharedResourceCache], optional): The cache sharing the indicators between the calls, no caching if None. Defaults to None.
+            cache_key (Hashable, optional): The key identifying the crypto data in the cache. Defaults to None.
 
             **kwargs: The optional arguments to pass to the indicators functions it could be : `momentum_lookback`, `volatility_lookback`
 
@@ -436,13 +645,19 @@ class CryptoDataLoader:
         assert unique_fields.issubset(
             INDICATOR_MAPPING.keys()
         ), f"Invalid field name, please use one of the following : {','.join(INDICATOR_MAPPING.keys())},"
+        if kwargs.get("indicator_backend") == IndicatorBackend.NUMPY:
+            # The numpy kernels of all the indicators of the panel share their scratch buffers
+            kwargs.setdefault("kernel_workspace", KernelWorkspace())
 
         for field in unique_fields:
             # Compute the wanted indicator in the mapping dict for the given initial crypto_dataframe (w/o multiindex)
-            df_indicator = INDICATOR_MAPPING[field](crypto_dataframe, **kwargs)
-            df_indicator.columns = pd.MultiIndex.from_product(
-                [[field], crypto_dataframe.columns]
-            )  # Create the multiindex columns for this indicator
+            df_indicator = compute_cached_indicator(
+                crypto_dataframe, field, cache, cache_key, **kwargs
+            )
+            # Create the multiindex columns for this indicator (the cached indicator is left untouched)
+            df_indicator = df_indicator.set_axis(
+                pd.MultiIndex.from_product([[field], crypto_dataframe.columns]), axis=1
+            )
             # Merge the indicator dataframe with the final dataframe
             df_final = pd.merge(
                 df_final,
@@ -466,18 +681,6 @@ class CryptoDataLoader:
         ----
             pd.DataFrame: The wrangled dataframe.
         """
-        raw_dataframe["date"] = pd.to_datetime(
-            raw_dataframe["date"], infer_datetime_format=True
-        )
+        # The format is inferred from the first date (`infer_datetime_format` was removed from pandas)
+        raw_dataframe["date"] = pd.to_datetime(raw_dataframe["date"])
         return raw_dataframe.set_index("date").asfreq("1D")
-
-    def __new__(cls) -> Self:
-        """Singleton pattern to get the data loader instance.
-
-        Returns:
-        ----
-            Self: The only one allowed data loader instance.
-        """
-        if cls._instance is None:
-            cls._instance = super(CryptoDataLoader, cls).__new__(cls)
-        return cls._instance
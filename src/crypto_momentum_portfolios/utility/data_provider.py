@@ -0,0 +1,283 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Self
+import pandas as pd
+
+# The layout of the candles of the quant_invest_lab cache files
+CANDLE_COLUMNS = ["Timestamp", "Open", "Close", "High", "Low", "Amount", "Volume"]
+# The universe fields derived from the candles
+CANDLE_FIELDS = {"price": "Close", "volume": "Volume", "amount": "Amount"}
+# The fields of the candles where a missing bar means nothing traded
+TRADED_FIELDS = {"volume", "amount"}
+# The pandas frequency (multiple, alias) of the units of the candles timeframes e.g. "15min", "4hour", "1day", "1week"
+TIMEFRAME_UNITS = {"min": (1, "min"), "hour": (1, "h"), "day": (1, "D"), "week": (7, "D")}
+
+
+class CandleProvider(ABC):
+    """
+    CandleProvider is the interface of the sources of OHLCV candles. A provider returns the whole candle set of a symbol in one call, the universe fields are all derived from it.
+
+    The provider is used as a context manager around a batch of fetches so that it can open its connections (and e.g. refresh its symbols listing) once for all the symbols, `fetch_candles` is called from several threads.
+    """
+
+    def open(self) -> None:
+        """Open the connections shared by the fetches, nothing by default."""
+
+    def close(self) -> None:
+        """Release the connections shared by the fetches, nothing by default."""
+
+    def __enter__(self) -> Self:
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @abstractmethod
+    def fetch_candles(
+        self, symbol: str, timeframe: str, since: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Fetch the candles of a symbol.
+
+        Args:
+        ----
+            symbol (str): The symbol e.g. "BTC-USDT".
+            timeframe (str): The candles timeframe e.g. "1day".
+            since (Optional[int], optional): Only return the candles strictly after this unix timestamp, the whole history if None. Defaults to None.
+
+        Returns:
+        ----
+            pd.DataFrame: The candles with the `CANDLE_COLUMNS`, sorted by timestamp.
+        """
+        raise NotImplementedError
+
+
+class QuantInvestLabProvider(CandleProvider):
+    """
+    QuantInvestLabProvider serves the candles of the quant_invest_lab Kucoin service, which keeps its own on disk history and only downloads the missing bars. The service and its Kucoin client are shared by all the fetches, the symbols listing is refreshed once per batch.
+    """
+
+    def __init__(self) -> None:
+        self.__service = None
+
+    def open(self) -> None:
+        # Imported here so the package can be imported (e.g. in process pool workers) without the data provider
+        from quant_invest_lab.data_provider import CryptoService
+
+        self.__service = CryptoService()
+        self.__service.refresh_list_of_symbols()
+
+    def close(self) -> None:
+        self.__service = None
+
+    def fetch_candles(
+        self, symbol: str, timeframe: str, since: Optional[int] = None
+    ) -> pd.DataFrame:
+        assert self.__service is not None, "Use the provider as a context manager"
+        candles = self.__service.get_history_of_symbol(symbol, timeframe)
+        return _after(candles, since)
+
+
+class LocalFixtureProvider(CandleProvider):
+    """
+    LocalFixtureProvider serves candle files laid out as the quant_invest_lab cache, `<directory>/<timeframe>/<symbol>.csv`, e.g. fixtures for tests or an offline copy of the data. It counts the fetches of each symbol.
+
+    Private Attributes:
+    ----
+        __directory (str): The root directory of the files.
+        __fetch_counts (Dict[str, int]): The number of fetches of each symbol.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """Constructor method.
+
+        Args:
+            directory (str): The root directory of the candle files.
+        """
+        self.__directory = directory
+        self.__fetch_counts: Dict[str, int] = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def fetch_counts(self) -> Dict[str, int]:
+        with self.__lock:
+            return dict(self.__fetch_counts)
+
+    def fetch_candles(
+        self, symbol: str, timeframe: str, since: Optional[int] = None
+    ) -> pd.DataFrame:
+        with self.__lock:
+            self.__fetch_counts[symbol] = self.__fetch_counts.get(symbol, 0) + 1
+        candles = pd.read_csv(
+            os.path.join(self.__directory, timeframe, f"{symbol}.csv"), dtype=float
+        )
+        return _after(candles, since)
+
+    @staticmethod
+    def write_fixture(
+        directory: str, symbol: str, timeframe: str, candles: pd.DataFrame
+    ) -> None:
+        """Write a candle file served by the provider.
+
+        Args:
+        ----
+            directory (str): The root directory of the files.
+            symbol (str): The symbol.
+            timeframe (str): The candles timeframe.
+            candles (pd.DataFrame): The candles with the `CANDLE_COLUMNS`.
+        """
+        os.makedirs(os.path.join(directory, timeframe), exist_ok=True)
+        candles[CANDLE_COLUMNS].to_csv(
+            os.path.join(directory, timeframe, f"{symbol}.csv"), index=False
+        )
+
+
+class CandleStore:
+    """
+    CandleStore keeps the candles of the symbols of a timeframe and appends the new bars. The symbols are fetched concurrently, each one in a single call: the full history the first time, then only the candles after its last cached timestamp.
+
+    Private Attributes:
+    ----
+        __timeframe (str): The candles timeframe.
+        __frequency (str): The pandas frequency of the timeframe bars e.g. "1D".
+        __candles (Dict[str, pd.DataFrame]): The candles of each symbol.
+        __lock (threading.Lock): Serialize the updates.
+    """
+
+    def __init__(self, timeframe: str = "1day") -> None:
+        """Constructor method.
+
+        Args:
+            timeframe (str, optional): The candles timeframe. Defaults to "1day".
+        """
+        self.__timeframe = timeframe
+        self.__frequency = _timeframe_frequency(timeframe)
+        self.__candles: Dict[str, pd.DataFrame] = {}
+        self.__lock = threading.Lock()
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        """Get the last cached timestamp of a symbol.
+
+        Args:
+        ----
+            symbol (str): The symbol.
+
+        Returns:
+        ----
+            Optional[int]: The unix timestamp, None when the symbol is not cached.
+        """
+        candles = self.__candles.get(symbol)
+        if candles is None or candles.empty:
+            return None
+        return int(candles["Timestamp"].iloc[-1])
+
+    def update(
+        self,
+        provider: CandleProvider,
+        symbols: Iterable[str],
+        max_workers: int = 8,
+    ) -> Dict[str, int]:
+        """Fetch the new candles of the symbols and append them.
+
+        Args:
+        ----
+            provider (CandleProvider): The candles source.
+            symbols (Iterable[str]): The symbols to update.
+            max_workers (int, optional): The number of concurrent fetches. Defaults to 8.
+
+        Returns:
+        ----
+            Dict[str, int]: The number of appended candles of each symbol.
+        """
+        symbols = sorted(set(symbols))
+        with self.__lock, provider, ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(symbols)))
+        ) as executor:
+            fetched = list(
+                executor.map(
+                    lambda symbol: provider.fetch_candles(
+                        symbol, self.__timeframe, self.last_timestamp(symbol)
+                    ),
+                    symbols,
+                )
+            )
+            appended = {}
+            for symbol, new_candles in zip(symbols, fetched):
+                since = self.last_timestamp(symbol)
+                new_candles = _after(new_candles, since)
+                appended[symbol] = len(new_candles)
+                if symbol in self.__candles:
+                    new_candles = pd.concat(
+                        [self.__candles[symbol], new_candles], ignore_index=True
+                    )
+                self.__candles[symbol] = new_candles
+        return appended
+
+    def candles(self, symbol: str) -> pd.DataFrame:
+        """Get the cached candles of a symbol.
+
+        Args:
+        ----
+            symbol (str): The symbol.
+
+        Returns:
+        ----
+            pd.DataFrame: The candles, they must not be modified in place.
+        """
+        return self.__candles[symbol]
+
+    def build_panel(self, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Derive the price, volume, amount and market cap fields of the universe from the cached candles, as the former three `build_multi_crypto_dataframe` calls. The candles are dated in UTC whatever the local timezone, at the start of their bar (the day of the daily and weekly bars), the missing volumes and amounts are 0 while the missing prices and market caps stay NaN.
+
+        Args:
+        ----
+            symbols (Optional[Iterable[str]], optional): The symbols of the panel. Defaults to None i.e. all the cached symbols.
+
+        Returns:
+        ----
+            pd.DataFrame: The panel at the frequency of the timeframe (MultiIndex columns field x symbol).
+        """
+        symbols = sorted(self.__candles) if symbols is None else list(symbols)
+        fields: Dict[str, List[pd.Series]] = {field: [] for field in CANDLE_FIELDS}
+        for symbol in symbols:
+            candles = self.__candles[symbol]
+            dates = (
+                pd.to_datetime(candles["Timestamp"].to_numpy(), unit="s", utc=True)
+                .tz_localize(None)
+                .floor(min(pd.Timedelta(self.__frequency), pd.Timedelta(days=1)))
+                .rename("Date")
+            )
+            candles = candles.set_axis(dates)
+            candles = candles.loc[~candles.index.duplicated()].sort_index()
+            for field, column in CANDLE_FIELDS.items():
+                series = candles[column].rename(symbol)
+                fields[field].append(
+                    series.fillna(0.0) if field in TRADED_FIELDS else series
+                )
+        panel = pd.concat(
+            {field: pd.concat(series, axis=1) for field, series in fields.items()},
+            axis=1,
+        ).asfreq(self.__frequency)
+        market_cap = panel["price"] * panel["amount"]
+        market_cap.columns = pd.MultiIndex.from_product(
+            [["market_cap"], market_cap.columns]
+        )
+        return pd.concat([panel, market_cap], axis=1)
+
+
+def _timeframe_frequency(timeframe: str) -> str:
+    match = re.fullmatch(r"(\d+)(min|hour|day|week)", timeframe)
+    assert match, f"Invalid timeframe: {timeframe}, use a number of {', '.join(TIMEFRAME_UNITS)} e.g. '1day'"
+    multiple, alias = TIMEFRAME_UNITS[match.group(2)]
+    return f"{int(match.group(1)) * multiple}{alias}"
+
+
+def _after(candles: pd.DataFrame, since: Optional[int]) -> pd.DataFrame:
+    candles = candles[CANDLE_COLUMNS].sort_values("Timestamp")
+    if since is not None:
+        candles = candles[candles["Timestamp"] > since]
+    return candles.reset_index(drop=True)
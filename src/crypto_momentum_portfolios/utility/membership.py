@@ -0,0 +1,202 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import hashlib
+from typing import Optional
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from crypto_momentum_portfolios.utility.types import Fields
+
+# Number of set bits of each byte value, used to count the members without unpacking the mask
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+@dataclass(frozen=True)
+class MembershipMask:
+    """The (date x asset) eligibility of the assets of a universe, stored as a bitset: one bit per asset, the assets of a date packed in `ceil(n_assets / 8)` bytes.
+
+    Attributes:
+    ----
+        index (pd.Index): The dates, first axis of `bits`.
+        columns (pd.Index): The assets, in the order of the bits.
+        bits (npt.NDArray[np.uint8]): The `(date, ceil(asset / 8))` packed mask, big endian bit order as `np.packbits`.
+    """
+
+    index: pd.Index
+    columns: pd.Index
+    bits: npt.NDArray[np.uint8]
+
+    @classmethod
+    def from_dense(cls, eligible: pd.DataFrame) -> MembershipMask:
+        """Pack a boolean DataFrame.
+
+        Args:
+        ----
+            eligible (pd.DataFrame): The eligibility (dates x assets).
+
+        Returns:
+        ----
+            MembershipMask: The packed mask.
+        """
+        return cls(
+            eligible.index,
+            eligible.columns,
+            np.packbits(eligible.to_numpy(dtype=bool), axis=1),
+        )
+
+    @classmethod
+    def from_universe(
+        cls,
+        universe: pd.DataFrame,
+        min_volume: Optional[float] = None,
+        volume_lookback: int = 30,
+        max_market_cap_rank: Optional[int] = None,
+    ) -> MembershipMask:
+        """Build the mask of a universe once, an asset is eligible at a date when:
+        - it is listed i.e. the date is after its first valid price, and it has a price that day,
+        - its average volume over the last `volume_lookback` dates is at least `min_volume`,
+        - its market capitalization is among the `max_market_cap_rank` largest of the day.
+
+        Every rule only uses the data up to the date, as the ranking fields.
+
+        Args:
+        ----
+            universe (pd.DataFrame): The universe (MultiIndex columns field x asset) with the price field, and the volume and market_cap fields when the matching rule is used.
+            min_volume (Optional[float], optional): The minimum average volume, no liquidity rule if None. Defaults to None.
+            volume_lookback (int, optional): The number of dates of the average volume. Defaults to 30.
+            max_market_cap_rank (Optional[int], optional): The number of largest capitalizations eligible each date, no size rule if None. Defaults to None.
+
+        Returns:
+        ----
+            MembershipMask: The packed mask, its columns are the assets of the price field.
+        """
+        columns = universe[Fields.PRICE].columns
+        valid_price = ~np.isnan(universe[Fields.PRICE].to_numpy(dtype=float))
+        eligible = np.logical_or.accumulate(valid_price, axis=0) & valid_price
+
+        if min_volume is not None:
+            assert volume_lookback > 0, "The volume lookback must be positive"
+            average_volume = (
+                universe[Fields.VOLUME][columns]
+                .rolling(volume_lookback, min_periods=1)
+                .mean()
+                .to_numpy(dtype=float)
+            )
+            with np.errstate(invalid="ignore"):
+                eligible &= average_volume >= min_volume
+
+        if max_market_cap_rank is not None:
+            assert max_market_cap_rank > 0, "The market cap rank must be positive"
+            market_cap = universe[Fields.MARKET_CAP][columns].to_numpy(dtype=float)
+            keys = np.where(np.isnan(market_cap), np.inf, -market_cap)
+            order = np.argsort(keys, axis=1, kind="stable")
+            ranks = np.empty_like(order)
+            np.put_along_axis(ranks, order, np.arange(columns.size)[None, :], axis=1)
+            eligible &= (ranks < max_market_cap_rank) & ~np.isnan(market_cap)
+
+        return cls(universe.index, columns, np.packbits(eligible, axis=1))
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def is_member(self, date_position: int, asset_position: int) -> bool:
+        """Check the eligibility of an asset at a date in O(1).
+
+        Args:
+        ----
+            date_position (int): The integer position of the date.
+            asset_position (int): The integer position of the asset.
+
+        Returns:
+        ----
+            bool: Whether the asset is eligible.
+        """
+        byte = self.bits[date_position, asset_position >> 3]
+        return bool((byte >> (7 - (asset_position & 7))) & 1)
+
+    def rows(
+        self,
+        positions: npt.NDArray[np.intp],
+        columns: Optional[pd.Index] = None,
+    ) -> npt.NDArray[np.bool_]:
+        """Unpack the mask of some dates, e.g. the rebalance dates.
+
+        Args:
+        ----
+            positions (npt.NDArray[np.intp]): The integer positions of the dates.
+            columns (Optional[pd.Index], optional): The assets order of the output, the assets missing from the mask are not eligible. Defaults to None i.e. the mask columns.
+
+        Returns:
+        ----
+            npt.NDArray[np.bool_]: The `(date, asset)` eligibility.
+        """
+        eligible = np.unpackbits(
+            self.bits[positions], axis=1, count=self.columns.size
+        ).astype(bool)
+        if columns is None or columns.equals(self.columns):
+            return eligible
+        indexer = self.columns.get_indexer(columns)
+        aligned = eligible[:, indexer]
+        aligned[:, indexer < 0] = False
+        return aligned
+
+    def counts(self) -> pd.Series:
+        """Count the eligible assets of each date without unpacking the mask.
+
+        Returns:
+        ----
+            pd.Series: The number of eligible assets per date.
+        """
+        return pd.Series(_POPCOUNT[self.bits].sum(axis=1), index=self.index)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Unpack the whole mask.
+
+        Returns:
+        ----
+            pd.DataFrame: The eligibility (dates x assets).
+        """
+        return pd.DataFrame(
+            self.rows(np.arange(self.index.size)), index=self.index, columns=self.columns
+        )
+
+    def reindex(self, index: pd.Index) -> MembershipMask:
+        """Align the mask on other dates e.g. a dropna'ed universe, the dates missing from the mask are not eligible.
+
+        Args:
+        ----
+            index (pd.Index): The target dates.
+
+        Returns:
+        ----
+            MembershipMask: The aligned mask, `self` when the dates already match.
+        """
+        if index.equals(self.index):
+            return self
+        rows = self.index.get_indexer(index)
+        bits = self.bits[rows]
+        bits[rows < 0] = 0
+        return MembershipMask(index, self.columns, bits)
+
+    def fingerprint(self) -> str:
+        """Compute a content hash of the mask, used to key the results derived from it.
+
+        Returns:
+        ----
+            str: The hexadecimal fingerprint.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(
+            pd.util.hash_pandas_object(self.index, index=False).to_numpy().tobytes()
+        )
+        digest.update(repr(self.columns.to_list()).encode())
+        digest.update(np.ascontiguousarray(self.bits).tobytes())
+        return digest.hexdigest()
+
+    def __and__(self, other: MembershipMask) -> MembershipMask:
+        assert self.index.equals(other.index) and self.columns.equals(
+            other.columns
+        ), "The masks must share their dates and assets"
+        return MembershipMask(self.index, self.columns, self.bits & other.bits)
@@ -0,0 +1,163 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+import numpy as np
+import pandas as pd
+
+# The key of the schema metadata holding the pandas index and columns of the panel
+METADATA_KEY = b"crypto_momentum_portfolios"
+INDEX_COLUMN = "__index__"
+
+
+class PanelFile:
+    """
+    PanelFile persists the (field x asset) indicator panels of `get_crypto` as Arrow IPC files (the Feather v2 format), so that several processes or notebook kernels share a panel computed once:
+    - `export` writes the panel uncompressed in a single record batch, one Arrow column per (field, asset) pair, the dates in a timestamp column and the MultiIndex of the columns in the schema metadata.
+    - `attach` memory-maps the file, the columns of the DataFrame are read-only views on the mapped pages: no parsing and no copy, the pages are shared by the processes through the OS page cache.
+
+    The files are also readable by `pyarrow.feather.read_table` or any Arrow IPC reader. pyarrow is only imported by these methods.
+    """
+
+    @staticmethod
+    def export(
+        panel: pd.DataFrame,
+        path: Union[str, os.PathLike],
+        request: Optional[Dict[str, Any]] = None,
+    ) -> Path:
+        """Write a panel to an Arrow IPC file.
+
+        Args:
+        ----
+            panel (pd.DataFrame): The numeric panel (dates x MultiIndex columns field x asset, or flat columns).
+            path (Union[str, os.PathLike]): The file, e.g. "universe.arrow" or "universe.feather", overwritten if it exists.
+            request (Optional[Dict[str, Any]], optional): The parameters the panel was built with (JSON serializable), checked by `attach_or_export`. Defaults to None.
+
+        Returns:
+        ----
+            Path: The path of the file.
+        """
+        import pyarrow as pa
+
+        assert all(
+            np.issubdtype(dtype, np.number) for dtype in panel.dtypes
+        ), "Only the numeric panels can be exported"
+        metadata = {
+            "columns": [
+                list(column) if isinstance(column, tuple) else column
+                for column in panel.columns
+            ],
+            "column_names": list(panel.columns.names),
+            "index_name": panel.index.name,
+            "freq": None if getattr(panel.index, "freq", None) is None else panel.index.freqstr,
+            "request": PanelFile.__normalized(request),
+        }
+        # The NaN are kept as values, without validity bitmap, so that the columns can be viewed as NumPy arrays
+        arrays = [pa.array(panel.index)] + [
+            pa.array(panel.iloc[:, i].to_numpy(), from_pandas=False)
+            for i in range(panel.shape[1])
+        ]
+        names = [INDEX_COLUMN] + [str(i) for i in range(panel.shape[1])]
+        batch = pa.RecordBatch.from_arrays(arrays, names=names).replace_schema_metadata(
+            {METADATA_KEY: json.dumps(metadata, default=str)}
+        )
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside then renamed so that a kernel attaching the file never sees a partial one
+        partial = path.with_name(f".{path.name}.partial")
+        with pa.OSFile(str(partial), "wb") as sink:
+            with pa.ipc.new_file(sink, batch.schema) as writer:
+                writer.write_batch(batch)
+        os.replace(partial, path)
+        return path
+
+    @staticmethod
+    def attach(path: Union[str, os.PathLike], copy: bool = False) -> pd.DataFrame:
+        """Memory-map a panel written by `export`, its columns are read-only views on the file: an in place assignment (e.g. `panel.iloc[0, 0] = 1`) raises a ValueError.
+
+        Args:
+        ----
+            path (Union[str, os.PathLike]): The file.
+            copy (bool, optional): Copy the panel in memory so that it is writable, as a built panel, at the cost of the copy. Defaults to False.
+
+        Returns:
+        ----
+            pd.DataFrame: The panel, with its dates and the MultiIndex of its columns.
+        """
+        import pyarrow as pa
+
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        metadata = json.loads(table.schema.metadata[METADATA_KEY])
+        index = pd.DatetimeIndex(
+            table.column(INDEX_COLUMN).to_pandas().array,
+            freq=metadata["freq"],
+            name=metadata["index_name"],
+        )
+        panel = pd.DataFrame(
+            {
+                i: table.column(str(i)).chunk(0).to_numpy(zero_copy_only=True)
+                for i in range(table.num_columns - 1)
+            },
+            index=index,
+            copy=False,
+        )
+        if len(metadata["column_names"]) > 1:
+            panel.columns = pd.MultiIndex.from_tuples(
+                [tuple(column) for column in metadata["columns"]],
+                names=metadata["column_names"],
+            )
+        else:
+            panel.columns = pd.Index(metadata["columns"], name=metadata["column_names"][0])
+        return panel.copy() if copy else panel
+
+    @staticmethod
+    def request(path: Union[str, os.PathLike]) -> Optional[Dict[str, Any]]:
+        """Read the parameters a panel file was built with, without reading the panel.
+
+        Args:
+        ----
+            path (Union[str, os.PathLike]): The file.
+
+        Returns:
+        ----
+            Optional[Dict[str, Any]]: The request given to `export`.
+        """
+        import pyarrow as pa
+
+        with pa.memory_map(str(path), "r") as source:
+            schema = pa.ipc.open_file(source).schema
+        return json.loads(schema.metadata[METADATA_KEY])["request"]
+
+    @staticmethod
+    def attach_or_export(
+        path: Union[str, os.PathLike],
+        request: Dict[str, Any],
+        build: Callable[[], pd.DataFrame],
+        copy: bool = False,
+    ) -> pd.DataFrame:
+        """Attach the panel file when it was built with the same request, else build the panel and export it. The attached panel is read-only unless `copy` is set while the built one is writable.
+
+        Args:
+        ----
+            path (Union[str, os.PathLike]): The file.
+            request (Dict[str, Any]): The parameters of the panel, e.g. the selected cryptos, the fields, the lookbacks and the fingerprint of the data.
+            build (Callable[[], pd.DataFrame]): Compute the panel.
+            copy (bool, optional): Copy the attached panel so that it is writable (see `attach`). Defaults to False.
+
+        Returns:
+        ----
+            pd.DataFrame: The attached panel, or the built one.
+        """
+        if Path(path).exists() and PanelFile.request(path) == PanelFile.__normalized(
+            request
+        ):
+            return PanelFile.attach(path, copy=copy)
+        panel = build()
+        PanelFile.export(panel, path, request)
+        return panel
+
+    @staticmethod
+    def __normalized(request: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """The request as read back from the file: enums and tuples are stored as their JSON values."""
+        return None if request is None else json.loads(json.dumps(request, default=str))
@@ -0,0 +1,258 @@
+import contextlib
+import cProfile
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple, Union
+import pandas as pd
+
+_NULL_STAGE = contextlib.nullcontext()
+_ACTIVE_PROFILER: ContextVar[Optional["StageProfiler"]] = ContextVar(
+    "active_profiler", default=None
+)
+_CAPTURED_OPTIMIZATIONS: ContextVar[Optional[List[Any]]] = ContextVar(
+    "captured_optimizations", default=None
+)
+
+
+class StageProfiler:
+    """
+    StageProfiler instruments the stages of a backtest (rank, slice, allocate, drift, stats, plot): wall time and number of calls per stage, free counters and the convergence of each `scipy.optimize.minimize` call made by the allocators.
+
+    A disabled profiler returns a shared no-op context manager from `stage`, so the instrumented code keeps a near-zero overhead.
+
+    Methods:
+    ----
+        stage(name: str) -> ContextManager: Time a block of code.
+        count(name: str, n: int = 1) -> None: Increment a counter.
+        activate() -> ContextManager: Make the profiler visible to the allocators (and run cProfile when enabled).
+        summary() -> Dict[str, Any]: The per stage timings, the optimizer report and the counters.
+        to_chrome_trace(path) -> None: Export the stages events as a Chrome trace (chrome://tracing, Perfetto).
+        dump_stats(path) -> None: Export the cProfile statistics (pstats compatible).
+
+    Private Attributes:
+    ----
+        __events (List[Tuple[str, int, int, int]]): The (stage, start ns, duration ns, thread id) events.
+        __counters (Dict[str, int]): The counters.
+        __optimizations (List[Dict[str, Any]]): The allocator, iterations, function evaluations and success of each optimization.
+        __cprofile (Optional[cProfile.Profile]): The cProfile profiler, None if not requested.
+    """
+
+    def __init__(self, enabled: bool = True, cprofile: bool = False) -> None:
+        """Constructor method.
+
+        Args:
+            enabled (bool, optional): Record the stages, a disabled profiler records nothing. Defaults to True.
+            cprofile (bool, optional): Also run cProfile while the profiler is active, see `dump_stats`. Defaults to False.
+        """
+        self.enabled = enabled
+        self.__origin = time.perf_counter_ns()
+        self.__events: List[Tuple[str, int, int, int]] = []
+        self.__counters: Dict[str, int] = {}
+        self.__optimizations: List[Dict[str, Any]] = []
+        self.__cprofile = cProfile.Profile() if enabled and cprofile else None
+        self.__lock = threading.Lock()
+
+    def stage(self, name: str) -> ContextManager:
+        """Time a block of code.
+
+        Args:
+        ----
+            name (str): The stage name e.g. "allocate".
+
+        Returns:
+        ----
+            ContextManager: The timing context manager.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return self.__timed_stage(name)
+
+    @contextlib.contextmanager
+    def __timed_stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            with self.__lock:
+                self.__events.append(
+                    (name, start - self.__origin, end - start, threading.get_ident())
+                )
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Increment a counter.
+
+        Args:
+        ----
+            name (str): The counter name.
+            n (int, optional): The increment. Defaults to 1.
+        """
+        if self.enabled:
+            with self.__lock:
+                self.__counters[name] = self.__counters.get(name, 0) + n
+
+    def record_optimization(self, allocator: str, result: Any) -> None:
+        """Record the convergence of an optimization.
+
+        Args:
+        ----
+            allocator (str): The allocation method running the optimization.
+            result (Any): The `scipy.optimize.OptimizeResult`.
+        """
+        if self.enabled:
+            with self.__lock:
+                self.__optimizations.append(
+                    {
+                        "allocator": allocator,
+                        "iterations": int(getattr(result, "nit", 0)),
+                        "function_evaluations": int(getattr(result, "nfev", 0)),
+                        "success": bool(result.success),
+                        "message": str(result.message),
+                    }
+                )
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["StageProfiler"]:
+        """Make the profiler the active one of the current context (thread or task) so the allocators can report their optimizations, cProfile runs meanwhile if requested.
+
+        Yields:
+        ----
+            StageProfiler: The profiler.
+        """
+        if not self.enabled:
+            yield self
+            return
+        token = _ACTIVE_PROFILER.set(self)
+        if self.__cprofile is not None:
+            self.__cprofile.enable()
+        try:
+            yield self
+        finally:
+            if self.__cprofile is not None:
+                self.__cprofile.disable()
+            _ACTIVE_PROFILER.reset(token)
+
+    def summary(self) -> Dict[str, Any]:
+        """Summarize the recorded stages, optimizations and counters.
+
+        Returns:
+        ----
+            Dict[str, Any]: `stages` DataFrame (calls, total, mean and max seconds, share of the total time per stage), `optimizer` DataFrame (calls, mean and max iterations, function evaluations and failed convergences per allocator), `failed_optimizations` DataFrame and `counters` dict.
+        """
+        events = pd.DataFrame(
+            self.__events, columns=["stage", "start", "duration", "thread"]
+        )
+        durations = events.groupby("stage", sort=False)["duration"]
+        stages = pd.DataFrame(
+            {
+                "calls": durations.size(),
+                "total_s": durations.sum() / 1e9,
+                "mean_s": durations.mean() / 1e9,
+                "max_s": durations.max() / 1e9,
+            }
+        )
+        stages["share"] = stages["total_s"] / stages["total_s"].sum()
+
+        optimizations = pd.DataFrame(
+            self.__optimizations,
+            columns=[
+                "allocator",
+                "iterations",
+                "function_evaluations",
+                "success",
+                "message",
+            ],
+        )
+        by_allocator = optimizations.groupby("allocator")
+        optimizer = pd.DataFrame(
+            {
+                "calls": by_allocator.size(),
+                "mean_iterations": by_allocator["iterations"].mean(),
+                "max_iterations": by_allocator["iterations"].max(),
+                "function_evaluations": by_allocator["function_evaluations"].sum(),
+                "failed": by_allocator["success"].apply(lambda s: int((~s).sum())),
+            }
+        )
+        return {
+            "stages": stages,
+            "optimizer": optimizer,
+            "failed_optimizations": optimizations[~optimizations["success"]],
+            "counters": dict(self.__counters),
+        }
+
+    def to_chrome_trace(self, path: Union[str, os.PathLike]) -> None:
+        """Export the stages events as a Chrome trace JSON file, open it with chrome://tracing or https://ui.perfetto.dev.
+
+        Args:
+        ----
+            path (Union[str, os.PathLike]): The output file.
+        """
+        pid = os.getpid()
+        trace_events = [
+            {
+                "name": name,
+                "cat": "backtest",
+                "ph": "X",
+                "ts": start / 1e3,
+                "dur": duration / 1e3,
+                "pid": pid,
+                "tid": thread,
+            }
+            for name, start, duration, thread in self.__events
+        ]
+        trace_events += [
+            {"name": name, "ph": "C", "ts": 0, "pid": pid, "args": {name: value}}
+            for name, value in self.__counters.items()
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
+
+    def dump_stats(self, path: Union[str, os.PathLike]) -> None:
+        """Export the cProfile statistics, readable with `pstats.Stats(path)` or snakeviz.
+
+        Args:
+        ----
+            path (Union[str, os.PathLike]): The output file.
+        """
+        assert (
+            self.__cprofile is not None
+        ), "The profiler must be built with cprofile=True"
+        self.__cprofile.dump_stats(path)
+
+
+DISABLED_PROFILER = StageProfiler(enabled=False)
+
+
+def record_optimization(allocator: str, result: Any) -> None:
+    """Report an optimization to the active profiler and to the enclosing `capture_optimizations` block, if any.
+
+    Args:
+    ----
+        allocator (str): The allocation method running the optimization.
+        result (Any): The `scipy.optimize.OptimizeResult`.
+    """
+    profiler = _ACTIVE_PROFILER.get()
+    if profiler is not None:
+        profiler.record_optimization(allocator, result)
+    captured = _CAPTURED_OPTIMIZATIONS.get()
+    if captured is not None:
+        captured.append(result)
+
+
+@contextlib.contextmanager
+def capture_optimizations() -> Iterator[List[Any]]:
+    """Collect the optimizations run in the block, whether a profiler is active or not, e.g. to check the convergence of an allocation.
+
+    Yields:
+    ----
+        List[Any]: The `scipy.optimize.OptimizeResult` of the optimizations, filled when the block runs.
+    """
+    results: List[Any] = []
+    token = _CAPTURED_OPTIMIZATIONS.set(results)
+    try:
+        yield results
+    finally:
+        _CAPTURED_OPTIMIZATIONS.reset(token)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import hashlib
+from typing import Dict, Union
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from crypto_momentum_portfolios.utility.types import RebalanceFrequency
+
+# The offsets are objects and not string aliases: pandas renames the aliases across versions e.g. "1M" -> "ME", "Q" -> "QE"
+FREQUENCY_TO_OFFSET: Dict[RebalanceFrequency, pd.DateOffset] = {
+    RebalanceFrequency.DAILY: pd.offsets.Day(1),
+    RebalanceFrequency.EVERY_TWO_DAYS: pd.offsets.Day(2),
+    RebalanceFrequency.EVERY_THREE_DAYS: pd.offsets.Day(3),
+    RebalanceFrequency.EVERY_FOUR_DAYS: pd.offsets.Day(4),
+    RebalanceFrequency.EVERY_FIVE_DAYS: pd.offsets.Day(5),
+    RebalanceFrequency.EVERY_SIX_DAYS: pd.offsets.Day(6),
+    RebalanceFrequency.WEEKLY: pd.offsets.Week(weekday=6),
+    RebalanceFrequency.MONTHLY: pd.offsets.MonthEnd(),
+    RebalanceFrequency.FRIDAY: pd.offsets.Week(weekday=4),
+    RebalanceFrequency.THURSDAY: pd.offsets.Week(weekday=3),
+    RebalanceFrequency.WEDNESDAY: pd.offsets.Week(weekday=2),
+    RebalanceFrequency.TUESDAY: pd.offsets.Week(weekday=1),
+    RebalanceFrequency.MONDAY: pd.offsets.Week(weekday=0),
+    RebalanceFrequency.SATURDAY: pd.offsets.Week(weekday=5),
+    RebalanceFrequency.MONTH_START: pd.offsets.MonthBegin(),
+    RebalanceFrequency.QUARTER_END: pd.offsets.QuarterEnd(startingMonth=12),
+    RebalanceFrequency.QUARTER_START: pd.offsets.QuarterBegin(startingMonth=1),
+}
+
+
+@dataclass(frozen=True)
+class RebalanceCalendar:
+    """The rebalance dates of a backtest aligned on the dates of its universe, as a boolean mask (O(1) membership of a row) and the integer positions of the rebalances.
+
+    The constructors always rebalance on the first date, the portfolio is invested from the start of the universe, and snap the dates missing from the universe to the next available date.
+
+    Attributes:
+    ----
+        index (pd.DatetimeIndex): The sorted dates of the universe.
+        mask (npt.NDArray[np.bool_]): Whether the portfolio is rebalanced at each date of `index`.
+    """
+
+    index: pd.DatetimeIndex
+    mask: npt.NDArray[np.bool_]
+
+    def __post_init__(self):
+        assert self.mask.shape == (self.index.size,), "The mask must hold one entry per date"
+
+    @classmethod
+    def from_frequency(
+        cls, index: pd.DatetimeIndex, frequency: RebalanceFrequency
+    ) -> RebalanceCalendar:
+        """Build the calendar of a rebalance frequency: the first date then the dates of the frequency between the first and last dates.
+
+        Args:
+        ----
+            index (pd.DatetimeIndex): The dates of the universe.
+            frequency (RebalanceFrequency): The rebalance frequency.
+
+        Returns:
+        ----
+            RebalanceCalendar: The calendar.
+        """
+        return cls.from_dates(
+            index,
+            pd.date_range(
+                index[0], index[-1], freq=FREQUENCY_TO_OFFSET[RebalanceFrequency(frequency)]
+            ),
+        )
+
+    @classmethod
+    def from_dates(cls, index: pd.DatetimeIndex, dates: pd.Index) -> RebalanceCalendar:
+        """Build the calendar of explicit rebalance dates, each date is moved to the first date of the universe at or after it. The dates after the last date of the universe are dropped.
+
+        Args:
+        ----
+            index (pd.DatetimeIndex): The dates of the universe.
+            dates (pd.Index): The rebalance dates, in any order.
+
+        Returns:
+        ----
+            RebalanceCalendar: The calendar.
+        """
+        assert index.is_monotonic_increasing, "The dates of the universe must be sorted"
+        positions = index.searchsorted(pd.DatetimeIndex(dates))
+        return cls.__from_positions(index, positions[positions < index.size])
+
+    @classmethod
+    def every_n_dates(cls, index: pd.DatetimeIndex, n: int) -> RebalanceCalendar:
+        """Build the calendar rebalancing every `n` dates of the universe (e.g. trading days) from the first one, whatever the gaps of the index.
+
+        Args:
+        ----
+            index (pd.DatetimeIndex): The dates of the universe.
+            n (int): The number of dates between two rebalances.
+
+        Returns:
+        ----
+            RebalanceCalendar: The calendar.
+        """
+        assert n >= 1, "The number of dates between two rebalances must be positive"
+        return cls.__from_positions(index, np.arange(0, index.size, n))
+
+    @classmethod
+    def from_signal(
+        cls, index: pd.DatetimeIndex, signal: Union[pd.Series, npt.ArrayLike]
+    ) -> RebalanceCalendar:
+        """Build the calendar of a rebalance signal: the portfolio is rebalanced at the dates where the signal is True.
+
+        Args:
+        ----
+            index (pd.DatetimeIndex): The dates of the universe.
+            signal (Union[pd.Series, npt.ArrayLike]): The boolean signal, a Series indexed by dates (its True dates are snapped as in `from_dates`) or an array aligned on `index`.
+
+        Returns:
+        ----
+            RebalanceCalendar: The calendar.
+        """
+        if isinstance(signal, pd.Series):
+            return cls.from_dates(index, signal.index[signal.to_numpy(dtype=bool)])
+        signal = np.asarray(signal, dtype=bool)
+        assert signal.shape == (index.size,), "The signal must hold one entry per date"
+        return cls.__from_positions(index, np.flatnonzero(signal))
+
+    @classmethod
+    def resolve(
+        cls, schedule: RebalanceSchedule, index: pd.DatetimeIndex
+    ) -> RebalanceCalendar:
+        """Get the calendar of a schedule on the dates of a universe.
+
+        Args:
+        ----
+            schedule (RebalanceSchedule): A rebalance frequency or a calendar, built on other dates or not.
+            index (pd.DatetimeIndex): The dates of the universe.
+
+        Returns:
+        ----
+            RebalanceCalendar: The calendar aligned on `index`.
+        """
+        if isinstance(schedule, RebalanceCalendar):
+            return schedule.reindex(index)
+        return cls.from_frequency(index, schedule)
+
+    @classmethod
+    def __from_positions(
+        cls, index: pd.DatetimeIndex, positions: npt.NDArray[np.intp]
+    ) -> RebalanceCalendar:
+        mask = np.zeros(index.size, dtype=bool)
+        mask[positions] = True
+        mask[:1] = True
+        return cls(index, mask)
+
+    @property
+    def positions(self) -> npt.NDArray[np.intp]:
+        """The sorted positions of the rebalances in the index."""
+        return np.flatnonzero(self.mask)
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        """The rebalance dates."""
+        return self.index[self.mask]
+
+    @property
+    def previous_positions(self) -> npt.NDArray[np.intp]:
+        """The position of the previous rebalance of each rebalance, 0 for the first one i.e. the starts of the rebalance intervals."""
+        positions = self.positions
+        return np.concatenate(([0], positions[:-1])).astype(np.intp)
+
+    def __len__(self) -> int:
+        return int(self.mask.sum())
+
+    def reindex(self, index: pd.DatetimeIndex) -> RebalanceCalendar:
+        """Align the calendar on other dates, its rebalance dates are snapped as in `from_dates`.
+
+        Args:
+        ----
+            index (pd.DatetimeIndex): The target dates.
+
+        Returns:
+        ----
+            RebalanceCalendar: The aligned calendar, `self` when the dates already match.
+        """
+        if index.equals(self.index):
+            return self
+        return RebalanceCalendar.from_dates(index, self.dates)
+
+    def fingerprint(self) -> str:
+        """Compute a content hash of the calendar, used to key the results derived from it.
+
+        Returns:
+        ----
+            str: The hexadecimal fingerprint.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(
+            pd.util.hash_pandas_object(self.index, index=False).to_numpy().tobytes()
+        )
+        digest.update(np.packbits(self.mask).tobytes())
+        return digest.hexdigest()
+
+
+# A calendar frequency or an explicit calendar (dates, every n dates, signal)
+RebalanceSchedule = Union[RebalanceFrequency, RebalanceCalendar]
+
+
+def schedule_key(schedule: RebalanceSchedule) -> str:
+    """Get the value identifying a schedule in a result store configuration: the frequency, or the fingerprint of a calendar.
+
+    Args:
+    ----
+        schedule (RebalanceSchedule): The rebalance schedule.
+
+    Returns:
+    ----
+        str: The key of the schedule.
+    """
+    if isinstance(schedule, RebalanceCalendar):
+        return f"calendar:{schedule.fingerprint()}"
+    return RebalanceFrequency(schedule)
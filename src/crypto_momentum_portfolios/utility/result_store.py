@@ -0,0 +1,351 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+from crypto_momentum_portfolios.portfolio_management.costs import CostLedger
+from crypto_momentum_portfolios.portfolio_management.weights import WeightsHistory
+
+PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Hash the source code of the package, a stored result is invalidated as soon as the code producing it changes.
+
+    Returns:
+    ----
+        str: The hexadecimal hash of the package sources.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(PACKAGE_ROOT.rglob("*.py")):
+        digest.update(str(path.relative_to(PACKAGE_ROOT)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def config_hash(
+    config: Dict[str, Any],
+    universe_fingerprint: str,
+    costs: Dict[str, float],
+    version: Optional[str] = None,
+) -> str:
+    """Compute the key of a backtest run in the result store.
+
+    Args:
+    ----
+        config (Dict[str, Any]): The strategy parameters (JSON serializable, enums are stored by value).
+        universe_fingerprint (str): The fingerprint of the universe (see `dataframe_fingerprint`).
+        costs (Dict[str, float]): The cost parameters e.g. `transaction_cost` and `slippage_effect`.
+        version (Optional[str], optional): The code version, the current one if None. Defaults to None.
+
+    Returns:
+    ----
+        str: The hexadecimal key of the run.
+    """
+    payload = json.dumps(
+        {
+            "config": config,
+            "universe": universe_fingerprint,
+            "costs": costs,
+            "code_version": version if version is not None else code_version(),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class ResultStore:
+    """
+    ResultStore is a content addressed store of backtest runs. Each run is saved under the hash of its configuration, universe fingerprint, cost parameters and code version:
+    - `<key>.npz` holds the columnar arrays: dates, returns, the sparse weights history (CSR arrays) and the cost ledger (gross returns and traded notional of the rebalances).
+    - `<key>.json` holds the manifest: the configuration, the costs, the fingerprints and the statistics.
+
+    Private Attributes:
+    ----
+        __root (Path): The directory of the store.
+    """
+
+    def __init__(self, root: Union[str, os.PathLike]) -> None:
+        """Constructor method.
+
+        Args:
+            root (Union[str, os.PathLike]): The directory of the store, created if needed.
+        """
+        self.__root = Path(root)
+        self.__root.mkdir(parents=True, exist_ok=True)
+
+    def __contains__(self, key: str) -> bool:
+        return (self.__root / f"{key}.json").exists()
+
+    def save(
+        self,
+        key: str,
+        returns: pd.Series,
+        weights: Optional[WeightsHistory] = None,
+        stats: Optional[pd.DataFrame] = None,
+        manifest: Optional[Dict[str, Any]] = None,
+        ledger: Optional[CostLedger] = None,
+    ) -> None:
+        """Save a run, the arrays are written before the manifest so a run is only visible once complete.
+
+        Args:
+        ----
+            key (str): The run key (see `config_hash`).
+            returns (pd.Series): The returns of the strategy.
+            weights (Optional[WeightsHistory], optional): The weights history. Defaults to None.
+            stats (Optional[pd.DataFrame], optional): The statistics of the strategy. Defaults to None.
+            manifest (Optional[Dict[str, Any]], optional): The configuration of the run. Defaults to None.
+            ledger (Optional[CostLedger], optional): The cost ledger of the run, to reprice its costs. Defaults to None.
+        """
+        arrays = {
+            # The dates keep their resolution (e.g. datetime64[us]) so that the index round trips exactly
+            "dates": returns.index.values,
+            "returns": returns.to_numpy(dtype=np.float64),
+        }
+        if weights is not None:
+            arrays["assets"] = weights.assets.to_numpy(dtype=str)
+            arrays.update(
+                {f"weights_{name}": array for name, array in weights.to_arrays().items()}
+            )
+        if ledger is not None:
+            arrays["assets"] = ledger.traded_notional.columns.to_numpy(dtype=str)
+            arrays.update(
+                {f"ledger_{name}": array for name, array in ledger.to_arrays().items()}
+            )
+        temporary_path = self.__root / f"{key}.tmp.npz"
+        np.savez_compressed(temporary_path, **arrays)
+        os.replace(temporary_path, self.__root / f"{key}.npz")
+
+        document = {
+            "key": key,
+            **(manifest or {}),
+            "stats": None if stats is None else stats.to_dict(orient="records"),
+        }
+        temporary_path = self.__root / f"{key}.tmp.json"
+        temporary_path.write_text(json.dumps(document, default=str, indent=1))
+        os.replace(temporary_path, self.__root / f"{key}.json")
+
+    def save_stats(self, key: str, stats: pd.DataFrame) -> None:
+        """Attach the statistics to a stored run, only its manifest is written again.
+
+        Args:
+        ----
+            key (str): The run key.
+            stats (pd.DataFrame): The statistics of the strategy.
+        """
+        document = {
+            **self.load_manifest(key),
+            "stats": stats.to_dict(orient="records"),
+        }
+        temporary_path = self.__root / f"{key}.tmp.json"
+        temporary_path.write_text(json.dumps(document, default=str, indent=1))
+        os.replace(temporary_path, self.__root / f"{key}.json")
+
+    def load_manifest(self, key: str) -> Dict[str, Any]:
+        """Load the manifest of a run.
+
+        Args:
+        ----
+            key (str): The run key.
+
+        Returns:
+        ----
+            Dict[str, Any]: The manifest.
+        """
+        return json.loads((self.__root / f"{key}.json").read_text())
+
+    def load(
+        self, key: str, asset_returns: Optional[np.ndarray] = None
+    ) -> Dict[str, Any]:
+        """Load a run.
+
+        Args:
+        ----
+            key (str): The run key.
+            asset_returns (Optional[np.ndarray], optional): The `(date, asset)` returns of the universe, needed to rebuild the drifted weights. Defaults to None.
+
+        Returns:
+        ----
+            Dict[str, Any]: The `returns` Series, the `weights` history (None if not stored or if `asset_returns` is missing), the `stats` DataFrame (None if not stored), the cost `ledger` (None if not stored) and the `manifest`.
+        """
+        manifest = self.load_manifest(key)
+        with np.load(self.__root / f"{key}.npz") as arrays:
+            dates = ResultStore.__dates(arrays)
+            returns = pd.Series(arrays["returns"], index=dates, dtype=float)
+            weights = None
+            if "weights_positions" in arrays and asset_returns is not None:
+                weights = WeightsHistory.from_arrays(
+                    dates,
+                    pd.Index(arrays["assets"]),
+                    asset_returns,
+                    arrays["weights_positions"],
+                    arrays["weights_offsets"],
+                    arrays["weights_asset_indices"],
+                    arrays["weights_weights"],
+                    {
+                        name[len("weights_diagnostics_") :]: arrays[name]
+                        for name in arrays.files
+                        if name.startswith("weights_diagnostics_")
+                    },
+                )
+            ledger = ResultStore.__ledger(arrays, dates)
+        stats = None if manifest["stats"] is None else pd.DataFrame(manifest["stats"])
+        return {
+            "returns": returns,
+            "weights": weights,
+            "stats": stats,
+            "ledger": ledger,
+            "manifest": manifest,
+        }
+
+    def get_or_run(
+        self,
+        key: str,
+        run: Callable[[], Dict[str, Any]],
+        manifest: Optional[Dict[str, Any]] = None,
+        asset_returns: Optional[np.ndarray] = None,
+    ) -> Dict[str, Any]:
+        """Load a run from the store or execute and save it.
+
+        Args:
+        ----
+            key (str): The run key.
+            run (Callable[[], Dict[str, Any]]): The function executing the run, it returns the `returns`, `weights` and `stats`.
+            manifest (Optional[Dict[str, Any]], optional): The configuration saved with the run. Defaults to None.
+            asset_returns (Optional[np.ndarray], optional): The `(date, asset)` returns of the universe to rebuild the stored weights. Defaults to None.
+
+        Returns:
+        ----
+            Dict[str, Any]: The run outputs.
+        """
+        if key in self:
+            return self.load(key, asset_returns)
+        outputs = run()
+        self.save(key, manifest=manifest, **outputs)
+        return outputs
+
+    def keys(self) -> List[str]:
+        """List the stored runs.
+
+        Returns:
+        ----
+            List[str]: The runs keys.
+        """
+        return sorted(
+            path.stem
+            for path in self.__root.glob("*.json")
+            if not path.stem.endswith(".tmp")
+        )
+
+    def query(self, **filters: Any) -> pd.DataFrame:
+        """Query the manifests of the stored runs, nothing is executed.
+
+        Args:
+        ----
+            **filters: The configuration values to match e.g. `allocation_method="risk_parity"`, a list matches any of its values.
+
+        Returns:
+        ----
+            pd.DataFrame: One row per matching run with its key, configuration and costs.
+        """
+        rows = []
+        for key in self.keys():
+            manifest = self.load_manifest(key)
+            flat = {
+                "key": key,
+                **manifest.get("config", {}),
+                **manifest.get("costs", {}),
+            }
+            if all(
+                (flat.get(name) in value)
+                if isinstance(value, (list, tuple, set))
+                else flat.get(name) == value
+                for name, value in filters.items()
+            ):
+                rows.append(flat)
+        return pd.DataFrame(rows)
+
+    def load_returns(self, keys: Iterable[str]) -> pd.DataFrame:
+        """Load the returns of many runs side by side for comparison.
+
+        Args:
+        ----
+            keys (Iterable[str]): The runs keys e.g. `store.query(...)["key"]`.
+
+        Returns:
+        ----
+            pd.DataFrame: The returns (dates x runs).
+        """
+        columns = {}
+        for key in keys:
+            with np.load(self.__root / f"{key}.npz") as arrays:
+                columns[key] = pd.Series(
+                    arrays["returns"], index=ResultStore.__dates(arrays)
+                )
+        return pd.DataFrame(columns)
+
+    def load_ledgers(self, keys: Iterable[str]) -> Dict[str, CostLedger]:
+        """Load the cost ledgers of many runs, e.g. to reprice the costs of a sweep with `cost_sensitivity`.
+
+        Args:
+        ----
+            keys (Iterable[str]): The runs keys.
+
+        Returns:
+        ----
+            Dict[str, CostLedger]: The ledgers by key, the runs saved without ledger are skipped.
+        """
+        ledgers = {}
+        for key in keys:
+            with np.load(self.__root / f"{key}.npz") as arrays:
+                ledger = ResultStore.__ledger(arrays, ResultStore.__dates(arrays))
+            if ledger is not None:
+                ledgers[key] = ledger
+        return ledgers
+
+    def load_stats(self, keys: Iterable[str]) -> pd.DataFrame:
+        """Load the statistics of many runs (runs x metrics).
+
+        Args:
+        ----
+            keys (Iterable[str]): The runs keys.
+
+        Returns:
+        ----
+            pd.DataFrame: The statistics, the runs saved without statistics are skipped.
+        """
+        rows = {}
+        for key in keys:
+            stats = self.load_manifest(key)["stats"]
+            if stats:
+                rows[key] = {row["metric"]: row["value"] for row in stats}
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    @staticmethod
+    def __dates(arrays: Any) -> pd.DatetimeIndex:
+        """Read the dates of a run file, the runs saved before the dates kept their resolution hold int64 nanoseconds."""
+        dates = arrays["dates"]
+        if dates.dtype.kind == "i":
+            dates = dates.astype("datetime64[ns]")
+        return pd.DatetimeIndex(dates)
+
+    @staticmethod
+    def __ledger(arrays: Any, dates: pd.DatetimeIndex) -> Optional[CostLedger]:
+        """Rebuild the cost ledger of the `ledger_` arrays of a run file, None if the run has none."""
+        if "ledger_gross_returns" not in arrays:
+            return None
+        return CostLedger.from_arrays(
+            dates,
+            pd.Index(arrays["assets"]),
+            {
+                name[len("ledger_") :]: arrays[name]
+                for name in arrays.files
+                if name.startswith("ledger_")
+            },
+        )
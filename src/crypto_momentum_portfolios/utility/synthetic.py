@@ -0,0 +1,132 @@
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+
+from crypto_momentum_portfolios.portfolio_management.indicators import Indicators
+from crypto_momentum_portfolios.utility.types import Fields
+
+SYNTHETIC_INDICATORS = {
+    Fields.RETURNS: Indicators.returns,
+    Fields.MOMENTUM: Indicators.momentum,
+    Fields.EMA_MOMENTUM: Indicators.ema_momentum,
+    Fields.TS_MOMENTUM: Indicators.ts_momentum,
+    Fields.VOLATILITY_NEUTRALIZED_MOMENTUM: Indicators.volatility_neutralized_momentum,
+    Fields.VOLATILITY: Indicators.volatility,
+}
+
+
+def generate_synthetic_prices(
+    n_assets: int = 20,
+    n_days: int = 3 * 365,
+    seed: Optional[int] = None,
+    start_date: str = "2018-01-01",
+) -> pd.DataFrame:
+    """Generate crypto like daily prices: a common market factor plus idiosyncratic noise, with fat tailed (Student) shocks. The last asset is named `BTC-USDT` so the bitcoin benchmark can be built.
+
+    Args:
+    ----
+        n_assets (int, optional): The number of assets. Defaults to 20.
+        n_days (int, optional): The number of daily bars. Defaults to 3*365.
+        seed (Optional[int], optional): The random seed. Defaults to None.
+        start_date (str, optional): The first date. Defaults to "2018-01-01".
+
+    Returns:
+    ----
+        pd.DataFrame: The prices (dates x assets).
+    """
+    rng = np.random.default_rng(seed)
+    betas = rng.uniform(0.6, 1.4, n_assets)
+    idiosyncratic_vol = rng.uniform(0.02, 0.05, n_assets)
+    drifts = rng.normal(0.0005, 0.001, n_assets)
+    market = 0.03 * rng.standard_t(4, n_days) / np.sqrt(2)
+    noise = idiosyncratic_vol * rng.standard_t(4, (n_days, n_assets)) / np.sqrt(2)
+    log_returns = drifts + market[:, None] * betas + noise
+    prices = rng.uniform(0.1, 1000, n_assets) * np.exp(np.cumsum(log_returns, axis=0))
+    return pd.DataFrame(
+        prices,
+        index=pd.date_range(start_date, periods=n_days, freq="1D"),
+        columns=[f"SYN{i}-USDT" for i in range(n_assets - 1)] + ["BTC-USDT"],
+    )
+
+
+def generate_synthetic_panel(
+    n_assets: int = 20,
+    n_days: int = 3 * 365,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """Generate a raw panel with the same layout as the one loaded by `CryptoDataLoaderQIL`: price, volume, amount and market_cap.
+
+    Args:
+    ----
+        n_assets (int, optional): The number of assets. Defaults to 20.
+        n_days (int, optional): The number of daily bars. Defaults to 3*365.
+        seed (Optional[int], optional): The random seed. Defaults to None.
+
+    Returns:
+    ----
+        pd.DataFrame: The MultiIndex (field x asset) panel.
+    """
+    rng = np.random.default_rng(seed)
+    prices = generate_synthetic_prices(n_assets, n_days, seed)
+    volume = prices.pct_change().abs().fillna(0) * rng.uniform(
+        1e6, 1e9, n_assets
+    ) + rng.uniform(1e4, 1e6, (n_days, n_assets))
+    amount = pd.DataFrame(
+        rng.uniform(1e6, 1e9, n_assets) * np.linspace(1, 1.2, n_days)[:, None],
+        index=prices.index,
+        columns=prices.columns,
+    )
+    return pd.concat(
+        {
+            Fields.PRICE.value: prices,
+            Fields.VOLUME.value: volume,
+            Fields.AMOUNT.value: amount,
+            Fields.MARKET_CAP.value: prices * amount,
+        },
+        axis=1,
+    )
+
+
+def generate_synthetic_universe(
+    n_assets: int = 20,
+    n_days: int = 3 * 365,
+    seed: Optional[int] = None,
+    fields: List[Fields] = [
+        Fields.PRICE,
+        Fields.MARKET_CAP,
+        Fields.VOLUME,
+        Fields.RETURNS,
+        Fields.MOMENTUM,
+        Fields.EMA_MOMENTUM,
+        Fields.VOLATILITY,
+    ],
+    lookback: int = 30,
+) -> pd.DataFrame:
+    """Generate a backtest ready universe, i.e. the output of `get_crypto(...).dropna()`, without touching any data provider.
+
+    Args:
+    ----
+        n_assets (int, optional): The number of assets. Defaults to 20.
+        n_days (int, optional): The number of daily bars before the indicators warm up is dropped. Defaults to 3*365.
+        seed (Optional[int], optional): The random seed. Defaults to None.
+        fields (List[Fields], optional): The fields of the universe. Defaults to price, market_cap, volume, returns, momentum, ema_momentum and volatility.
+        lookback (int, optional): The lookback of the indicators. Defaults to 30.
+
+    Returns:
+    ----
+        pd.DataFrame: The MultiIndex (field x asset) universe.
+    """
+    panel = generate_synthetic_panel(n_assets, n_days, seed)
+    frames = {}
+    for field in fields:
+        if field in panel.columns.get_level_values(0):
+            frames[str(field)] = panel[field]
+        else:
+            frames[str(field)] = SYNTHETIC_INDICATORS[field](
+                panel[Fields.PRICE],
+                momentum_lookback=lookback,
+                ema_momentum_lookback=lookback,
+                ts_momentum_lookback=lookback,
+                volatility_lookback=lookback,
+            )
+    return pd.concat(frames, axis=1).dropna()
@@ -1,6 +1,7 @@
-from dataclasses import field
-from typing import Literal, TypedDict, Unpack
-from enum import IntEnum, StrEnum
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Literal, Optional, TypedDict, Union, Unpack
+from enum import EnumType, IntEnum, StrEnum
+import warnings
 
 CryptoName = Literal[
     "bitcoin",
@@ -59,6 +60,9 @@ class GetCryptoKwargs(TypedDict):
     ts_momentum_lookback: int
     ema_momentum_lookback: int
     volatility_lookback: int
+    indicator_backend: "IndicatorBackend"  # pandas or the numpy kernels
+    indicator_dtype: str  # Storage type of the numpy backend panels e.g. "float32"
+    kernel_workspace: "KernelWorkspace"  # Scratch buffers of the numpy backend shared by the indicators of a panel
 
     # @classmethod
     # def create(cls, a: int = 0, b: int = 1) -> A:
@@ -131,7 +135,38 @@ class Side(IntEnum):
         return list(map(lambda c: c.name, cls))
 
 
-class RebalanceFrequency(StrEnum):
+class _RebalanceFrequencyType(EnumType):
+    """The metaclass of `RebalanceFrequency`, it resolves the deprecated names of its members with a DeprecationWarning."""
+
+    # The former aliases of the members, a single member is kept per schedule
+    DEPRECATED_NAMES = {
+        "MONTH_END": "MONTHLY",
+        "WEEK_START": "WEEKLY",
+        "WEEK_END": "FRIDAY",
+        "SUNDAY": "WEEKLY",
+    }
+
+    def __getattr__(cls, name: str) -> Any:
+        if name in _RebalanceFrequencyType.DEPRECATED_NAMES:
+            return super().__getitem__(cls.__canonical_name(name))
+        raise AttributeError(name)
+
+    def __getitem__(cls, name: str) -> Any:
+        if name in _RebalanceFrequencyType.DEPRECATED_NAMES:
+            name = cls.__canonical_name(name)
+        return super().__getitem__(name)
+
+    def __canonical_name(cls, name: str) -> str:
+        canonical = _RebalanceFrequencyType.DEPRECATED_NAMES[name]
+        warnings.warn(
+            f"{cls.__name__}.{name} is deprecated, use {cls.__name__}.{canonical}",
+            DeprecationWarning,
+            stacklevel=3,
+        )
+        return canonical
+
+
+class RebalanceFrequency(StrEnum, metaclass=_RebalanceFrequencyType):
     DAILY = "1D"
     EVERY_TWO_DAYS = "2D"
     EVERY_THREE_DAYS = "3D"
@@ -139,20 +174,17 @@ class RebalanceFrequency(StrEnum):
     EVERY_FIVE_DAYS = "5D"
     EVERY_SIX_DAYS = "6D"
     WEEKLY = "1W"
-    MONTHLY = "1M"
+    MONTHLY = "1ME"
     FRIDAY = "W-FRI"
     THURSDAY = "W-THU"
     WEDNESDAY = "W-WED"
     TUESDAY = "W-TUE"
     MONDAY = "W-MON"
-    SUNDAY = "W-SUN"
     SATURDAY = "W-SAT"
-    MONTH_END = "1M"
+    # MONTH_END, WEEK_START, WEEK_END and SUNDAY are deprecated names of MONTHLY, WEEKLY (anchored on Sunday), FRIDAY and WEEKLY
     MONTH_START = "MS"
-    QUARTER_END = "Q"
+    QUARTER_END = "QE"
     QUARTER_START = "QS"
-    WEEK_START = "1W"
-    WEEK_END = "W-FRI"
 
     @classmethod
     def list_values(cls):
@@ -162,6 +194,18 @@ class RebalanceFrequency(StrEnum):
     def list_names(cls):
         return list(map(lambda c: c.name, cls))
 
+    @classmethod
+    def _missing_(cls, value):
+        # The values before the pandas month and quarter end aliases were renamed
+        return {
+            "1M": cls.MONTHLY,
+            "M": cls.MONTHLY,
+            "ME": cls.MONTHLY,
+            "Q": cls.QUARTER_END,
+            # The value of the former SUNDAY member
+            "W-SUN": cls.WEEKLY,
+        }.get(value)
+
 
 class Benchmark(StrEnum):
     EQUAL_WEIGHTED = "equal_weighted_benchmark"
@@ -185,6 +229,117 @@ class AllocationMethod(StrEnum):
     MOMENTUM_WEIGHTED = "momentum_weighted"
     RISK_PARITY = "risk_parity"
     MEAN_VARIANCE = "mean_variance"
+    INVERSE_VARIANCE = "inverse_variance"
+    MINIMUM_VARIANCE = "minimum_variance"
+    HIERARCHICAL_RISK_PARITY = "hierarchical_risk_parity"
+
+    @classmethod
+    def list_values(cls):
+        return list(map(lambda c: c.value, cls))
+
+    @classmethod
+    def list_names(cls):
+        return list(map(lambda c: c.name, cls))
+
+
+class CovarianceEstimator(StrEnum):
+    SAMPLE = "sample"
+    LEDOIT_WOLF = "ledoit_wolf"
+    ORACLE_APPROXIMATING_SHRINKAGE = "oas"
+    EWMA = "ewma"
+    FACTOR_MODEL = "factor_model"
+
+    @classmethod
+    def list_values(cls):
+        return list(map(lambda c: c.value, cls))
+
+    @classmethod
+    def list_names(cls):
+        return list(map(lambda c: c.name, cls))
+
+
+class CorrelationMethod(StrEnum):
+    PEARSON = "pearson"
+    SPEARMAN = "spearman"
+
+    @classmethod
+    def list_values(cls):
+        return list(map(lambda c: c.value, cls))
+
+    @classmethod
+    def list_names(cls):
+        return list(map(lambda c: c.name, cls))
+
+
+class InformationCoefficientMode(StrEnum):
+    TIME_SERIES = "time_series"
+    CROSS_SECTIONAL = "cross_sectional"
+
+    @classmethod
+    def list_values(cls):
+        return list(map(lambda c: c.value, cls))
+
+    @classmethod
+    def list_names(cls):
+        return list(map(lambda c: c.name, cls))
+
+
+class IndicatorBackend(StrEnum):
+    PANDAS = "pandas"
+    NUMPY = "numpy"
+
+    @classmethod
+    def list_values(cls):
+        return list(map(lambda c: c.value, cls))
+
+    @classmethod
+    def list_names(cls):
+        return list(map(lambda c: c.name, cls))
+
+
+class VolatilityForecast(StrEnum):
+    EWMA = "ewma"
+    ROLLING = "rolling"
+
+    @classmethod
+    def list_values(cls):
+        return list(map(lambda c: c.value, cls))
+
+    @classmethod
+    def list_names(cls):
+        return list(map(lambda c: c.name, cls))
+
+
+class ScenarioMethod(StrEnum):
+    GBM = "gbm"
+    BLOCK_BOOTSTRAP = "block_bootstrap"
+    REGIME_SWITCHING = "regime_switching"
+
+    @classmethod
+    def list_values(cls):
+        return list(map(lambda c: c.value, cls))
+
+    @classmethod
+    def list_names(cls):
+        return list(map(lambda c: c.name, cls))
+
+
+class FalseDiscoveryMethod(StrEnum):
+    BENJAMINI_HOCHBERG = "benjamini_hochberg"
+    BENJAMINI_YEKUTIELI = "benjamini_yekutieli"
+
+    @classmethod
+    def list_values(cls):
+        return list(map(lambda c: c.value, cls))
+
+    @classmethod
+    def list_names(cls):
+        return list(map(lambda c: c.name, cls))
+
+
+class CostModel(StrEnum):
+    PER_REBALANCE = "per_rebalance"  # transaction_cost x 2k + slippage_effect at each rebalance, as charged by the backtester
+    TURNOVER = "turnover"  # (transaction_cost + slippage_effect) x traded notional
 
     @classmethod
     def list_values(cls):
@@ -230,3 +385,26 @@ class Metrics(StrEnum):
     @classmethod
     def list_names(cls):
         return list(map(lambda c: c.name, cls))
+
+
+@dataclass(frozen=True)
+class StrategySpec:
+    """The selection and allocation parameters of a strategy, as passed to `PortfolioBacktester.run_strategy`."""
+
+    ranking_method: RankingMethod = RankingMethod.EMA_MOMENTUM
+    ranking_mode: RankingMode = RankingMode.DESCENDING
+    select_top_k_assets: int = 5
+    allocation_method: AllocationMethod = AllocationMethod.EQUAL_WEIGHTED
+    allocation_mode: AllocationMode = AllocationMode.CLASSIC
+    rebalance_frequency: RebalanceFrequency = RebalanceFrequency.MONTHLY
+    side: Side = Side.LONG
+    covariance_estimator: CovarianceEstimator = CovarianceEstimator.SAMPLE
+    estimation_window: Optional[Union[int, str]] = None
+
+    def to_kwargs(self) -> Dict[str, Any]:
+        """Get the spec as keyword arguments for `PortfolioBacktester.run_strategy`.
+
+        Returns:
+            Dict[str, Any]: The keyword arguments.
+        """
+        return asdict(self)
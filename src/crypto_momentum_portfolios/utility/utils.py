@@ -1,31 +1,67 @@
 from datetime import datetime
-from typing import Dict, List, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 import numpy as np
 import numpy.typing as npt
 import pandas as pd
 
+from crypto_momentum_portfolios.utility.rebalance_calendar import FREQUENCY_TO_OFFSET
 from crypto_momentum_portfolios.utility.types import RebalanceFrequency
 
+# A number of rows or a time span e.g. 90 or "90D"
+EstimationWindow = Union[int, str, pd.Timedelta]
+
 
 def get_rebalance_dates(
     start_date: Union[datetime, str],
     end_date: Union[datetime, str],
     frequency: RebalanceFrequency = RebalanceFrequency.MONTH_START,
 ) -> Tuple[Union[pd.Timestamp, datetime], ...]:
-    """Generate a Series of the rebalance date during the backtest period based on the frequency.
+    """Generate a Series of the rebalance date during the backtest period based on the frequency. The backtests use `RebalanceCalendar`, aligned on the dates of the universe.
 
     Args:
         start_date (Union[datetime, str]): The start date.
         end_date (Union[datetime, str]):  The start date.
-        frequency (RebalanceFrequency, optional): _description_. Defaults to "monthly".
+        frequency (RebalanceFrequency, optional): The rebalance frequency. Defaults to RebalanceFrequency.MONTH_START.
 
     Returns:
         Tuple[datetime,...]: The rebalance dates.
     """
     if isinstance(start_date, str):
-        start_date = pd.to_datetime(start_date, infer_datetime_format=True)
+        start_date = pd.Timestamp(start_date)
     return tuple(
-        [start_date] + pd.date_range(start_date, end_date, freq=frequency).to_list()
+        [start_date]
+        + pd.date_range(
+            start_date, end_date, freq=FREQUENCY_TO_OFFSET[RebalanceFrequency(frequency)]
+        ).to_list()
+    )
+
+
+def estimation_window_starts(
+    dates: pd.Index,
+    rebalance_positions: npt.NDArray[np.intp],
+    interval_starts: npt.NDArray[np.intp],
+    estimation_window: Optional[EstimationWindow] = None,
+) -> npt.NDArray[np.intp]:
+    """Compute the first row of the allocation estimation window of each rebalance, the window ends at the rebalance date (included). The starts are integer offsets, the allocators slice a precomputed array with them.
+
+    Args:
+        dates (pd.Index): The dates of the universe.
+        rebalance_positions (npt.NDArray[np.intp]): The positions of the rebalance dates in `dates`.
+        interval_starts (npt.NDArray[np.intp]): The starts of the rebalance intervals (the previous rebalance), used when no window is given.
+        estimation_window (Optional[EstimationWindow], optional): The number of rows of the window, or its time span (e.g. "90D", the dates after `rebalance date - span`). Defaults to None i.e. the rebalance interval.
+
+    Returns:
+        npt.NDArray[np.intp]: The first rows of the windows, clipped to the start of the universe.
+    """
+    if estimation_window is None:
+        return np.asarray(interval_starts, dtype=np.intp)
+    if isinstance(estimation_window, (int, np.integer)):
+        assert estimation_window >= 1, "The estimation window must hold one row at least"
+        return np.maximum(rebalance_positions - estimation_window + 1, 0).astype(np.intp)
+    span = pd.Timedelta(estimation_window)
+    assert span > pd.Timedelta(0), "The estimation window must be a positive time span"
+    return dates.searchsorted(dates[rebalance_positions] - span, side="right").astype(
+        np.intp
     )
 
 
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.portfolio_management.allocation import (
+    ALLOCATION_FIELDS,
+    ALLOCATION_TO_FUNCTION,
+    COVARIANCE_ALLOCATION_METHODS,
+    allocate_valid_selection,
+)
+from crypto_momentum_portfolios.portfolio_management.covariance import (
+    BatchedCovariance,
+)
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    CovarianceEstimator,
+    Fields,
+)
+
+N_DATES, LISTING, WINDOW = 300, 200, 90
+ASSETS = list("abcdef")
+# The late listed asset "d" is selected in the first two windows, which start before its listing
+SELECTION = np.array([[0, 1, 2, 3], [3, 0, 4, 5], [0, 1, 2, 4]])
+REBALANCE_POSITIONS = np.array([230, 260, 299])
+
+
+@pytest.fixture
+def universe() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2018-01-01", periods=N_DATES, freq="D")
+    returns = pd.DataFrame(
+        rng.normal(0.001, 0.03, (N_DATES, len(ASSETS))) * [1, 2, 0.5, 1.5, 1, 0.8],
+        index=dates,
+        columns=ASSETS,
+    )
+    returns.iloc[:LISTING, 3] = np.nan
+    prices = 100 * (1 + returns.fillna(0)).cumprod()
+    prices.iloc[:LISTING, 3] = np.nan
+    fields = {
+        Fields.RETURNS: returns,
+        Fields.VOLATILITY: returns.rolling(20).std(),
+        Fields.MARKET_CAP: prices * 1e6,
+        Fields.VOLUME: prices.abs() * 1e3,
+        Fields.MOMENTUM: prices.pct_change(30) + 2,
+    }
+    return pd.concat(fields, axis=1)
+
+
+def per_date_allocation(universe, method, **kwargs) -> np.ndarray:
+    field = universe[ALLOCATION_FIELDS[method]]
+    weights = []
+    for assets, end in zip(SELECTION, REBALANCE_POSITIONS):
+        names = [ASSETS[i] for i in assets]
+        window = field.iloc[end - WINDOW + 1 : end + 1]
+        allocation = ALLOCATION_TO_FUNCTION[method](names, window[names], False, **kwargs)
+        weights.append([allocation[name] for name in names])
+    return np.array(weights)
+
+
+def batched_allocation(universe, method, **kwargs) -> np.ndarray:
+    return allocate_valid_selection(
+        method,
+        SELECTION,
+        np.ones(SELECTION.shape, dtype=bool),
+        universe[ALLOCATION_FIELDS[method]].to_numpy(dtype=np.float64),
+        REBALANCE_POSITIONS,
+        REBALANCE_POSITIONS - WINDOW + 1,
+        **kwargs,
+    )
+
+
+def test_sample_covariance_is_pairwise_complete(universe):
+    returns = universe[Fields.RETURNS]
+    covariances, _ = BatchedCovariance.estimate(
+        SELECTION,
+        returns.to_numpy(dtype=np.float64),
+        REBALANCE_POSITIONS,
+        REBALANCE_POSITIONS - WINDOW + 1,
+    )
+    for assets, end, covariance in zip(SELECTION, REBALANCE_POSITIONS, covariances):
+        window = returns.iloc[end - WINDOW + 1 : end + 1, assets]
+        np.testing.assert_allclose(covariance, window.cov().to_numpy(), rtol=1e-10)
+
+
+@pytest.mark.parametrize("method", list(AllocationMethod))
+def test_batched_allocation_matches_the_per_date_allocation(universe, method):
+    batched = batched_allocation(universe, method)
+    np.testing.assert_allclose(batched, per_date_allocation(universe, method), atol=1e-6)
+    np.testing.assert_allclose(batched.sum(axis=1), 1.0)
+
+
+@pytest.mark.parametrize("method", COVARIANCE_ALLOCATION_METHODS)
+def test_late_listing_keeps_the_covariance_allocation(universe, method):
+    weights = batched_allocation(universe, method)
+    equal = np.full(SELECTION.shape[1], 1 / SELECTION.shape[1])
+    # The other assets are not reverted to equal weights by the missing returns of "d"
+    assert not np.allclose(weights[0], equal)
+    assert not np.allclose(weights[1], equal)
+
+
+@pytest.mark.parametrize(
+    "estimator",
+    [
+        CovarianceEstimator.LEDOIT_WOLF,
+        CovarianceEstimator.ORACLE_APPROXIMATING_SHRINKAGE,
+        CovarianceEstimator.EWMA,
+        CovarianceEstimator.FACTOR_MODEL,
+    ],
+)
+@pytest.mark.parametrize("method", COVARIANCE_ALLOCATION_METHODS)
+def test_incomplete_assets_get_no_weight(universe, method, estimator):
+    batched = batched_allocation(universe, method, covariance_estimator=estimator)
+    if estimator != CovarianceEstimator.FACTOR_MODEL:
+        # The per date factor model takes the window assets as the market, not the universe
+        per_date = per_date_allocation(universe, method, covariance_estimator=estimator)
+        np.testing.assert_allclose(batched, per_date, atol=1e-6)
+    # "d" misses returns in the first two windows and has none of the weight
+    assert batched[0, 3] == 0.0 and batched[1, 0] == 0.0
+    np.testing.assert_allclose(batched.sum(axis=1), 1.0)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.portfolio_management.backtester import (
+    PortfolioBacktester,
+)
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    Fields,
+    RebalanceFrequency,
+    Side,
+)
+from crypto_momentum_portfolios.utility.utils import weights_drift
+
+TRANSACTION_COST, SLIPPAGE_EFFECT = 0.001, 0.002
+
+
+def build_universe(listing: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n_dates, n_assets = 300, 10
+    dates = pd.date_range("2020-01-01", periods=n_dates, freq="D")
+    names = [f"A{i}-USDT" for i in range(n_assets - 1)] + ["BTC-USDT"]
+    returns = pd.DataFrame(
+        rng.normal(0.001, 0.03, (n_dates, n_assets)), index=dates, columns=names
+    )
+    returns.iloc[0] = 0.0
+    prices = 100 * (1 + returns).cumprod()
+    momentum = prices.pct_change(20)
+    # The first assets are listed late: no price and no ranking value before the listing
+    late = names[:6]
+    for field in (prices, returns, momentum):
+        field.iloc[:listing, : len(late)] = np.nan
+    return pd.concat(
+        {
+            Fields.PRICE: prices,
+            Fields.RETURNS: returns,
+            Fields.MOMENTUM: momentum,
+            Fields.EMA_MOMENTUM: momentum + returns,
+            Fields.VOLATILITY: returns.rolling(20, min_periods=2).std(),
+            Fields.MARKET_CAP: prices * np.linspace(1e6, 1e7, n_assets),
+        },
+        axis=1,
+    )
+
+
+def run(universe: pd.DataFrame, **kwargs):
+    return PortfolioBacktester(universe).run_strategy(
+        ranking_method=Fields.MOMENTUM,
+        print_stats=False,
+        plot_curve=False,
+        transaction_cost=TRANSACTION_COST,
+        slippage_effect=SLIPPAGE_EFFECT,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("side", [Side.LONG, Side.SHORT])
+def test_returns_match_the_daily_drift_loop(side):
+    universe = build_universe()
+    result = run(
+        universe,
+        allocation_method=AllocationMethod.RISK_PARITY,
+        rebalance_frequency=RebalanceFrequency.FRIDAY,
+        side=side,
+    )
+    history = result.weights_history
+    rebalance_positions = universe.index.get_indexer(history.rebalance_dates)
+    expected = []
+    for position, (_, row) in enumerate(universe.iterrows()):
+        if position in rebalance_positions:
+            target = history.target_weights(
+                int(np.flatnonzero(rebalance_positions == position)[0])
+            )
+            securities, weights = target.index.tolist(), target.to_numpy()
+        returns = row[Fields.RETURNS][securities].to_numpy(dtype=float)
+        portfolio_return = returns @ weights
+        if position in rebalance_positions:
+            portfolio_return -= (
+                TRANSACTION_COST * len(securities) * 2 + SLIPPAGE_EFFECT
+                if securities
+                else 0.0
+            )
+        expected.append(portfolio_return * side)
+        weights = np.array(list(weights_drift(securities, weights, returns).values()))
+    # The targets are stored in float32 by the weights history
+    np.testing.assert_allclose(result.returns, expected, rtol=0, atol=1e-7)
+
+
+def test_costs_are_charged_on_the_held_assets_only():
+    universe = build_universe(listing=150)
+    result = run(universe, select_top_k_assets=6)
+    history = result.weights_history
+    n_held = np.diff(history.to_arrays()["offsets"])
+    costs = (result.ledger.gross_returns - result.returns).loc[history.rebalance_dates]
+    # Before the listing fewer than k assets are held, none before the first momentum value
+    assert n_held.min() == 0 and 0 < n_held[n_held < 6].max() < 6
+    np.testing.assert_allclose(
+        costs,
+        np.where(n_held > 0, TRANSACTION_COST * n_held * 2 + SLIPPAGE_EFFECT, 0.0),
+        atol=1e-15,
+    )
+    assert result.returns.notna().all()
+    pd.testing.assert_series_equal(
+        result.ledger.reprice_costs(TRANSACTION_COST, SLIPPAGE_EFFECT), result.returns
+    )
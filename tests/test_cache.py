@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from crypto_momentum_portfolios.utility.cache import (
+    SHARED_CACHE,
+    SharedResourceCache,
+    resource_nbytes,
+)
+from crypto_momentum_portfolios.utility.constants import SHARED_CACHE_MAX_BYTES
+
+MB = 1024**2
+
+
+def frame(n_megabytes: int) -> pd.DataFrame:
+    return pd.DataFrame(np.zeros((n_megabytes * MB // 80, 10)))
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SharedResourceCache(max_entries=2)
+    cache.get_or_compute("a", 1, lambda: "first")
+    cache.get_or_compute("a", 2, lambda: "second")
+    # Using the first resource makes the second one the least recently used
+    cache.get_or_compute("a", 1, lambda: "recomputed")
+    cache.get_or_compute("a", 3, lambda: "third")
+
+    assert ("a", 1) in cache and ("a", 3) in cache and ("a", 2) not in cache
+    assert cache.get_or_compute("a", 2, lambda: "recomputed") == "recomputed"
+    assert len(cache) == 2
+
+
+def test_bytes_budget():
+    cache = SharedResourceCache(max_bytes=10 * MB)
+    for key in range(4):
+        cache.get_or_compute("frames", key, lambda: frame(3))
+    assert [key for key, _ in cache.items("frames")] == [1, 2, 3]
+    assert 9 * MB <= cache.nbytes() <= 10 * MB
+
+    # A resource larger than the budget is kept alone
+    cache.get_or_compute("frames", "large", lambda: frame(12))
+    assert [key for key, _ in cache.items("frames")] == ["large"]
+    cache.invalidate("frames")
+    assert cache.nbytes() == 0 and len(cache) == 0
+
+
+def test_resource_nbytes_counts_the_shared_buffers_once():
+    values = frame(1)
+    nested = {"values": values, "again": [values, values.to_numpy()]}
+    assert resource_nbytes(nested) >= 2 * resource_nbytes(values) - 1024
+    assert resource_nbytes(nested) < 3 * resource_nbytes(values)
+
+
+def test_shared_cache_is_bounded():
+    SHARED_CACHE.get_or_compute("test_cache", 0, lambda: frame(1))
+    assert 0 < SHARED_CACHE.nbytes() <= SHARED_CACHE_MAX_BYTES
+    SHARED_CACHE.invalidate("test_cache")
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.portfolio_management.combiner import (
+    PortfolioCombiner,
+    Sleeve,
+)
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    CostModel,
+    Fields,
+    RebalanceFrequency,
+    Side,
+    StrategySpec,
+)
+
+
+@pytest.fixture
+def universe() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n_dates, n_assets = 300, 12
+    dates = pd.date_range("2020-01-01", periods=n_dates, freq="D")
+    names = [f"A{i}-USDT" for i in range(n_assets)]
+    returns = pd.DataFrame(
+        rng.normal(0.001, 0.03, (n_dates, n_assets)), index=dates, columns=names
+    )
+    prices = 100 * (1 + returns).cumprod()
+    returns.iloc[0] = 0.0
+    momentum = prices.pct_change(20)
+    return pd.concat(
+        {
+            Fields.PRICE: prices,
+            Fields.RETURNS: returns,
+            Fields.MOMENTUM: momentum,
+            Fields.EMA_MOMENTUM: momentum + returns,
+            Fields.VOLATILITY: returns.rolling(20, min_periods=2).std(),
+        },
+        axis=1,
+    )
+
+
+def test_book_stays_invested_with_different_rebalance_dates(universe):
+    result = PortfolioCombiner(universe).run_combination(
+        [
+            Sleeve(
+                "monthly",
+                StrategySpec(rebalance_frequency=RebalanceFrequency.MONTH_START),
+                0.5,
+            ),
+            Sleeve(
+                "friday",
+                StrategySpec(
+                    ranking_method=Fields.MOMENTUM,
+                    allocation_method=AllocationMethod.RISK_PARITY,
+                    rebalance_frequency=RebalanceFrequency.FRIDAY,
+                ),
+                0.5,
+            ),
+        ]
+    )
+    invested = result.weights.sum(axis=1)
+    first_full = invested.index[invested.gt(0.99)][0]
+    np.testing.assert_allclose(invested.loc[first_full:], 1.0, atol=1e-12)
+    pd.testing.assert_series_equal(
+        result.sleeves_contribution.sum(axis=1), result.gross_returns, check_names=False
+    )
+
+
+def test_short_sleeve_keeps_its_capital(universe):
+    spec = StrategySpec(rebalance_frequency=RebalanceFrequency.FRIDAY)
+    result = PortfolioCombiner(universe).run_combination(
+        [
+            Sleeve("long", spec, 0.8),
+            Sleeve(
+                "short",
+                StrategySpec(
+                    rebalance_frequency=RebalanceFrequency.MONTH_START, side=Side.SHORT
+                ),
+                0.2,
+            ),
+        ]
+    )
+    gross = result.weights.abs().sum(axis=1)
+    # Without crossing positions the gross exposure is the capital of both sleeves, never levered
+    assert (gross.iloc[40:] <= 1.0 + 1e-9).all()
+    assert (gross.iloc[40:] > 0.5).all()
+
+
+def test_per_rebalance_cost_model(universe):
+    spec = StrategySpec(rebalance_frequency=RebalanceFrequency.MONTH_START)
+    result = PortfolioCombiner(universe).run_combination(
+        [Sleeve("monthly", spec, 1.0)],
+        transaction_cost=0.001,
+        slippage_effect=0.0005,
+        cost_model=CostModel.PER_REBALANCE,
+    )
+    charged = result.costs[result.costs > 0]
+    np.testing.assert_allclose(charged, 0.001 * spec.select_top_k_assets * 2 + 0.0005)
+    assert result.cost_model == CostModel.PER_REBALANCE
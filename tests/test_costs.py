@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.portfolio_management.backtester import (
+    PortfolioBacktester,
+)
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    CostModel,
+    Fields,
+    RebalanceFrequency,
+    Side,
+)
+from crypto_momentum_portfolios.utility.utils import weights_drift
+
+TRANSACTION_COSTS = np.array([0.0, 0.0005, 0.003])
+SLIPPAGE_EFFECTS = np.array([0.0, 0.001, 0.0002])
+
+
+@pytest.fixture
+def universe() -> pd.DataFrame:
+    rng = np.random.default_rng(13)
+    n_dates, n_assets = 250, 10
+    dates = pd.date_range("2020-01-01", periods=n_dates, freq="D")
+    names = [f"A{i}-USDT" for i in range(n_assets - 1)] + ["BTC-USDT"]
+    returns = pd.DataFrame(
+        rng.normal(0.001, 0.03, (n_dates, n_assets)), index=dates, columns=names
+    )
+    returns.iloc[0] = 0.0
+    prices = 100 * (1 + returns).cumprod()
+    momentum = prices.pct_change(20)
+    return pd.concat(
+        {
+            Fields.PRICE: prices,
+            Fields.RETURNS: returns,
+            Fields.MOMENTUM: momentum,
+            Fields.EMA_MOMENTUM: momentum,
+            Fields.VOLATILITY: returns.rolling(20, min_periods=2).std(),
+            Fields.MARKET_CAP: prices * np.linspace(1e6, 1e7, n_assets),
+        },
+        axis=1,
+    )
+
+
+def run(universe: pd.DataFrame, **kwargs):
+    return PortfolioBacktester(universe).run_strategy(
+        ranking_method=Fields.MOMENTUM,
+        allocation_method=AllocationMethod.VOLATILITY_WEIGHTED,
+        rebalance_frequency=RebalanceFrequency.FRIDAY,
+        print_stats=False,
+        plot_curve=False,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("side", [Side.LONG, Side.SHORT])
+def test_repriced_costs_match_the_reruns(universe, side):
+    ledger = run(universe, side=side).ledger
+    repriced = ledger.reprice_costs(TRANSACTION_COSTS, SLIPPAGE_EFFECTS)
+    for level, (transaction_cost, slippage_effect) in enumerate(
+        zip(TRANSACTION_COSTS, SLIPPAGE_EFFECTS)
+    ):
+        rerun = run(
+            universe,
+            side=side,
+            transaction_cost=transaction_cost,
+            slippage_effect=slippage_effect,
+        )
+        # Bit for bit: the costs are subtracted in the order of the backtester
+        pd.testing.assert_series_equal(
+            repriced.iloc[:, level], rerun.returns, check_names=False, rtol=0, atol=0
+        )
+
+
+def test_traded_notional_matches_the_daily_drift(universe):
+    result = run(universe)
+    history = result.weights_history
+    rebalance_positions = universe.index.get_indexer(history.rebalance_dates)
+    held = pd.Series(0.0, index=universe[Fields.RETURNS].columns)
+    expected = []
+    for position, (_, row) in enumerate(universe.iterrows()):
+        if position in rebalance_positions:
+            target = history.target_weights(
+                int(np.flatnonzero(rebalance_positions == position)[0])
+            ).reindex(held.index, fill_value=0.0)
+            expected.append((target - held).abs())
+            held = target
+        securities = held.index[held != 0].tolist()
+        held = pd.Series(
+            weights_drift(
+                securities,
+                held[securities].to_numpy(),
+                row[Fields.RETURNS][securities].to_numpy(dtype=float),
+            ),
+            index=held.index,
+        ).fillna(0.0)
+    np.testing.assert_allclose(
+        result.ledger.traded_notional, pd.DataFrame(expected), rtol=0, atol=1e-12
+    )
+
+
+def test_turnover_cost_model(universe):
+    ledger = run(universe, side=Side.SHORT).ledger
+    asset_costs = pd.Series({"A0-USDT": 0.01, "BTC-USDT": 0.002})
+    repriced = ledger.reprice_costs(
+        0.001, 0.0005, CostModel.TURNOVER, asset_costs=asset_costs
+    )
+    costs = (
+        ledger.turnover * 0.0015
+        + ledger.traded_notional[asset_costs.index] @ asset_costs
+    )
+    expected = ledger.gross_returns.copy()
+    expected.loc[costs.index] -= Side.SHORT * costs
+    pd.testing.assert_series_equal(repriced, expected, check_names=False)
+    # Only the rebalances that hold assets are charged
+    np.testing.assert_array_equal(costs > 0, ledger.n_assets > 0)
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from crypto_momentum_portfolios.portfolio_management.covariance import (
+    BatchedCovariance,
+    MomentsCache,
+)
+from crypto_momentum_portfolios.utility.types import CovarianceEstimator
+
+N_DATES, N_ASSETS, DECAY = 200, 8, 0.9
+
+
+@pytest.fixture
+def panel() -> np.ndarray:
+    rng = np.random.default_rng(9)
+    market = rng.normal(0.0, 0.02, (N_DATES, 1))
+    return market * rng.uniform(0.5, 1.5, N_ASSETS) + rng.normal(
+        0.0, 0.01, (N_DATES, N_ASSETS)
+    )
+
+
+@pytest.fixture
+def windows():
+    rng = np.random.default_rng(10)
+    rebalance_positions = np.array([30, 60, 61, 120, 199])
+    window_starts = np.array([0, 31, 20, 90, 100])
+    selection = np.array(
+        [rng.choice(N_ASSETS, 4, replace=False) for _ in rebalance_positions]
+    )
+    return selection, rebalance_positions, window_starts
+
+
+def reference_covariance(window: np.ndarray, market: np.ndarray, estimator):
+    """The covariance of a single `(date, asset)` window, written after the textbook formulas."""
+    n_dates, n_assets = window.shape
+    if estimator == CovarianceEstimator.SAMPLE:
+        return np.cov(window, rowvar=False), 0.0
+    if estimator == CovarianceEstimator.EWMA:
+        weights = DECAY ** np.arange(n_dates)[::-1]
+        return np.cov(window, rowvar=False, aweights=weights), 0.0
+    if estimator == CovarianceEstimator.FACTOR_MODEL:
+        market_variance = np.var(market, ddof=1)
+        betas = np.array(
+            [np.cov(window[:, i], market)[0, 1] for i in range(n_assets)]
+        ) / market_variance
+        residuals = np.var(window, axis=0, ddof=1) - betas**2 * market_variance
+        return market_variance * np.outer(betas, betas) + np.diag(residuals), 0.0
+    centered = window - window.mean(axis=0)
+    empirical = centered.T @ centered / n_dates
+    mu = np.trace(empirical) / n_assets
+    if estimator == CovarianceEstimator.LEDOIT_WOLF:
+        beta = (
+            ((centered**2).T @ (centered**2)).sum() / n_dates - (empirical**2).sum()
+        ) / (n_assets * n_dates)
+        delta = ((empirical - mu * np.eye(n_assets)) ** 2).sum() / n_assets
+        shrinkage = min(beta, delta) / delta
+    else:
+        alpha = (empirical**2).mean()
+        shrinkage = min(
+            (alpha + mu**2) / ((n_dates + 1) * (alpha - mu**2 / n_assets)), 1.0
+        )
+    return (1 - shrinkage) * empirical + shrinkage * mu * np.eye(n_assets), shrinkage
+
+
+@pytest.mark.parametrize("estimator", list(CovarianceEstimator))
+def test_batched_estimators_match_the_window_formulas(panel, windows, estimator):
+    selection, rebalance_positions, window_starts = windows
+    covariances, shrinkage = BatchedCovariance.estimate(
+        selection, panel, rebalance_positions, window_starts, estimator, DECAY
+    )
+    market = panel.mean(axis=1)
+    for r, (start, end) in enumerate(zip(window_starts, rebalance_positions + 1)):
+        expected, expected_shrinkage = reference_covariance(
+            panel[start:end, selection[r]], market[start:end], estimator
+        )
+        np.testing.assert_allclose(covariances[r], expected, rtol=1e-10, atol=1e-18)
+        assert shrinkage[r] == pytest.approx(expected_shrinkage, rel=1e-10, abs=1e-15)
+
+
+@pytest.mark.parametrize(
+    "estimator",
+    [
+        CovarianceEstimator.LEDOIT_WOLF,
+        CovarianceEstimator.ORACLE_APPROXIMATING_SHRINKAGE,
+    ],
+)
+def test_shrinkage_matches_scikit_learn(panel, windows, estimator):
+    covariance = pytest.importorskip("sklearn.covariance")
+    selection, rebalance_positions, window_starts = windows
+    covariances, shrinkage = BatchedCovariance.estimate(
+        selection, panel, rebalance_positions, window_starts, estimator
+    )
+    function = (
+        covariance.ledoit_wolf
+        if estimator == CovarianceEstimator.LEDOIT_WOLF
+        else covariance.oas
+    )
+    for r, (start, end) in enumerate(zip(window_starts, rebalance_positions + 1)):
+        expected, expected_shrinkage = function(panel[start:end, selection[r]])
+        np.testing.assert_allclose(covariances[r], expected, rtol=1e-10)
+        assert shrinkage[r] == pytest.approx(expected_shrinkage, rel=1e-10)
+
+
+def test_moments_cache_returns_the_estimates(panel, windows):
+    selection, rebalance_positions, window_starts = windows
+    cache = MomentsCache()
+    expected = BatchedCovariance.estimate(
+        selection, panel, rebalance_positions, window_starts
+    )
+    for _ in range(2):
+        covariances, _ = cache.estimate(
+            selection, panel, rebalance_positions, window_starts
+        )
+        np.testing.assert_array_equal(covariances, expected[0])
+    assert cache.misses == len(rebalance_positions)
+    assert cache.hits == len(rebalance_positions)
@@ -0,0 +1,194 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.utility.cache import SharedResourceCache
+from crypto_momentum_portfolios.utility.constants import CRYPTOS
+from crypto_momentum_portfolios.utility.data_loader import CryptoDataLoaderQIL
+from crypto_momentum_portfolios.utility.data_provider import (
+    CandleStore,
+    LocalFixtureProvider,
+)
+from crypto_momentum_portfolios.utility.types import Fields
+
+N_DAYS = 200
+START = "2021-01-01"
+LATE_LISTING = 50
+
+
+def make_candles(n_days: int, start: str, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=n_days, freq="D")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, n_days)))
+    return pd.DataFrame(
+        {
+            "Timestamp": (dates - pd.Timestamp(0)) // pd.Timedelta(seconds=1),
+            "Open": close,
+            "Close": close,
+            "High": close,
+            "Low": close,
+            "Amount": rng.uniform(1e3, 1e4, n_days),
+            "Volume": rng.uniform(1e5, 1e6, n_days),
+        }
+    )
+
+
+@pytest.fixture
+def candles() -> dict:
+    data = {
+        symbol: make_candles(N_DAYS, START, seed)
+        for seed, symbol in enumerate(sorted(CRYPTOS))
+    }
+    # A late listing and a bar without price nor volume
+    data["SOL-USDT"] = data["SOL-USDT"].iloc[LATE_LISTING:].reset_index(drop=True)
+    data["BTC-USDT"].loc[10, ["Close", "Volume", "Amount"]] = np.nan
+    return data
+
+
+def write_fixtures(directory, data: dict, drop_last: int = 0) -> None:
+    for symbol, symbol_candles in data.items():
+        LocalFixtureProvider.write_fixture(
+            str(directory), symbol, "1day", symbol_candles.iloc[: len(symbol_candles) - drop_last]
+        )
+
+
+def build_panel(directory, symbols) -> pd.DataFrame:
+    store = CandleStore()
+    store.update(LocalFixtureProvider(str(directory)), symbols)
+    return store.build_panel()
+
+
+def test_build_panel_dates_are_utc_days(tmp_path, candles, monkeypatch):
+    write_fixtures(tmp_path, candles)
+    if hasattr(time, "tzset"):
+        # A local timezone behind UTC dated the midnight candles on the previous day
+        monkeypatch.setenv("TZ", "America/New_York")
+        time.tzset()
+    try:
+        panel = build_panel(tmp_path, candles)
+    finally:
+        monkeypatch.undo()
+        if hasattr(time, "tzset"):
+            time.tzset()
+
+    expected = pd.date_range(START, periods=N_DAYS, freq="D", name="Date")
+    assert panel.index.tz is None
+    assert panel.index.equals(expected)
+    assert panel.index.freqstr == "D"
+
+
+def test_build_panel_aligns_the_assets(tmp_path, candles):
+    write_fixtures(tmp_path, candles)
+    panel = build_panel(tmp_path, candles)
+
+    symbols = sorted(candles)
+    assert list(panel.columns.get_level_values(0).unique()) == [
+        "price",
+        "volume",
+        "amount",
+        "market_cap",
+    ]
+    for field in ["price", "volume", "amount", "market_cap"]:
+        assert panel[field].columns.to_list() == symbols
+    eth = candles["ETH-USDT"]
+    np.testing.assert_allclose(panel["price"]["ETH-USDT"].to_numpy(), eth["Close"])
+    np.testing.assert_allclose(panel["volume"]["ETH-USDT"].to_numpy(), eth["Volume"])
+    # The late listing is aligned on its dates, not on its first row
+    sol = panel["price"]["SOL-USDT"]
+    assert sol.iloc[:LATE_LISTING].isna().all()
+    np.testing.assert_allclose(
+        sol.iloc[LATE_LISTING:].to_numpy(), candles["SOL-USDT"]["Close"]
+    )
+
+
+def test_build_panel_only_fills_the_traded_fields(tmp_path, candles):
+    write_fixtures(tmp_path, candles)
+    panel = build_panel(tmp_path, candles)
+
+    date = pd.Timestamp(START) + pd.Timedelta(days=10)
+    assert np.isnan(panel.loc[date, ("price", "BTC-USDT")])
+    assert np.isnan(panel.loc[date, ("market_cap", "BTC-USDT")])
+    assert panel.loc[date, ("volume", "BTC-USDT")] == 0.0
+    assert panel.loc[date, ("amount", "BTC-USDT")] == 0.0
+    assert panel["price"].drop(date).notna().to_numpy()[:, 0].all()
+
+
+def test_refresh_invalidates_the_panel_and_the_indicators(tmp_path, candles):
+    directory, full_directory = tmp_path / "partial", tmp_path / "full"
+    write_fixtures(directory, candles, drop_last=5)
+    write_fixtures(full_directory, candles)
+    fields = [Fields.PRICE, Fields.VOLUME, Fields.MOMENTUM, Fields.VOLATILITY]
+    kwargs = dict(fields=fields, momentum_lookback=20, volatility_lookback=10)
+
+    provider = LocalFixtureProvider(str(directory))
+    loader = CryptoDataLoaderQIL(SharedResourceCache(), provider=provider)
+    before = loader.get_crypto("all", **kwargs)
+    assert before.index[-1] == pd.Timestamp(START) + pd.Timedelta(days=N_DAYS - 6)
+
+    write_fixtures(directory, candles)
+    assert set(loader.refresh().values()) == {5}
+    assert set(provider.fetch_counts.values()) == {2}
+    after = loader.get_crypto("all", **kwargs)
+
+    expected = CryptoDataLoaderQIL(
+        SharedResourceCache(), provider=LocalFixtureProvider(str(full_directory))
+    ).get_crypto("all", **kwargs)
+    pd.testing.assert_frame_equal(after, expected, rtol=1e-9)
+    pd.testing.assert_frame_equal(after.iloc[: len(before)], before, rtol=1e-9)
+    assert set(loader.refresh().values()) == {0}
+
+
+def test_build_panel_follows_the_timeframe(tmp_path, candles):
+    hours = pd.date_range(START, periods=30, freq="4h")
+    symbol_candles = candles["ETH-USDT"].iloc[:30].assign(
+        Timestamp=(hours - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    )
+    # A missing bar is reindexed on the 4 hours grid
+    LocalFixtureProvider.write_fixture(
+        str(tmp_path), "ETH-USDT", "4hour", symbol_candles.drop(index=12)
+    )
+    store = CandleStore("4hour")
+    store.update(LocalFixtureProvider(str(tmp_path)), ["ETH-USDT"])
+    panel = store.build_panel()
+
+    assert panel.index.equals(pd.DatetimeIndex(hours, name="Date"))
+    assert np.isnan(panel[("price", "ETH-USDT")].iloc[12])
+    assert panel[("price", "ETH-USDT")].drop(hours[12]).notna().all()
+
+
+def test_invalid_timeframe_is_rejected():
+    with pytest.raises(AssertionError):
+        CandleStore("1d")
+
+
+def test_refresh_keeps_the_resources_of_the_other_loaders(tmp_path, candles):
+    directory, other_directory = tmp_path / "partial", tmp_path / "other"
+    write_fixtures(directory, candles, drop_last=5)
+    write_fixtures(other_directory, candles)
+    # An incremental indicator (momentum) and a recomputed one (long_ma)
+    kwargs = dict(
+        fields=[Fields.PRICE, Fields.MOMENTUM, Fields.LONG_MA], momentum_lookback=20
+    )
+    cache = SharedResourceCache()
+    other = CryptoDataLoaderQIL(
+        cache, provider=LocalFixtureProvider(str(other_directory))
+    )
+    other_result = other.get_crypto("all", **kwargs)
+    other_resources = {
+        namespace: dict(cache.items(namespace))
+        for namespace in ("qil_panel", "indicators", "indicator_states")
+    }
+
+    loader = CryptoDataLoaderQIL(cache, provider=LocalFixtureProvider(str(directory)))
+    loader.get_crypto("all", **kwargs)
+    write_fixtures(directory, candles)
+    assert set(loader.refresh().values()) == {5}
+
+    for namespace, resources in other_resources.items():
+        kept = dict(cache.items(namespace))
+        assert all(kept[key] is value for key, value in resources.items())
+    # The refreshed loader has its own panel and indicators again
+    assert len(cache.items("qil_panel")) == 2
+    assert len(cache.items("indicators")) == 2 * len(other_resources["indicators"]) - 1
+    pd.testing.assert_frame_equal(other.get_crypto("all", **kwargs), other_result)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.portfolio_management.incremental import (
+    IncrementalIndicators,
+)
+from crypto_momentum_portfolios.portfolio_management.indicators import Indicators
+from crypto_momentum_portfolios.utility.types import Fields, IndicatorBackend
+
+N_DATES, N_ASSETS = 400, 12
+
+CASES = [
+    pytest.param(Fields.MOMENTUM, dict(momentum_lookback=30), id="momentum"),
+    pytest.param(Fields.MOMENTUM, dict(momentum_lookback=1), id="momentum-1"),
+    pytest.param(Fields.VOLATILITY, dict(volatility_lookback=20), id="rolling-std"),
+    pytest.param(
+        Fields.VOLATILITY,
+        dict(volatility_lookback=20, indicator_backend=IndicatorBackend.NUMPY),
+        id="rolling-std-numpy",
+    ),
+    pytest.param(Fields.EMA_MOMENTUM, dict(ema_momentum_lookback=15), id="ewm"),
+    pytest.param(
+        Fields.EMA_MOMENTUM,
+        dict(long_ema_lookback=40, ema_momentum_lookback=3),
+        id="ewm-long-ema-lookback",
+    ),
+]
+
+
+@pytest.fixture
+def prices() -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.03, (N_DATES, N_ASSETS)), axis=0)),
+        index=pd.date_range("2020-01-01", periods=N_DATES, freq="D"),
+        columns=[f"asset_{i}" for i in range(N_ASSETS)],
+    )
+    # A late listing, a gap, a single missing bar and an asset without any price
+    prices.iloc[:150, 3] = np.nan
+    prices.iloc[300:310, 5] = np.nan
+    prices.iloc[N_DATES - 3, 7] = np.nan
+    prices.iloc[:, 9] = np.nan
+    return prices
+
+
+def full_recomputation(prices: pd.DataFrame, field: Fields, **kwargs) -> pd.DataFrame:
+    return getattr(Indicators, str(field))(prices, **kwargs)
+
+
+@pytest.mark.parametrize("field, kwargs", CASES)
+@pytest.mark.parametrize("k", [1, 5, 40])
+def test_update_appends_k_bars(prices, field, kwargs, k):
+    state = IncrementalIndicators.initialize(prices.iloc[:-k], field, **kwargs)
+    state = IncrementalIndicators.update(state, prices)
+
+    pd.testing.assert_frame_equal(
+        state.frame(), full_recomputation(prices, field, **kwargs), rtol=1e-9
+    )
+
+
+@pytest.mark.parametrize("field, kwargs", CASES)
+def test_successive_updates(prices, field, kwargs):
+    state = IncrementalIndicators.initialize(prices.iloc[:10], field, **kwargs)
+    steps = np.random.default_rng(2).integers(1, 30, N_DATES)
+    n_dates = 10
+    for step in steps:
+        if n_dates == N_DATES:
+            break
+        n_dates = min(N_DATES, n_dates + int(step))
+        state = IncrementalIndicators.update(state, prices.iloc[:n_dates])
+        pd.testing.assert_frame_equal(
+            state.frame(),
+            full_recomputation(prices.iloc[:n_dates], field, **kwargs),
+            rtol=1e-9,
+        )
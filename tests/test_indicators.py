@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+from crypto_momentum_portfolios.portfolio_management.indicators import Indicators
+from crypto_momentum_portfolios.portfolio_management.kernels import rolling_std
+from crypto_momentum_portfolios.utility.types import IndicatorBackend
+
+LOOKBACKS = [1, 2, 3, 5, 8, 9, 30, 200]
+
+
+@pytest.fixture
+def prices() -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    n_dates, n_assets = 3000, 6
+    # Long trending histories far from their mean: the windows barely move against the history spread
+    returns = rng.normal(0.001, 0.03, (n_dates, n_assets))
+    prices = pd.DataFrame(
+        1e4 * np.exp(np.cumsum(returns, axis=0)),
+        index=pd.date_range("2015-01-01", periods=n_dates, freq="D"),
+        columns=[f"A{i}-USDT" for i in range(n_assets)],
+    )
+    prices.iloc[:100, 1] = np.nan
+    prices.iloc[1500:1503, 2] = np.nan
+    return prices
+
+
+def exact_std(prices: pd.DataFrame, lookback: int) -> np.ndarray:
+    """The sample standard deviation of each window centered on its own mean."""
+    values = np.full(prices.shape, np.nan)
+    values[lookback - 1 :] = sliding_window_view(
+        prices.to_numpy(), lookback, axis=0
+    ).std(axis=-1, ddof=1)
+    return values
+
+
+def test_volatility_sweep_matches_pandas(prices):
+    panel = Indicators.volatility_sweep(prices, LOOKBACKS)
+    assert np.isnan(panel.values[0]).all()
+    for i, lookback in enumerate(LOOKBACKS[1:], start=1):
+        expected = prices.rolling(lookback).std()
+        # pandas' online updates drift by about 1e-8 on the short windows
+        np.testing.assert_allclose(panel.values[i], expected, rtol=1e-6)
+        np.testing.assert_allclose(
+            panel.values[i], exact_std(prices, lookback), rtol=1e-10
+        )
+        np.testing.assert_array_equal(np.isnan(panel.values[i]), expected.isna())
+
+
+@pytest.mark.parametrize("lookback", [2, 9, 30])
+def test_numpy_backend_matches_the_sweep(prices, lookback):
+    pd.testing.assert_frame_equal(
+        Indicators.volatility(
+            prices, lookback, indicator_backend=IndicatorBackend.NUMPY
+        ),
+        Indicators.volatility_sweep(prices, [lookback]).frame(lookback),
+    )
+    np.testing.assert_array_equal(
+        rolling_std(prices.to_numpy(), lookback),
+        Indicators.volatility_sweep(prices, [lookback]).values[0],
+    )
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.portfolio_management.backtester import (
+    PortfolioBacktester,
+)
+from crypto_momentum_portfolios.portfolio_management.combiner import (
+    PortfolioCombiner,
+    Sleeve,
+)
+from crypto_momentum_portfolios.portfolio_management.long_short import (
+    LongShortBacktester,
+)
+from crypto_momentum_portfolios.portfolio_management.selection import (
+    select_tails_for_rows,
+)
+from crypto_momentum_portfolios.utility.rebalance_calendar import RebalanceCalendar
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    Fields,
+    RankingMode,
+    RebalanceFrequency,
+    Side,
+    StrategySpec,
+)
+
+LISTING = 120
+
+
+@pytest.fixture
+def universe() -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    n_dates, n_assets = 300, 6
+    dates = pd.date_range("2020-01-01", periods=n_dates, freq="D")
+    names = [f"A{i}-USDT" for i in range(n_assets)]
+    returns = pd.DataFrame(
+        rng.normal(0.0, 0.03, (n_dates, n_assets)), index=dates, columns=names
+    )
+    # A late listing leaves 5 valid assets for 3 long and 3 short ones
+    returns.iloc[:LISTING, 2] = np.nan
+    momentum = (1 + returns).rolling(10).apply(np.prod, raw=True) - 1
+    return pd.concat(
+        {
+            Fields.RETURNS: returns,
+            Fields.MOMENTUM: momentum,
+            Fields.EMA_MOMENTUM: momentum,
+        },
+        axis=1,
+    )
+
+
+def test_tails_shrink_without_overlap():
+    values = np.array(
+        [
+            [5.0, 4.0, np.nan, 3.0, 2.0, 1.0],
+            [5.0, 4.0, np.nan, np.nan, np.nan, 1.0],
+            [5.0, np.nan, np.nan, np.nan, np.nan, np.nan],
+            [np.nan] * 6,
+        ]
+    )
+    top, top_valid, bottom, bottom_valid = select_tails_for_rows(values, 3, 3)
+    np.testing.assert_array_equal(top_valid.sum(axis=1), [2, 1, 0, 0])
+    np.testing.assert_array_equal(bottom_valid.sum(axis=1), [3, 2, 1, 0])
+    for row in range(values.shape[0]):
+        longs, shorts = top[row][top_valid[row]], bottom[row][bottom_valid[row]]
+        assert not set(longs) & set(shorts)
+        assert not np.isnan(values[row, np.concatenate([longs, shorts])]).any()
+    np.testing.assert_array_equal(top[0][top_valid[0]], [0, 1])
+    np.testing.assert_array_equal(bottom[0], [5, 4, 3])
+
+
+def test_long_short_runs_on_a_late_listing(universe):
+    result = LongShortBacktester(universe).run_long_short(
+        ranking_method=Fields.MOMENTUM,
+        long_k=3,
+        short_k=3,
+        rebalance_frequency=RebalanceFrequency.FRIDAY,
+    )
+    targets = result.targets
+    late = targets.columns[2]
+    assert (targets.loc[targets.index < universe.index[LISTING], late] == 0).all()
+    held = targets.loc[targets.index >= universe.index[15]]
+    assert ((held > 0).sum(axis=1) >= 2).all() and ((held < 0).sum(axis=1) >= 2).all()
+    np.testing.assert_allclose(held.clip(lower=0).sum(axis=1), 1.0)
+    np.testing.assert_allclose(held.clip(upper=0).sum(axis=1), -1.0)
+    assert np.isfinite(result.returns).all()
+
+
+@pytest.fixture
+def complete_universe() -> pd.DataFrame:
+    rng = np.random.default_rng(4)
+    n_dates, n_assets = 250, 10
+    dates = pd.date_range("2020-01-01", periods=n_dates, freq="D")
+    names = [f"A{i}-USDT" for i in range(n_assets - 1)] + ["BTC-USDT"]
+    returns = pd.DataFrame(
+        rng.normal(0.0, 0.03, (n_dates, n_assets)), index=dates, columns=names
+    )
+    prices = 100 * (1 + returns).cumprod()
+    # A ranking signal known from the first date
+    signal = pd.DataFrame(
+        rng.normal(size=(n_dates, n_assets)), index=dates, columns=names
+    )
+    return pd.concat(
+        {
+            Fields.PRICE: prices,
+            Fields.RETURNS: returns,
+            Fields.MOMENTUM: signal,
+            Fields.EMA_MOMENTUM: signal,
+            Fields.VOLATILITY: returns.rolling(20, min_periods=2).std(),
+            Fields.MARKET_CAP: prices * np.linspace(1e6, 1e7, n_assets),
+        },
+        axis=1,
+    )
+
+
+@pytest.mark.parametrize(
+    "allocation_method", [AllocationMethod.EQUAL_WEIGHTED, AllocationMethod.RISK_PARITY]
+)
+def test_long_only_book_matches_run_strategy(complete_universe, allocation_method):
+    kwargs = dict(
+        ranking_method=Fields.MOMENTUM,
+        allocation_method=allocation_method,
+        rebalance_frequency=RebalanceFrequency.FRIDAY,
+    )
+    book = LongShortBacktester(complete_universe).run_long_short(
+        long_k=4, short_k=0, gross_exposure=1.0, net_exposure=1.0, **kwargs
+    )
+    reference = PortfolioBacktester(complete_universe).run_strategy(
+        select_top_k_assets=4, print_stats=False, plot_curve=False, **kwargs
+    )
+    np.testing.assert_allclose(
+        book.gross_returns, reference.ledger.gross_returns, rtol=0, atol=1e-15
+    )
+
+
+def test_long_short_book_matches_a_two_sleeves_combination(complete_universe):
+    # The sleeves of the combiner are resized on their drifted capital at each rebalance while the legs are reset
+    # to their exposure, both books are the same as long as the legs are held
+    calendar = RebalanceCalendar.from_dates(
+        complete_universe.index, complete_universe.index[:1]
+    )
+    book = LongShortBacktester(complete_universe).run_long_short(
+        ranking_method=Fields.MOMENTUM,
+        long_k=3,
+        short_k=3,
+        gross_exposure=1.0,
+        rebalance_frequency=calendar,
+    )
+    spec = dict(
+        ranking_method=Fields.MOMENTUM,
+        select_top_k_assets=3,
+        rebalance_frequency=calendar,
+    )
+    reference = PortfolioCombiner(complete_universe).run_combination(
+        [
+            Sleeve("long", StrategySpec(**spec), 0.5),
+            Sleeve(
+                "short",
+                StrategySpec(**spec, ranking_mode=RankingMode.ASCENDING, side=Side.SHORT),
+                0.5,
+            ),
+        ]
+    )
+    np.testing.assert_allclose(book.gross_returns, reference.gross_returns, atol=1e-15)
+    np.testing.assert_allclose(
+        book.long_contribution, reference.sleeves_contribution["long"], atol=1e-15
+    )
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from crypto_momentum_portfolios.portfolio_management.multiple_testing import (
+    MultipleTesting,
+)
+from crypto_momentum_portfolios.utility.types import FalseDiscoveryMethod
+
+N_DATES, N_STRATEGIES, N_DRAWS, BLOCK_SIZE, SEED = 300, 40, 200, 8.0, 11
+
+
+@pytest.fixture
+def returns() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    # Autocorrelated returns, a few strategies with a positive drift
+    noise = rng.standard_t(5, (N_DATES, N_STRATEGIES)) * 0.01
+    values = noise + 0.3 * np.roll(noise, 1, axis=0)
+    values[:, :5] += 0.002
+    return pd.DataFrame(
+        values,
+        index=pd.date_range("2021-01-01", periods=N_DATES, freq="D"),
+        columns=[f"strategy_{i}" for i in range(N_STRATEGIES)],
+    )
+
+
+@pytest.mark.parametrize(
+    "method, scipy_method",
+    [
+        (FalseDiscoveryMethod.BENJAMINI_HOCHBERG, "bh"),
+        (FalseDiscoveryMethod.BENJAMINI_YEKUTIELI, "by"),
+    ],
+)
+def test_adjusted_p_values_match_scipy(method, scipy_method):
+    p_values = np.random.default_rng(0).uniform(0, 0.2, 50) ** 2
+    np.testing.assert_allclose(
+        MultipleTesting.adjust_p_values(p_values, method),
+        stats.false_discovery_control(p_values, method=scipy_method),
+        rtol=1e-12,
+    )
+
+
+def test_deflated_sharpe_ratio_matches_the_formula(returns):
+    values = returns.to_numpy()
+    sharpe_ratios = values.mean(axis=0) / values.std(axis=0, ddof=1)
+    n_trials = 25
+    expected_maximum = np.std(sharpe_ratios, ddof=1) * (
+        (1 - np.euler_gamma) * stats.norm.ppf(1 - 1 / n_trials)
+        + np.euler_gamma * stats.norm.ppf(1 - 1 / (n_trials * np.e))
+    )
+    expected = []
+    for column, sharpe_ratio in zip(values.T, sharpe_ratios):
+        skewness = stats.skew(column)
+        kurtosis = stats.kurtosis(column, fisher=False)
+        expected.append(
+            stats.norm.cdf(
+                (sharpe_ratio - expected_maximum)
+                * np.sqrt(N_DATES - 1)
+                / np.sqrt(
+                    1 - skewness * sharpe_ratio + (kurtosis - 1) / 4 * sharpe_ratio**2
+                )
+            )
+        )
+    np.testing.assert_allclose(
+        MultipleTesting.deflated_sharpe_ratio(values, n_trials), expected, rtol=1e-12
+    )
+    # A single trial is the probabilistic Sharpe ratio against 0
+    assert MultipleTesting.deflated_sharpe_ratio(values[:, :1], 1)[0] == pytest.approx(
+        stats.norm.cdf(
+            sharpe_ratios[0]
+            * np.sqrt(N_DATES - 1)
+            / np.sqrt(
+                1
+                - stats.skew(values[:, 0]) * sharpe_ratios[0]
+                + (stats.kurtosis(values[:, 0], fisher=False) - 1)
+                / 4
+                * sharpe_ratios[0] ** 2
+            )
+        ),
+        rel=1e-12,
+    )
+
+
+def test_bootstrap_p_values_match_the_draw_by_draw_tests(returns):
+    result = MultipleTesting.evaluate(
+        returns, n_draws=N_DRAWS, block_size=BLOCK_SIZE, seed=SEED, draws_per_chunk=N_DRAWS
+    )
+    values = returns.to_numpy()
+    indices = MultipleTesting.stationary_bootstrap_indices(
+        N_DATES, N_DRAWS, BLOCK_SIZE, np.random.default_rng(SEED)
+    )
+    mean = values.mean(axis=0)
+    # Hansen's kernel variance from the autocovariances summed lag by lag
+    centered = values - mean
+    decay = 1 - 1 / BLOCK_SIZE
+    variance = (centered**2).sum(axis=0) / N_DATES
+    for lag in range(1, N_DATES):
+        autocovariance = (centered[lag:] * centered[:-lag]).sum(axis=0) / N_DATES
+        kernel = (N_DATES - lag) / N_DATES * decay**lag + lag / N_DATES * decay ** (
+            N_DATES - lag
+        )
+        variance += 2 * kernel * autocovariance
+    omega = np.sqrt(variance)
+    studentized = np.sqrt(N_DATES) * mean / omega
+    recentering = np.where(
+        studentized >= -np.sqrt(2 * np.log(np.log(N_DATES))), mean, 0.0
+    )
+
+    reality_check, spa, individual = 0, 0, np.zeros(N_STRATEGIES)
+    for draw in indices:
+        bootstrap_mean = values[draw].mean(axis=0)
+        centered_mean = np.sqrt(N_DATES) * (bootstrap_mean - mean)
+        reality_check += centered_mean.max() >= np.sqrt(N_DATES) * mean.max()
+        spa += max(
+            (np.sqrt(N_DATES) * (bootstrap_mean - recentering) / omega).max(), 0.0
+        ) >= max(studentized.max(), 0.0)
+        individual += centered_mean >= np.sqrt(N_DATES) * mean
+
+    np.testing.assert_allclose(
+        result.statistics["p-value"], (1 + individual) / (1 + N_DRAWS)
+    )
+    assert result.reality_check_p_value == (1 + reality_check) / (1 + N_DRAWS)
+    assert result.spa_p_value == (1 + spa) / (1 + N_DRAWS)
+    assert result.best_strategy == returns.columns[np.argmax(mean)]
+    np.testing.assert_allclose(
+        result.statistics["Adjusted p-value"],
+        stats.false_discovery_control((1 + individual) / (1 + N_DRAWS)),
+    )
+
+
+def test_stationary_bootstrap_blocks():
+    indices = MultipleTesting.stationary_bootstrap_indices(
+        N_DATES, 500, BLOCK_SIZE, np.random.default_rng(0)
+    )
+    assert indices.min() >= 0 and indices.max() < N_DATES
+    # Within a block the dates follow each other (circularly)
+    continued = np.diff(indices, axis=1) % N_DATES == 1
+    assert 1 / (1 - continued.mean()) == pytest.approx(BLOCK_SIZE, rel=0.05)
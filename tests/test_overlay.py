@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.portfolio_management.overlay import (
+    VolatilityTargeting,
+)
+from crypto_momentum_portfolios.utility.types import VolatilityForecast
+
+TRANSACTION_COST, SLIPPAGE_EFFECT, FUNDING_COST = 0.001, 0.0005, 0.05
+
+
+@pytest.fixture
+def strategy_returns() -> pd.Series:
+    rng = np.random.default_rng(5)
+    dates = pd.date_range("2020-01-01", periods=400, freq="D")
+    # A volatility regime change so that the leverage moves between its caps
+    volatility = np.where(np.arange(dates.size) < 200, 0.01, 0.05)
+    return pd.Series(rng.normal(0.0005, volatility), index=dates)
+
+
+@pytest.mark.parametrize("method", list(VolatilityForecast))
+def test_forecast_only_uses_the_previous_returns(strategy_returns, method):
+    forecast = VolatilityTargeting.forecast_volatility(strategy_returns, method, 20)
+    shocked = strategy_returns.copy()
+    shocked.iloc[250] = 1.0
+    shocked_forecast = VolatilityTargeting.forecast_volatility(shocked, method, 20)
+    pd.testing.assert_series_equal(shocked_forecast.iloc[:251], forecast.iloc[:251])
+    assert shocked_forecast.iloc[251] > forecast.iloc[251]
+
+    if method == VolatilityForecast.ROLLING:
+        expected = [
+            strategy_returns.iloc[t - 20 : t].std() * np.sqrt(365)
+            for t in range(20, strategy_returns.size)
+        ]
+        np.testing.assert_allclose(forecast.iloc[20:], expected, rtol=1e-12)
+    assert forecast.iloc[:20].isna().all()
+
+
+def test_apply_matches_the_daily_loop(strategy_returns):
+    result = VolatilityTargeting.apply(
+        strategy_returns,
+        target_volatility=0.3,
+        lookback=20,
+        min_leverage=0.4,
+        max_leverage=1.5,
+        transaction_cost=TRANSACTION_COST,
+        slippage_effect=SLIPPAGE_EFFECT,
+        funding_cost=FUNDING_COST,
+    )
+    previous_leverage, expected = 1.0, []
+    for forecast, daily_return in zip(result.forecast_volatility, strategy_returns):
+        leverage = 1.0 if np.isnan(forecast) else min(max(0.3 / forecast, 0.4), 1.5)
+        cost = (TRANSACTION_COST + SLIPPAGE_EFFECT) * abs(leverage - previous_leverage)
+        cost += FUNDING_COST / 365 * max(leverage - 1, 0)
+        expected.append(leverage * daily_return - cost)
+        previous_leverage = leverage
+    np.testing.assert_allclose(result.returns, expected, rtol=0, atol=1e-15)
+    assert {0.4, 1.5} <= set(result.leverage.round(12))
+
+
+def test_sweep_matches_apply(strategy_returns):
+    targets = [0.1, 0.3, 0.8]
+    sweep = VolatilityTargeting.sweep(
+        strategy_returns, targets, VolatilityForecast.ROLLING, funding_cost=FUNDING_COST
+    )
+    for target in targets:
+        pd.testing.assert_series_equal(
+            sweep[target],
+            VolatilityTargeting.apply(
+                strategy_returns,
+                target,
+                VolatilityForecast.ROLLING,
+                funding_cost=FUNDING_COST,
+            ).returns,
+            check_names=False,
+        )
+
+
+def test_weights_are_scaled_by_the_leverage(strategy_returns):
+    weights = pd.DataFrame(
+        {"A-USDT": 0.6, "B-USDT": 0.4}, index=strategy_returns.index
+    )
+    result = VolatilityTargeting.apply(strategy_returns, weights=weights)
+    np.testing.assert_allclose(result.weights.sum(axis=1), result.leverage)
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.utility.rebalance_calendar import (
+    FREQUENCY_TO_OFFSET,
+    RebalanceCalendar,
+)
+from crypto_momentum_portfolios.utility.types import RebalanceFrequency
+
+
+def test_one_member_per_schedule():
+    assert set(FREQUENCY_TO_OFFSET) == set(RebalanceFrequency)
+    offsets = [offset.freqstr for offset in FREQUENCY_TO_OFFSET.values()]
+    assert len(set(offsets)) == len(offsets)
+
+
+@pytest.mark.parametrize(
+    "name, canonical",
+    [
+        ("MONTH_END", RebalanceFrequency.MONTHLY),
+        ("WEEK_START", RebalanceFrequency.WEEKLY),
+        ("WEEK_END", RebalanceFrequency.FRIDAY),
+        ("SUNDAY", RebalanceFrequency.WEEKLY),
+    ],
+)
+def test_deprecated_names_resolve_to_the_canonical_member(name, canonical):
+    with pytest.warns(DeprecationWarning, match=canonical.name):
+        assert getattr(RebalanceFrequency, name) is canonical
+    with pytest.warns(DeprecationWarning):
+        assert RebalanceFrequency[name] is canonical
+
+
+def test_former_values_resolve_to_the_canonical_member():
+    assert RebalanceFrequency("1M") is RebalanceFrequency.MONTHLY
+    assert RebalanceFrequency("W-SUN") is RebalanceFrequency.WEEKLY
+    assert RebalanceFrequency("Q") is RebalanceFrequency.QUARTER_END
+    with pytest.raises(AttributeError):
+        RebalanceFrequency.FORTNIGHTLY
+
+
+def test_weekly_rebalances_on_sundays():
+    index = pd.date_range("2021-01-01", periods=60, freq="D")
+    calendar = RebalanceCalendar.from_frequency(index, RebalanceFrequency.WEEKLY)
+    assert calendar.dates[0] == index[0]
+    assert set(calendar.dates[1:].day_name()) == {"Sunday"}
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.portfolio_management.backtester import (
+    PortfolioBacktester,
+)
+from crypto_momentum_portfolios.utility.result_store import ResultStore
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    Fields,
+    RebalanceFrequency,
+)
+from crypto_momentum_portfolios.utility.utils import weights_drift
+
+
+@pytest.fixture
+def universe() -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    n_dates, n_assets = 250, 10
+    dates = pd.date_range("2020-01-01", periods=n_dates, freq="D")
+    names = [f"A{i}-USDT" for i in range(n_assets - 1)] + ["BTC-USDT"]
+    returns = pd.DataFrame(
+        rng.normal(0.001, 0.03, (n_dates, n_assets)), index=dates, columns=names
+    )
+    returns.iloc[0] = 0.0
+    prices = 100 * (1 + returns).cumprod()
+    momentum = prices.pct_change(20)
+    return pd.concat(
+        {
+            Fields.PRICE: prices,
+            Fields.RETURNS: returns,
+            Fields.MOMENTUM: momentum,
+            Fields.EMA_MOMENTUM: momentum + returns,
+            Fields.VOLATILITY: returns.rolling(20, min_periods=2).std(),
+            Fields.MARKET_CAP: prices * np.linspace(1e6, 1e7, n_assets),
+        },
+        axis=1,
+    )
+
+
+def run(universe: pd.DataFrame, **kwargs):
+    return PortfolioBacktester(universe).run_strategy(
+        ranking_method=Fields.MOMENTUM,
+        allocation_method=AllocationMethod.RISK_PARITY,
+        rebalance_frequency=RebalanceFrequency.FRIDAY,
+        print_stats=False,
+        plot_curve=False,
+        **kwargs,
+    )
+
+
+def test_stored_run_round_trips_exactly(tmp_path, universe):
+    store = ResultStore(tmp_path)
+    computed = run(universe, result_store=store)
+    assert len(store.keys()) == 1
+    loaded = run(universe, result_store=store)
+
+    pd.testing.assert_series_equal(loaded.returns, computed.returns, check_freq=False)
+    pd.testing.assert_frame_equal(loaded.weights, computed.weights, check_freq=False)
+    for name, array in computed.weights_history.to_arrays().items():
+        np.testing.assert_array_equal(loaded.weights_history.to_arrays()[name], array)
+    pd.testing.assert_frame_equal(
+        loaded.weights_history.diagnostics,
+        computed.weights_history.diagnostics,
+        check_freq=False,
+    )
+    for name, array in computed.ledger.to_arrays().items():
+        np.testing.assert_array_equal(loaded.ledger.to_arrays()[name], array)
+
+
+def test_stats_are_saved_with_the_run(tmp_path, universe):
+    store = ResultStore(tmp_path)
+    returns = run(universe).returns
+    stats = pd.DataFrame({"metric": ["Sharpe ratio", "CAGR"], "value": [1.25, 0.3]})
+    store.save("run", returns, manifest={"config": {"side": 1}})
+    assert store.load("run")["stats"] is None
+
+    store.save_stats("run", stats)
+    loaded = store.load("run")
+    pd.testing.assert_frame_equal(loaded["stats"], stats)
+    pd.testing.assert_series_equal(loaded["returns"], returns, check_freq=False)
+    assert loaded["manifest"]["config"] == {"side": 1}
+    assert store.load_stats(["run"]).loc["run", "CAGR"] == 0.3
+
+
+def test_dense_weights_match_the_daily_drift_loop(universe):
+    result = run(universe)
+    returns, weights, _ = result
+    history = result.weights_history
+    assert weights is result.weights
+
+    rebalance_positions = universe.index.get_indexer(history.rebalance_dates)
+    expected = pd.DataFrame(0.0, index=universe.index, columns=weights.columns)
+    for position, (date, row) in enumerate(universe.iterrows()):
+        if position in rebalance_positions:
+            target = history.target_weights(
+                int(np.flatnonzero(rebalance_positions == position)[0])
+            )
+            drifted = dict(zip(target.index, target.to_numpy()))
+        expected.loc[date, list(drifted)] = list(drifted.values())
+        securities = list(drifted)
+        drifted = weights_drift(
+            securities,
+            np.array(list(drifted.values())),
+            row[Fields.RETURNS][securities].to_numpy(dtype=float),
+        )
+    # The targets are stored in float32 by the weights history
+    pd.testing.assert_frame_equal(
+        weights, expected, check_freq=False, check_names=False, rtol=0, atol=1e-6
+    )
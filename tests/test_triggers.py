@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_momentum_portfolios.portfolio_management.backtester import (
+    PortfolioBacktester,
+)
+from crypto_momentum_portfolios.portfolio_management.triggers import (
+    RebalanceTriggers,
+)
+from crypto_momentum_portfolios.utility.rebalance_calendar import RebalanceCalendar
+from crypto_momentum_portfolios.utility.types import (
+    AllocationMethod,
+    Fields,
+    RebalanceFrequency,
+)
+from crypto_momentum_portfolios.utility.utils import weights_drift
+
+TOP_K, DRIFT_THRESHOLD = 3, 0.04
+
+
+@pytest.fixture
+def universe() -> pd.DataFrame:
+    rng = np.random.default_rng(12)
+    n_dates, n_assets = 240, 8
+    dates = pd.date_range("2020-01-01", periods=n_dates, freq="D")
+    names = [f"A{i}-USDT" for i in range(n_assets - 1)] + ["BTC-USDT"]
+    returns = pd.DataFrame(
+        rng.normal(0.001, 0.03, (n_dates, n_assets)), index=dates, columns=names
+    )
+    returns.iloc[0] = 0.0
+    prices = 100 * (1 + returns).cumprod()
+    momentum = prices.pct_change(30)
+    return pd.concat(
+        {
+            Fields.PRICE: prices,
+            Fields.RETURNS: returns,
+            Fields.MOMENTUM: momentum,
+            Fields.EMA_MOMENTUM: momentum,
+            Fields.VOLATILITY: returns.rolling(20, min_periods=2).std(),
+            Fields.MARKET_CAP: prices * np.linspace(1e6, 1e7, n_assets),
+        },
+        axis=1,
+    )
+
+
+def run(universe: pd.DataFrame, rebalance_frequency):
+    return PortfolioBacktester(universe).run_strategy(
+        ranking_method=Fields.MOMENTUM,
+        select_top_k_assets=TOP_K,
+        allocation_method=AllocationMethod.RISK_PARITY,
+        rebalance_frequency=rebalance_frequency,
+        print_stats=False,
+        plot_curve=False,
+    )
+
+
+def test_membership_and_predicate_triggers_match_the_brute_force(universe):
+    predicate = lambda u: u[Fields.VOLATILITY].mean(axis=1) > 0.031
+    calendar = RebalanceTriggers(membership_change=True, predicate=predicate).to_calendar(
+        universe, Fields.MOMENTUM, select_top_k_assets=TOP_K
+    )
+    members = [
+        frozenset(row.dropna().nlargest(TOP_K).index)
+        for _, row in universe[Fields.MOMENTUM].iterrows()
+    ]
+    expected = [
+        position == 0 or members[position] != members[position - 1] or flag
+        for position, flag in enumerate(predicate(universe))
+    ]
+    np.testing.assert_array_equal(calendar.mask, expected)
+    assert 10 < calendar.mask.sum() < universe.shape[0] / 2
+
+
+def test_drift_trigger_matches_the_daily_drift(universe):
+    result = run(
+        universe,
+        RebalanceTriggers(
+            drift_threshold=DRIFT_THRESHOLD, schedule=RebalanceFrequency.MONTHLY
+        ),
+    )
+    history = result.weights_history
+    positions = universe.index.get_indexer(history.rebalance_dates)
+    scheduled = RebalanceCalendar.resolve(RebalanceFrequency.MONTHLY, universe.index).mask
+    returns = universe[Fields.RETURNS]
+    expected, position = [0], 0
+    while True:
+        target = history.target_weights(len(expected) - 1)
+        weights = target.to_numpy()
+        for following in range(position + 1, universe.shape[0] + 1):
+            if following == universe.shape[0] or scheduled[following]:
+                break
+            weights = np.array(
+                list(
+                    weights_drift(
+                        target.index.tolist(),
+                        weights,
+                        returns.iloc[following - 1][target.index].to_numpy(),
+                    ).values()
+                )
+            )
+            if np.abs(weights - target.to_numpy()).sum() > DRIFT_THRESHOLD:
+                break
+        if following == universe.shape[0]:
+            break
+        expected.append(following)
+        position = following
+    np.testing.assert_array_equal(positions, expected)
+    assert (~scheduled[positions]).sum() > 5
+
+
+@pytest.mark.parametrize(
+    "triggers",
+    [
+        RebalanceTriggers(membership_change=True),
+        RebalanceTriggers(drift_threshold=DRIFT_THRESHOLD),
+    ],
+)
+def test_triggered_run_matches_the_explicit_calendar(universe, triggers):
+    triggered = run(universe, triggers)
+    explicit = run(
+        universe,
+        RebalanceCalendar.from_dates(
+            universe.index, triggered.weights_history.rebalance_dates
+        ),
+    )
+    pd.testing.assert_series_equal(triggered.returns, explicit.returns)
+    pd.testing.assert_frame_equal(triggered.weights, explicit.weights)